@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
 import numba as nb
@@ -53,6 +54,25 @@ class AccessibilitySettings(PydanticReadable):
     If less than 1, use this fraction of the total number of rows.
     """
 
+    tile_size: int = 0
+    """
+    If > 0, compute accessibilities in tiles of this many origin zones.
+
+    Each tile evaluates the SPEC for its origin zones to all destination zones,
+    and reduces the results straight into the accessibility table, so peak
+    memory is bounded by the tile size (times `tile_threads`).  Adaptive and
+    explicit chunking are not used when this is set.
+
+    .. versionadded:: 1.3
+    """
+
+    tile_threads: int = 1
+    """
+    Number of tiles to compute concurrently on a thread pool, if `tile_size` > 0.
+
+    .. versionadded:: 1.3
+    """
+
 
 @nb.njit
 def _accumulate_accessibility(arr, orig_zone_count, dest_zone_count):
@@ -69,6 +89,78 @@ def _accumulate_accessibility(arr, orig_zone_count, dest_zone_count):
     return result
 
 
+def _od_dataframe(orig_zones, land_use_df, orig_land_use_df, trace_label):
+    """
+    OD dataframe of every orig zone to every land_use_df zone, with land use columns
+    """
+    dest_zones = land_use_df.index.values
+
+    orig_zone_count = len(orig_zones)
+    dest_zone_count = len(dest_zones)
+
+    # create OD dataframe
+    od_data = {
+        "orig": np.repeat(orig_zones, dest_zone_count),
+        "dest": np.tile(dest_zones, orig_zone_count),
+    }
+    # previously, the land use was added to the dataframe via pd.merge
+    # but the merge is expensive and unnecessary as we can just tile.
+    logger.debug(f"{trace_label}: tiling land_use_columns into od_data")
+    for c in land_use_df.columns:
+        od_data[c] = np.tile(land_use_df[c].to_numpy(), orig_zone_count)
+    if orig_land_use_df is not None:
+        logger.debug(f"{trace_label}: repeating orig_land_use_columns into od_data")
+        for c in orig_land_use_df:
+            od_data[f"landuse_orig_{c}"] = np.repeat(
+                orig_land_use_df[c], dest_zone_count
+            )
+    logger.debug(f"{trace_label}: converting od_data to DataFrame")
+    od_df = pd.DataFrame(od_data)
+    logger.debug(f"{trace_label}: dropping od_data")
+    del od_data
+    logger.debug(f"{trace_label}: dropping od_data complete")
+
+    return od_df
+
+
+def _accessibility_locals(od_df, constants, network_los):
+    """
+    locals_dict for evaluating the accessibility spec on od_df
+    """
+    locals_d = {
+        "log": np.log,
+        "exp": np.exp,
+        "network_los": network_los,
+    }
+    locals_d.update(constants)
+
+    skim_dict = network_los.get_default_skim_dict()
+    locals_d["skim_od"] = skim_dict.wrap("orig", "dest").set_df(od_df)
+    locals_d["skim_do"] = skim_dict.wrap("dest", "orig").set_df(od_df)
+
+    if network_los.zone_system == los.THREE_ZONE:
+        locals_d["tvpb"] = network_los.tvpb
+
+    return locals_d
+
+
+def _write_accessibility_trace(state, od_df, trace_results, trace_assigned_locals):
+    # add OD columns to trace results
+    df = pd.concat([od_df, trace_results], axis=1)
+
+    # dump the trace results table (with _temp variables) to aid debugging
+    state.tracing.trace_df(
+        df,
+        label="accessibility",
+        index_label="skim_offset",
+        slicer="NONE",
+        warn_if_empty=True,
+    )
+
+    if trace_assigned_locals:
+        state.tracing.write_csv(trace_assigned_locals, file_name="accessibility_locals")
+
+
 def compute_accessibilities_for_zones(
     state: workflow.State,
     accessibility_df: pd.DataFrame,
@@ -111,27 +203,7 @@ def compute_accessibilities_for_zones(
         % (trace_label, orig_zone_count, dest_zone_count)
     )
 
-    # create OD dataframe
-    od_data = {
-        "orig": np.repeat(orig_zones, dest_zone_count),
-        "dest": np.tile(dest_zones, orig_zone_count),
-    }
-    # previously, the land use was added to the dataframe via pd.merge
-    # but the merge is expensive and unnecessary as we can just tile.
-    logger.debug(f"{trace_label}: tiling land_use_columns into od_data")
-    for c in land_use_df.columns:
-        od_data[c] = np.tile(land_use_df[c].to_numpy(), orig_zone_count)
-    if orig_land_use_df is not None:
-        logger.debug(f"{trace_label}: repeating orig_land_use_columns into od_data")
-        for c in orig_land_use_df:
-            od_data[f"landuse_orig_{c}"] = np.repeat(
-                orig_land_use_df[c], dest_zone_count
-            )
-    logger.debug(f"{trace_label}: converting od_data to DataFrame")
-    od_df = pd.DataFrame(od_data)
-    logger.debug(f"{trace_label}: dropping od_data")
-    del od_data
-    logger.debug(f"{trace_label}: dropping od_data complete")
+    od_df = _od_dataframe(orig_zones, land_use_df, orig_land_use_df, trace_label)
 
     trace_od = state.settings.trace_od
     if trace_od:
@@ -142,20 +214,8 @@ def compute_accessibilities_for_zones(
 
     chunk_sizer.log_df(trace_label, "od_df", od_df)
 
-    locals_d = {
-        "log": np.log,
-        "exp": np.exp,
-        "network_los": network_los,
-    }
-    locals_d.update(constants)
-
-    skim_dict = network_los.get_default_skim_dict()
-    # FIXME: because od_df is so huge, next two lines use a fair bit of memory
-    locals_d["skim_od"] = skim_dict.wrap("orig", "dest").set_df(od_df)
-    locals_d["skim_do"] = skim_dict.wrap("dest", "orig").set_df(od_df)
-
-    if network_los.zone_system == los.THREE_ZONE:
-        locals_d["tvpb"] = network_los.tvpb
+    # FIXME: because od_df is so huge, skim wrappers use a fair bit of memory
+    locals_d = _accessibility_locals(od_df, constants, network_los)
 
     logger.info(f"{trace_label}: assign.assign_variables")
     results, trace_results, trace_assigned_locals = assign.assign_variables(
@@ -188,22 +248,131 @@ def compute_accessibilities_for_zones(
                 f"trace_od not found origin = {trace_orig}, dest = {trace_dest}"
             )
         else:
-            # add OD columns to trace results
-            df = pd.concat([od_df[trace_od_rows], trace_results], axis=1)
-
-            # dump the trace results table (with _temp variables) to aid debugging
-            state.tracing.trace_df(
-                df,
-                label="accessibility",
-                index_label="skim_offset",
-                slicer="NONE",
-                warn_if_empty=True,
+            _write_accessibility_trace(
+                state, od_df[trace_od_rows], trace_results, trace_assigned_locals
             )
 
-            if trace_assigned_locals:
-                state.tracing.write_csv(
-                    trace_assigned_locals, file_name="accessibility_locals"
-                )
+    return accessibility_df
+
+
+def compute_accessibilities_for_zones_tiled(
+    state: workflow.State,
+    accessibility_df: pd.DataFrame,
+    land_use_df: pd.DataFrame,
+    orig_land_use_df: pd.DataFrame | None,
+    assignment_spec: dict,
+    constants: dict,
+    network_los: los.Network_LOS,
+    trace_label: str,
+    tile_size: int,
+    tile_threads: int = 1,
+):
+    """
+    Compute accessibility for each zone in tiles of orig zones, on a thread pool.
+
+    Like compute_accessibilities_for_zones, but only tile_size orig zones at a time are
+    expanded to an od table, so peak memory is bounded by tile_size * len(land_use_df)
+    rows (for each of tile_threads threads), and the accessibility of each tile is
+    accumulated straight into the result.
+
+    Parameters
+    ----------
+    state : workflow.State
+    accessibility_df : pd.DataFrame
+    land_use_df : pd.DataFrame
+    orig_land_use_df : pd.DataFrame | None
+    assignment_spec : dict
+    constants : dict
+    network_los : los.Network_LOS
+    trace_label : str
+    tile_size : int
+        number of orig zones in each tile
+    tile_threads : int
+        number of tiles to compute concurrently
+
+    Returns
+    -------
+    accessibility_df : pd.DataFrame
+    """
+    assert tile_size > 0
+
+    orig_zones = accessibility_df.index.values
+    orig_zone_count = len(orig_zones)
+    dest_zone_count = len(land_use_df)
+
+    logger.info(
+        f"Running {trace_label} with {orig_zone_count} orig zones {dest_zone_count} "
+        f"dest zones in tiles of {tile_size} orig zones on {tile_threads} threads"
+    )
+
+    trace_od = state.settings.trace_od
+
+    def compute_tile(start):
+        stop = min(start + tile_size, orig_zone_count)
+        tile_trace_label = f"{trace_label}.tile_{start}"
+
+        od_df = _od_dataframe(
+            orig_zones[start:stop],
+            land_use_df,
+            None
+            if orig_land_use_df is None
+            else orig_land_use_df.loc[orig_zones[start:stop]],
+            tile_trace_label,
+        )
+
+        trace_od_rows = None
+        if trace_od:
+            trace_orig, trace_dest = trace_od
+            if trace_orig in orig_zones[start:stop]:
+                trace_od_rows = (od_df.orig == trace_orig) & (od_df.dest == trace_dest)
+
+        results, trace_results, trace_assigned_locals = assign.assign_variables(
+            state,
+            assignment_spec,
+            od_df,
+            _accessibility_locals(od_df, constants, network_los),
+            trace_rows=trace_od_rows,
+            trace_label=tile_trace_label,
+        )
+
+        accessibilities = {
+            column: _accumulate_accessibility(
+                results[column].to_numpy(), stop - start, dest_zone_count
+            )
+            for column in results.columns
+        }
+
+        if trace_od_rows is not None and trace_od_rows.any():
+            trace = (od_df[trace_od_rows], trace_results, trace_assigned_locals)
+        else:
+            trace = None
+
+        return start, stop, accessibilities, trace
+
+    accessibility_new_columns = {}
+    trace = None
+    with ThreadPoolExecutor(max_workers=tile_threads) as pool:
+        for start, stop, accessibilities, tile_trace in pool.map(
+            compute_tile, range(0, orig_zone_count, tile_size)
+        ):
+            for column, values in accessibilities.items():
+                if column not in accessibility_new_columns:
+                    accessibility_new_columns[column] = np.empty(
+                        orig_zone_count, dtype=values.dtype
+                    )
+                accessibility_new_columns[column][start:stop] = values
+            trace = trace or tile_trace
+
+    logger.info(f"{trace_label}: completed aggregating")
+    accessibility_df = accessibility_df.assign(**accessibility_new_columns)
+
+    if trace_od:
+        if trace is None:
+            logger.warning(
+                f"trace_od not found origin = {trace_od[0]}, dest = {trace_od[1]}"
+            )
+        else:
+            _write_accessibility_trace(state, *trace)
 
     return accessibility_df
 
@@ -272,30 +441,49 @@ def compute_accessibility(
     accessibilities_list = []
     explicit_chunk_size = model_settings.explicit_chunk
 
-    for (
-        _i,
-        chooser_chunk,
-        _chunk_trace_label,
-        chunk_sizer,
-    ) in chunk.adaptive_chunked_choosers(
-        state, accessibility_df, trace_label, explicit_chunk_size=explicit_chunk_size
-    ):
-        if orig_land_use_df is not None:
-            orig_land_use_df_chunk = orig_land_use_df.loc[chooser_chunk.index]
-        else:
-            orig_land_use_df_chunk = None
-        accessibilities = compute_accessibilities_for_zones(
-            state,
+    if model_settings.tile_size > 0:
+        accessibilities_list.append(
+            compute_accessibilities_for_zones_tiled(
+                state,
+                accessibility_df,
+                land_use_df,
+                orig_land_use_df,
+                assignment_spec,
+                constants,
+                network_los,
+                trace_label,
+                tile_size=model_settings.tile_size,
+                tile_threads=model_settings.tile_threads,
+            )
+        )
+    else:
+        for (
+            _i,
             chooser_chunk,
-            land_use_df,
-            orig_land_use_df_chunk,
-            assignment_spec,
-            constants,
-            network_los,
-            trace_label,
+            _chunk_trace_label,
             chunk_sizer,
-        )
-        accessibilities_list.append(accessibilities)
+        ) in chunk.adaptive_chunked_choosers(
+            state,
+            accessibility_df,
+            trace_label,
+            explicit_chunk_size=explicit_chunk_size,
+        ):
+            if orig_land_use_df is not None:
+                orig_land_use_df_chunk = orig_land_use_df.loc[chooser_chunk.index]
+            else:
+                orig_land_use_df_chunk = None
+            accessibilities = compute_accessibilities_for_zones(
+                state,
+                chooser_chunk,
+                land_use_df,
+                orig_land_use_df_chunk,
+                assignment_spec,
+                constants,
+                network_los,
+                trace_label,
+                chunk_sizer,
+            )
+            accessibilities_list.append(accessibilities)
 
     accessibility_df = pd.concat(accessibilities_list)
 
@@ -95,7 +95,11 @@ def initialize_los(state: workflow.State, network_los: los.Network_LOS) -> None:
                 tap_cache.get_data_and_lock_from_buffers()
             )  # don't need lock here since single process
 
-            if os.path.isfile(tap_cache.cache_path):
+            if tap_cache.persistent:
+                # shared cache was loaded by load_data_to_buffer from the persistent cache,
+                # with np.nan for any attribute combinations initialize_tvpb has yet to compute
+                pass
+            elif os.path.isfile(tap_cache.cache_path):
                 # fully populated cache should have been loaded from saved cache
                 assert not network_los.rebuild_tvpb_cache
                 assert not any_uninitialized(data, lock=None)
@@ -206,6 +210,9 @@ def initialize_tvpb(
     of the tuples (and the other processes will compute the rest). All process wait until the cache is fully
     populated before returning, and the locutor process writes the results.
 
+    if the persistent_tvpb_cache setting is True, only the attribute tuples missing from the persistent
+    cache are computed, and each process writes them to the persistent cache as soon as they are computed.
+
 
     FIXME - if we did not close this, we could avoid having to reload it from mmap when single-process?
     """
@@ -225,8 +232,21 @@ def initialize_tvpb(
     tap_cache = network_los.tvpb.tap_cache
     assert not tap_cache.is_open
 
+    if tap_cache.persistent:
+        # only compute attribute combinations not already in the persistent cache
+        missing_offsets = set(tap_cache.missing_offsets())
+        if not missing_offsets:
+            logger.info(
+                f"{trace_label} skipping rebuild of STATIC cache because persistent cache "
+                f"is fully populated: {tap_cache.persistent_cache_dir}"
+            )
+            return
+        logger.info(
+            f"{trace_label} computing {len(missing_offsets)} attribute combinations "
+            f"missing from persistent cache: {tap_cache.persistent_cache_dir}"
+        )
     # if cache already exists,
-    if os.path.isfile(tap_cache.cache_path):
+    elif os.path.isfile(tap_cache.cache_path):
         # otherwise should have been deleted by TVPBCache.cleanup in initialize_los step
         assert not network_los.rebuild_tvpb_cache
         logger.info(
@@ -253,6 +273,9 @@ def initialize_tvpb(
         # compute utilities for this 'skim' with a single full set of scalar attributes
 
         offset = network_los.tvpb.uid_calculator.get_skim_offset(scalar_attributes)
+        if tap_cache.persistent and offset not in missing_offsets:
+            continue
+
         tuple_trace_label = tracing.extend_trace_label(trace_label, f"offset{offset}")
 
         compute_utilities_for_attribute_tuple(
@@ -264,6 +287,17 @@ def initialize_tvpb(
             data.reshape(uid_calculator.skim_shape)[offset], lock
         )
 
+        if tap_cache.persistent:
+            # persistent cache fills as we go, so other processes and later runs can use it
+            with lock_data(lock):
+                tap_cache.write_chunk(
+                    offset, data.reshape(uid_calculator.skim_shape)[offset]
+                )
+
+    if tap_cache.persistent:
+        # every process has written the attribute combinations it computed
+        return
+
     if multiprocess and not state.get_injectable("locutor", False):
         return
 
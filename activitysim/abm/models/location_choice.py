@@ -1000,6 +1000,12 @@ def iterate_location_choice(
 
     logger.debug(f"{trace_label} max_iterations: {max_iterations}")
 
+    # choosers to re-simulate depend on their sampled alternatives
+    resimulate_changed_only = (
+        spc.resimulate_subset
+        and spc.shadow_settings.SHADOW_PRICE_METHOD != "simulation"
+    )
+
     save_sample_df = (
         choices_df
     ) = None  # initialize to None, will be populated in first iteration
@@ -1010,20 +1016,29 @@ def iterate_location_choice(
         if spc.use_shadow_pricing and iteration > 1:
             spc.update_shadow_prices(state)
 
-            if spc.shadow_settings.SHADOW_PRICE_METHOD == "simulation":
+            if resimulate_changed_only:
+                spc.sampled_persons = spc.choosers_to_resimulate(
+                    choices=choices_df["choice"],
+                    segment_ids=persons_merged_df[chooser_segment_column].reindex(
+                        choices_df.index
+                    ),
+                    sample_df=save_sample_df,
+                )
+
+            if spc.resimulate_subset:
                 # filter from the sampled persons
                 persons_merged_df_ = persons_merged_df_[
                     persons_merged_df_.index.isin(spc.sampled_persons.index)
                 ]
                 persons_merged_df_ = persons_merged_df_.sort_index()
 
-        choices_df_, save_sample_df = run_location_choice(
+        choices_df_, sample_df_ = run_location_choice(
             state,
             persons_merged_df_,
             network_los,
             shadow_price_calculator=spc,
             want_logsums=want_logsums,
-            want_sample_table=want_sample_table,
+            want_sample_table=want_sample_table or resimulate_changed_only,
             estimator=estimator,
             model_settings=model_settings,
             chunk_size=chunk_size,
@@ -1035,12 +1050,27 @@ def iterate_location_choice(
         if choices_df_ is None:
             break
 
+        if resimulate_changed_only and iteration > 1:
+            # keep the sample of choosers that were not re-simulated
+            if save_sample_df is None:
+                save_sample_df = sample_df_
+            elif sample_df_ is not None:
+                save_sample_df = pd.concat(
+                    [
+                        save_sample_df[
+                            ~save_sample_df.index.get_level_values(0).isin(
+                                sample_df_.index.get_level_values(0)
+                            )
+                        ],
+                        sample_df_,
+                    ]
+                ).sort_index(level=0, sort_remaining=False)
+        else:
+            save_sample_df = sample_df_
+
         if spc.use_shadow_pricing:
-            # handle simulation method
-            if (
-                spc.shadow_settings.SHADOW_PRICE_METHOD == "simulation"
-                and iteration > 1
-            ):
+            # handle simulation method, and choosers not re-simulated
+            if spc.resimulate_subset and iteration > 1:
                 # if a process ends up with no sampled workers in it, hence an empty choice_df_, then choice_df wil be what it was previously
                 if len(choices_df_) != 0:
                     choices_df = pd.concat([choices_df, choices_df_], axis=0)
@@ -1082,6 +1112,8 @@ def iterate_location_choice(
     if locutor:
         if spc.use_shadow_pricing and model_settings.SHADOW_PRICE_TABLE:
             state.add_table(model_settings.SHADOW_PRICE_TABLE, spc.shadow_prices)
+        if spc.use_shadow_pricing and spc.shadow_settings.PERSIST_SHADOW_PRICES:
+            spc.write_persisted_shadow_prices(state, iterations=iteration)
         if model_settings.MODELED_SIZE_TABLE:
             state.add_table(model_settings.MODELED_SIZE_TABLE, spc.modeled_size)
 
@@ -1107,7 +1139,7 @@ def iterate_location_choice(
             choices_df[ALT_LOGSUM].reindex(persons_df.index).astype("float")
         )
 
-    if save_sample_df is not None:
+    if want_sample_table and save_sample_df is not None:
         # might be None for tiny samples even if sample_table_name was specified
         assert len(save_sample_df.index.get_level_values(0).unique()) == len(choices_df)
         # lest they try to put school and workplace samples into the same table
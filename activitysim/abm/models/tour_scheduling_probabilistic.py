@@ -43,6 +43,9 @@ def run_tour_scheduling_probabilistic(
     pandas.Series
         series of chosen alternative indices for each chooser
     """
+    # compile probs once, rather than merging them with each chunk of tours
+    probs_lookup = ps.SchedulingProbsLookup(scheduling_probs, probs_join_cols)
+
     result_list = []
     for (
         i,
@@ -63,6 +66,7 @@ def run_tour_scheduling_probabilistic(
             trace_choice_col_name="depart_return",
             clip_earliest_latest=False,
             chunk_sizer=chunk_sizer,
+            probs_lookup=probs_lookup,
         )
         result_list.append(choices)
 
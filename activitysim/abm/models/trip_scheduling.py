@@ -9,6 +9,7 @@ from typing import Any, List, Literal
 
 import numpy as np
 import pandas as pd
+from numba import njit
 
 from activitysim.abm.models.util import probabilistic_scheduling as ps
 from activitysim.abm.models.util.school_escort_tours_trips import (
@@ -192,6 +193,25 @@ def update_tour_earliest(trips, outbound_choices, logic_version: int):
     return
 
 
+def _probs_join_cols(model_settings: TripSchedulingSettings) -> list[str]:
+    scheduling_mode = model_settings.scheduling_mode
+    probs_join_cols = model_settings.probs_join_cols
+    if probs_join_cols is None:
+        if scheduling_mode == "departure":
+            probs_join_cols = PROBS_JOIN_COLUMNS_DEPARTURE_BASED
+        elif scheduling_mode == "stop_duration":
+            probs_join_cols = PROBS_JOIN_COLUMNS_DURATION_BASED
+        elif scheduling_mode == "relative":
+            probs_join_cols = PROBS_JOIN_COLUMNS_RELATIVE_BASED
+        else:
+            logger.error(
+                "Invalid scheduling mode specified: {0}.".format(scheduling_mode),
+                "Please select one of ['departure', 'stop_duration', 'relative'] and try again.",
+            )
+            raise ValueError(f"Invalid scheduling mode specified: {scheduling_mode}")
+    return probs_join_cols
+
+
 def schedule_trips_in_leg(
     state: workflow.State,
     outbound,
@@ -202,6 +222,7 @@ def schedule_trips_in_leg(
     trace_label,
     *,
     chunk_sizer: chunk.ChunkSizer,
+    probs_lookup: ps.SchedulingProbsLookup | None = None,
 ):
     """
 
@@ -214,6 +235,8 @@ def schedule_trips_in_leg(
     depart_alt_base
     is_last_iteration
     trace_label
+    probs_lookup : SchedulingProbsLookup, optional
+        probs_spec compiled into a lookup table (for departure scheduling_mode)
 
     Returns
     -------
@@ -226,20 +249,7 @@ def schedule_trips_in_leg(
     scheduling_mode = model_settings.scheduling_mode
     preprocessor_settings = model_settings.preprocessor
 
-    probs_join_cols = model_settings.probs_join_cols
-    if probs_join_cols is None:
-        if scheduling_mode == "departure":
-            probs_join_cols = PROBS_JOIN_COLUMNS_DEPARTURE_BASED
-        elif scheduling_mode == "stop_duration":
-            probs_join_cols = PROBS_JOIN_COLUMNS_DURATION_BASED
-        elif scheduling_mode == "relative":
-            probs_join_cols = PROBS_JOIN_COLUMNS_RELATIVE_BASED
-        else:
-            logger.error(
-                "Invalid scheduling mode specified: {0}.".format(scheduling_mode),
-                "Please select one of ['departure', 'stop_duration', 'relative'] and try again.",
-            )
-            raise ValueError(f"Invalid scheduling mode specified: {scheduling_mode}")
+    probs_join_cols = _probs_join_cols(model_settings)
 
     # logger.debug("%s scheduling %s trips" % (trace_label, trips.shape[0]))
 
@@ -317,6 +327,7 @@ def schedule_trips_in_leg(
             report_failed_trips=is_last_iteration,
             trace_label=nth_trace_label,
             chunk_sizer=chunk_sizer,
+            probs_lookup=probs_lookup,
         )
 
         # most initial departure (when no choice was made because all probs were zero)
@@ -373,6 +384,7 @@ def run_trip_scheduling(
     trace_label,
     *,
     chunk_sizer: chunk.ChunkSizer,
+    probs_lookup: ps.SchedulingProbsLookup | None = None,
 ):
     set_tour_hour(trips_chunk, tours)
     set_stop_num(trips_chunk)
@@ -396,6 +408,7 @@ def run_trip_scheduling(
             is_last_iteration=is_last_iteration,
             trace_label=leg_trace_label,
             chunk_sizer=chunk_sizer,
+            probs_lookup=probs_lookup,
         )
         result_list.append(choices)
 
@@ -417,6 +430,7 @@ def run_trip_scheduling(
             is_last_iteration=is_last_iteration,
             trace_label=leg_trace_label,
             chunk_sizer=chunk_sizer,
+            probs_lookup=probs_lookup,
         )
         result_list.append(choices)
 
@@ -427,6 +441,255 @@ def run_trip_scheduling(
     return choices
 
 
+@njit(cache=True, error_model="numpy")
+def _schedule_leg_departures(
+    order,
+    spec_rows,
+    probs,
+    depart_alt_base,
+    first_trip_in_leg,
+    rands,
+    earliest,
+    latest,
+    adjust,
+    next_trip,
+    fill_failed,
+    depart,
+    failed,
+):
+    """
+    Choose departure periods for the trips of one leg, in dependency order
+
+    Equivalent to make_scheduling_choices for each trip_num in turn in
+    schedule_trips_in_leg (in departure mode), but one trip at a time: the probs of
+    each trip's spec row are clipped to its earliest-latest window, a depart (or
+    failure) is chosen with its rand, and the choice constrains the adjust column
+    (earliest for outbound, latest for inbound) of the next trip in the leg.
+
+    Parameters
+    ----------
+    order : array of int, trip positions in the order they are to be scheduled
+    spec_rows : array of int, row of probs for each trip
+    probs : 2-D array of float, normalized_probs of a SchedulingProbsLookup
+    depart_alt_base : int
+    first_trip_in_leg : array of bool, whether to renormalize clipped probs
+    rands : array of float
+    earliest, latest : array of float
+    adjust : array of float, the earliest or latest array constrained by each choice
+    next_trip : array of int, position of next trip in leg, or -1 for none
+    fill_failed : bool, whether failed departs are set to the adjust column
+    depart : array of float, receives depart choices (NaN if failed and not filled)
+    failed : array of bool, receives whether choice failed
+    """
+    num_alts = probs.shape[1]
+    chooser_probs = np.empty(num_alts + 1, dtype=np.float64)
+    for k in order:
+        choice, _ = ps.clipped_cumsum_choice(
+            probs[spec_rows[k]],
+            True,
+            earliest[k],
+            latest[k],
+            depart_alt_base,
+            first_trip_in_leg[k],
+            rands[k],
+            chooser_probs,
+        )
+
+        if choice == num_alts:
+            failed[k] = True
+            depart[k] = adjust[k] if fill_failed else np.nan
+        else:
+            depart[k] = choice + depart_alt_base
+
+        # adjust allowed depart range of next trip
+        if next_trip[k] >= 0:
+            adjust[next_trip[k]] = adjust[k] if np.isnan(depart[k]) else depart[k]
+
+
+def schedule_trips_vectorized(
+    state: workflow.State,
+    trips: pd.DataFrame,
+    tours: pd.DataFrame,
+    probs_lookup: ps.SchedulingProbsLookup,
+    model_settings: TripSchedulingSettings,
+    trace_label: str,
+    *,
+    chunk_sizer: chunk.ChunkSizer,
+):
+    """
+    Schedule departure-based trips of all tours at once, with retries for failed legs.
+
+    Makes the same choices as the iterations of run_trip_scheduling (with the same
+    random numbers) but the probs are looked up for trips just once, each leg is
+    scheduled in a single numba sweep in trip_num order, and each retry reschedules
+    just the legs of tours with a failed trip, by masking arrays rather than by
+    slicing and rebuilding the trips table.
+
+    Parameters
+    ----------
+    state : workflow.State
+    trips : pandas.DataFrame
+        trips of whole tours, indexed by trip_id
+    tours : pandas.DataFrame
+    probs_lookup : SchedulingProbsLookup
+    model_settings : TripSchedulingSettings
+        with departure scheduling_mode, and no preprocessor
+    trace_label : str
+    chunk_sizer : chunk.ChunkSizer
+
+    Returns
+    -------
+    choices : pandas.Series
+        depart choice for trips, indexed by trip_id, NaN for trips that failed
+    iterations : int
+        number of iterations performed
+    """
+    assert model_settings.scheduling_mode == DEPARTURE_MODE
+    assert not model_settings.preprocessor
+
+    failfix = model_settings.FAILFIX
+    depart_alt_base = model_settings.DEPART_ALT_BASE
+    max_iterations = model_settings.MAX_ITERATIONS
+    logic_version = _logic_version(model_settings)
+
+    trips = trips.sort_index()
+    set_tour_hour(trips, tours)
+    chunk_sizer.log_df(trace_label, "trips", trips)
+
+    spec_rows = probs_lookup.cells(trips)
+
+    num_trips = len(trips)
+    outbound = trips.outbound.to_numpy()
+    trip_num = trips.trip_num.to_numpy().astype(np.int64)
+    trip_count = trips.trip_count.to_numpy().astype(np.int64)
+    tour_ix = pd.factorize(trips.tour_id)[0]
+    tour_hour = trips.tour_hour.to_numpy().astype(np.float64)
+    tour_earliest = trips.earliest.to_numpy().astype(np.float64)
+    tour_latest = trips.latest.to_numpy().astype(np.float64)
+
+    # trips to/from tour origin or atwork get tour_hour departure times
+    do_not_schedule = (trips.primary_purpose == "atwork").to_numpy() | np.where(
+        outbound, trip_num == 1, trip_num == trip_count
+    )
+
+    depart = np.full(num_trips, np.nan)
+    failed = np.zeros(num_trips, dtype=bool)
+    first_trip_in_leg = np.zeros(num_trips, dtype=bool)
+    next_trip = np.full(num_trips, -1, dtype=np.int64)
+    rands = np.zeros(num_trips, dtype=np.float64)
+    active = np.ones(num_trips, dtype=bool)
+    chunk_sizer.log_df(trace_label, "depart", depart)
+
+    def schedule_leg(leg_outbound, earliest, latest, is_last_iteration):
+        in_leg = active & (outbound == leg_outbound)
+        depart[in_leg & do_not_schedule] = tour_hour[in_leg & do_not_schedule]
+
+        # schedule in trip_num order, or reverse trip_num order for inbound trips
+        scheduled = np.flatnonzero(in_leg & ~do_not_schedule)
+        if len(scheduled) == 0:
+            return
+        num = trip_num[scheduled]
+        if leg_outbound:
+            nth = num
+            is_final = num == trip_count[scheduled]
+            next_trip[scheduled] = np.where(is_final, -1, np.roll(scheduled, -1))
+        else:
+            nth = trip_count[scheduled] - num
+            is_final = num == 1
+            next_trip[scheduled] = np.where(is_final, -1, np.roll(scheduled, 1))
+        first_trip_in_leg[scheduled] = nth == num.min()
+
+        in_range = (nth >= num.min()) & (nth <= num.max())
+        order = scheduled[in_range][np.argsort(nth[in_range], kind="stable")]
+
+        rands[order] = (
+            state.get_rn_generator()
+            .random_for_df(pd.DataFrame(index=trips.index[order]))
+            .ravel()
+        )
+
+        _schedule_leg_departures(
+            order,
+            spec_rows,
+            probs_lookup.normalized_probs,
+            depart_alt_base,
+            first_trip_in_leg,
+            rands,
+            earliest,
+            latest,
+            earliest if leg_outbound else latest,
+            next_trip,
+            is_last_iteration and (failfix == FAILFIX_CHOOSE_MOST_INITIAL),
+            depart,
+            failed,
+        )
+
+    i = 0
+    while (i < max_iterations) and active.any():
+        i += 1
+        is_last_iteration = i == max_iterations
+        trace_label_i = tracing.extend_trace_label(trace_label, "i%s" % i)
+        logger.info("%s scheduling %s trips vectorized", trace_label_i, active.sum())
+
+        earliest = tour_earliest.copy()
+        latest = tour_latest.copy()
+        depart[active] = np.nan
+        failed[active] = False
+
+        if (active & outbound).any():
+            schedule_leg(True, earliest, latest, is_last_iteration)
+
+            # departure time of last outbound trips must constrain
+            # departure times for initial inbound trips
+            outbound_departs = pd.Series(np.where(active & outbound, depart, np.nan))
+            max_outbound_depart = (
+                outbound_departs.groupby(tour_ix).max().reindex(tour_ix).to_numpy()
+            )
+            if logic_version == 1:
+                earliest = np.where(outbound, earliest, max_outbound_depart)
+            elif logic_version > 1:
+                earliest = np.where(
+                    ~outbound & ~np.isnan(max_outbound_depart),
+                    max_outbound_depart,
+                    earliest,
+                )
+            else:
+                raise ValueError(f"bad logic_version: {logic_version}")
+
+        if (active & ~outbound).any():
+            schedule_leg(False, earliest, latest, is_last_iteration)
+
+        iteration_failed = active & failed
+        logger.info("%s %s failed", trace_label_i, iteration_failed.sum())
+
+        if is_last_iteration and iteration_failed.any():
+            ps._report_bad_choices(
+                state,
+                bad_row_map=iteration_failed,
+                df=trips,
+                filename="failed_choosers",
+                trace_label=trace_label_i,
+            )
+            if failfix == FAILFIX_CHOOSE_MOST_INITIAL:
+                logger.warning(
+                    "%s coercing %s depart choices to most initial"
+                    % (trace_label_i, iteration_failed.sum())
+                )
+
+        if not is_last_iteration:
+            # reschedule legs of tours with a failed trip
+            failed_cohorts = failed_trip_cohorts(
+                trips[active], pd.Series(failed[active], index=trips.index[active])
+            )
+            active[active] = failed_cohorts.to_numpy()
+
+    choices = pd.Series(depart, index=trips.index)
+    if not failed.any():
+        choices = choices.astype(np.int64)
+
+    return choices, i
+
+
 class TripSchedulingSettings(PydanticReadable):
     """
     Settings for the `trip_scheduling` component.
@@ -458,6 +721,20 @@ class TripSchedulingSettings(PydanticReadable):
 
     CONSTANTS: dict[str, Any] = {}
 
+    vectorized: bool = False
+    """
+    Schedule all trips of each chunk at once with a vectorized engine.
+
+    The probs are looked up for trips once, each leg's trips are scheduled in a
+    single (numba) sweep in trip_num order, and retries reschedule just the legs
+    with failed trips, without rebuilding the trips table.  Choices are the same as
+    without this setting.  This is only used with the "departure" scheduling_mode
+    and no preprocessor (and not for chunks with traced households), otherwise
+    trips are scheduled one trip_num at a time as usual.
+
+    .. versionadded:: 1.3
+    """
+
 
 @workflow.step(copy_tables=False)
 def trip_scheduling(
@@ -562,6 +839,13 @@ def trip_scheduling(
     # coefficients_df = state.filesystem.read_model_coefficients(model_settings)
     # probs_spec = map_coefficients(probs_spec, coefficients_df)
 
+    # compile departure probs once, rather than merging them with trips for each leg
+    probs_lookup = None
+    if model_settings.scheduling_mode == DEPARTURE_MODE:
+        probs_lookup = ps.SchedulingProbsLookup(
+            probs_spec, _probs_join_cols(model_settings)
+        )
+
     # add tour-based chunk_id so we can chunk all trips in tour together
     trips_df["chunk_id"] = reindex(
         pd.Series(list(range(len(tours))), tours.index), trips_df.tour_id
@@ -572,6 +856,16 @@ def trip_scheduling(
     max_iterations = model_settings.MAX_ITERATIONS
     assert max_iterations > 0
 
+    vectorized = model_settings.vectorized
+    if vectorized and (
+        model_settings.scheduling_mode != DEPARTURE_MODE or model_settings.preprocessor
+    ):
+        logger.warning(
+            f"{trace_label} vectorized trip scheduling requires departure "
+            f"scheduling_mode and no preprocessor, scheduling trips one trip_num at a time"
+        )
+        vectorized = False
+
     choices_list = []
 
     for (
@@ -582,6 +876,22 @@ def trip_scheduling(
     ) in chunk.adaptive_chunked_choosers_by_chunk_id(
         state, trips_df, trace_label, trace_label
     ):
+        if vectorized and not (
+            state.settings.trace_hh_id and state.tracing.has_trace_targets(trips_chunk)
+        ):
+            with chunk.chunk_log(state, trace_label):
+                choices, i = schedule_trips_vectorized(
+                    state,
+                    trips_chunk,
+                    tours,
+                    probs_lookup,
+                    model_settings,
+                    trace_label=trace_label,
+                    chunk_sizer=chunk_sizer,
+                )
+            choices_list.append(choices)
+            continue
+
         i = 0
         while (i < max_iterations) and not trips_chunk.empty:
             # only chunk log first iteration since memory use declines with each iteration
@@ -609,6 +919,7 @@ def trip_scheduling(
                     is_last_iteration=is_last_iteration,
                     trace_label=trace_label_i,
                     chunk_sizer=chunk_sizer,
+                    probs_lookup=probs_lookup,
                 )
 
                 # boolean series of trips whose individual trip scheduling failed
@@ -6,11 +6,212 @@ import logging
 
 import numpy as np
 import pandas as pd
+from numba import njit
 
 from activitysim.core import chunk, logit, tracing, workflow
 
 logger = logging.getLogger(__name__)
 
+# same tolerance as logit.make_choices
+BAD_PROB_THRESHOLD = 0.001
+
+
+class SchedulingProbsLookup:
+    """
+    Departure probs spec compiled into a dense lookup table keyed by the join columns
+
+    Each distinct value of each of the probs_join_cols in the spec is integer coded,
+    and the spec probs are laid out in a dense table with a row for every combination
+    of codes (NaN for combinations not in the spec, and in a final row for choosers
+    with values not in the spec).  Choosers are matched with their probs by coding
+    their join column values and gathering rows, rather than by merging them with
+    the probs spec.
+    """
+
+    def __init__(self, probs_spec: pd.DataFrame, probs_join_cols: str | list[str]):
+        """
+        Parameters
+        ----------
+        probs_spec : pandas.DataFrame
+            probs_join_cols, and a column of probs for each departure alternative
+        probs_join_cols : str or list of str
+        """
+        if isinstance(probs_join_cols, str):
+            probs_join_cols = [probs_join_cols]
+        self.probs_join_cols = list(probs_join_cols)
+        self.probs_cols = [
+            c for c in probs_spec.columns if c not in self.probs_join_cols
+        ]
+        self.categories = [
+            pd.Index(probs_spec[c].unique()) for c in self.probs_join_cols
+        ]
+        self.shape = tuple(len(c) for c in self.categories)
+        self.num_cells = int(np.prod(self.shape, dtype=np.int64))
+
+        spec_cells = self.cells(probs_spec)
+        if len(np.unique(spec_cells)) < len(spec_cells):
+            raise ValueError(
+                f"probs spec has duplicate values of probs_join_cols {self.probs_join_cols}"
+            )
+
+        spec_probs = probs_spec[self.probs_cols]
+        self.probs = np.full((self.num_cells + 1, len(self.probs_cols)), np.nan)
+        self.probs[spec_cells] = spec_probs.to_numpy(np.float64)
+
+        # probs normalized to sum to 1, as by _clip_probs
+        self.normalized_probs = np.full_like(self.probs, np.nan)
+        self.normalized_probs[spec_cells] = spec_probs.div(
+            spec_probs.sum(axis=1), axis=0
+        ).to_numpy(np.float64)
+
+        logger.debug(
+            f"SchedulingProbsLookup with shape {self.shape} "
+            f"for {len(probs_spec)} spec rows ({self.probs.nbytes * 2} bytes)"
+        )
+
+    def cells(self, choosers_df: pd.DataFrame) -> np.ndarray:
+        """
+        Row of the lookup table for each chooser
+
+        Parameters
+        ----------
+        choosers_df : pandas.DataFrame
+            with probs_join_cols
+
+        Returns
+        -------
+        numpy.ndarray of int64
+            row of probs (and normalized_probs) for each chooser, with num_cells
+            (an all NaN row) for choosers with no probs in the spec
+        """
+        codes = [
+            categories.get_indexer(np.asarray(choosers_df[col]))
+            for col, categories in zip(self.probs_join_cols, self.categories)
+        ]
+        missing = np.any([c < 0 for c in codes], axis=0)
+        cells = np.ravel_multi_index(
+            [np.maximum(c, 0) for c in codes], self.shape
+        ).astype(np.int64)
+        cells[missing] = self.num_cells
+        return cells
+
+    def probs_df(self, choosers_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        choosers_df with the probs columns of each chooser, as merged with probs spec
+        """
+        probs = pd.DataFrame(
+            self.probs[self.cells(choosers_df)],
+            index=choosers_df.index,
+            columns=self.probs_cols,
+        )
+        return pd.concat([choosers_df, probs], axis=1)
+
+
+@njit(cache=True, error_model="numpy")
+def clipped_cumsum_choice(
+    probs,
+    clip,
+    earliest,
+    latest,
+    depart_alt_base,
+    renormalize,
+    rand,
+    chooser_probs,
+):
+    """
+    Choose a departure alternative (or failure) for a single chooser
+
+    Makes the same choice as _preprocess_departure_probs followed by
+    logit.make_choices: probs are zeroed out before earliest or after latest,
+    renormalized (if requested), and the residual probability (the difference from
+    1 of their sum) becomes the prob of a final 'fail' alternative.  The choice is
+    made by subtracting each prob in turn from rand.
+
+    Parameters
+    ----------
+    probs : 1-D array of float, probs of each departure alternative (NaN for none)
+    clip : bool, whether to zero probs of departures outside earliest-latest
+    earliest, latest : float
+    depart_alt_base : int
+    renormalize : bool, whether to rescale clipped probs to sum to 1
+    rand : float
+    chooser_probs : 1-D array of float, with room for probs and the fail prob
+
+    Returns
+    -------
+    choice : int, index of chosen alternative (len(probs) for 'fail')
+    prob_sum : float, sum of probs including fail prob (to check it is 1)
+    """
+    num_alts = len(probs)
+
+    for c in range(num_alts):
+        if clip:
+            period = c + depart_alt_base
+            in_window = period >= earliest and period <= latest
+            chooser_probs[c] = probs[c] * (1.0 if in_window else 0.0)
+        else:
+            chooser_probs[c] = probs[c]
+
+    if renormalize:
+        # probs should sum to 1 unless all zero
+        total = 0.0
+        for c in range(num_alts):
+            if not np.isnan(chooser_probs[c]):
+                total += chooser_probs[c]
+        for c in range(num_alts):
+            p = chooser_probs[c] / total
+            chooser_probs[c] = 0.0 if np.isnan(p) else p
+
+    # residual probs result in choice of 'fail'
+    total = 0.0
+    for c in range(num_alts):
+        if not np.isnan(chooser_probs[c]):
+            total += chooser_probs[c]
+    chooser_probs[num_alts] = 1 - min(max(total, 0.0), 1.0)
+    prob_sum = total + chooser_probs[num_alts]
+
+    z = rand
+    for c in range(num_alts + 1):
+        z = z - chooser_probs[c]
+        if z <= 0:
+            return c, prob_sum
+
+    # rand greater than sum of probs (due to limits of numerical precision)
+    choice = num_alts
+    max_pr = 0.0
+    for c in range(num_alts + 1):
+        if chooser_probs[c] > max_pr:
+            choice = c
+            max_pr = chooser_probs[c]
+    return choice, prob_sum
+
+
+@njit(cache=True)
+def _clipped_cumsum_choices(
+    cells,
+    probs,
+    clip,
+    earliest,
+    latest,
+    depart_alt_base,
+    renormalize,
+    rands,
+    choices,
+    prob_sums,
+):
+    chooser_probs = np.empty(probs.shape[1] + 1, dtype=np.float64)
+    for k in range(len(cells)):
+        choices[k], prob_sums[k] = clipped_cumsum_choice(
+            probs[cells[k]],
+            clip,
+            earliest[k],
+            latest[k],
+            depart_alt_base,
+            renormalize,
+            rands[k],
+            chooser_probs,
+        )
+
 
 def _clip_probs(choosers_df, probs, depart_alt_base):
     """
@@ -243,6 +444,95 @@ def _postprocess_scheduling_choices(
     return choices, failed
 
 
+def _make_departure_choices(
+    state: workflow.State,
+    choosers_df,
+    probs_lookup: SchedulingProbsLookup,
+    depart_alt_base,
+    first_trip_in_leg,
+    report_failed_trips,
+    trace_label,
+    clip_earliest_latest=True,
+    *,
+    chunk_sizer: chunk.ChunkSizer,
+):
+    """
+    make_scheduling_choices for departure scheduling_mode with a probs lookup table
+
+    Returns
+    -------
+    choices: pd.Series
+        time periods depart choices, one per chooser (-1 for failed choices)
+    failed: pd.Series
+        bool, whether choice failed
+    """
+    cells = probs_lookup.cells(choosers_df)
+    num_choosers = len(choosers_df)
+    if clip_earliest_latest:
+        # probs are normalized to sum to 1 before clipping
+        probs = probs_lookup.normalized_probs
+        earliest = choosers_df.earliest.to_numpy().astype(np.float64)
+        latest = choosers_df.latest.to_numpy().astype(np.float64)
+    else:
+        probs = probs_lookup.probs
+        earliest = latest = np.zeros(num_choosers, dtype=np.float64)
+
+    rands = state.get_rn_generator().random_for_df(choosers_df).ravel()
+    raw_choices = np.empty(num_choosers, dtype=np.int32)
+    prob_sums = np.empty(num_choosers, dtype=np.float64)
+    chunk_sizer.log_df(trace_label, "raw_choices", raw_choices)
+
+    _clipped_cumsum_choices(
+        cells,
+        probs,
+        clip_earliest_latest,
+        earliest,
+        latest,
+        depart_alt_base,
+        first_trip_in_leg,
+        rands,
+        raw_choices,
+        prob_sums,
+    )
+
+    bad_probs = np.abs(prob_sums - 1) > BAD_PROB_THRESHOLD
+    if bad_probs.any():
+        make_choices_trace_label = tracing.extend_trace_label(
+            trace_label, "make_choices"
+        )
+        logit.report_bad_choices(
+            state,
+            bad_probs,
+            probs_lookup.probs_df(choosers_df)[probs_lookup.probs_cols],
+            trace_label=tracing.extend_trace_label(
+                make_choices_trace_label, "bad_probs"
+            ),
+            msg="probabilities do not add up to 1",
+            trace_choosers=choosers_df,
+        )
+
+    choices, failed = _postprocess_scheduling_choices(
+        "departure",
+        depart_alt_base,
+        pd.Series(raw_choices, index=choosers_df.index),
+        pd.Index(probs_lookup.probs_cols + ["fail"]),
+        choosers_df,
+    )
+
+    # report failed trips while we have the best diagnostic info
+    if report_failed_trips and failed.any():
+        _report_bad_choices(
+            state,
+            bad_row_map=failed,
+            df=probs_lookup.probs_df(choosers_df),
+            filename="failed_choosers",
+            trace_label=trace_label,
+            trace_choosers=None,
+        )
+
+    return choices, failed
+
+
 def make_scheduling_choices(
     state: workflow.State,
     choosers_df,
@@ -257,6 +547,7 @@ def make_scheduling_choices(
     clip_earliest_latest=True,
     *,
     chunk_sizer: chunk.ChunkSizer,
+    probs_lookup: SchedulingProbsLookup | None = None,
 ):
     """
     We join each trip with the appropriate row in probs_spec by joining on probs_join_cols,
@@ -278,6 +569,13 @@ def make_scheduling_choices(
         e.g. depart_alt_base = 5 means first column (column 0) represents 5 am
     report_failed_trips : bool
     trace_label
+    probs_lookup : SchedulingProbsLookup, optional
+        probs_spec compiled into a lookup table, used (for the 'departure'
+        scheduling_mode) instead of merging choosers with probs_spec.  It is built
+        from probs_spec if not given, but it can be built once and reused by callers
+        making choices for many sets of choosers.
+
+        .. versionadded:: 1.3
 
     Returns
     -------
@@ -285,68 +583,89 @@ def make_scheduling_choices(
         time periods depart choices, one per trip (except for trips with zero probs)
     """
     trace_hh_id = state.settings.trace_hh_id
-    choosers = pd.merge(
-        choosers_df.reset_index(), probs_spec, on=probs_join_cols, how="left"
-    ).set_index(choosers_df.index.name)
-    chunk_sizer.log_df(trace_label, "choosers", choosers)
+    traced = trace_hh_id and state.tracing.has_trace_targets(choosers_df)
 
-    if trace_hh_id and state.tracing.has_trace_targets(choosers_df):
-        state.tracing.trace_df(choosers, "%s.choosers" % trace_label)
-
-    # different pre-processing is required based on the scheduling mode
-    chooser_probs = _preprocess_scheduling_probs(
-        scheduling_mode,
-        choosers_df,
-        choosers,
-        probs_spec,
-        probs_join_cols,
-        clip_earliest_latest,
-        depart_alt_base,
-        first_trip_in_leg,
-    )
+    if scheduling_mode == "departure" and not traced:
+        # gather probs from lookup table rather than merging choosers with probs_spec
+        if probs_lookup is None:
+            probs_lookup = SchedulingProbsLookup(probs_spec, probs_join_cols)
+        choices, failed = _make_departure_choices(
+            state,
+            choosers_df,
+            probs_lookup,
+            depart_alt_base,
+            first_trip_in_leg,
+            report_failed_trips,
+            trace_label,
+            clip_earliest_latest,
+            chunk_sizer=chunk_sizer,
+        )
+        chunk_sizer.log_df(trace_label, "failed", failed)
+    else:
+        choosers = pd.merge(
+            choosers_df.reset_index(), probs_spec, on=probs_join_cols, how="left"
+        ).set_index(choosers_df.index.name)
+        chunk_sizer.log_df(trace_label, "choosers", choosers)
 
-    chunk_sizer.log_df(trace_label, "chooser_probs", chooser_probs)
+        if trace_hh_id and state.tracing.has_trace_targets(choosers_df):
+            state.tracing.trace_df(choosers, "%s.choosers" % trace_label)
 
-    if trace_hh_id and state.tracing.has_trace_targets(choosers_df):
-        state.tracing.trace_df(chooser_probs, "%s.chooser_probs" % trace_label)
+        # different pre-processing is required based on the scheduling mode
+        chooser_probs = _preprocess_scheduling_probs(
+            scheduling_mode,
+            choosers_df,
+            choosers,
+            probs_spec,
+            probs_join_cols,
+            clip_earliest_latest,
+            depart_alt_base,
+            first_trip_in_leg,
+        )
 
-    raw_choices, rands = logit.make_choices(
-        state, chooser_probs, trace_label=trace_label, trace_choosers=choosers
-    )
+        chunk_sizer.log_df(trace_label, "chooser_probs", chooser_probs)
 
-    chunk_sizer.log_df(trace_label, "choices", raw_choices)
-    chunk_sizer.log_df(trace_label, "rands", rands)
+        if trace_hh_id and state.tracing.has_trace_targets(choosers_df):
+            state.tracing.trace_df(chooser_probs, "%s.chooser_probs" % trace_label)
 
-    if trace_hh_id and state.tracing.has_trace_targets(choosers_df):
-        state.tracing.trace_df(
-            raw_choices,
-            "%s.choices" % trace_label,
-            columns=[None, trace_choice_col_name],
+        raw_choices, rands = logit.make_choices(
+            state, chooser_probs, trace_label=trace_label, trace_choosers=choosers
         )
-        state.tracing.trace_df(rands, "%s.rands" % trace_label, columns=[None, "rand"])
 
-    # different post-processing is required based on the scheduling mode
-    choices, failed = _postprocess_scheduling_choices(
-        scheduling_mode,
-        depart_alt_base,
-        raw_choices,
-        chooser_probs.columns,
-        choosers_df,
-    )
+        chunk_sizer.log_df(trace_label, "choices", raw_choices)
+        chunk_sizer.log_df(trace_label, "rands", rands)
 
-    chunk_sizer.log_df(trace_label, "failed", failed)
+        if trace_hh_id and state.tracing.has_trace_targets(choosers_df):
+            state.tracing.trace_df(
+                raw_choices,
+                "%s.choices" % trace_label,
+                columns=[None, trace_choice_col_name],
+            )
+            state.tracing.trace_df(
+                rands, "%s.rands" % trace_label, columns=[None, "rand"]
+            )
 
-    # report failed trips while we have the best diagnostic info
-    if report_failed_trips and failed.any():
-        _report_bad_choices(
-            state,
-            bad_row_map=failed,
-            df=choosers,
-            filename="failed_choosers",
-            trace_label=trace_label,
-            trace_choosers=None,
+        # different post-processing is required based on the scheduling mode
+        choices, failed = _postprocess_scheduling_choices(
+            scheduling_mode,
+            depart_alt_base,
+            raw_choices,
+            chooser_probs.columns,
+            choosers_df,
         )
 
+        chunk_sizer.log_df(trace_label, "failed", failed)
+
+        # report failed trips while we have the best diagnostic info
+        if report_failed_trips and failed.any():
+            _report_bad_choices(
+                state,
+                bad_row_map=failed,
+                df=choosers,
+                filename="failed_choosers",
+                trace_label=trace_label,
+                trace_choosers=None,
+            )
+
     # trace before removing failures
     if trace_hh_id and state.tracing.has_trace_targets(choosers_df):
         state.tracing.trace_df(
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import logging
+import time
 from collections import OrderedDict
 from pathlib import Path
 from typing import Any
@@ -65,6 +66,132 @@ class TourSchedulingSettings(LogitComponentSettings, extra="forbid"):
     If less than 1, use this fraction of the total number of rows.
     """
 
+    LOGSUM_CACHE_CHOOSER_COLUMNS: list[str] | None = None
+    """
+    Chooser columns on which the tour mode choice logsums depend.
+
+    If given (and the `tour_scheduling_logsum_cache_size` setting is non-zero),
+    representative logsums are looked up in the run's tour scheduling logsum cache,
+    keyed on the tour purpose, these chooser columns and the representative
+    time period columns of the tdd alternative, before computing them.  These
+    columns must include every chooser attribute the logsum preprocessor and SPEC
+    use (e.g. origin and destination zones, income, auto sufficiency), otherwise
+    choosers that differ in other attributes will wrongly share logsums.
+
+    .. versionadded:: 1.3
+    """
+
+
+class TourSchedulingLogsumCache:
+    """
+    Run-scoped, size-bounded LRU cache of tour scheduling logsums
+
+    Logsums are keyed on tuples of the values of the key columns of each row, and
+    the least recently used logsums are evicted once there are more than
+    max_size of them.  Hits, misses and compute time are tallied for each model
+    step, so the time saved by the cache can be estimated and reported.
+    """
+
+    def __init__(self, max_size: int):
+        assert max_size > 0
+        self.max_size = max_size
+        self.logsums = OrderedDict()
+        self.stats = {}
+
+    def __len__(self):
+        return len(self.logsums)
+
+    def get_or_compute(self, key_df: pd.DataFrame, compute, step_name, trace_label):
+        """
+        Look up logsums for the rows of key_df, computing (and caching) missing ones
+
+        Parameters
+        ----------
+        key_df : pandas.DataFrame
+            one row per logsum, with a column for each key attribute
+        compute : callable
+            called with the positions in key_df of rows whose logsums are not cached
+            (one row for each distinct missing key), returning their logsums
+        step_name : str
+            model step name under which to tally hits and time saved
+        trace_label : str
+
+        Returns
+        -------
+        numpy.ndarray of float64
+            logsums for the rows of key_df
+        """
+        # NaN != NaN, so replace nulls with None for them to match in keys
+        keys = list(
+            zip(
+                *(
+                    np.where(key_df[c].isna(), None, key_df[c].to_numpy(dtype=object))
+                    if key_df[c].hasnans
+                    else key_df[c].to_numpy()
+                    for c in key_df.columns
+                )
+            )
+        )
+        logsums = np.empty(len(keys), dtype=np.float64)
+
+        # positions of rows with missing keys, and of the first row for each missing key
+        missing = []
+        first_missing = {}
+        for i, key in enumerate(keys):
+            logsum = self.logsums.get(key)
+            if logsum is None:
+                missing.append(i)
+                first_missing.setdefault(key, i)
+            else:
+                self.logsums.move_to_end(key)
+                logsums[i] = logsum
+
+        stats = self.stats.setdefault(
+            step_name, {"rows": 0, "hits": 0, "computed": 0, "compute_seconds": 0.0}
+        )
+        stats["rows"] += len(keys)
+        stats["hits"] += len(keys) - len(missing)
+
+        if missing:
+            t0 = time.time()
+            compute_positions = np.fromiter(first_missing.values(), dtype=np.int64)
+            computed = np.asanyarray(compute(compute_positions), dtype=np.float64)
+            stats["compute_seconds"] += time.time() - t0
+            stats["computed"] += len(compute_positions)
+
+            computed = dict(zip(first_missing.keys(), computed))
+            logsums[missing] = [computed[keys[i]] for i in missing]
+
+            self.logsums.update(computed)
+            while len(self.logsums) > self.max_size:
+                self.logsums.popitem(last=False)
+
+        # rows not computed were either cache hits or duplicates of computed rows
+        seconds_per_logsum = stats["compute_seconds"] / max(stats["computed"], 1)
+        logger.info(
+            f"{trace_label} logsum cache hits {stats['hits']} of {stats['rows']} "
+            f"({round(100 * stats['hits'] / max(stats['rows'], 1), 2)}%) in "
+            f"{step_name} saved about "
+            f"{round(seconds_per_logsum * (stats['rows'] - stats['computed']), 2)} "
+            f"seconds ({len(self.logsums)} logsums cached)"
+        )
+
+        return logsums
+
+
+def tour_scheduling_logsum_cache(state: workflow.State):
+    """
+    The run's TourSchedulingLogsumCache, or None if logsum caching is disabled
+    """
+    max_size = state.settings.tour_scheduling_logsum_cache_size
+    if not max_size:
+        return None
+    cache = state.get_injectable("tour_scheduling_logsum_cache", None)
+    if cache is None:
+        cache = TourSchedulingLogsumCache(max_size)
+        state.add_injectable("tour_scheduling_logsum_cache", cache)
+    return cache
+
 
 def skims_for_logsums(
     state: workflow.State,
@@ -438,16 +565,55 @@ def compute_tour_scheduling_logsums(
         tracing.print_elapsed_time()
 
         # - compute logsums for the alt_tdd_periods
-        deduped_alt_tdds["logsums"] = _compute_logsums(
-            state,
-            deduped_alt_tdds,
-            tours_merged,
-            tour_purpose,
-            model_settings,
-            network_los,
-            skims,
-            trace_label,
+        logsum_cache = (
+            tour_scheduling_logsum_cache(state)
+            if model_settings.LOGSUM_CACHE_CHOOSER_COLUMNS
+            else None
         )
+        if logsum_cache is not None:
+            # key on logsum settings, tour purpose, chooser columns, and alt periods
+            key_df = tours_merged[model_settings.LOGSUM_CACHE_CHOOSER_COLUMNS].reindex(
+                deduped_alt_tdds.index
+            )
+            key_df.insert(0, "_logsum_settings", str(model_settings.LOGSUM_SETTINGS))
+            key_df.insert(1, "_logsum_preprocessor", model_settings.LOGSUM_PREPROCESSOR)
+            key_df.insert(2, "_tour_purpose", tour_purpose)
+            for c in deduped_alt_tdds.columns:
+                key_df[f"_alt_{c}"] = deduped_alt_tdds[c].to_numpy()
+            chunk_sizer.log_df(trace_label, "key_df", key_df)
+
+            def compute_missing_logsums(positions, alt_tdds=deduped_alt_tdds):
+                return _compute_logsums(
+                    state,
+                    alt_tdds.iloc[positions],
+                    tours_merged,
+                    tour_purpose,
+                    model_settings,
+                    network_los,
+                    skims,
+                    trace_label,
+                ).to_numpy()
+
+            deduped_alt_tdds["logsums"] = logsum_cache.get_or_compute(
+                key_df,
+                compute_missing_logsums,
+                step_name=state.current_model_name or trace_label,
+                trace_label=trace_label,
+            )
+
+            del key_df
+            chunk_sizer.log_df(trace_label, "key_df", None)
+        else:
+            deduped_alt_tdds["logsums"] = _compute_logsums(
+                state,
+                deduped_alt_tdds,
+                tours_merged,
+                tour_purpose,
+                model_settings,
+                network_los,
+                skims,
+                trace_label,
+            )
 
         # tracing.log_runtime(model_name=trace_label, start_time=t0)
 
@@ -581,51 +747,34 @@ def tdd_interaction_dataset(
     trace_label = tracing.extend_trace_label(trace_label, "tdd_interaction_dataset")
 
     with chunk.chunk_log(state, trace_label) as chunk_sizer:
-        alts_ids = np.tile(alts.index, len(tours.index))
-        chunk_sizer.log_df(trace_label, "alts_ids", alts_ids)
-
-        tour_ids = np.repeat(tours.index, len(alts.index))
-        window_row_ids = np.repeat(tours[window_id_col], len(alts.index))
-        chunk_sizer.log_df(trace_label, "window_row_ids", window_row_ids)
-
-        alt_tdd = alts.take(alts_ids)
-
-        alt_tdd.index = tour_ids
-
-        import xarray as xr
-
-        alt_tdd_ = xr.Dataset.from_dataframe(alt_tdd)
-        dimname = alt_tdd.index.name or "index"
-        # alt_tdd_[window_id_col] = xr.DataArray(window_row_ids, dims=(dimname,))
-        alt_tdd_[choice_column] = xr.DataArray(
-            alts_ids, dims=(dimname,), coords=alt_tdd_.coords
+        # ask the timetable for just the available (tour, tdd) pairs,
+        # rather than tiling every alt for every tour and then slicing out
+        # the unavailable ones
+        tour_ix, alt_ix = timetable.available_tour_tdds(
+            tours[window_id_col], alts.index
         )
-
-        # add tdd alternative id
-        # by convention, the choice column is the first column in the interaction dataset
-        # alt_tdd.insert(loc=0, column=choice_column, value=alts_ids)
-
-        # slice out all non-available tours
-        available = timetable.tour_available(window_row_ids, alts_ids)
-
-        del window_row_ids
-        chunk_sizer.log_df(trace_label, "window_row_ids", None)
+        chunk_sizer.log_df(trace_label, "tour_ix", tour_ix)
+        chunk_sizer.log_df(trace_label, "alt_ix", alt_ix)
 
         logger.debug(
-            f"tdd_interaction_dataset keeping {available.sum()} of ({len(available)}) available alt_tdds"
+            f"tdd_interaction_dataset keeping {len(alt_ix)} of "
+            f"({len(tours.index) * len(alts.index)}) available alt_tdds"
         )
-        assert available.any()
+        assert len(alt_ix) > 0
 
-        chunk_sizer.log_df(
-            trace_label, "alt_tdd_", alt_tdd_
-        )  # catch this before we slice on available
+        alt_tdd = alts.take(alt_ix)
+        alt_tdd.index = tours.index.take(tour_ix)
 
-        alt_tdd = alt_tdd_.isel({dimname: available}).to_dataframe()
+        # add tdd alternative id
+        # by convention, the choice column is the last column in the interaction dataset
+        alt_tdd[choice_column] = alts.index.to_numpy().take(alt_ix)
 
-        chunk_sizer.log_df(trace_label, "alt_tdd", alt_tdd)
+        del tour_ix
+        chunk_sizer.log_df(trace_label, "tour_ix", None)
+        del alt_ix
+        chunk_sizer.log_df(trace_label, "alt_ix", None)
 
-        # FIXME - don't need this any more after slicing
-        # del alt_tdd[window_id_col]
+        chunk_sizer.log_df(trace_label, "alt_tdd", alt_tdd)
 
     return alt_tdd
 
@@ -3,14 +3,17 @@
 from __future__ import annotations
 
 import ctypes
+import hashlib
 import logging
 import multiprocessing
 import time
 from collections import OrderedDict
+from pathlib import Path
 from typing import Any, Literal
 
 import numpy as np
 import pandas as pd
+import yaml
 
 from activitysim.abm.tables.size_terms import size_terms as get_size_terms
 from activitysim.abm.tables.size_terms import tour_destination_size_terms
@@ -139,6 +142,75 @@ class ShadowPriceSettings(PydanticReadable, extra="forbid"):
 
     WRITE_ITERATION_CHOICES: bool = False
 
+    RESIMULATE_CHANGED_ONLY: bool = False
+    """Only re-simulate choosers affected by the latest shadow price update.
+
+    After the first iteration, only choosers whose chosen zone is over target, or
+    whose sampled alternatives include a zone whose shadow price changed by more
+    than PRICE_CHANGE_THRESHOLD, are re-sampled and re-simulated.  All other
+    choosers keep their choice from the previous iteration, and iteration stops
+    early once there are no choosers left to re-simulate.
+
+    Only used by the ctramp and daysim methods, the simulation method always
+    re-simulates a sample of the choosers in over-assigned zones.
+
+    .. versionadded:: 1.3
+    """
+
+    PRICE_CHANGE_THRESHOLD: float = 0.01
+    """Shadow price change that triggers re-simulation, in utility units.
+
+    This is the absolute change in the log of the shadow price for the ctramp
+    method, and in the shadow price itself for the daysim method.
+
+    .. versionadded:: 1.3
+    """
+
+    PERSIST_SHADOW_PRICES: bool = False
+    """Save final shadow prices, and warm start from similar saved shadow prices.
+
+    The final shadow prices of each model are saved to SAVED_SHADOW_PRICES_DIR,
+    together with the desired_size they were fitted to, in a subdirectory named
+    for the model, method, and a fingerprint (hash) of the desired_size.  If no
+    SAVED_SHADOW_PRICE_TABLE_NAME file is loaded, later runs warm start from the
+    saved shadow prices whose desired_size is closest to their own, provided it
+    differs by no more than WARM_START_TOLERANCE, and so use MAX_ITERATIONS_SAVED.
+    The iterations and time saved by the warm start are logged.
+
+    .. versionadded:: 1.3
+    """
+
+    SAVED_SHADOW_PRICES_DIR: str | None = None
+    """Directory for persisted shadow prices, relative to the working directory.
+
+    Defaults to the `shadow_prices` subdirectory of the cache directory.  Point
+    the runs of several scenarios at the same directory to share shadow prices
+    between them.
+
+    .. versionadded:: 1.3
+    """
+
+    WARM_START_TOLERANCE: float = 5
+    """Max percent difference in desired_size for warm starting from saved shadow prices.
+
+    The difference is the sum of absolute differences in desired_size over all
+    zones and segments, as a percentage of total desired_size.
+
+    .. versionadded:: 1.3
+    """
+
+    ANDERSON_ACCELERATION_DEPTH: int = 0
+    """Number of previous iterations used to accelerate shadow price updates.
+
+    If greater than zero, Anderson acceleration is applied to the ctramp or
+    daysim shadow price updates, treating each update as a fixed point iteration
+    and extrapolating from the updates of up to this many previous iterations.
+    A depth of 1 is a secant method.  ctramp shadow prices are accelerated in log
+    space, so they stay positive.
+
+    .. versionadded:: 1.3
+    """
+
     SEGMENT_TO_NAME: dict[str, str] = {
         "school": "school_segment",
         "workplace": "income_segment",
@@ -179,6 +251,9 @@ class ShadowPriceCalculator:
         self.saved_shadow_price_file_path = (
             None  # set by read_saved_shadow_prices if loaded
         )
+        self.warm_start = None  # set by read_persisted_shadow_prices if loaded
+        self.converged = False
+        self.start_time = time.time()
 
         self.model_selector = model_settings.MODEL_SELECTOR
 
@@ -270,6 +345,13 @@ class ShadowPriceCalculator:
                     state, model_settings
                 )
 
+            if (
+                self.shadow_prices is None
+                and self.shadow_settings.PERSIST_SHADOW_PRICES
+            ):
+                # read_persisted_shadow_prices returns None if none are close enough
+                self.shadow_prices = self.read_persisted_shadow_prices(state)
+
             if self.shadow_prices is None:
                 self.max_iterations = self.shadow_settings.MAX_ITERATIONS
             else:
@@ -292,6 +374,9 @@ class ShadowPriceCalculator:
         self.num_fail = pd.DataFrame(index=self.desired_size.columns)
         self.max_abs_diff = pd.DataFrame(index=self.desired_size.columns)
         self.max_rel_diff = pd.DataFrame(index=self.desired_size.columns)
+        self.max_price_change = pd.DataFrame(index=self.desired_size.columns)
+        self.shadow_price_change = None
+        self.anderson_history = []
         self.choices_by_iteration = pd.DataFrame()
         self.global_pending_persons = 1
         self.sampled_persons = pd.DataFrame()
@@ -336,6 +421,17 @@ class ShadowPriceCalculator:
                     ), f"{target} is not in landuse columns: {land_use.columns}"
                     self.target[segment] = land_use[target]
 
+    @property
+    def resimulate_subset(self):
+        """
+        True if iterations after the first only re-simulate sampled_persons
+        """
+        if not self.use_shadow_pricing:
+            return False
+        if self.shadow_settings.SHADOW_PRICE_METHOD == "simulation":
+            return True
+        return self.shadow_settings.RESIMULATE_CHANGED_ONLY
+
     def read_saved_shadow_prices(
         self, state: workflow.State, model_settings: TourLocationComponentSettings
     ):
@@ -370,6 +466,132 @@ class ShadowPriceCalculator:
 
         return shadow_prices
 
+    def persisted_shadow_prices_dir(self, state: workflow.State) -> Path:
+        saved_dir = self.shadow_settings.SAVED_SHADOW_PRICES_DIR
+        if saved_dir is None:
+            saved_dir = state.filesystem.get_cache_dir().joinpath("shadow_prices")
+        else:
+            saved_dir = state.filesystem.get_working_subdir(saved_dir)
+        saved_dir.mkdir(parents=True, exist_ok=True)
+        return saved_dir
+
+    def read_persisted_shadow_prices(self, state: workflow.State):
+        """
+        Read the persisted shadow_prices fitted to the desired_size closest to ours (warm start)
+
+        Only shadow_prices for the same model, method, zones and segments are considered, and
+        returns None if none of them were fitted to a desired_size within WARM_START_TOLERANCE.
+
+        Returns
+        -------
+        shadow_prices : pandas.DataFrame or None
+        """
+        saved_dir = self.persisted_shadow_prices_dir(state)
+        desired_size = self.desired_size.to_numpy()
+
+        closest = None
+        for metadata_path in sorted(
+            saved_dir.glob(
+                f"{self.model_selector}_{self.shadow_price_method}_*/shadow_prices.yaml"
+            )
+        ):
+            saved_desired_size = pd.read_csv(
+                metadata_path.parent / "desired_size.csv", index_col=0
+            )
+            if not (
+                np.array_equal(saved_desired_size.index, self.desired_size.index)
+                and list(saved_desired_size.columns) == list(self.desired_size.columns)
+            ):
+                continue
+            difference = np.abs(saved_desired_size.to_numpy() - desired_size).sum()
+            difference = 100 * difference / max(desired_size.sum(), 1)
+            if closest is None or difference < closest[0]:
+                closest = (difference, metadata_path)
+
+        if closest is None:
+            logger.info(
+                f"no persisted {self.model_selector} shadow prices found in {saved_dir}"
+            )
+            return None
+
+        difference, metadata_path = closest
+        if difference > self.shadow_settings.WARM_START_TOLERANCE:
+            logger.info(
+                f"not warm starting {self.model_selector} shadow prices: closest persisted "
+                f"desired_size differs by {difference:.2f}% ({metadata_path.parent})"
+            )
+            return None
+
+        with open(metadata_path) as f:
+            self.warm_start = yaml.safe_load(f)
+        self.warm_start["desired_size_difference"] = float(difference)
+
+        shadow_prices = pd.read_csv(
+            metadata_path.parent / "shadow_prices.csv", index_col=0
+        )
+        shadow_prices.index = self.desired_size.index
+        logger.info(
+            f"warm starting {self.model_selector} shadow prices from {metadata_path.parent} "
+            f"(desired_size differs by {difference:.2f}%)"
+        )
+
+        return shadow_prices
+
+    def write_persisted_shadow_prices(self, state: workflow.State, iterations):
+        """
+        Save final shadow_prices, desired_size and fit, for warm starting later runs
+
+        Also logs the iterations and time saved, if we were warm started.
+
+        Parameters
+        ----------
+        iterations : int
+            number of shadow pricing iterations run
+        """
+        assert self.use_shadow_pricing
+
+        elapsed_seconds = time.time() - self.start_time
+        fingerprint = desired_size_fingerprint(self.desired_size)
+        saved_dir = self.persisted_shadow_prices_dir(state) / (
+            f"{self.model_selector}_{self.shadow_price_method}_{fingerprint}"
+        )
+        saved_dir.mkdir(parents=True, exist_ok=True)
+
+        metadata = {
+            "model_selector": self.model_selector,
+            "shadow_price_method": self.shadow_price_method,
+            "desired_size_fingerprint": fingerprint,
+            "iterations": int(iterations),
+            "converged": bool(self.converged),
+            "num_fail": int(self.num_fail.iloc[:, -1].sum())
+            if len(self.num_fail.columns)
+            else None,
+            "elapsed_seconds": round(elapsed_seconds, 3),
+            # carry cold start fit forward, so we can report savings of later warm starts
+            "cold_start_iterations": int(iterations),
+            "cold_start_seconds": round(elapsed_seconds, 3),
+            "warm_started_from": None,
+        }
+
+        if self.warm_start is not None:
+            metadata["cold_start_iterations"] = self.warm_start["cold_start_iterations"]
+            metadata["cold_start_seconds"] = self.warm_start["cold_start_seconds"]
+            metadata["warm_started_from"] = self.warm_start["desired_size_fingerprint"]
+            logger.info(
+                f"{self.model_selector} shadow pricing warm start: {iterations} iterations "
+                f"in {elapsed_seconds:.1f} seconds (converged: {self.converged}) vs "
+                f"{metadata['cold_start_iterations']} iterations in "
+                f"{metadata['cold_start_seconds']:.1f} seconds for cold start, saving "
+                f"{metadata['cold_start_seconds'] - elapsed_seconds:.1f} seconds"
+            )
+
+        self.shadow_prices.to_csv(saved_dir / "shadow_prices.csv")
+        self.desired_size.to_csv(saved_dir / "desired_size.csv")
+        with open(saved_dir / "shadow_prices.yaml", "w") as f:
+            yaml.dump(metadata, f, sort_keys=False)
+
+        logger.info(f"saved {self.model_selector} shadow prices to {saved_dir}")
+
     def synchronize_modeled_size(self, local_modeled_size):
         """
         We have to wait until all processes have computed choices and aggregated them by segment
@@ -549,6 +771,8 @@ class ShadowPriceCalculator:
             # - not multiprocessing
             self.choices_synced = choices
             self.modeled_size = modeled_size
+            if self.resimulate_subset and self.shadow_price_method != "simulation":
+                self.global_pending_persons = int(len(self.sampled_persons) > 0)
         else:
             # - if we are multiprocessing, we have to aggregate across sub-processes
             self.modeled_size = self.synchronize_modeled_size(modeled_size)
@@ -635,6 +859,10 @@ class ShadowPriceCalculator:
 
             converged = total_fails <= max_fail
 
+            if self.resimulate_subset:
+                # nobody was re-simulated, so choices and shadow prices will not change
+                converged |= (iteration > 1) & (self.global_pending_persons == 0)
+
         else:
             rel_diff_df = pd.DataFrame(index=self.shadow_prices.index)
             abs_diff_df = pd.DataFrame(index=self.shadow_prices.index)
@@ -684,16 +912,32 @@ class ShadowPriceCalculator:
                 (iteration > 1) & (self.global_pending_persons == 0)
             )
 
+        self.converged = converged
+
+        if self.shadow_price_change is not None:
+            self.max_price_change[
+                "iter%s" % iteration
+            ] = self.shadow_price_change.abs().max()
+
         logger.info(
             "check_fit %s iteration: %s converged: %s max_fail: %s total_fails: %s"
             % (self.model_selector, iteration, converged, max_fail, total_fails)
         )
+        if self.resimulate_subset and iteration > 1:
+            logger.info(
+                "check_fit %s iteration: %s resimulated: %s"
+                % (self.model_selector, iteration, len(self.sampled_persons))
+            )
 
         # - convergence stats
         if converged or iteration == self.max_iterations:
             logger.info("\nshadow_pricing max_abs_diff\n%s" % self.max_abs_diff)
             logger.info("\nshadow_pricing max_rel_diff\n%s" % self.max_rel_diff)
             logger.info("\nshadow_pricing num_fail\n%s" % self.num_fail)
+            if not self.max_price_change.empty:
+                logger.info(
+                    "\nshadow_pricing max_price_change\n%s" % self.max_price_change
+                )
 
             if write_choices:
                 state.tracing.write_csv(
@@ -763,6 +1007,12 @@ class ShadowPriceCalculator:
             new_shadow_prices.where(
                 self.modeled_size > 0, self.shadow_prices, inplace=True
             )
+            new_shadow_prices = self.accelerate_shadow_prices(new_shadow_prices)
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                self.shadow_price_change = np.log(
+                    new_shadow_prices / self.shadow_prices
+                ).fillna(0)
             self.shadow_prices = new_shadow_prices
 
         elif shadow_price_method == "daysim":
@@ -811,6 +1061,9 @@ class ShadowPriceCalculator:
             )
 
             new_shadow_prices = self.shadow_prices + adjustment
+            new_shadow_prices = self.accelerate_shadow_prices(new_shadow_prices)
+
+            self.shadow_price_change = new_shadow_prices - self.shadow_prices
             self.shadow_prices = new_shadow_prices
 
         elif shadow_price_method == "simulation":
@@ -912,6 +1165,132 @@ class ShadowPriceCalculator:
         else:
             raise RuntimeError("unknown SHADOW_PRICE_METHOD %s" % shadow_price_method)
 
+    def accelerate_shadow_prices(self, new_shadow_prices):
+        """
+        Anderson acceleration of the update from shadow_prices to new_shadow_prices
+
+        Each shadow price update is treated as an iteration x_k+1 = g(x_k) of a fixed point
+        problem.  With the residuals f_k = g(x_k) - x_k of the last ANDERSON_ACCELERATION_DEPTH
+        + 1 updates, the accelerated update is g(x_k) - dG @ gamma, where gamma is the least
+        squares solution of dF @ gamma = f_k and dF and dG are the differences between successive
+        residuals and updates.  ctramp shadow prices are multiplicative, so they are accelerated
+        in log space.
+
+        Parameters
+        ----------
+        new_shadow_prices : pandas.DataFrame
+            unaccelerated update of shadow_prices
+
+        Returns
+        -------
+        pandas.DataFrame
+            accelerated update, or new_shadow_prices if acceleration is not enabled or there
+            is not yet enough history to extrapolate from
+        """
+        depth = self.shadow_settings.ANDERSON_ACCELERATION_DEPTH
+        if depth < 1:
+            return new_shadow_prices
+
+        log_space = self.shadow_price_method == "ctramp"
+        x = self.shadow_prices.to_numpy(dtype=np.float64).ravel()
+        g = new_shadow_prices.to_numpy(dtype=np.float64).ravel()
+        if log_space:
+            with np.errstate(divide="ignore"):
+                x, g = np.log(x), np.log(g)
+
+        self.anderson_history.append((x, g))
+        del self.anderson_history[: -(depth + 1)]
+        if len(self.anderson_history) < 2:
+            return new_shadow_prices
+
+        # one column per iteration, oldest first
+        g_history = np.column_stack([h[1] for h in self.anderson_history])
+        with np.errstate(invalid="ignore"):
+            # -inf - -inf for zero (ctramp) shadow prices, masked below
+            f_history = g_history - np.column_stack(
+                [h[0] for h in self.anderson_history]
+            )
+
+        # zones with zero (ctramp) shadow prices just take the unaccelerated update
+        finite = np.isfinite(f_history).all(axis=1)
+        delta_f = np.diff(f_history[finite], axis=1)
+        delta_g = np.diff(g_history[finite], axis=1)
+        gamma = np.linalg.lstsq(delta_f, f_history[finite, -1], rcond=None)[0]
+
+        accelerated = g.copy()
+        accelerated[finite] = g[finite] - delta_g @ gamma
+        if not np.isfinite(accelerated[finite]).all():
+            logger.warning(
+                f"{self.model_selector} shadow price acceleration failed, not accelerating"
+            )
+            return new_shadow_prices
+        if log_space:
+            accelerated = np.exp(accelerated)
+
+        return pd.DataFrame(
+            data=accelerated.reshape(new_shadow_prices.shape),
+            index=new_shadow_prices.index,
+            columns=new_shadow_prices.columns,
+        )
+
+    def choosers_to_resimulate(self, choices, segment_ids, sample_df=None):
+        """
+        Choosers whose choices may be changed by the latest shadow price update
+
+        These are choosers whose chosen zone is over target (by more than PERCENT_TOLERANCE
+        for zones whose desired_size is at least SIZE_THRESHOLD), or whose sampled alternatives
+        include a zone whose shadow price changed by more than PRICE_CHANGE_THRESHOLD.
+
+        Parameters
+        ----------
+        choices : pandas.Series
+            zone id of location choice indexed by person_id
+        segment_ids : pandas.Series
+            segment id tag for this individual indexed by person_id
+        sample_df : pandas.DataFrame, optional
+            location sample indexed by person_id and alternative zone id. If not given,
+            only the chosen zone is checked for shadow price changes.
+
+        Returns
+        -------
+        pandas.Series
+            zone id of location choice of choosers to re-simulate, indexed by person_id
+        """
+        assert self.shadow_price_method in ["ctramp", "daysim"]
+        assert self.shadow_price_change is not None
+
+        percent_tolerance = self.shadow_settings.PERCENT_TOLERANCE
+        over_target = (
+            self.modeled_size > self.desired_size * (1 + percent_tolerance / 100.0)
+        ) & (self.desired_size >= self.shadow_settings.SIZE_THRESHOLD)
+        price_changed = (
+            self.shadow_price_change.abs() > self.shadow_settings.PRICE_CHANGE_THRESHOLD
+        )
+
+        if sample_df is not None:
+            sample_choosers = sample_df.index.get_level_values(0)
+            sample_zones = sample_df.index.get_level_values(1)
+
+        resimulate = pd.Series(False, index=choices.index)
+        for seg_name, seg_id in self.segment_ids.items():
+            in_segment = segment_ids == seg_id
+            resimulate |= in_segment & choices.isin(
+                over_target.index[over_target[seg_name]]
+            )
+
+            changed_zones = price_changed.index[price_changed[seg_name]]
+            if sample_df is None:
+                resimulate |= in_segment & choices.isin(changed_zones)
+            else:
+                sampled_changed = sample_choosers[sample_zones.isin(changed_zones)]
+                resimulate |= in_segment & choices.index.isin(sampled_changed)
+
+        logger.info(
+            f"{self.model_selector} re-simulating {resimulate.sum()} of {len(choices)} choosers"
+        )
+
+        return choices[resimulate]
+
     def dest_size_terms(self, segment):
         assert segment in self.segment_ids
 
@@ -981,6 +1360,23 @@ class ShadowPriceCalculator:
             )
 
 
+def desired_size_fingerprint(desired_size):
+    """
+    Hash of the zones, segments and values of a desired_size table
+
+    Parameters
+    ----------
+    desired_size : pandas.DataFrame
+
+    Returns
+    -------
+    str
+    """
+    digest = hashlib.md5(",".join(map(str, desired_size.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(desired_size, index=True).values.tobytes())
+    return digest.hexdigest()[:16]
+
+
 def block_name(model_selector):
     """
     return canonical block name for model_selector
@@ -1239,6 +1635,13 @@ def load_shadow_price_calculator(
 
     model_selector = model_settings.MODEL_SELECTOR
 
+    if state.get_injectable("micro_sliced", False):
+        # micro-slices are not all running at the same time, so cannot be synchronized
+        raise RuntimeError(
+            f"{model_selector} shadow pricing synchronizes all sub-processes "
+            f"and cannot be run in a micro_sliced multiprocess step"
+        )
+
     # - get shared_data from data_buffers (if multiprocessing)
     data_buffers = state.get_injectable("data_buffers", None)
     if data_buffers is not None:
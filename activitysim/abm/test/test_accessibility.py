@@ -0,0 +1,104 @@
+# ActivitySim
+# See full license in LICENSE.txt.
+from __future__ import annotations
+
+import os
+
+import pandas.testing as pdt
+import pkg_resources
+import pytest
+
+from activitysim.abm.models.accessibility import (
+    AccessibilitySettings,
+    compute_accessibility,
+)
+from activitysim.core import workflow
+
+
+def example_path(dirname):
+    resource = os.path.join("examples", "prototype_mtc", dirname)
+    return pkg_resources.resource_filename("activitysim", resource)
+
+
+@pytest.fixture(scope="module")
+def state(tmp_path_factory):
+    state = workflow.State.make_default(
+        configs_dir=[example_path("configs")],
+        data_dir=example_path("data"),
+        output_dir=tmp_path_factory.mktemp("output"),
+    )
+    state.run(models=["initialize_landuse"])
+    return state
+
+
+def _accessibility(state, output_table_name, **settings):
+    model_settings = AccessibilitySettings.read_settings_file(
+        state.filesystem, "accessibility.yaml"
+    )
+    model_settings = model_settings.model_copy(update=settings)
+    compute_accessibility(
+        state,
+        state.get_dataframe("land_use"),
+        state.get_dataframe("accessibility"),
+        state.get_injectable("network_los"),
+        model_settings=model_settings,
+        output_table_name=output_table_name,
+    )
+    return state.get_dataframe(output_table_name)
+
+
+@pytest.mark.parametrize("tile_size,tile_threads", [(1, 1), (7, 1), (7, 3), (500, 2)])
+def test_tiled_accessibility(state, tile_size, tile_threads):
+
+    expected = _accessibility(state, "accessibility_untiled")
+    tiled = _accessibility(
+        state, "accessibility_tiled", tile_size=tile_size, tile_threads=tile_threads
+    )
+
+    pdt.assert_frame_equal(tiled, expected)
+
+
+ORIG_SPEC = """Description,Target,Expression
+peak round trip distance,_auPkTime,"skim_od[('SOVTOLL_TIME', 'AM')] + skim_do[('SOVTOLL_TIME', 'PM')]"
+decay function,_decay, exp(_auPkTime * dispersion_parameter_automobile)
+auto peak total,auPkTotal,df.TOTEMP * _decay
+orig and dest total,origPkTotal,(df.landuse_orig_TOTEMP + df.TOTEMP) * _decay
+"""
+
+
+@pytest.mark.parametrize("tile_size,tile_threads", [(1, 1), (4, 3)])
+def test_tiled_accessibility_orig_columns(state, tmp_path, tile_size, tile_threads):
+
+    spec_path = tmp_path / "accessibility_orig.csv"
+    spec_path.write_text(ORIG_SPEC)
+
+    # accessibility for a reordered subset of zones, as for a multiprocess slice
+    accessibility = state.get_dataframe("accessibility")
+    sliced = accessibility.iloc[::2].iloc[::-1]
+
+    def sliced_accessibility(output_table_name, **settings):
+        model_settings = AccessibilitySettings.read_settings_file(
+            state.filesystem, "accessibility.yaml"
+        )
+        model_settings = model_settings.model_copy(
+            update=dict(
+                SPEC=str(spec_path), land_use_columns_orig=["TOTEMP"], **settings
+            )
+        )
+        compute_accessibility(
+            state,
+            state.get_dataframe("land_use"),
+            sliced,
+            state.get_injectable("network_los"),
+            model_settings=model_settings,
+            output_table_name=output_table_name,
+        )
+        return state.get_dataframe(output_table_name)
+
+    expected = sliced_accessibility("accessibility_orig_untiled")
+    tiled = sliced_accessibility(
+        "accessibility_orig_tiled", tile_size=tile_size, tile_threads=tile_threads
+    )
+
+    assert (expected.origPkTotal != expected.auPkTotal).any()
+    pdt.assert_frame_equal(tiled, expected)
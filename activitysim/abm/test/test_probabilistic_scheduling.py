@@ -0,0 +1,166 @@
+# ActivitySim
+# See full license in LICENSE.txt.
+from __future__ import annotations
+
+import os
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pkg_resources
+import pytest
+
+from activitysim.abm.models.util import probabilistic_scheduling as ps
+from activitysim.core import chunk, logit, workflow
+
+PROBS_JOIN_COLS = ["primary_purpose", "outbound", "tour_hour", "trip_num"]
+
+
+def example_path(dirname):
+    resource = os.path.join("examples", "prototype_mtc", dirname)
+    return pkg_resources.resource_filename("activitysim", resource)
+
+
+@pytest.fixture(scope="module")
+def probs_spec():
+    return pd.read_csv(
+        os.path.join(example_path("configs"), "trip_scheduling_probs.csv"),
+        comment="#",
+    )
+
+
+@pytest.fixture(scope="module")
+def choosers():
+    rng = np.random.default_rng(7)
+    num_choosers = 2000
+    earliest = rng.integers(5, 24, num_choosers)
+    latest = np.minimum(earliest + rng.integers(0, 8, num_choosers), 23)
+    outbound = rng.random(num_choosers) < 0.5
+    return pd.DataFrame(
+        {
+            "household_id": np.arange(num_choosers) // 3,
+            # 'atwork' and trip_num 5 are not in the probs spec
+            "primary_purpose": rng.choice(
+                ["work", "school", "shopping", "othdiscr", "atwork"], num_choosers
+            ),
+            "outbound": outbound,
+            "tour_hour": np.where(outbound, earliest, latest).astype(np.int8),
+            "trip_num": rng.integers(1, 6, num_choosers),
+            "earliest": earliest,
+            "latest": latest,
+        },
+        index=pd.Index(np.arange(num_choosers) * 3 + 11, name="trip_id"),
+    )
+
+
+@pytest.fixture(scope="module")
+def state(tmp_path_factory):
+    return workflow.State.make_default(
+        configs_dir=[example_path("configs")],
+        data_dir=example_path("data"),
+        output_dir=tmp_path_factory.mktemp("output"),
+    )
+
+
+def _merged_scheduling_choices(
+    state, choosers_df, probs_spec, first_trip_in_leg, clip_earliest_latest
+):
+    # make_scheduling_choices (for 'departure' mode) by merging choosers with spec
+    choosers = pd.merge(
+        choosers_df.reset_index(), probs_spec, on=PROBS_JOIN_COLS, how="left"
+    ).set_index(choosers_df.index.name)
+    chooser_probs = ps._preprocess_scheduling_probs(
+        "departure",
+        choosers_df,
+        choosers,
+        probs_spec,
+        PROBS_JOIN_COLS,
+        clip_earliest_latest,
+        5,
+        first_trip_in_leg,
+    )
+    raw_choices, _ = logit.make_choices(state, chooser_probs, allow_bad_probs=True)
+    choices, failed = ps._postprocess_scheduling_choices(
+        "departure", 5, raw_choices, chooser_probs.columns, choosers_df
+    )
+    return choices[~failed]
+
+
+def _in_step(state, choosers_df, func):
+    rng = state.get_rn_generator()
+    rng.add_channel("trips", choosers_df)
+    rng.begin_step("test_probabilistic_scheduling")
+    try:
+        return func()
+    finally:
+        rng.end_step("test_probabilistic_scheduling")
+        rng.drop_channel("trips")
+
+
+def test_scheduling_probs_lookup(probs_spec, choosers):
+    probs_lookup = ps.SchedulingProbsLookup(probs_spec, PROBS_JOIN_COLS)
+
+    assert probs_lookup.shape == (9, 2, 19, 4)
+    assert probs_lookup.probs_cols == [f"HR{h}" for h in range(5, 24)]
+
+    cells = probs_lookup.cells(choosers)
+    missing = (choosers.primary_purpose == "atwork") | (choosers.trip_num == 5)
+    assert (cells[missing.to_numpy()] == probs_lookup.num_cells).all()
+    assert (cells[~missing.to_numpy()] < probs_lookup.num_cells).all()
+
+    merged = pd.merge(
+        choosers.reset_index(), probs_spec, on=PROBS_JOIN_COLS, how="left"
+    ).set_index("trip_id")
+    pdt.assert_frame_equal(probs_lookup.probs_df(choosers), merged)
+
+    with pytest.raises(ValueError, match="duplicate"):
+        ps.SchedulingProbsLookup(pd.concat([probs_spec, probs_spec]), PROBS_JOIN_COLS)
+
+
+@pytest.mark.parametrize(
+    "first_trip_in_leg,clip_earliest_latest",
+    [(True, True), (False, True), (False, False)],
+)
+def test_lookup_scheduling_choices(
+    state, probs_spec, choosers, first_trip_in_leg, clip_earliest_latest
+):
+    probs_lookup = ps.SchedulingProbsLookup(probs_spec, PROBS_JOIN_COLS)
+    if not clip_earliest_latest:
+        # as for tour_scheduling_probabilistic
+        choosers = choosers.drop(columns=["earliest", "latest"])
+
+    def lookup_choices():
+        choices_list = []
+        for (
+            _,
+            chooser_chunk,
+            chunk_trace_label,
+            chunk_sizer,
+        ) in chunk.adaptive_chunked_choosers(state, choosers, "test"):
+            choices = ps.make_scheduling_choices(
+                state,
+                chooser_chunk,
+                "departure",
+                probs_spec,
+                PROBS_JOIN_COLS,
+                5,
+                first_trip_in_leg=first_trip_in_leg,
+                report_failed_trips=False,
+                trace_label=chunk_trace_label,
+                clip_earliest_latest=clip_earliest_latest,
+                chunk_sizer=chunk_sizer,
+                probs_lookup=probs_lookup,
+            )
+            choices_list.append(choices)
+        return pd.concat(choices_list)
+
+    def merged_choices():
+        return _merged_scheduling_choices(
+            state, choosers, probs_spec, first_trip_in_leg, clip_earliest_latest
+        )
+
+    choices = _in_step(state, choosers, lookup_choices)
+    expected = _in_step(state, choosers, merged_choices)
+
+    assert len(choices) > 0
+    pdt.assert_series_equal(choices, expected)
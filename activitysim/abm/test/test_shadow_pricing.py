@@ -0,0 +1,155 @@
+# ActivitySim
+# See full license in LICENSE.txt.
+from __future__ import annotations
+
+import time
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from activitysim.abm.tables.shadow_pricing import (
+    ShadowPriceCalculator,
+    ShadowPriceSettings,
+    desired_size_fingerprint,
+)
+from activitysim.core import workflow
+
+
+def _calculator(method, **settings):
+    # bypass __init__, which needs a full pipeline
+    spc = ShadowPriceCalculator.__new__(ShadowPriceCalculator)
+    spc.use_shadow_pricing = True
+    spc.shadow_price_method = method
+    spc.shadow_settings = ShadowPriceSettings(SHADOW_PRICE_METHOD=method, **settings)
+    spc.model_selector = "workplace"
+    spc.segment_ids = {"low": 1, "high": 2}
+    spc.anderson_history = []
+    spc.warm_start = None
+    spc.converged = False
+    spc.start_time = time.time()
+    spc.num_fail = pd.DataFrame(index=["low", "high"])
+    return spc
+
+
+def test_anderson_acceleration():
+
+    # a linear fixed point problem x = g(x) that converges slowly without acceleration
+    a = np.array([[0.9, 0.05], [0.02, 0.85]])
+    b = np.array([0.5, -0.2])
+    solution = np.linalg.solve(np.eye(2) - a, b)
+
+    def iterate(depth, iterations):
+        spc = _calculator("daysim", ANDERSON_ACCELERATION_DEPTH=depth)
+        spc.shadow_prices = pd.DataFrame({"low": [0.0], "high": [0.0]})
+        for _ in range(iterations):
+            g = a @ spc.shadow_prices.to_numpy().ravel() + b
+            new_shadow_prices = pd.DataFrame(
+                g.reshape(1, 2), columns=spc.shadow_prices.columns
+            )
+            spc.shadow_prices = spc.accelerate_shadow_prices(new_shadow_prices)
+        return np.abs(spc.shadow_prices.to_numpy().ravel() - solution).max()
+
+    assert iterate(depth=0, iterations=6) > 0.1
+    assert iterate(depth=2, iterations=6) < 1e-8
+
+    # ctramp shadow prices are accelerated in log space, so stay positive
+    spc = _calculator("ctramp", ANDERSON_ACCELERATION_DEPTH=1)
+    spc.shadow_prices = pd.DataFrame({"low": [1.0, 1.0], "high": [1.0, 0.0]})
+    for scale in [0.5, 0.4]:
+        new_shadow_prices = spc.shadow_prices * scale
+        spc.shadow_prices = spc.accelerate_shadow_prices(new_shadow_prices)
+    assert (spc.shadow_prices["low"] > 0).all()
+    assert spc.shadow_prices.at[1, "high"] == 0
+
+
+def test_choosers_to_resimulate():
+
+    spc = _calculator("daysim", PERCENT_TOLERANCE=5, SIZE_THRESHOLD=10)
+    zones = pd.Index([1, 2, 3, 4], name="zone_id")
+    spc.desired_size = pd.DataFrame(
+        {"low": [100, 100, 100, 5], "high": [100, 100, 100, 100]}, index=zones
+    )
+    spc.modeled_size = pd.DataFrame(
+        {"low": [120, 100, 100, 50], "high": [100, 100, 100, 100]}, index=zones
+    )
+    spc.shadow_price_change = pd.DataFrame(
+        {"low": [-0.2, 0, 0, 0], "high": [0, 0, 0.5, 0]}, index=zones
+    )
+
+    persons = pd.Index([10, 11, 12, 13, 14], name="person_id")
+    choices = pd.Series([1, 4, 2, 3, 2], index=persons)
+    segment_ids = pd.Series([1, 1, 2, 2, 2], index=persons)
+
+    # without a sample, only chosen zones are considered
+    resimulate = spc.choosers_to_resimulate(choices, segment_ids)
+    # person 10 chose over target zone 1, zone 4 is too small to be over target,
+    # and person 13 chose zone 3 whose price changed for their segment
+    pdt.assert_series_equal(resimulate, choices.loc[[10, 13]])
+
+    # with a sample, choosers who sampled a zone with changed price are re-simulated
+    sample_df = pd.DataFrame(
+        index=pd.MultiIndex.from_tuples(
+            [(10, 1), (11, 4), (11, 1), (12, 2), (12, 3), (13, 3), (14, 2), (14, 1)],
+            names=["person_id", "zone_id"],
+        )
+    )
+    resimulate = spc.choosers_to_resimulate(choices, segment_ids, sample_df)
+    pdt.assert_series_equal(resimulate, choices.loc[[10, 11, 12, 13]])
+
+
+def test_persisted_shadow_prices(tmp_path):
+
+    for subdir in ["configs", "data"]:
+        tmp_path.joinpath(subdir).mkdir()
+    state = workflow.State()
+    state.initialize_filesystem(working_dir=tmp_path)
+
+    zones = pd.Index([1, 2, 3], name="zone_id")
+    desired_size = pd.DataFrame(
+        {"low": [100.0, 50, 10], "high": [20.0, 0, 80]}, index=zones
+    )
+
+    spc = _calculator(
+        "ctramp", PERSIST_SHADOW_PRICES=True, SAVED_SHADOW_PRICES_DIR="sp"
+    )
+    spc.desired_size = desired_size
+    assert spc.read_persisted_shadow_prices(state) is None
+
+    spc.start_time -= 60
+    spc.shadow_prices = pd.DataFrame(
+        {"low": [1.5, 0.5, 1.0], "high": [0.9, 1.0, 1.1]}, index=zones
+    )
+    spc.num_fail["iter4"] = [0, 1]
+    spc.converged = True
+    spc.write_persisted_shadow_prices(state, iterations=4)
+
+    # warm start from similar desired_size
+    warm = _calculator(
+        "ctramp", PERSIST_SHADOW_PRICES=True, SAVED_SHADOW_PRICES_DIR="sp"
+    )
+    warm.desired_size = desired_size * 1.02
+    shadow_prices = warm.read_persisted_shadow_prices(state)
+    pdt.assert_frame_equal(shadow_prices, spc.shadow_prices)
+    assert warm.warm_start["cold_start_iterations"] == 4
+    assert warm.warm_start["cold_start_seconds"] >= 60
+    assert warm.warm_start["desired_size_difference"] == pytest.approx(2 / 1.02)
+
+    warm.shadow_prices = shadow_prices
+    warm.write_persisted_shadow_prices(state, iterations=1)
+    saved = sorted((tmp_path / "sp").glob("workplace_ctramp_*"))
+    assert len(saved) == 2
+    assert desired_size_fingerprint(warm.desired_size) in saved[0].name + saved[1].name
+
+    # but not from different desired_size, or a different method
+    cold = _calculator(
+        "ctramp", PERSIST_SHADOW_PRICES=True, SAVED_SHADOW_PRICES_DIR="sp"
+    )
+    cold.desired_size = desired_size * 1.5
+    assert cold.read_persisted_shadow_prices(state) is None
+    cold = _calculator(
+        "daysim", PERSIST_SHADOW_PRICES=True, SAVED_SHADOW_PRICES_DIR="sp"
+    )
+    cold.desired_size = desired_size
+    assert cold.read_persisted_shadow_prices(state) is None
@@ -0,0 +1,180 @@
+# ActivitySim
+# See full license in LICENSE.txt.
+from __future__ import annotations
+
+import os
+
+import numpy as np
+import pandas as pd
+import pkg_resources
+import pytest
+from numpy.testing import assert_array_equal
+
+from activitysim.abm.models.util import vectorize_tour_scheduling as vts
+from activitysim.abm.models.util.vectorize_tour_scheduling import (
+    TourSchedulingLogsumCache,
+    TourSchedulingSettings,
+    compute_tour_scheduling_logsums,
+)
+from activitysim.core import chunk, workflow
+
+
+def example_path(dirname):
+    resource = os.path.join("examples", "prototype_mtc", dirname)
+    return pkg_resources.resource_filename("activitysim", resource)
+
+
+def _logsum(key_df):
+    return (
+        key_df.orig * 100 + key_df.dest + 0.5 * (key_df.out_period == "AM")
+    ).to_numpy()
+
+
+def test_tour_scheduling_logsum_cache():
+
+    cache = TourSchedulingLogsumCache(max_size=4)
+    computed = []
+
+    def lookup(key_df):
+        def compute(positions):
+            computed.append(positions)
+            return _logsum(key_df.iloc[positions])
+
+        return cache.get_or_compute(key_df, compute, "test_step", "test")
+
+    # distinct missing keys are computed just once, for their first row
+    key_df = pd.DataFrame(
+        {
+            "orig": [1, 1, 2, 1],
+            "dest": [3, 3, 4, 3],
+            "out_period": ["AM", "AM", "MD", "MD"],
+        }
+    )
+    assert_array_equal(lookup(key_df), _logsum(key_df))
+    assert_array_equal(computed[-1], [0, 2, 3])
+    assert len(cache) == 3
+
+    # cached keys are not recomputed
+    key_df = pd.DataFrame(
+        {"orig": [2, 5, 1], "dest": [4, 6, 3], "out_period": ["MD", "AM", "AM"]}
+    )
+    assert_array_equal(lookup(key_df), _logsum(key_df))
+    assert_array_equal(computed[-1], [1])
+    assert len(cache) == 4
+
+    stats = cache.stats["test_step"]
+    assert stats["rows"] == 7
+    assert stats["hits"] == 2
+    assert stats["computed"] == 4
+
+    # least recently used key (1, 3, "MD") is evicted when the cache overflows
+    key_df = pd.DataFrame({"orig": [7], "dest": [8], "out_period": ["EV"]})
+    lookup(key_df)
+    assert len(cache) == 4
+    assert (1, 3, "MD") not in cache.logsums
+    assert (1, 3, "AM") in cache.logsums
+
+    key_df = pd.DataFrame({"orig": [1], "dest": [3], "out_period": ["MD"]})
+    np.testing.assert_allclose(lookup(key_df), _logsum(key_df))
+    assert_array_equal(computed[-1], [0])
+
+
+@pytest.fixture
+def state(tmp_path):
+    return workflow.State.make_default(
+        configs_dir=[example_path("configs")],
+        data_dir=example_path("data"),
+        output_dir=tmp_path,
+    )
+
+
+def test_compute_tour_scheduling_logsums_cache(state, monkeypatch):
+
+    computed = []
+
+    def _compute_logsums(
+        state,
+        alt_tdd,
+        tours_merged,
+        tour_purpose,
+        model_settings,
+        network_los,
+        skims,
+        trace_label,
+    ):
+        # stand-in for tour mode choice logsums, depending on the cache key
+        # chooser columns and the alt time periods
+        computed.append(len(alt_tdd))
+        choosers = alt_tdd.join(tours_merged, how="left", rsuffix="_chooser")
+        return (
+            choosers.destination
+            + choosers.income / 1000
+            + choosers.out_period.cat.codes * 0.1
+            + choosers.in_period.cat.codes * 0.01
+            + choosers.duration * 0.001
+        )
+
+    monkeypatch.setattr(vts, "_compute_logsums", _compute_logsums)
+
+    # tours 1 and 2 have the same cache key columns (but different ages),
+    # tours 3 and 4 differ from tour 1 in income and destination respectively
+    tours_merged = pd.DataFrame(
+        {
+            "destination": [5, 5, 5, 7],
+            "income": [50000, 50000, 90000, 50000],
+            "age": [30, 45, 30, 30],
+        },
+        index=pd.Index([1, 2, 3, 4], name="tour_id"),
+    )
+    tdd_alts = pd.DataFrame(
+        [(start, end) for start in range(5, 24) for end in range(start, 24)],
+        columns=["start", "end"],
+    )
+    model_settings = TourSchedulingSettings(
+        LOGSUM_SETTINGS="tour_mode_choice.yaml",
+        LOGSUM_CACHE_CHOOSER_COLUMNS=["destination", "income"],
+    )
+
+    def logsums(tours):
+        # all the tdd alts for each tour, as in _schedule_tours
+        alt_tdd = tdd_alts.loc[np.tile(tdd_alts.index, len(tours))]
+        alt_tdd.index = tours.index.repeat(len(tdd_alts))
+        with chunk.chunk_log(state, "test") as chunk_sizer:
+            return compute_tour_scheduling_logsums(
+                state,
+                alt_tdd,
+                tours,
+                "work",
+                model_settings,
+                skims={},
+                trace_label="test",
+                chunk_sizer=chunk_sizer,
+            )
+
+    state.settings.tour_scheduling_logsum_cache_size = 0
+    uncached = logsums(tours_merged)
+    uncached_rows = computed.pop()
+    assert state.get_injectable("tour_scheduling_logsum_cache", None) is None
+
+    state.settings.tour_scheduling_logsum_cache_size = 1000
+    cached = logsums(tours_merged)
+    pd.testing.assert_series_equal(cached, uncached)
+
+    # tour 2 shares the logsums of tour 1, tours 3 and 4 have their own
+    assert computed.pop() == uncached_rows * 3 / 4
+    assert_array_equal(cached.loc[2], cached.loc[1])
+    assert (cached.loc[3].to_numpy() != cached.loc[1].to_numpy()).all()
+    assert (cached.loc[4].to_numpy() != cached.loc[1].to_numpy()).all()
+
+    # a later call only computes logsums for the tours with new key columns
+    tours_merged = pd.DataFrame(
+        {"destination": [7, 8], "income": [50000, 50000], "age": [60, 30]},
+        index=pd.Index([5, 6], name="tour_id"),
+    )
+    cached = logsums(tours_merged)
+    assert computed.pop() == uncached_rows / 4
+    assert not computed
+
+    state.settings.tour_scheduling_logsum_cache_size = 0
+    state.add_injectable("tour_scheduling_logsum_cache", None)
+    pd.testing.assert_series_equal(cached, logsums(tours_merged))
@@ -0,0 +1,132 @@
+# ActivitySim
+# See full license in LICENSE.txt.
+from __future__ import annotations
+
+import os
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pkg_resources
+import pytest
+
+from activitysim.abm.models.trip_scheduling import (
+    TripSchedulingSettings,
+    trip_scheduling,
+)
+from activitysim.core import workflow
+
+PURPOSES = ["work", "school", "shopping", "eatout", "othdiscr"]
+
+
+def example_path(dirname):
+    resource = os.path.join("examples", "prototype_mtc", dirname)
+    return pkg_resources.resource_filename("activitysim", resource)
+
+
+@pytest.fixture(scope="module")
+def tours_and_trips():
+    rng = np.random.default_rng(42)
+    num_tours = 400
+
+    start = rng.integers(5, 24, num_tours)
+    end = np.minimum(start + rng.integers(0, 12, num_tours), 23)
+    tours = pd.DataFrame(
+        {
+            "person_id": np.arange(num_tours) // 2,
+            "primary_purpose": rng.choice(PURPOSES, num_tours),
+            "start": start,
+            "end": end,
+            "tour_num": 1,
+            "tour_count": 1,
+            "parent_tour_id": np.nan,
+        },
+        index=pd.Index(np.arange(num_tours) + 1000, name="tour_id"),
+    )
+
+    # an atwork subtour in the middle of some work tours
+    parents = tours[
+        (tours.primary_purpose == "work") & (tours.end - tours.start > 3)
+    ].iloc[::2]
+    subtours = pd.DataFrame(
+        {
+            "person_id": parents.person_id.to_numpy(),
+            "primary_purpose": "atwork",
+            "start": parents.start.to_numpy() + 1,
+            "end": parents.end.to_numpy() - 1,
+            "tour_num": 1,
+            "tour_count": 1,
+            "parent_tour_id": parents.index.to_numpy(),
+        },
+        index=pd.Index(np.arange(len(parents)) + 5000, name="tour_id"),
+    )
+    tours = pd.concat([tours, subtours])
+
+    # up to 5 trips per leg, beyond the trip_nums in the probs spec
+    trips = []
+    for tour_id, tour in tours.iterrows():
+        for outbound in [True, False]:
+            trip_count = rng.integers(1, 6)
+            for trip_num in range(1, trip_count + 1):
+                trips.append(
+                    {
+                        "trip_id": tour_id * 10 + (0 if outbound else 5) + trip_num,
+                        "person_id": tour.person_id,
+                        "household_id": tour.person_id,
+                        "tour_id": tour_id,
+                        "primary_purpose": tour.primary_purpose,
+                        "outbound": outbound,
+                        "trip_num": trip_num,
+                        "trip_count": trip_count,
+                        "origin": trip_num,
+                        "destination": trip_num + 1,
+                    }
+                )
+    trips = pd.DataFrame(trips).set_index("trip_id")
+
+    return tours, trips
+
+
+def _trip_scheduling(tmp_path, tours, trips, **settings):
+    state = workflow.State.make_default(
+        configs_dir=[example_path("configs")],
+        data_dir=example_path("data"),
+        output_dir=tmp_path,
+    )
+    model_settings = TripSchedulingSettings.read_settings_file(
+        state.filesystem, "trip_scheduling.yaml"
+    )
+    model_settings = model_settings.model_copy(update=settings)
+
+    rng = state.get_rn_generator()
+    rng.add_channel("trips", trips)
+    rng.begin_step("trip_scheduling")
+    trip_scheduling(state, trips, tours, model_settings=model_settings)
+    rng.end_step("trip_scheduling")
+
+    return state.get_dataframe("trips")
+
+
+@pytest.mark.parametrize(
+    "max_iterations,failfix,logic_version",
+    [
+        (100, "choose_most_initial", 1),
+        (100, "choose_most_initial", 2),
+        (2, "choose_most_initial", 2),
+        (2, "drop_and_cleanup", 1),
+    ],
+)
+def test_vectorized_trip_scheduling(
+    tmp_path, tours_and_trips, max_iterations, failfix, logic_version
+):
+    tours, trips = tours_and_trips
+    settings = dict(
+        MAX_ITERATIONS=max_iterations, FAILFIX=failfix, logic_version=logic_version
+    )
+
+    expected = _trip_scheduling(tmp_path / "legacy", tours, trips, **settings)
+    vectorized = _trip_scheduling(
+        tmp_path / "vectorized", tours, trips, vectorized=True, **settings
+    )
+
+    pdt.assert_frame_equal(vectorized, expected)
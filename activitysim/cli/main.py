@@ -8,7 +8,7 @@ import sys
 def prog():
 
     from activitysim import __doc__, __version__, workflows
-    from activitysim.cli import CLI, benchmark, create, exercise, run
+    from activitysim.cli import CLI, benchmark, create, exercise, run, skims_to_zarr
 
     asim = CLI(version=__version__, description=__doc__)
     asim.add_subcommand(
@@ -35,6 +35,12 @@ def prog():
         exec_func=workflows.main,
         description=workflows.main.__doc__,
     )
+    asim.add_subcommand(
+        name="skims_to_zarr",
+        args_func=skims_to_zarr.add_skims_to_zarr_args,
+        exec_func=skims_to_zarr.skims_to_zarr,
+        description=skims_to_zarr.skims_to_zarr.__doc__,
+    )
     asim.add_subcommand(
         name="test",
         args_func=exercise.add_exercise_args,
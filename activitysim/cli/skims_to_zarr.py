@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+# ActivitySim
+# See full license in LICENSE.txt.
+import logging
+import os
+
+from activitysim.core import workflow
+from activitysim.core.configuration import FileSystem
+
+logger = logging.getLogger(__name__)
+
+
+def add_skims_to_zarr_args(parser):
+    """skims_to_zarr command args"""
+    parser.add_argument(
+        "-w",
+        "--working_dir",
+        type=str,
+        metavar="PATH",
+        help="path to example/project directory (default: %s)" % os.getcwd(),
+    )
+    parser.add_argument(
+        "-c",
+        "--config",
+        type=str,
+        action="append",
+        metavar="PATH",
+        help="path to config dir",
+    )
+    parser.add_argument(
+        "-o", "--output", type=str, metavar="PATH", help="path to output dir"
+    )
+    parser.add_argument(
+        "-d",
+        "--data",
+        type=str,
+        action="append",
+        metavar="PATH",
+        help="path to data dir",
+    )
+    parser.add_argument(
+        "-s", "--settings_file", type=str, metavar="FILE", help="settings file name"
+    )
+    parser.add_argument(
+        "-t",
+        "--skim_tag",
+        type=str,
+        action="append",
+        metavar="TAG",
+        help="skim tag to convert, may be given more than once "
+        "(default: taz, and also tap for three zone systems)",
+    )
+    parser.add_argument(
+        "-n",
+        "--num_processes",
+        type=int,
+        metavar="N",
+        help="number of processes to use (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="rebuild the whole zarr skim cache, not just variables "
+        "whose source omx files have changed",
+    )
+
+
+def skims_to_zarr(args):
+    """
+    Convert omx skims to the zarr skim cache used when sharrow is enabled.
+
+    The zarr file names and digital encodings are taken from the network_los
+    settings. Only variables whose source omx files have changed since the
+    zarr skim cache was written are rebuilt, unless '--rebuild' is given.
+
+    returns:
+        int: sys.exit exit code
+    """
+    from activitysim import abm  # noqa: F401  -- register network_los_preload
+    from activitysim.core.los import THREE_ZONE
+    from activitysim.core.skim_dataset import convert_omx_to_zarr
+
+    state = workflow.State()
+    state.logging.config_logger(basic=True)
+
+    if args.working_dir:
+        os.chdir(args.working_dir)
+    state.filesystem = FileSystem.parse_args(args)
+    state.load_settings()
+
+    network_los = state.get_injectable("network_los_preload")
+    skim_tags = args.skim_tag or (
+        ["taz", "tap"] if network_los.zone_system == THREE_ZONE else ["taz"]
+    )
+
+    for skim_tag in skim_tags:
+        zarr_file = convert_omx_to_zarr(
+            state,
+            skim_tag,
+            num_processes=args.num_processes,
+            rebuild=args.rebuild,
+            network_los=network_los,
+        )
+        logger.info(f"{skim_tag} zarr skims at {zarr_file}")
+
+    return 0
@@ -26,6 +26,14 @@ def test_create_help():
     assert "usage: activitysim create [-h] (-l | -e PATH) [-d PATH]" in str(cp.stdout)
 
 
+def test_skims_to_zarr_help():
+
+    cp = subprocess.run(["activitysim", "skims_to_zarr", "-h"], capture_output=True)
+
+    assert "usage: activitysim skims_to_zarr" in str(cp.stdout)
+    assert "--rebuild" in str(cp.stdout)
+
+
 def test_create_list():
 
     cp = subprocess.run(["activitysim", "create", "--list"], capture_output=True)
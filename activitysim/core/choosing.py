@@ -28,6 +28,81 @@ def choice_maker(pr, rn, out=None):
     return out
 
 
+@njit
+def utils_choice_maker(
+    utils, rn, exp_util_min, out_choices, out_choice_probs, out_logsums, out_bad
+):
+    """
+    Make choices directly from utilities, without materializing probabilities.
+
+    For each row, utilities are shifted so the maximum is zero, exponentiated,
+    summed, and the choice is made by comparing the random number against the
+    cumulative probabilities, all in a single pass over the row.
+
+    Parameters
+    ----------
+    utils : array of float, shape (n_choosers, n_alts)
+    rn : array of float, shape (n_choosers)
+    exp_util_min : float
+        exponentiated utilities at or below this value are treated as zero
+    out_choices : array of int, shape (n_choosers)
+    out_choice_probs : array of float, shape (n_choosers)
+        probability of the chosen alternative
+    out_logsums : array of float, shape (n_choosers)
+    out_bad : array of bool, shape (n_choosers)
+        set for rows with missing or infinite utilities, whose
+        probabilities cannot be computed
+    """
+    n_alts = utils.shape[1]
+    exp_utils = np.empty(n_alts, dtype=np.float64)
+    for row in range(utils.shape[0]):
+        shift = -np.inf
+        bad = False
+        for col in range(n_alts):
+            u = utils[row, col]
+            if np.isnan(u):
+                bad = True
+            elif u > shift:
+                shift = u
+        if bad or not np.isfinite(shift):
+            out_bad[row] = True
+            out_choices[row] = 0
+            out_choice_probs[row] = 0.0
+            out_logsums[row] = np.nan
+            continue
+        out_bad[row] = False
+
+        total = 0.0
+        for col in range(n_alts):
+            e = np.exp(utils[row, col] - shift)
+            if e <= exp_util_min:
+                e = 0.0
+            exp_utils[col] = e
+            total += e
+
+        z = rn[row]
+        chosen = -1
+        for col in range(n_alts):
+            z = z - exp_utils[col] / total
+            if z <= 0:
+                chosen = col
+                break
+        if chosen < 0:
+            # rare condition, only if a random point is greater than 1 (a bug)
+            # or if the sum of probabilities is less than 1 and a random point
+            # is greater than that sum, which due to the limits of numerical
+            # precision can technically happen
+            max_e = 0.0
+            for col in range(n_alts):
+                if exp_utils[col] > max_e:
+                    chosen = col
+                    max_e = exp_utils[col]
+
+        out_choices[row] = chosen
+        out_choice_probs[row] = exp_utils[chosen] / total
+        out_logsums[row] = np.log(total) + shift
+
+
 @njit
 def sample_choices_maker(
     prob_array,
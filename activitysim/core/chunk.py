@@ -18,6 +18,7 @@ import pandas as pd
 import xarray as xr
 
 from activitysim.core import configuration, mem, tracing, util, workflow
+from activitysim.core.interaction_frame import InteractionFrame
 from activitysim.core.util import GB
 
 logger = logging.getLogger(__name__)
@@ -129,6 +130,9 @@ CHUNK_HISTORY_COLUMNS = (
 
 CHUNK_CACHE_COLUMNS = [C_CHUNK_TAG, C_NUM_ROWS] + METRICS
 
+# allowance for temporaries (e.g. while evaluating expressions) in estimate_row_size
+ROW_SIZE_ESTIMATE_OVERHEAD = 2
+
 #
 # globals
 #
@@ -227,6 +231,77 @@ def overhead_for_chunk_method(state: workflow.State, overhead, method=None):
     return oh
 
 
+def estimate_row_size(
+    num_alternatives: int,
+    num_expressions: int = 0,
+    sample_size: int = 0,
+    interaction_dtypes=(),
+    chooser_dtypes=(),
+    num_nest_nodes: int = 0,
+) -> int:
+    """
+    Estimate the bytes needed to simulate the choice of one chooser from model structure.
+
+    This is a static alternative to the row_size learned in a training run, used to size
+    the first chunk of a chunk_tag with no cached row_size if the estimate_chunk_row_size
+    setting is True.
+
+    Parameters
+    ----------
+    num_alternatives : int
+        number of alternatives (spec columns of a simple simulate model)
+    num_expressions : int
+        number of spec expressions
+    sample_size : int
+        number of interaction rows per chooser of an interaction model, 0 if not an
+        interaction model
+    interaction_dtypes : iterable of dtypes
+        dtypes of the alternatives columns in the interaction dataset
+    chooser_dtypes : iterable of dtypes
+        dtypes of the chooser columns (repeated for each interaction row)
+    num_nest_nodes : int
+        number of nodes (nests and alternatives) of the nest tree of a nested logit
+        model, 0 if multinomial logit
+
+    Returns
+    -------
+    row_size : int
+        estimated bytes per chooser
+    """
+
+    def itemsize(dtypes):
+        size = 0
+        for dtype in dtypes:
+            if isinstance(dtype, pd.CategoricalDtype):
+                # categoricals hold the smallest integer code for their categories
+                size += np.min_scalar_type(-len(dtype.categories)).itemsize
+            else:
+                # object columns hold (at least) a pointer per row
+                size += getattr(dtype, "itemsize", 8)
+        return size
+
+    float_size = np.dtype(np.float64).itemsize
+
+    if sample_size:
+        # interaction dataset (with index), expression values, utilities and probs
+        interaction_row_size = (
+            itemsize(interaction_dtypes) + itemsize(chooser_dtypes) + float_size
+        )
+        row_size = sample_size * (interaction_row_size + 3 * float_size)
+    else:
+        # expression values, utilities and probs
+        row_size = (num_expressions + 2 * num_alternatives) * float_size
+
+    if num_nest_nodes:
+        # nested exp utilities, nested probabilities, logsums and base probabilities
+        row_size += (2 * num_nest_nodes + 1 + num_alternatives) * float_size
+
+    # rands, positions and choices
+    row_size += 3 * float_size
+
+    return int(row_size * ROW_SIZE_ESTIMATE_OVERHEAD)
+
+
 def consolidate_logs(state: workflow.State):
     glob_file_name = state.get_log_file_path(f"*{LOG_FILE_NAME}", prefix=False)
     glob_files = glob.glob(str(glob_file_name))
@@ -393,7 +468,11 @@ class ChunkHistorian:
             ):
                 # raise RuntimeError(f"chunk_training_mode is {MODE_PRODUCTION} but no chunk_cache: {chunk_cache_path}")
 
-                state.settings.chunk_training_mode = MODE_RETRAIN
+                # row sizes estimated from model structure make retraining unnecessary
+                if state.settings.estimate_chunk_row_size:
+                    state.settings.chunk_training_mode = MODE_ADAPTIVE
+                else:
+                    state.settings.chunk_training_mode = MODE_RETRAIN
                 logger.warning(
                     f"chunk_training_mode is {MODE_PRODUCTION} but no chunk_cache: {chunk_cache_path}"
                 )
@@ -556,6 +635,9 @@ class ChunkLedger:
             elif isinstance(df, (np.ndarray, xr.DataArray)):
                 elements = util.iprod(df.shape)
                 bytes = df.nbytes
+            elif isinstance(df, InteractionFrame):
+                elements = len(df)
+                bytes = df.nbytes
             elif isinstance(df, (list, tuple)):
                 # dict of series, dataframe, or ndarray (e.g. assign assign_variables target and temp dicts)
                 elements = 0
@@ -722,6 +804,7 @@ class ChunkSizer:
         num_choosers=0,
         chunk_size=0,
         chunk_training_mode="disabled",
+        estimated_row_size=0,
     ):
         self.state = state
         if state is not None:
@@ -733,6 +816,7 @@ class ChunkSizer:
         self.num_choosers = num_choosers
         self.rows_processed = 0
         self.initial_row_size = 0
+        self.estimated_row_size = estimated_row_size
         self.rows_per_chunk = 0
         self.chunk_ledger = None
         self.history = {}
@@ -857,6 +941,18 @@ class ChunkSizer:
             self.state, self.chunk_tag
         )
 
+        # otherwise use the row_size estimated from model structure, if any
+        if (
+            self.initial_row_size == 0
+            and self.estimated_row_size > 0
+            and self.state.settings.estimate_chunk_row_size
+        ):
+            self.initial_row_size = self.estimated_row_size
+            logger.debug(
+                f"{self.trace_label}.initial_rows_per_chunk - "
+                f"estimated_row_size: {self.estimated_row_size}"
+            )
+
         if self.chunk_size == 0:
             rows_per_chunk = self.num_choosers
             estimated_number_of_chunks = 1
@@ -1214,6 +1310,7 @@ def adaptive_chunked_choosers(
     *,
     chunk_size: int | None = None,
     explicit_chunk_size: float = 0,
+    estimated_row_size: int = 0,
 ):
     # generator to iterate over choosers
 
@@ -1256,6 +1353,7 @@ def adaptive_chunked_choosers(
         num_choosers,
         chunk_size,
         chunk_training_mode=state.settings.chunk_training_mode,
+        estimated_row_size=estimated_row_size,
     )
 
     rows_per_chunk, estimated_number_of_chunks = chunk_sizer.initial_rows_per_chunk()
@@ -1297,6 +1395,7 @@ def adaptive_chunked_choosers_and_alts(
     *,
     chunk_size: int | None = None,
     explicit_chunk_size: int = 0,
+    estimated_row_size: int = 0,
 ):
     """
     generator to iterate over choosers and alternatives in chunk_size chunks
@@ -1387,6 +1486,7 @@ def adaptive_chunked_choosers_and_alts(
         num_choosers,
         chunk_size,
         chunk_training_mode=state.settings.chunk_training_mode,
+        estimated_row_size=estimated_row_size,
     )
     rows_per_chunk, estimated_number_of_chunks = chunk_sizer.initial_rows_per_chunk()
     assert (rows_per_chunk > 0) and (rows_per_chunk <= num_choosers)
@@ -1450,6 +1550,7 @@ def adaptive_chunked_choosers_by_chunk_id(
     trace_label: str,
     chunk_tag=None,
     explicit_chunk_size: int = 0,
+    estimated_row_size: int = 0,
 ):
     # generator to iterate over choosers in chunk_size chunks
     # like chunked_choosers but based on chunk_id field rather than dataframe length
@@ -1487,6 +1588,7 @@ def adaptive_chunked_choosers_by_chunk_id(
         num_choosers,
         chunk_size,
         chunk_training_mode=state.settings.chunk_training_mode,
+        estimated_row_size=estimated_row_size,
     )
 
     rows_per_chunk, estimated_number_of_chunks = chunk_sizer.initial_rows_per_chunk()
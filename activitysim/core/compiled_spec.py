@@ -0,0 +1,339 @@
+# ActivitySim
+# See full license in LICENSE.txt.
+from __future__ import annotations
+
+import ast
+import hashlib
+import logging
+import warnings
+
+import numexpr as ne
+import numpy as np
+import pandas as pd
+
+from activitysim.core.simulate_consts import SPEC_EXPRESSION_NAME
+
+logger = logging.getLogger(__name__)
+
+# maximum number of distinct chooser columns referenced by a single numexpr program
+# (numexpr is limited by NPY_MAXARGS inputs, one of which is the utility accumulator)
+MAX_PROGRAM_COLUMNS = 24
+
+# maximum number of spec terms folded into a single numexpr program
+MAX_PROGRAM_TERMS = 64
+
+# node types that have identical semantics in DataFrame.eval and numexpr
+_NUMEXPR_NODES = (
+    ast.Expression,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Compare,
+    ast.Name,
+    ast.Load,
+    ast.Constant,
+    ast.Call,
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.Pow,
+    ast.Mod,
+    ast.USub,
+    ast.UAdd,
+    ast.Invert,
+    ast.BitAnd,
+    ast.BitOr,
+    ast.Eq,
+    ast.NotEq,
+    ast.Lt,
+    ast.LtE,
+    ast.Gt,
+    ast.GtE,
+)
+
+_NUMEXPR_FUNCS = {"abs", "exp", "expm1", "log", "log1p", "sqrt"}
+
+# DataFrame.eval parses & and | with the precedence of 'and' and 'or' (below comparisons)
+_BITWISE_OPS = (ast.BitAnd, ast.BitOr)
+
+# numexpr only supports a subset of numpy dtypes, smaller ones are upcast
+_NUMEXPR_DTYPES = {
+    np.dtype(np.bool_): None,
+    np.dtype(np.int32): None,
+    np.dtype(np.int64): None,
+    np.dtype(np.float32): None,
+    np.dtype(np.float64): None,
+    np.dtype(np.int8): np.int32,
+    np.dtype(np.int16): np.int32,
+    np.dtype(np.uint8): np.int32,
+    np.dtype(np.uint16): np.int32,
+    np.dtype(np.uint32): np.int64,
+    np.dtype(np.float16): np.float32,
+}
+
+_compiled_specs = {}
+
+
+def _pure_column_names(expr):
+    """
+    Return the set of names referenced by a simple expression if it can be evaluated
+    by numexpr exactly as DataFrame.eval would evaluate it, otherwise None.
+    """
+    try:
+        tree = ast.parse(expr.strip(), mode="eval")
+    except SyntaxError:
+        return None
+
+    names = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, _NUMEXPR_NODES):
+            return None
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, str) or node.value is None:
+                return None
+        elif isinstance(node, ast.Compare):
+            # numexpr does not support chained comparisons
+            if len(node.ops) != 1:
+                return None
+            # python (and numexpr) bind & and | tighter than comparisons, so
+            # 'ptype == 1 & work_from_home' means something else to DataFrame.eval
+            for operand in [node.left] + node.comparators:
+                if isinstance(operand, ast.BinOp) and isinstance(
+                    operand.op, _BITWISE_OPS
+                ):
+                    return None
+        elif isinstance(node, ast.Call):
+            if (
+                not isinstance(node.func, ast.Name)
+                or node.func.id not in _NUMEXPR_FUNCS
+                or node.keywords
+            ):
+                return None
+        elif isinstance(node, ast.Name):
+            names.add(node.id)
+
+    return names - _NUMEXPR_FUNCS
+
+
+class CompiledSpec:
+    """
+    A utility spec parsed once into a form that can be evaluated repeatedly without
+    materializing the (expressions x choosers) expression_values array.
+
+    Simple expressions that only reference numeric chooser columns are folded, together
+    with their coefficients, into numexpr programs that accumulate the utility of each
+    alternative in place.  All other expressions ("@" python expressions and simple
+    expressions numexpr cannot evaluate exactly like DataFrame.eval) are evaluated one
+    at a time, with "@" expressions precompiled to code objects, and their values are
+    added into the utilities of the alternatives with non-zero coefficients.
+
+    Peak memory is thus O(alternatives x choosers) rather than
+    O(expressions x choosers).
+    """
+
+    def __init__(self, spec: pd.DataFrame):
+        if isinstance(spec.index, pd.MultiIndex):
+            exprs = spec.index.get_level_values(SPEC_EXPRESSION_NAME)
+        else:
+            exprs = spec.index
+
+        self.columns = spec.columns
+        self.coefficients = spec.astype(np.float64).values
+        self.exprs = list(exprs)
+
+        # python expressions, compiled once
+        self.code = {}
+        # names referenced by simple expressions numexpr can evaluate
+        self.pure_names = {}
+        for i, expr in enumerate(self.exprs):
+            if expr.startswith("@"):
+                self.code[i] = compile(expr[1:], f"<spec: {expr}>", "eval")
+            else:
+                names = _pure_column_names(expr)
+                if names is not None:
+                    self.pure_names[i] = names
+
+        self._programs = {}
+
+    def _programs_for(self, pure_terms):
+        """
+        Return list of (alt_idx, program_str, column_names, term_idxs) numexpr
+        programs covering all non-zero coefficients of pure_terms, cached by pure_terms.
+        """
+        key = tuple(pure_terms)
+        if key in self._programs:
+            return self._programs[key]
+
+        programs = []
+        for j in range(self.coefficients.shape[1]):
+            terms = []
+            names = set()
+            term_idxs = []
+            for i in pure_terms:
+                coefficient = self.coefficients[i, j]
+                if coefficient == 0:
+                    continue
+                if terms and (
+                    len(terms) >= MAX_PROGRAM_TERMS
+                    or len(names | self.pure_names[i]) > MAX_PROGRAM_COLUMNS
+                ):
+                    programs.append(
+                        (j, "u + " + " + ".join(terms), sorted(names), term_idxs)
+                    )
+                    terms, names, term_idxs = [], set(), []
+                terms.append(f"{coefficient!r} * ({self.exprs[i].strip()})")
+                names |= self.pure_names[i]
+                term_idxs.append(i)
+            if terms:
+                programs.append(
+                    (j, "u + " + " + ".join(terms), sorted(names), term_idxs)
+                )
+
+        self._programs[key] = programs
+        return programs
+
+    def _eval_expr(self, i, choosers, globals_dict, locals_dict, trace_label):
+        expr = self.exprs[i]
+        try:
+            with warnings.catch_warnings(record=True) as w:
+                # Cause all warnings to always be triggered.
+                warnings.simplefilter("always")
+                if i in self.code:
+                    value = eval(self.code[i], globals_dict, locals_dict)
+                else:
+                    value = choosers.eval(expr)
+
+                if len(w) > 0:
+                    for wrn in w:
+                        logger.warning(
+                            f"{trace_label} - {type(wrn).__name__} ({wrn.message}) evaluating: {str(expr)}"
+                        )
+
+        except Exception as err:
+            logger.exception(
+                f"{trace_label} - {type(err).__name__} ({str(err)}) evaluating: {str(expr)}"
+            )
+            raise err
+
+        return value
+
+    def eval_utilities(
+        self,
+        choosers: pd.DataFrame,
+        globals_dict: dict,
+        locals_dict: dict,
+        trace_label: str = None,
+        use_numexpr: bool = True,
+    ) -> np.ndarray:
+        """
+        Evaluate utilities for choosers.
+
+        Parameters
+        ----------
+        choosers : pandas.DataFrame
+        globals_dict, locals_dict : dict
+            environment for "@" python expressions
+        trace_label : str
+        use_numexpr : bool
+            if False, all expressions are evaluated one at a time
+
+        Returns
+        -------
+        utilities : 2-D ndarray of shape (len(choosers), number of alternatives)
+        """
+
+        num_choosers = len(choosers)
+        utilities = np.zeros(
+            (self.coefficients.shape[1], num_choosers), dtype=np.float64
+        )
+
+        # numexpr can only evaluate expressions whose names are all numeric columns
+        columns = {}
+        pure_terms = []
+        if use_numexpr:
+            for i, names in self.pure_names.items():
+                for name in names:
+                    if name in columns:
+                        continue
+                    if name not in choosers.columns:
+                        break
+                    col = choosers[name]
+                    if (
+                        not isinstance(col, pd.Series)
+                        or col.dtype not in _NUMEXPR_DTYPES
+                    ):
+                        break
+                    upcast = _NUMEXPR_DTYPES[col.dtype]
+                    columns[name] = col.to_numpy(dtype=upcast)
+                else:
+                    pure_terms.append(i)
+
+        # (alt_idx, term_idxs) of programs numexpr could not evaluate
+        fallback = []
+        if pure_terms:
+            for j, program, names, term_idxs in self._programs_for(pure_terms):
+                local_dict = {name: columns[name] for name in names}
+                local_dict["u"] = utilities[j]
+                try:
+                    ne.evaluate(program, local_dict=local_dict, out=utilities[j])
+                except (TypeError, ValueError, NotImplementedError) as err:
+                    # e.g. & or ~ of int columns, which numexpr only supports for bool,
+                    # so evaluate these terms one at a time like the other expressions
+                    logger.debug(
+                        f"{trace_label} - {type(err).__name__} ({str(err)}) "
+                        f"evaluating compiled spec program, falling back to eval: "
+                        f"{program}"
+                    )
+                    fallback.append((j, term_idxs))
+
+        pure_terms = set(pure_terms)
+        for i in range(len(self.exprs)):
+            if i in pure_terms:
+                continue
+            nonzero = np.flatnonzero(self.coefficients[i])
+            if len(nonzero) == 0:
+                continue
+            value = self._eval_value(
+                i, choosers, globals_dict, locals_dict, trace_label
+            )
+            for j in nonzero:
+                utilities[j] += self.coefficients[i, j] * value
+
+        values = {}
+        for j, term_idxs in fallback:
+            for i in term_idxs:
+                if i not in values:
+                    values[i] = self._eval_value(
+                        i, choosers, globals_dict, locals_dict, trace_label
+                    )
+                utilities[j] += self.coefficients[i, j] * values[i]
+
+        return utilities.T
+
+    def _eval_value(self, i, choosers, globals_dict, locals_dict, trace_label):
+        value = self._eval_expr(i, choosers, globals_dict, locals_dict, trace_label)
+        value = np.asanyarray(value, dtype=np.float64)
+        if value.ndim == 0:
+            value = np.broadcast_to(value, len(choosers))
+        return value
+
+
+def spec_hash(spec: pd.DataFrame) -> str:
+    """
+    Hash of spec expressions, alternatives and coefficients
+    """
+    h = hashlib.md5()
+    h.update(pd.util.hash_pandas_object(spec, index=True).values.tobytes())
+    h.update(str(list(spec.columns)).encode("utf8"))
+    return h.hexdigest()
+
+
+def compile_spec(spec: pd.DataFrame) -> CompiledSpec:
+    """
+    Return CompiledSpec for spec, reusing a cached one if spec has been compiled before
+    """
+    key = spec_hash(spec)
+    compiled = _compiled_specs.get(key)
+    if compiled is None:
+        compiled = _compiled_specs[key] = CompiledSpec(spec)
+    return compiled
@@ -201,6 +201,58 @@ class ComputeSettings(PydanticBase):
     for more information.
     """
 
+    compiled_spec: bool = False
+    """Evaluate utilities with a compiled spec when not using sharrow.
+
+    When True, the spec for this component is parsed once (and cached), simple
+    expressions on numeric chooser columns are folded with their coefficients
+    into numexpr programs, and utilities are accumulated directly instead of
+    first computing the full (expressions x choosers) array of expression values.
+    This reduces the memory needed to evaluate utilities from
+    O(expressions x choosers) to O(alternatives x choosers), which allows
+    for larger chunks.  Utilities may differ from the default evaluation in the
+    last few bits due to the different order of summation.
+
+    Tracing, estimation, and `log_alt_losers` require the expression values, so
+    the default evaluation is always used when they are active.
+
+    .. versionadded:: 1.3
+    """
+
+    lazy_interaction_dataset: bool = False
+    """Use a lazy interaction dataset when not using sharrow.
+
+    When True, interaction_simulate and interaction_sample do not build the
+    merged (choosers x alternatives) interaction table.  Choosers and
+    alternatives are instead stored once, and each column is gathered for the
+    interaction rows only when an expression references it.  This reduces peak
+    memory, especially for components with wide chooser or alternatives tables
+    like location choice and tour scheduling.  "@" expressions can still use
+    `df.column` and `df["column"]`, but not other DataFrame methods of `df`.
+
+    Tracing and estimation require the merged table, so it is always built
+    when they are active.
+
+    .. versionadded:: 1.3
+    """
+
+    fused_choices: bool = False
+    """Make MNL choices directly from utilities.
+
+    When True, multinomial logit choices in simple_simulate and
+    interaction_simulate are made with a single fused kernel that
+    exponentiates, normalizes and chooses one row at a time, instead of first
+    building a full table of probabilities.  This avoids several temporary
+    arrays the size of the utilities table.  Choices can differ from the
+    default only when a random number falls within rounding error of a
+    cumulative probability.
+
+    Tracing and custom choosers require the probabilities, so the default
+    method is always used when they are active.
+
+    .. versionadded:: 1.3
+    """
+
     drop_unused_columns: bool = True
     """Drop unused columns in the choosers df.
 
@@ -242,6 +294,9 @@ class ComputeSettings(PydanticBase):
             use_bottleneck=self.use_bottleneck,
             use_numexpr=self.use_numexpr,
             use_numba=self.use_numba,
+            compiled_spec=self.compiled_spec,
+            lazy_interaction_dataset=self.lazy_interaction_dataset,
+            fused_choices=self.fused_choices,
             drop_unused_columns=self.drop_unused_columns,
             protect_columns=self.protect_columns,
         )
@@ -249,6 +249,21 @@ class NetworkSettings(PydanticReadable, extra="forbid"):
     network_cache_dir: str = None
     """alternate dir to read/write cache files (defaults to output_dir)"""
 
+    skim_manifest: str = None
+    """Filename of a skim manifest listing the skims to preload.
+
+    The manifest is a YAML file mapping skim tags (e.g. `taz`, `tap`) to lists of
+    OMX matrix names (e.g. `SOV_TIME__AM`), such as the `skim_manifest.yaml`
+    written by the `track_skim_usage` step of a prior run.  Only the listed
+    skims of these skim tags are loaded at startup.  Any other skim is read from
+    its OMX file the first time it is looked up, with a warning.  Skim tags not
+    in the manifest are loaded in full.
+
+    Not used when sharrow is enabled.
+
+    .. versionadded:: 1.3
+    """
+
     #### 2 ZONE ####
 
     maz: str = None
@@ -285,6 +300,22 @@ class NetworkSettings(PydanticReadable, extra="forbid"):
     rebuild and overwrite existing pre-computed TAP to TAP utilities cache
     """
 
+    persistent_tvpb_cache: bool = False
+    """
+    Keep pre-computed TAP to TAP utilities in a persistent, versioned cache.
+
+    The cache is written to a subdirectory of the cache directory named for a
+    hash of the tap skims, the taps, and the tour_mode_choice TVPB settings and
+    specs, with a separate file of utilities for each combination of tap_tap
+    attribute_segments.  Only attribute combinations missing from the cache are
+    computed by the initialize_tvpb step, so later runs with the same transit
+    network (e.g. scenarios that only change land use) reuse the utilities of
+    earlier runs, and runs with a changed transit network start a new cache.
+    The `rebuild_tvpb_cache` setting is ignored when this is True.
+
+    .. versionadded:: 1.3
+    """
+
     trace_tvpb_cache_as_csv: bool = False
     """Write a CSV version of TVPB cache for tracing
 
@@ -194,6 +194,28 @@ class MultiprocessStepSlice(PydanticBase, extra="forbid"):
     used as a Pydantic field name.
     """
 
+    weight_by: list[str] = None
+    """
+    Optional list of tables or columns used to balance work across subprocesses.
+
+    .. versionadded:: 1.3
+
+    By default, rows of the primary slicer table are dealt out to subprocesses
+    in turn, so each subprocess gets the same number of rows.  If `weight_by`
+    is given, each primary slicer row is weighted by the sum of, for each item
+    in the list, either the number of rows of that sliced table that belong to
+    it (e.g. `persons`, `tours` or `trips`) or the value of that column of the
+    primary slicer table (e.g. `hhsize`).  Rows are then assigned in order of
+    decreasing weight, each to the subprocess with the smallest total weight so
+    far (longest processing time first), which nearly equalizes the total
+    weight of each subprocess.  Items that are neither tables in the pipeline
+    nor columns of the primary slicer table (e.g. `trips` before trip
+    generation) are ignored, with a warning.
+
+    The runtime of each subprocess, and the ratio of the longest to the mean
+    runtime, are recorded in the breadcrumbs for each multiprocess step.
+    """
+
 
 class MultiprocessStep(PydanticBase):
     """
@@ -217,6 +239,24 @@ class MultiprocessStep(PydanticBase):
     slice: MultiprocessStepSlice = None
     """Instructions on how to slice tables for each subprocess."""
 
+    micro_slices: int = None
+    """
+    The number of micro-slices to cut the sliced tables into.
+
+    If given and greater than `num_processes`, tables are apportioned into this
+    many micro-slices instead of one slice per process, and a pool of
+    `num_processes` persistent workers pulls micro-slices from a shared queue
+    until all of them have been simulated.  Each worker attaches to the shared
+    skim and shadow pricing buffers once, and a worker that finishes early
+    simply takes the next micro-slice, so a few slow slices (e.g. with extreme
+    households) do not leave the other processes idle.
+
+    Location choice models, which synchronize all sub-processes for shadow
+    pricing, cannot be run in a micro-sliced step.
+
+    .. versionadded:: 1.3
+    """
+
     chunk_size: int = None
 
 
@@ -389,6 +429,23 @@ class Settings(PydanticBase, extra="allow", validate_assignment=True):
     Default number of rows to use in initial chunking.
     """
 
+    estimate_chunk_row_size: bool = False
+    """
+    Size the first chunk from a row size estimated from model structure.
+
+    .. versionadded:: 1.3
+
+    When True, a chunk_tag that has no row_size in the chunk cache (e.g. in the
+    first training or adaptive run on a new machine or region, or in a production
+    run without a cache) sizes its first chunk from the bytes per chooser
+    estimated from the number of spec expressions and alternatives, the sample
+    size, the dtypes of the interaction columns and the size of the nest tree,
+    instead of using `default_initial_rows_per_chunk` rows.  Subsequent chunks are
+    sized adaptively as usual (or from the estimate in production mode).  A
+    production run without a chunk cache falls back to adaptive rather than
+    training mode.
+    """
+
     min_available_chunk_ratio: float = 0.05
     """
     minimum fraction of total chunk_size to reserve for adaptive chunking
@@ -408,6 +465,46 @@ class Settings(PydanticBase, extra="allow", validate_assignment=True):
     Storage format to use when saving checkpoint files.
     """
 
+    stream_multiprocess_pipelines: bool = False
+    """
+    Apportion and coalesce parquet pipelines without loading tables into memory.
+
+    .. versionadded:: 1.3
+
+    When True (and `checkpoint_format` is "parquet"), the apportion phase of
+    each multiprocess step reads pipeline tables one batch of rows at a time
+    and writes each subprocess's rows of every batch as a row group of that
+    subprocess's table, and the coalesce phase unions the subprocess tables by
+    linking their parquet files into a single dataset directory, instead of
+    concatenating them in memory.  This reduces the time and peak memory of
+    these phases for large tables.  Rows of tables sliced by index (e.g.
+    `person_windows`) keep the order in which they are stored, which is
+    ordinarily the same as the order of their source table.
+
+    Tables that cannot be streamed (those stored as pickles, or with a
+    RangeIndex, or with differing parquet schemas across subprocesses) are
+    loaded and sliced or concatenated in memory as usual.
+    """
+
+    persistent_multiprocess_workers: bool = False
+    """
+    Keep sub-processes alive across consecutive multiprocess steps with the same slicing.
+
+    .. versionadded:: 1.3
+
+    When True, consecutive multiprocess steps that have the same `num_processes`,
+    `slice` and `chunk_size` (and no `micro_slices`) are run as a single group.
+    The pipeline is apportioned once before the first step of the group, each
+    sub-process is set up once and then runs the models of all the steps in the
+    group keeping its tables in memory, and the pipelines are coalesced once
+    after the last step, with a checkpoint named for the last step.  This avoids
+    the startup, apportion and coalesce overhead between the steps.
+
+    Checkpoints named for the other steps of a group are not written, and a run
+    can only be resumed after the last checkpoint (or a model in the first step)
+    of a group.
+    """
+
     check_for_variability: bool = False
     """
     Debugging feature to find broken model specifications.
@@ -687,6 +784,25 @@ class Settings(PydanticBase, extra="allow", validate_assignment=True):
     rng_base_seed: Union[int, None] = 0
     """Base seed for pseudo-random number generator."""
 
+    rng_engine: Literal["legacy", "philox"] = "legacy"
+    """
+    Engine used to generate the per-row random number streams of each channel.
+
+    .. versionadded:: 1.3
+
+    * "legacy"
+        Reseed a numpy RandomState for every row and fast-forward it to the
+        current offset.  This reproduces the random streams (and so the model
+        results) of earlier versions of ActivitySim, and is the default.
+    * "philox"
+        Use a counter-based Philox4x32-10 generator keyed by each row's seed,
+        with the number of rands already consumed as the counter.  Streams
+        for all rows are generated in a single vectorized call, which is much
+        faster for large tables, and are still reproducible for each row
+        regardless of chunking or multiprocessing.  Results will differ from
+        those obtained with the legacy engine.
+    """
+
     duplicate_step_execution: Literal["error", "allow"] = "error"
     """
     How activitysim should handle attempts to re-run a step with the same name.
@@ -720,6 +836,20 @@ class Settings(PydanticBase, extra="allow", validate_assignment=True):
     .. versionadded:: 1.3
     """
 
+    tour_scheduling_logsum_cache_size: int = 0
+    """
+    Maximum number of tour mode choice logsums memoized by tour scheduling.
+
+    .. versionadded:: 1.3
+
+    Tour scheduling models that set `LOGSUM_CACHE_CHOOSER_COLUMNS` share a cache,
+    for the whole run, of the representative logsums of their tdd alternatives,
+    so logsums already computed for the same chooser attributes and time periods,
+    in the same or an earlier scheduling step, are not computed again.  When the
+    cache is full the least recently used logsums are evicted.  If zero (the
+    default) no logsums are cached.
+    """
+
     other_settings: dict[str, Any] = None
 
     def _get_attr(self, attr):
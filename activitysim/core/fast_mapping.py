@@ -13,6 +13,12 @@ def _fast_map(fm, target, dtype=np.int32):
     return out
 
 
+@nb.njit
+def _fill_range(fm, source, start):
+    for n in range(source.size):
+        fm[source[n]] = start + n
+
+
 class FastMapping:
     def __init__(self, source, to_range=np.int64):
         if isinstance(source, pd.Series):
@@ -30,14 +36,23 @@ class FastMapping:
                 key_type=nb.from_dtype(source.dtype),
                 value_type=nb.from_dtype(to_range),
             )
-            for v, k in enumerate(source):
-                m[k] = v
+            _fill_range(m, np.asarray(source), 0)
             self._in_dtype = source.dtype
             self._out_dtype = to_range
             self._mapper = m
         else:
             raise ValueError("invalid input")
 
+    def extend(self, source):
+        """
+        Append new keys to a range mapping, numbered from the current length onwards.
+        """
+        _fill_range(
+            self._mapper,
+            np.asarray(source, dtype=self._in_dtype),
+            self._out_dtype(len(self._mapper)),
+        )
+
     def __len__(self):
         return len(self._mapper)
 
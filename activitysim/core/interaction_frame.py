@@ -0,0 +1,261 @@
+# ActivitySim
+# See full license in LICENSE.txt.
+from __future__ import annotations
+
+import logging
+from collections.abc import MutableMapping
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class _ColumnResolver(MutableMapping):
+    """
+    Mapping of column names to columns of an InteractionFrame, gathered on access.
+
+    Used as a resolver for pandas.eval, so that only the columns actually referenced
+    by an expression are ever materialized.  pandas.eval may swap in converted values
+    for referenced names, which are held here and never written back to the frame.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.overrides = {}
+
+    def __getitem__(self, key):
+        if key in self.overrides:
+            return self.overrides[key]
+        if key not in self.frame:
+            raise KeyError(key)
+        return self.frame.column(key)
+
+    def __setitem__(self, key, value):
+        self.overrides[key] = value
+
+    def __delitem__(self, key):
+        del self.overrides[key]
+
+    def __contains__(self, key):
+        return key in self.overrides or key in self.frame
+
+    def __iter__(self):
+        return iter(set(self.frame.columns) | set(self.overrides))
+
+    def __len__(self):
+        return len(set(self.frame.columns) | set(self.overrides))
+
+
+class _IndexResolver(MutableMapping):
+    """
+    Mapping of index names to index values of an InteractionFrame, gathered on access.
+
+    Mirrors the index resolvers DataFrame.eval uses, so expressions can reference the
+    (alternatives) index by name (or as ilevel_0 if unnamed), or as 'index'.
+    As for _ColumnResolver, values pandas.eval swaps in are held in overrides.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.overrides = {}
+
+    def _names(self):
+        return [
+            name if name is not None else f"ilevel_{i}"
+            for i, name in enumerate(self.frame._alternatives.index.names)
+        ] + ["index"]
+
+    def __getitem__(self, key):
+        if key in self.overrides:
+            return self.overrides[key]
+        index = self.frame.index
+        if key == "index":
+            return index if isinstance(index, pd.MultiIndex) else index.to_series()
+        names = self._names()
+        if key not in names:
+            raise KeyError(key)
+        s = index.get_level_values(names.index(key)).to_series()
+        s.index = index
+        return s
+
+    def __setitem__(self, key, value):
+        self.overrides[key] = value
+
+    def __delitem__(self, key):
+        del self.overrides[key]
+
+    def __contains__(self, key):
+        return key in self.overrides or key in self._names()
+
+    def __iter__(self):
+        return iter(set(self._names()) | set(self.overrides))
+
+    def __len__(self):
+        return len(set(self._names()) | set(self.overrides))
+
+
+class InteractionFrame:
+    """
+    Lazy cross join of choosers and (optionally sampled) alternatives.
+
+    This is a drop-in replacement for the DataFrame returned by logit.interaction_dataset
+    for the purpose of evaluating interaction utility expressions.  Rather than repeating
+    every chooser column and taking every alternatives column for each of the
+    len(choosers) * sample_size rows, choosers and alternatives are stored once, along
+    with a pair of integer arrays giving the chooser and alternative position of each
+    interaction row.  Columns are gathered on demand (e.g. by df.eval, df[col] or df.col
+    in "@" expressions, or by skim wrappers) and can be freed as soon as the expression
+    that needed them has been evaluated, so peak memory scales with the number of
+    columns referenced at once rather than with the total number of columns.
+
+    Any duplicate column names in choosers table are renamed with an '_chooser' suffix,
+    as for interaction_dataset.
+    """
+
+    def __init__(
+        self,
+        choosers: pd.DataFrame,
+        alternatives: pd.DataFrame,
+        alt_positions: np.ndarray,
+        sample_size: int,
+        alt_index_id: str | None = None,
+        chooser_index_id: str | None = None,
+    ):
+        self._choosers = choosers
+        self._alternatives = alternatives
+        self._alt_positions = np.asanyarray(alt_positions)
+        self._chooser_positions = np.repeat(
+            np.arange(len(choosers), dtype=np.int64), sample_size
+        )
+        self._index = None
+
+        # column name -> (source, source column name)
+        # where source is one of 'alt', 'alt_index', 'chooser', 'chooser_index'
+        sources = {c: ("alt", c) for c in alternatives.columns}
+        if alt_index_id:
+            sources[alt_index_id] = ("alt_index", None)
+        for c in choosers.columns:
+            c_chooser = (c + "_chooser") if c in sources else c
+            sources[c_chooser] = ("chooser", c)
+        if chooser_index_id:
+            assert chooser_index_id not in sources
+            sources[chooser_index_id] = ("chooser_index", None)
+        self._sources = sources
+
+    def __len__(self):
+        return len(self._alt_positions)
+
+    @property
+    def shape(self):
+        return len(self), len(self._sources)
+
+    @property
+    def nbytes(self):
+        """
+        bytes used by the interaction row positions (choosers and alternatives are shared)
+        """
+        nbytes = self._alt_positions.nbytes + self._chooser_positions.nbytes
+        if self._index is not None:
+            nbytes += self._index.nbytes
+        return nbytes
+
+    @property
+    def columns(self):
+        return pd.Index(list(self._sources))
+
+    @property
+    def index(self):
+        """
+        index values (non-unique) from alternatives df
+        """
+        if self._index is None:
+            self._index = self._alternatives.index.take(self._alt_positions)
+        return self._index
+
+    def __contains__(self, key):
+        return key in self._sources
+
+    def column(self, key) -> pd.Series:
+        """
+        Gather a single column for all interaction rows.
+        """
+        return pd.Series(
+            self._gather(key, self._alt_positions, self._chooser_positions),
+            index=self.index,
+            name=key,
+        )
+
+    def _gather(self, key, alt_positions, chooser_positions):
+        source, c = self._sources[key]
+        if source == "alt":
+            return self._alternatives[c].array.take(alt_positions)
+        elif source == "alt_index":
+            return self._alternatives.index.take(alt_positions)
+        elif source == "chooser":
+            return self._choosers[c].array.take(chooser_positions)
+        else:
+            return self._choosers.index.take(chooser_positions)
+
+    def to_frame(self, rows=None) -> pd.DataFrame:
+        """
+        Materialize the interaction dataset (or a subset of its rows) as a DataFrame.
+
+        Parameters
+        ----------
+        rows : array-like of bool or int, optional
+            boolean mask or integer positions of interaction rows to materialize
+
+        Returns
+        -------
+        pandas.DataFrame
+            identical to (the corresponding rows of) logit.interaction_dataset
+        """
+        alt_positions = self._alt_positions
+        chooser_positions = self._chooser_positions
+        if rows is not None:
+            rows = np.asanyarray(rows)
+            if rows.dtype == bool:
+                rows = np.flatnonzero(rows)
+            alt_positions = alt_positions[rows]
+            chooser_positions = chooser_positions[rows]
+        index = self._alternatives.index.take(alt_positions)
+        return pd.DataFrame(
+            {
+                key: self._gather(key, alt_positions, chooser_positions)
+                for key in self._sources
+            },
+            index=index,
+        )
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in self._sources:
+                raise KeyError(key)
+            return self.column(key)
+        if isinstance(key, list) and all(isinstance(k, str) for k in key):
+            return pd.DataFrame(
+                {
+                    k: self._gather(k, self._alt_positions, self._chooser_positions)
+                    for k in key
+                },
+                index=self.index,
+            )
+        # row selection (e.g. trace rows)
+        return self.to_frame(key)
+
+    def __getattr__(self, name):
+        # only called when normal attribute lookup fails
+        if not name.startswith("_") and name in self._sources:
+            return self.column(name)
+        raise AttributeError(name)
+
+    def eval(self, expr, resolvers=(), **kwargs):
+        """
+        Evaluate a DataFrame.eval style expression, gathering only the columns it references.
+
+        As for DataFrame.eval, names that are not columns are resolved as index names.
+        """
+        resolvers = (_ColumnResolver(self), _IndexResolver(self)) + tuple(resolvers)
+        kwargs["level"] = kwargs.pop("level", 0) + 1
+        return pd.eval(expr, resolvers=resolvers, **kwargs)
@@ -299,6 +299,11 @@ def _interaction_sample(
             alternatives,
             sample_size=alternative_count,
             chooser_index_id=chooser_index_id,
+            lazy=(
+                compute_settings.lazy_interaction_dataset
+                and not sharrow_enabled
+                and not have_trace_targets
+            ),
         )
 
         chunk_sizer.log_df(trace_label, "interaction_df", interaction_df)
@@ -647,7 +652,15 @@ def interaction_sample(
         chunk_trace_label,
         chunk_sizer,
     ) in chunk.adaptive_chunked_choosers(
-        state, choosers, trace_label, chunk_tag, explicit_chunk_size=explicit_chunk_size
+        state,
+        choosers,
+        trace_label,
+        chunk_tag,
+        explicit_chunk_size=explicit_chunk_size,
+        # utilities of all alternatives are computed to sample from
+        estimated_row_size=interaction_simulate.estimated_row_size(
+            state, choosers, alternatives, spec, len(alternatives)
+        ),
     ):
         choices = _interaction_sample(
             state,
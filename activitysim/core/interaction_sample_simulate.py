@@ -495,6 +495,14 @@ def interaction_sample_simulate(
         chunk_tag,
         chunk_size=chunk_size,
         explicit_chunk_size=explicit_chunk_size,
+        # average number of sampled alternatives per chooser
+        estimated_row_size=interaction_simulate.estimated_row_size(
+            state,
+            choosers,
+            alternatives,
+            spec,
+            -(-len(alternatives) // max(len(choosers), 1)),
+        ),
     ):
         choices = _interaction_sample_simulate(
             state,
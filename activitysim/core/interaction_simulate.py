@@ -806,6 +806,12 @@ def _interaction_simulate(
             sample_size,
             alt_index_id=alt_index_id,
             chooser_index_id=chooser_index_id,
+            lazy=(
+                compute_settings.lazy_interaction_dataset
+                and not sharrow_enabled
+                and not have_trace_targets
+                and estimator is None
+            ),
         )
         chunk_sizer.log_df(trace_label, "interaction_df", interaction_df)
 
@@ -882,29 +888,38 @@ def _interaction_simulate(
 
     state.tracing.dump_df(DUMP, utilities, trace_label, "utilities")
 
-    # convert to probabilities (utilities exponentiated and normalized to probs)
-    # probs is same shape as utilities, one row per chooser and one column for alternative
-    probs = logit.utils_to_probs(
-        state, utilities, trace_label=trace_label, trace_choosers=choosers
-    )
-    chunk_sizer.log_df(trace_label, "probs", probs)
-
-    del utilities
-    chunk_sizer.log_df(trace_label, "utilities", None)
+    if compute_settings.fused_choices and not have_trace_targets:
+        # make choices directly from utilities without materializing probs
+        positions, rands, _ = logit.choose_from_utils(
+            state, utilities, trace_label=trace_label, trace_choosers=choosers
+        )
 
-    if have_trace_targets:
-        state.tracing.trace_df(
-            probs,
-            tracing.extend_trace_label(trace_label, "probs"),
-            column_labels=["alternative", "probability"],
+        del utilities
+        chunk_sizer.log_df(trace_label, "utilities", None)
+    else:
+        # convert to probabilities (utilities exponentiated and normalized to probs)
+        # probs is same shape as utilities, one row per chooser and one column for alternative
+        probs = logit.utils_to_probs(
+            state, utilities, trace_label=trace_label, trace_choosers=choosers
         )
+        chunk_sizer.log_df(trace_label, "probs", probs)
 
-    # make choices
-    # positions is series with the chosen alternative represented as a column index in probs
-    # which is an integer between zero and num alternatives in the alternative sample
-    positions, rands = logit.make_choices(
-        state, probs, trace_label=trace_label, trace_choosers=choosers
-    )
+        del utilities
+        chunk_sizer.log_df(trace_label, "utilities", None)
+
+        if have_trace_targets:
+            state.tracing.trace_df(
+                probs,
+                tracing.extend_trace_label(trace_label, "probs"),
+                column_labels=["alternative", "probability"],
+            )
+
+        # make choices
+        # positions is series with the chosen alternative represented as a column index in probs
+        # which is an integer between zero and num alternatives in the alternative sample
+        positions, rands = logit.make_choices(
+            state, probs, trace_label=trace_label, trace_choosers=choosers
+        )
     chunk_sizer.log_df(trace_label, "positions", positions)
     chunk_sizer.log_df(trace_label, "rands", rands)
 
@@ -935,6 +950,31 @@ def _interaction_simulate(
     return choices
 
 
+def estimated_row_size(
+    state: workflow.State, choosers, alternatives, spec, sample_size
+) -> int:
+    """
+    bytes per chooser of an interaction model, if estimate_chunk_row_size setting
+
+    Parameters
+    ----------
+    choosers : pandas.DataFrame
+    alternatives : pandas.DataFrame
+    spec : pandas.DataFrame
+    sample_size : int
+        number of alternatives (interaction rows) per chooser
+    """
+    if not state.settings.estimate_chunk_row_size:
+        return 0
+    return chunk.estimate_row_size(
+        num_alternatives=sample_size,
+        num_expressions=spec.shape[0],
+        sample_size=sample_size,
+        interaction_dtypes=alternatives.dtypes,
+        chooser_dtypes=choosers.dtypes,
+    )
+
+
 def interaction_simulate(
     state,
     choosers,
@@ -1011,7 +1051,13 @@ def interaction_simulate(
         chunk_trace_label,
         chunk_sizer,
     ) in chunk.adaptive_chunked_choosers(
-        state, choosers, trace_label, explicit_chunk_size=explicit_chunk_size
+        state,
+        choosers,
+        trace_label,
+        explicit_chunk_size=explicit_chunk_size,
+        estimated_row_size=estimated_row_size(
+            state, choosers, alternatives, spec, sample_size or len(alternatives)
+        ),
     ):
         choices = _interaction_simulate(
             state,
@@ -9,8 +9,9 @@ import numpy as np
 import pandas as pd
 
 from activitysim.core import tracing, workflow
-from activitysim.core.choosing import choice_maker
+from activitysim.core.choosing import choice_maker, utils_choice_maker
 from activitysim.core.configuration.logit import LogitNestSpec
+from activitysim.core.interaction_frame import InteractionFrame
 
 logger = logging.getLogger(__name__)
 
@@ -332,6 +333,84 @@ def make_choices(
     return choices, rands
 
 
+def choose_from_utils(
+    state: workflow.State,
+    utils: pd.DataFrame,
+    trace_label: str = None,
+    trace_choosers=None,
+    allow_bad_probs=False,
+    return_logsums: bool = False,
+):
+    """
+    Make MNL choices for each chooser directly from a table of utilities.
+
+    This is equivalent to calling utils_to_probs followed by make_choices, but
+    exponentiation, normalization and choosing are fused into a single pass over
+    each row, so no probabilities table (or other full size temporaries) are
+    created.  Use utils_to_probs and make_choices instead when the probabilities
+    themselves are needed (e.g. for tracing).
+
+    Parameters
+    ----------
+    utils : pandas.DataFrame
+        Rows should be choosers and columns should be alternatives.
+    trace_label : str, optional
+        label for tracing bad utility or probability values
+    trace_choosers : pandas.dataframe
+        the choosers df (for interaction_simulate) to facilitate the reporting of hh_id
+        by report_bad_choices because it can't deduce hh_id from the interaction_dataset
+        which is indexed on index values from alternatives df
+    allow_bad_probs : bool
+        if True, rows with missing or infinite utilities choose the first alternative
+        instead of raising an error
+    return_logsums : bool
+        also return the logsum of each row
+
+    Returns
+    -------
+    choices : pandas.Series
+        Maps chooser IDs (from `utils` index) to a choice, where the choice
+        is an index into the columns of `utils`.
+    rands : pandas.Series
+        The random numbers used to make the choices (for debugging, tracing)
+    choice_probs : pandas.Series
+        The probability of the chosen alternative
+    logsums : pandas.Series
+        Only returned if `return_logsums` is True
+    """
+    trace_label = tracing.extend_trace_label(trace_label, "choose_from_utils")
+
+    rands = state.get_rn_generator().random_for_df(utils)
+    rands = np.asanyarray(rands).reshape(-1)
+
+    num_choosers = len(utils.index)
+    choices = np.empty(num_choosers, dtype=np.int32)
+    choice_probs = np.empty(num_choosers, dtype=np.float64)
+    logsums = np.empty(num_choosers, dtype=np.float64)
+    bad = np.empty(num_choosers, dtype=np.bool_)
+    utils_choice_maker(
+        utils.values, rands, EXP_UTIL_MIN, choices, choice_probs, logsums, bad
+    )
+
+    if bad.any() and not allow_bad_probs:
+        report_bad_choices(
+            state,
+            bad,
+            utils,
+            trace_label=tracing.extend_trace_label(trace_label, "bad_utils"),
+            msg="probabilities do not add up to 1",
+            trace_choosers=trace_choosers,
+        )
+
+    choices = pd.Series(choices, index=utils.index)
+    rands = pd.Series(rands, index=utils.index)
+    choice_probs = pd.Series(choice_probs, index=utils.index)
+
+    if return_logsums:
+        return choices, rands, choice_probs, pd.Series(logsums, index=utils.index)
+    return choices, rands, choice_probs
+
+
 def interaction_dataset(
     state: workflow.State,
     choosers,
@@ -339,6 +418,7 @@ def interaction_dataset(
     sample_size=None,
     alt_index_id=None,
     chooser_index_id=None,
+    lazy=False,
 ):
     """
     Combine choosers and alternatives into one table for the purposes
@@ -353,10 +433,13 @@ def interaction_dataset(
     sample_size : int, optional
         If sampling from alternatives for each chooser, this is
         how many to sample.
+    lazy : bool, default False
+        Return an InteractionFrame that gathers columns on demand,
+        instead of materializing the merged table.
 
     Returns
     -------
-    alts_sample : pandas.DataFrame
+    alts_sample : pandas.DataFrame or InteractionFrame
         Merged choosers and alternatives with data repeated either
         len(alternatives) or `sample_size` times.
 
@@ -384,6 +467,16 @@ def interaction_dataset(
     else:
         sample = np.tile(alts_idx, numchoosers)
 
+    if lazy:
+        return InteractionFrame(
+            choosers,
+            alternatives,
+            sample,
+            sample_size,
+            alt_index_id=alt_index_id,
+            chooser_index_id=chooser_index_id,
+        )
+
     alts_sample = alternatives.take(sample).copy()
 
     if alt_index_id:
@@ -598,3 +691,234 @@ def count_nests(nest_spec):
             return 1
 
     return count_each_nest(nest_spec, 0) if nest_spec is not None else 0
+
+
+class NestTree:
+    """
+    Nest tree compiled once from a nest spec into flat arrays.
+
+    Nodes (leaves and nests) are numbered in post-order, so the root is the last
+    node.  The tree is stored as a parent index for each node along with the nesting
+    coefficient and product_of_coefficients of each node, and the children of the
+    nests at each level are gathered into padded index arrays.  This allows nested
+    exponentiated utilities, nested (conditional) probabilities, base probabilities
+    and logsums to be computed with a few array operations per level of the tree,
+    rather than with pandas operations for every nest.
+
+    Children are summed (and ancestor probabilities multiplied) in the same order
+    as the per-nest pandas computations, so results are identical.
+    """
+
+    def __init__(self, nest_spec: dict | LogitNestSpec):
+        nests = list(each_nest(nest_spec, post_order=True))
+
+        self.names = [nest.name for nest in nests]
+        node_index = {name: i for i, name in enumerate(self.names)}
+        num_nodes = len(nests)
+
+        self.parent = np.full(num_nodes, -1, dtype=np.int64)
+        self.level = np.array([nest.level for nest in nests], dtype=np.int64)
+        self.is_leaf = np.array([nest.is_leaf for nest in nests], dtype=bool)
+        self.coefficient = np.array(
+            [nest.coefficient for nest in nests], dtype=np.float64
+        )
+        self.product_of_coefficients = np.array(
+            [nest.product_of_coefficients for nest in nests], dtype=np.float64
+        )
+        for i, nest in enumerate(nests):
+            if not nest.is_leaf:
+                for alt in nest.alternatives:
+                    self.parent[node_index[alt]] = i
+        self.root = num_nodes - 1
+        assert self.parent[self.root] == -1
+
+        self.leaves = np.flatnonzero(self.is_leaf)
+        self.leaf_names = [self.names[i] for i in self.leaves]
+
+        # children of each nest, padded with a sentinel (num_nodes) that indexes
+        # an extra all zero column appended to the node arrays
+        nodes = np.flatnonzero(~self.is_leaf)
+        max_children = max(len(nests[i].alternatives) for i in nodes)
+        children = np.full((len(nodes), max_children), num_nodes, dtype=np.int64)
+        for row, i in enumerate(nodes):
+            for k, alt in enumerate(nests[i].alternatives):
+                children[row, k] = node_index[alt]
+        self.nodes = nodes
+        self.children = children
+
+        # nests grouped by level, deepest first, as (rows of children, node indexes)
+        self.nodes_by_level = []
+        for level in sorted(set(self.level[nodes]), reverse=True):
+            rows = np.flatnonzero(self.level[nodes] == level)
+            self.nodes_by_level.append((rows, nodes[rows]))
+
+        # non-root nodes grouped by level, shallowest first
+        self.descendants_by_level = []
+        for level in range(2, self.level.max() + 1):
+            self.descendants_by_level.append(np.flatnonzero(self.level == level))
+
+        # row in children of the parent of each non-root node
+        row_of_node = np.full(num_nodes, -1, dtype=np.int64)
+        row_of_node[nodes] = np.arange(len(nodes))
+        self.non_root = np.flatnonzero(self.parent >= 0)
+        self.parent_row = row_of_node[self.parent[self.non_root]]
+
+        # nested probability columns, in pre-order of nests as for
+        # simulate.compute_nested_probabilities
+        self.nested_probability_names = []
+        for nest in each_nest(nest_spec, type="node", post_order=False):
+            self.nested_probability_names.extend(nest.alternatives)
+        self.nested_probability_positions = np.array(
+            [node_index[name] for name in self.nested_probability_names],
+            dtype=np.int64,
+        )
+
+    def _sum_children(self, values, rows, nan_as_zero=False):
+        """
+        Sum values of children of the nests in rows, one child position at a time.
+        """
+        total = values[:, self.children[rows, 0]]
+        if nan_as_zero:
+            np.putmask(total, np.isnan(total), 0)
+        for k in range(1, self.children.shape[1]):
+            v = values[:, self.children[rows, k]]
+            if nan_as_zero:
+                np.putmask(v, np.isnan(v), 0)
+            total += v
+        return total
+
+    def exp_utilities(self, raw_utilities: pd.DataFrame) -> np.ndarray:
+        """
+        Exponentiated utilities of leaves and nests
+
+        Parameters
+        ----------
+        raw_utilities : pandas.DataFrame
+            raw utilities of leaf alternatives, with a column for each leaf
+
+        Returns
+        -------
+        exp_utilities : 2-D ndarray of shape (len(raw_utilities), number of nodes + 1)
+            columns are nodes in the order of `names`, the last column is all zeros
+        """
+        raw = raw_utilities[self.leaf_names].to_numpy(dtype=np.float64)
+        exp_utilities = np.zeros((len(raw), len(self.names) + 1), dtype=np.float64)
+
+        exp_utilities[:, self.leaves] = np.exp(
+            raw / self.product_of_coefficients[self.leaves]
+        )
+
+        for rows, nodes in self.nodes_by_level:
+            total = self._sum_children(exp_utilities, rows, nan_as_zero=True)
+            # log of zero sum is -inf, which becomes 0 when exponentiated
+            with np.errstate(divide="ignore"):
+                exp_utilities[:, nodes] = np.exp(
+                    self.coefficient[nodes] * np.log(total)
+                )
+
+        return exp_utilities
+
+    def logsums(self, exp_utilities: np.ndarray) -> np.ndarray:
+        """
+        Logsum of the nest root
+        """
+        return np.log(exp_utilities[:, self.root])
+
+    def nested_probabilities(
+        self,
+        state: workflow.State,
+        exp_utilities: np.ndarray,
+        trace_label: str = None,
+        index=None,
+    ) -> np.ndarray:
+        """
+        Probabilities of leaves and nests conditional on their parent nest
+
+        Like utils_to_probs with exponentiated=True and allow_zero_probs=True
+        applied to the children of each nest.
+
+        Returns
+        -------
+        nested_probabilities : 2-D ndarray of shape (len(exp_utilities), number of nodes)
+            columns are nodes in the order of `names`, the root column is unused
+        """
+        exp_utilities = exp_utilities.copy()
+        np.putmask(exp_utilities, exp_utilities <= EXP_UTIL_MIN, 0)
+
+        totals = self._sum_children(exp_utilities, np.arange(len(self.nodes)))
+
+        inf_utils = np.isinf(totals)
+        if inf_utils.any():
+            rows, nests = np.nonzero(inf_utils)
+            nest = self.nodes[nests[0]]
+            children = self.children[nests[0]]
+            children = children[children < len(self.names)]
+            report_bad_choices(
+                state,
+                inf_utils[:, nests[0]],
+                pd.DataFrame(
+                    exp_utilities[:, children],
+                    columns=[self.names[c] for c in children],
+                    index=index,
+                ),
+                trace_label=tracing.extend_trace_label(
+                    tracing.extend_trace_label(trace_label, "utils_to_probs"),
+                    "inf_exp_utils",
+                ),
+                msg=f"infinite exponentiated utilities in nest {self.names[nest]}",
+            )
+
+        probs = np.zeros((len(exp_utilities), len(self.names)), dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            probs[:, self.non_root] = (
+                exp_utilities[:, self.non_root] / totals[:, self.parent_row]
+            )
+
+        # nests with all zero exponentiated utilities have all zero probabilities
+        np.putmask(probs, np.isnan(probs), PROB_MIN)
+        np.clip(probs, PROB_MIN, PROB_MAX, out=probs)
+
+        return probs
+
+    def base_probabilities(
+        self, nested_probabilities: np.ndarray, alternatives
+    ) -> np.ndarray:
+        """
+        Unconditional probabilities of leaves
+
+        The base probability of a leaf is the product of the nested probabilities
+        of the leaf and of all of its ancestors (except the root).
+
+        Parameters
+        ----------
+        nested_probabilities : 2-D ndarray
+            as returned by nested_probabilities
+        alternatives : list-like
+            names of leaf alternatives in the order of the returned columns
+
+        Returns
+        -------
+        base_probabilities : 2-D ndarray of shape (len(nested_probabilities), len(alternatives))
+        """
+        assert set(alternatives) == set(self.leaf_names)
+
+        probs = nested_probabilities.copy()
+        for nodes in self.descendants_by_level[1:]:
+            probs[:, nodes] *= probs[:, self.parent[nodes]]
+
+        node_index = {name: i for i, name in enumerate(self.names)}
+        return probs[:, [node_index[alt] for alt in alternatives]]
+
+
+_nest_trees = {}
+
+
+def nest_tree(nest_spec: dict | LogitNestSpec) -> NestTree:
+    """
+    Return NestTree for nest_spec, reusing a cached one if built before
+    """
+    key = repr(nest_spec)
+    tree = _nest_trees.get(key)
+    if tree is None:
+        tree = _nest_trees[key] = NestTree(nest_spec)
+    return tree
@@ -11,11 +11,17 @@ from typing import Any
 
 import numpy as np
 import pandas as pd
+import yaml
 from pydantic import ValidationError
 
 from activitysim.core import config, input, pathbuilder, skim_dictionary, tracing, util
 from activitysim.core.cleaning import recode_based_on_table
 from activitysim.core.configuration.network import NetworkSettings, TAZ_Settings
+from activitysim.core.maz_to_maz import (
+    MazToMazCSR,
+    array_from_shared_buffer,
+    array_to_shared_buffer,
+)
 from activitysim.core.skim_dict_factory import MemMapSkimFactory, NumpyArraySkimFactory
 from activitysim.core.skim_dictionary import NOT_IN_SKIM_ZONE_ID
 
@@ -34,12 +40,77 @@ THREE_ZONE = 3
 
 DEFAULT_SETTINGS = {
     "rebuild_tvpb_cache": True,
+    "persistent_tvpb_cache": False,
     "zone_system": ONE_ZONE,
     "skim_dict_factory": "NumpyArraySkimFactory",
 }
 
 TRACE_TRIMMED_MAZ_TO_TAP_TABLES = True
 
+MAZ_TO_TAP_BUFFER_PREFIX = "maz_to_tap."
+
+
+def maz_to_tap_shared_buffers(mode, maz_to_tap_df):
+    """
+    Copy the columns (and MAZ, TAP index) of a maz_to_tap table into shared buffers
+
+    Parameters
+    ----------
+    mode : str
+        access mode (e.g. 'walk', 'drive')
+    maz_to_tap_df : pandas.DataFrame
+        maz_to_tap attributes indexed by MAZ and TAP
+
+    Returns
+    -------
+    dict of multiprocessing.RawArray keyed by maz_to_tap.<mode>.<column>
+        or None if maz_to_tap_df has non-numeric columns that can't be shared
+    """
+    df = maz_to_tap_df.reset_index()
+    if not all(
+        isinstance(dtype, np.dtype) and dtype.kind in "biuf" for dtype in df.dtypes
+    ):
+        return None
+    return {
+        f"{MAZ_TO_TAP_BUFFER_PREFIX}{mode}.{c}": array_to_shared_buffer(
+            df[c].to_numpy()
+        )
+        for c in df.columns
+    }
+
+
+def maz_to_tap_df_from_shared_buffers(data_buffers, mode):
+    """
+    Build maz_to_tap table from buffers allocated by maz_to_tap_shared_buffers
+
+    The attribute columns are no-copy views of the shared buffers, only the MAZ, TAP
+    index is materialized by each process.
+
+    Parameters
+    ----------
+    data_buffers : dict
+        shared data buffers, which may include buffers unrelated to maz_to_tap
+    mode : str
+        access mode (e.g. 'walk', 'drive')
+
+    Returns
+    -------
+    pandas.DataFrame or None
+        maz_to_tap attributes indexed by MAZ and TAP, or None if mode not in buffers
+    """
+    prefix = f"{MAZ_TO_TAP_BUFFER_PREFIX}{mode}."
+    columns = {
+        k[len(prefix) :]: array_from_shared_buffer(buffer)
+        for k, buffer in data_buffers.items()
+        if k.startswith(prefix)
+    }
+    if not columns:
+        return None
+    index = pd.MultiIndex.from_arrays(
+        [columns.pop("MAZ"), columns.pop("TAP")], names=["MAZ", "TAP"]
+    )
+    return pd.DataFrame(columns, index=index, copy=False)
+
 
 class Network_LOS(object):
     """
@@ -55,14 +126,17 @@ class Network_LOS(object):
       skim_time_periods = None            # list of str e.g. ['AM', 'MD', 'PM''
 
       skims_info: dict                    # dict of SkimInfo keyed by skim_tag
+      skim_manifest: dict                 # if specified in settings, dict of lists of omx keys of skims to
+                                          # preload keyed by skim_tag (others are loaded on first lookup)
       skim_buffers: dict                  # if multiprocessing, dict of multiprocessing.Array buffers keyed by skim_tag
       skim_dicts: dice                    # dict of SkimDict keyed by skim_tag
 
       # TWO_ZONE and THREE_ZONE
       maz_taz_df: pandas.DataFrame        # DataFrame with two columns, MAZ and TAZ, mapping MAZ to containing TAZ
-      maz_to_maz_df: pandas.DataFrame     # maz_to_maz attributes for MazSkimDict sparse skims
-                                          # indexed by synthetic omaz/dmaz index for faster get_mazpairs lookup)
-      maz_ceiling: int                    # max maz_id + 1 (to compute synthetic omaz/dmaz index by get_mazpairs)
+      maz_to_maz_csr: MazToMazCSR         # maz_to_maz attributes for MazSkimDict sparse skims and get_mazpairs
+                                          # indexed by omaz rows of sorted dmaz (the maz_to_maz DataFrame
+                                          # it is built from is not kept, so the table is only held once)
+      maz_ceiling: int                    # max maz_id + 1 (to compute synthetic omaz/dmaz index of maz_to_maz)
       max_blend_distance: dict            # dict of int maz_to_maz max_blend_distance values keyed by skim_tag
 
       # THREE_ZONE only
@@ -84,10 +158,11 @@ class Network_LOS(object):
         self.skim_time_periods = None
         self.skims_info = {}
         self.skim_dicts = {}
+        self.skim_manifest = None
 
         # TWO_ZONE and THREE_ZONE
         self.maz_taz_df = None
-        self.maz_to_maz_df = None
+        self.maz_to_maz_csr = None
         self.maz_ceiling = None
         self.max_blend_distance = {}
 
@@ -209,6 +284,14 @@ class Network_LOS(object):
         # validate skim_time_periods
         self.skim_time_periods = self.setting("skim_time_periods")
 
+        # dict of lists of omx keys of skims to preload, keyed by skim_tag
+        skim_manifest_file_name = self.setting("skim_manifest", None)
+        if skim_manifest_file_name:
+            with open(
+                self.state.filesystem.get_config_file_path(skim_manifest_file_name)
+            ) as f:
+                self.skim_manifest = yaml.safe_load(f) or {}
+
     def load_skim_info(self):
         """
         read skim info from omx files into SkimInfo, and store in self.skims_info dict keyed by skim_tag
@@ -241,197 +324,256 @@ class Network_LOS(object):
                 self
             )  # dependent on self.tap_df
 
-    def load_data(self):
+    def read_maz_taz_df(self):
         """
-        Load tables and skims from files specified in network_los settigns
+        Read maz table into maz_taz_df and set maz_ceiling (TWO_ZONE and THREE_ZONE)
+        """
+        file_name = self.setting("maz")
+        self.maz_taz_df = input.read_input_file(
+            self.state.filesystem.get_data_file_path(
+                file_name,
+                mandatory=True,
+                alternative_suffixes=(".csv.gz", ".parquet"),
+            )
+        )
+        self.maz_taz_df = self.maz_taz_df[["MAZ", "TAZ"]].sort_values(
+            by="MAZ"
+        )  # only fields we need
+
+        # recode MAZs if needed
+        self.maz_taz_df["MAZ"] = recode_based_on_table(
+            self.state, self.maz_taz_df["MAZ"], "land_use"
+        )
+        self.maz_taz_df["TAZ"] = recode_based_on_table(
+            self.state, self.maz_taz_df["TAZ"], "land_use_taz"
+        )
+
+        self.maz_ceiling = self.maz_taz_df.MAZ.max() + 1
+
+    def read_maz_to_maz_df(self):
         """
+        Read and combine maz_to_maz tables (TWO_ZONE and THREE_ZONE)
 
-        # load maz tables
-        if self.zone_system in [TWO_ZONE, THREE_ZONE]:
-            # maz
-            file_name = self.setting("maz")
-            self.maz_taz_df = input.read_input_file(
+        maz_ceiling must already have been set by read_maz_taz_df
+
+        Returns
+        -------
+        pandas.DataFrame or None
+            maz_to_maz attributes indexed by synthetic omaz/dmaz index
+        """
+        assert self.maz_ceiling is not None
+
+        maz_to_maz_df = None
+        maz_to_maz_tables = self.setting("maz_to_maz.tables")
+        maz_to_maz_tables = (
+            [maz_to_maz_tables]
+            if isinstance(maz_to_maz_tables, str)
+            else maz_to_maz_tables
+        )
+        for file_name in maz_to_maz_tables:
+            df = input.read_input_file(
                 self.state.filesystem.get_data_file_path(
                     file_name,
                     mandatory=True,
                     alternative_suffixes=(".csv.gz", ".parquet"),
                 )
             )
-            self.maz_taz_df = self.maz_taz_df[["MAZ", "TAZ"]].sort_values(
-                by="MAZ"
-            )  # only fields we need
 
             # recode MAZs if needed
-            self.maz_taz_df["MAZ"] = recode_based_on_table(
-                self.state, self.maz_taz_df["MAZ"], "land_use"
-            )
-            self.maz_taz_df["TAZ"] = recode_based_on_table(
-                self.state, self.maz_taz_df["TAZ"], "land_use_taz"
-            )
+            df["OMAZ"] = recode_based_on_table(self.state, df["OMAZ"], "land_use")
+            df["DMAZ"] = recode_based_on_table(self.state, df["DMAZ"], "land_use")
+
+            if self.maz_ceiling > (1 << 31):
+                raise ValueError("maz ceiling too high, will overflow int64")
+            elif self.maz_ceiling > 32767:
+                # too many MAZs, or un-recoded MAZ ID's that are too large
+                # will overflow a 32-bit index, so upgrade to 64bit.
+                df["i"] = df.OMAZ.astype(np.int64) * np.int64(
+                    self.maz_ceiling
+                ) + df.DMAZ.astype(np.int64)
+            else:
+                df["i"] = df.OMAZ.astype(np.int32) * np.int32(
+                    self.maz_ceiling
+                ) + df.DMAZ.astype(np.int32)
+            df.set_index("i", drop=True, inplace=True, verify_integrity=True)
+            logger.debug(f"loading maz_to_maz table {file_name} with {len(df)} rows")
+
+            # FIXME - don't really need these columns, but if we do want them,
+            #  we would need to merge them in since files may have different numbers of rows
+            df.drop(columns=["OMAZ", "DMAZ"], inplace=True)
+
+            # besides, we only want data columns so we can coerce to same type as skims
+            df = df.astype(np.dtype(self.skim_dtype_name))
+
+            if maz_to_maz_df is None:
+                maz_to_maz_df = df
+            else:
+                maz_to_maz_df = pd.concat([maz_to_maz_df, df], axis=1)
+
+        return maz_to_maz_df
+
+    def read_maz_to_tap_df(self, mode, maz_to_tap_settings):
+        """
+        Read and trim the maz_to_tap table for an access mode (THREE_ZONE)
+
+        Parameters
+        ----------
+        mode : str
+            access mode (e.g. 'walk', 'drive')
+        maz_to_tap_settings : dict
+            maz_to_tap settings for mode
 
-            self.maz_ceiling = self.maz_taz_df.MAZ.max() + 1
+        Returns
+        -------
+        pandas.DataFrame
+            maz_to_tap attributes indexed by MAZ and TAP
+        """
+        assert (
+            "table" in maz_to_tap_settings
+        ), f"Expected setting maz_to_tap.{mode}.table not found in in {LOS_SETTINGS_FILE_NAME}"
 
-            # maz_to_maz_df
-            maz_to_maz_tables = self.setting("maz_to_maz.tables")
-            maz_to_maz_tables = (
-                [maz_to_maz_tables]
-                if isinstance(maz_to_maz_tables, str)
-                else maz_to_maz_tables
+        file_name = maz_to_tap_settings["table"]
+        df = input.read_input_file(
+            self.state.filesystem.get_data_file_path(
+                file_name,
+                mandatory=True,
+                alternative_suffixes=(".csv.gz", ".parquet"),
             )
-            for file_name in maz_to_maz_tables:
-                df = input.read_input_file(
+        )
+
+        # recode MAZs if needed
+        df["MAZ"] = recode_based_on_table(self.state, df["MAZ"], "land_use")
+
+        # trim tap set
+        # if provided, use tap_line_distance_col together with tap_lines table to trim the near tap set
+        # to only include the nearest tap to origin when more than one tap serves the same line
+        distance_col = maz_to_tap_settings.get("tap_line_distance_col")
+        if distance_col:
+            if self.tap_lines_df is None:
+                # load tap_lines on demand (required if they specify tap_line_distance_col)
+                tap_lines_file_name = self.setting(
+                    "tap_lines",
+                )
+                self.tap_lines_df = input.read_input_file(
                     self.state.filesystem.get_data_file_path(
-                        file_name,
+                        tap_lines_file_name,
                         mandatory=True,
                         alternative_suffixes=(".csv.gz", ".parquet"),
                     )
                 )
 
-                # recode MAZs if needed
-                df["OMAZ"] = recode_based_on_table(self.state, df["OMAZ"], "land_use")
-                df["DMAZ"] = recode_based_on_table(self.state, df["DMAZ"], "land_use")
-
-                if self.maz_ceiling > (1 << 31):
-                    raise ValueError("maz ceiling too high, will overflow int64")
-                elif self.maz_ceiling > 32767:
-                    # too many MAZs, or un-recoded MAZ ID's that are too large
-                    # will overflow a 32-bit index, so upgrade to 64bit.
-                    df["i"] = df.OMAZ.astype(np.int64) * np.int64(
-                        self.maz_ceiling
-                    ) + df.DMAZ.astype(np.int64)
-                else:
-                    df["i"] = df.OMAZ.astype(np.int32) * np.int32(
-                        self.maz_ceiling
-                    ) + df.DMAZ.astype(np.int32)
-                df.set_index("i", drop=True, inplace=True, verify_integrity=True)
-                logger.debug(
-                    f"loading maz_to_maz table {file_name} with {len(df)} rows"
+                # csv file has one row per TAP with space-delimited list of lines served by that TAP
+                #  TAP                                      LINES
+                # 6020  GG_024b_SB GG_068_RT GG_228_WB GG_023X_RT
+                # stack to create dataframe with one column 'line' indexed by TAP with one row per line served
+                #  TAP        line
+                # 6020  GG_024b_SB
+                # 6020   GG_068_RT
+                # 6020   GG_228_WB
+                self.tap_lines_df = (
+                    self.tap_lines_df.set_index("TAP")
+                    .LINES.str.split(expand=True)
+                    .stack()
+                    .droplevel(1)
+                    .to_frame("line")
                 )
 
-                # FIXME - don't really need these columns, but if we do want them,
-                #  we would need to merge them in since files may have different numbers of rows
-                df.drop(columns=["OMAZ", "DMAZ"], inplace=True)
+            old_len = len(df)
 
-                # besides, we only want data columns so we can coerce to same type as skims
-                df = df.astype(np.dtype(self.skim_dtype_name))
+            # NOTE - merge will remove unused taps (not appearing in tap_lines)
+            df = pd.merge(df, self.tap_lines_df, left_on="TAP", right_index=True)
 
-                if self.maz_to_maz_df is None:
-                    self.maz_to_maz_df = df
-                else:
-                    self.maz_to_maz_df = pd.concat([self.maz_to_maz_df, df], axis=1)
+            # find nearest TAP to MAz that serves line
+            df = df.sort_values(by=distance_col).drop_duplicates(subset=["MAZ", "line"])
 
-        # load tap tables
-        if self.zone_system == THREE_ZONE:
-            # tap_df should already have been loaded by load_skim_info because,
-            # during multiprocessing, it is required by TapTapUidCalculator to size TVPBCache
-            # self.tap_df = pd.read_csv(self.state.filesystem.get_data_file_path(self.setting('tap'), mandatory=True))
-            assert self.tap_df is not None
+            # we don't need to remember which lines are served by which TAPs
+            df = (
+                df.drop(columns="line")
+                .drop_duplicates(subset=["MAZ", "TAP"])
+                .sort_values(["MAZ", "TAP"])
+            )
 
-            # maz_to_tap_dfs - different sized sparse arrays with different columns, so we keep them seperate
-            for mode, maz_to_tap_settings in self.setting("maz_to_tap").items():
-                assert (
-                    "table" in maz_to_tap_settings
-                ), f"Expected setting maz_to_tap.{mode}.table not found in in {LOS_SETTINGS_FILE_NAME}"
+            logger.debug(
+                f"trimmed maz_to_tap table {file_name} from {old_len} to {len(df)} rows "
+                f"based on tap_lines"
+            )
+            logger.debug(
+                f"maz_to_tap table {file_name} max {distance_col} {df[distance_col].max()}"
+            )
 
-                file_name = maz_to_tap_settings["table"]
-                df = input.read_input_file(
-                    self.state.filesystem.get_data_file_path(
-                        file_name,
-                        mandatory=True,
-                        alternative_suffixes=(".csv.gz", ".parquet"),
-                    )
+            max_dist = maz_to_tap_settings.get("max_dist", None)
+            if max_dist:
+                old_len = len(df)
+                df = df[df[distance_col] <= max_dist]
+                logger.debug(
+                    f"trimmed maz_to_tap table {file_name} from {old_len} to {len(df)} rows "
+                    f"based on max_dist {max_dist}"
                 )
 
-                # recode MAZs if needed
-                df["MAZ"] = recode_based_on_table(self.state, df["MAZ"], "land_use")
-
-                # trim tap set
-                # if provided, use tap_line_distance_col together with tap_lines table to trim the near tap set
-                # to only include the nearest tap to origin when more than one tap serves the same line
-                distance_col = maz_to_tap_settings.get("tap_line_distance_col")
-                if distance_col:
-                    if self.tap_lines_df is None:
-                        # load tap_lines on demand (required if they specify tap_line_distance_col)
-                        tap_lines_file_name = self.setting(
-                            "tap_lines",
-                        )
-                        self.tap_lines_df = input.read_input_file(
-                            self.state.filesystem.get_data_file_path(
-                                tap_lines_file_name,
-                                mandatory=True,
-                                alternative_suffixes=(".csv.gz", ".parquet"),
-                            )
-                        )
-
-                        # csv file has one row per TAP with space-delimited list of lines served by that TAP
-                        #  TAP                                      LINES
-                        # 6020  GG_024b_SB GG_068_RT GG_228_WB GG_023X_RT
-                        # stack to create dataframe with one column 'line' indexed by TAP with one row per line served
-                        #  TAP        line
-                        # 6020  GG_024b_SB
-                        # 6020   GG_068_RT
-                        # 6020   GG_228_WB
-                        self.tap_lines_df = (
-                            self.tap_lines_df.set_index("TAP")
-                            .LINES.str.split(expand=True)
-                            .stack()
-                            .droplevel(1)
-                            .to_frame("line")
-                        )
-
-                    old_len = len(df)
-
-                    # NOTE - merge will remove unused taps (not appearing in tap_lines)
-                    df = pd.merge(
-                        df, self.tap_lines_df, left_on="TAP", right_index=True
-                    )
+            if TRACE_TRIMMED_MAZ_TO_TAP_TABLES:
+                self.state.tracing.write_csv(
+                    df,
+                    file_name=f"trimmed_{maz_to_tap_settings['table']}",
+                    transpose=False,
+                )
 
-                    # find nearest TAP to MAz that serves line
-                    df = df.sort_values(by=distance_col).drop_duplicates(
-                        subset=["MAZ", "line"]
-                    )
+        else:
+            logger.warning(
+                f"tap_line_distance_col not provided in {LOS_SETTINGS_FILE_NAME} so maz_to_tap "
+                f"pairs will not be trimmed which may result in high memory use and long runtimes"
+            )
 
-                    # we don't need to remember which lines are served by which TAPs
-                    df = (
-                        df.drop(columns="line")
-                        .drop_duplicates(subset=["MAZ", "TAP"])
-                        .sort_values(["MAZ", "TAP"])
-                    )
+        df.set_index(["MAZ", "TAP"], drop=True, inplace=True, verify_integrity=True)
+        logger.debug(f"loaded maz_to_tap table {file_name} with {len(df)} rows")
 
-                    logger.debug(
-                        f"trimmed maz_to_tap table {file_name} from {old_len} to {len(df)} rows "
-                        f"based on tap_lines"
-                    )
-                    logger.debug(
-                        f"maz_to_tap table {file_name} max {distance_col} {df[distance_col].max()}"
-                    )
+        return df
 
-                    max_dist = maz_to_tap_settings.get("max_dist", None)
-                    if max_dist:
-                        old_len = len(df)
-                        df = df[df[distance_col] <= max_dist]
-                        logger.debug(
-                            f"trimmed maz_to_tap table {file_name} from {old_len} to {len(df)} rows "
-                            f"based on max_dist {max_dist}"
-                        )
-
-                    if TRACE_TRIMMED_MAZ_TO_TAP_TABLES:
-                        self.state.tracing.write_csv(
-                            df,
-                            file_name=f"trimmed_{maz_to_tap_settings['table']}",
-                            transpose=False,
-                        )
+    def load_data(self):
+        """
+        Load tables and skims from files specified in network_los settigns
 
-                else:
-                    logger.warning(
-                        f"tap_line_distance_col not provided in {LOS_SETTINGS_FILE_NAME} so maz_to_tap "
-                        f"pairs will not be trimmed which may result in high memory use and long runtimes"
-                    )
+        When multiprocessing, the maz_to_maz and maz_to_tap tables are wrapped from the
+        shared data_buffers allocated by allocate_shared_skim_buffers (if any) instead of
+        being read again by each subprocess.  Otherwise the maz_to_maz table is read and
+        indexed as maz_to_maz_csr, and the DataFrame it was read into is then dropped.
+        """
+
+        data_buffers = self.state.get_injectable("data_buffers", None) or {}
 
-                df.set_index(
-                    ["MAZ", "TAP"], drop=True, inplace=True, verify_integrity=True
+        # load maz tables
+        if self.zone_system in [TWO_ZONE, THREE_ZONE]:
+            # maz
+            self.read_maz_taz_df()
+
+            # maz_to_maz_csr
+            self.maz_to_maz_csr = MazToMazCSR.from_shared_buffers(data_buffers)
+            if self.maz_to_maz_csr is not None:
+                logger.info(
+                    f"load_data using shared maz_to_maz buffers "
+                    f"({util.GB(self.maz_to_maz_csr.nbytes)})"
                 )
-                logger.debug(f"loaded maz_to_tap table {file_name} with {len(df)} rows")
+            else:
+                maz_to_maz_df = self.read_maz_to_maz_df()
+                if maz_to_maz_df is not None:
+                    self.maz_to_maz_csr = MazToMazCSR.from_dataframe(
+                        maz_to_maz_df, self.maz_ceiling
+                    )
+                    del maz_to_maz_df
+
+        # load tap tables
+        if self.zone_system == THREE_ZONE:
+            # tap_df should already have been loaded by load_skim_info because,
+            # during multiprocessing, it is required by TapTapUidCalculator to size TVPBCache
+            # self.tap_df = pd.read_csv(self.state.filesystem.get_data_file_path(self.setting('tap'), mandatory=True))
+            assert self.tap_df is not None
+
+            # maz_to_tap_dfs - different sized sparse arrays with different columns, so we keep them seperate
+            for mode, maz_to_tap_settings in self.setting("maz_to_tap").items():
+                df = maz_to_tap_df_from_shared_buffers(data_buffers, mode)
+                if df is not None:
+                    logger.info(f"load_data using shared maz_to_tap {mode} buffers")
+                else:
+                    df = self.read_maz_to_tap_df(mode, maz_to_tap_settings)
 
                 assert mode not in self.maz_to_tap_dfs
                 self.maz_to_tap_dfs[mode] = df
@@ -457,7 +599,7 @@ class Network_LOS(object):
         if self.zone_system in [TWO_ZONE, THREE_ZONE]:
             if not self.sharrow_enabled:
                 # create MazSkimDict facade skim_dict
-                # (must have already loaded dependencies: taz skim_dict, maz_to_maz_df, and maz_taz_df)
+                # (must have already loaded dependencies: taz skim_dict, maz_to_maz_csr, and maz_taz_df)
                 assert "maz" not in self.skim_dicts
                 maz_skim_dict = self.create_skim_dict("maz")
                 self.skim_dicts["maz"] = maz_skim_dict
@@ -521,7 +663,7 @@ class Network_LOS(object):
 
         if skim_tag == "maz":
             # MazSkimDict gets a reference to self here, because it has dependencies on self.load_data
-            # (e.g. maz_to_maz_df, maz_taz_df...) We pass in taz_skim_dict as a parameter
+            # (e.g. maz_to_maz_csr, maz_taz_df...) We pass in taz_skim_dict as a parameter
             # to hilight the fact that we do not want two copies of its (very large) data array in memory
             assert (
                 "taz" in self.skim_dicts
@@ -702,8 +844,67 @@ class Network_LOS(object):
                 self.tvpb.tap_cache.cache_tag
             ] = self.tvpb.tap_cache.allocate_data_buffer(shared=True)
 
+        if self.zone_system in [TWO_ZONE, THREE_ZONE]:
+            skim_buffers.update(self.allocate_shared_maz_buffers())
+
         return skim_buffers
 
+    def allocate_shared_maz_buffers(self):
+        """
+        Read maz_to_maz and maz_to_tap tables into multiprocessing.RawArray shared data buffers.
+        Only called when multiprocessing - BEFORE load_data()
+
+        Unlike the skim buffers, the size of these sparse tables is not known until they
+        are read, so the buffers are both allocated and loaded here, and subprocess
+        load_data() wraps them rather than reading the tables again.
+
+        MAZ ids can only be recoded once the land_use table has been loaded, so
+        nothing is shared if recode_pipeline_columns is set.
+
+        Returns
+        -------
+        dict of multiprocessing.RawArray
+        """
+
+        if self.state.settings.recode_pipeline_columns:
+            logger.info(
+                "allocate_shared_maz_buffers: not sharing maz tables "
+                "because recode_pipeline_columns is set"
+            )
+            return {}
+
+        maz_buffers = {}
+
+        self.read_maz_taz_df()
+        maz_to_maz_df = self.read_maz_to_maz_df()
+        if maz_to_maz_df is not None and len(maz_to_maz_df.columns) > 0:
+            maz_to_maz_csr = MazToMazCSR.from_dataframe(maz_to_maz_df, self.maz_ceiling)
+            del maz_to_maz_df
+            maz_buffers.update(maz_to_maz_csr.to_shared_buffers())
+            logger.info(
+                f"allocate_shared_maz_buffers maz_to_maz "
+                f"total size: {util.INT(maz_to_maz_csr.nbytes)} "
+                f"({util.GB(maz_to_maz_csr.nbytes)})"
+            )
+
+        if self.zone_system == THREE_ZONE:
+            for mode, maz_to_tap_settings in self.setting("maz_to_tap").items():
+                df = self.read_maz_to_tap_df(mode, maz_to_tap_settings)
+                buffers = maz_to_tap_shared_buffers(mode, df)
+                if buffers is None:
+                    logger.warning(
+                        f"allocate_shared_maz_buffers: not sharing maz_to_tap {mode} "
+                        f"table with non-numeric columns"
+                    )
+                    continue
+                maz_buffers.update(buffers)
+                logger.info(
+                    f"allocate_shared_maz_buffers maz_to_tap {mode} "
+                    f"total size: {util.INT(df.memory_usage(index=True).sum())}"
+                )
+
+        return maz_buffers
+
     def get_skim_dict(self, skim_tag):
         """
         Get SkimDict for the specified skim_tag (e.g. 'taz', 'maz', or 'tap')
@@ -754,37 +955,22 @@ class Network_LOS(object):
 
     def get_mazpairs(self, omaz, dmaz, attribute):
         """
-        look up attribute values of maz od pairs in sparse maz_to_maz df
+        look up attribute values of maz od pairs in sparse maz_to_maz table
 
         Parameters
         ----------
         omaz: array-like list of omaz zone_ids
         dmaz: array-like list of omaz zone_ids
-        attribute: str name of attribute column in maz_to_maz_df
+        attribute: str name of maz_to_maz attribute, or list of names
 
         Returns
         -------
-        Numpy.ndarray: list of attribute values for od pairs
+        Numpy.ndarray: list of attribute values for od pairs (NaN if not in maz_to_maz)
+            (or 2-D array with a column for each attribute if attribute is a list)
         """
 
-        # # this is slower
-        # s = pd.merge(pd.DataFrame({'OMAZ': omaz, 'DMAZ': dmaz}),
-        #              self.maz_to_maz_df,
-        #              how="left")[attribute]
-
-        # synthetic index method i : omaz_dmaz
-        if self.maz_ceiling > 32767:
-            # too many MAZs, or un-recoded MAZ ID's that are too large
-            # will overflow a 32-bit index, so upgrade to 64bit.
-            i = np.asanyarray(omaz, dtype=np.int64) * np.int64(
-                self.maz_ceiling
-            ) + np.asanyarray(dmaz, dtype=np.int64)
-        else:
-            i = np.asanyarray(omaz) * self.maz_ceiling + np.asanyarray(dmaz)
-        s = util.quick_loc_df(i, self.maz_to_maz_df, attribute)
-
-        # FIXME - no point in returning series?
-        return np.asanyarray(s)
+        assert self.maz_to_maz_csr is not None, "maz_to_maz table not loaded"
+        return self.maz_to_maz_csr.get(omaz, dmaz, attribute)
 
     def get_tappairs3d(self, otap, dtap, dim3, key):
         """
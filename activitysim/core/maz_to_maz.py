@@ -0,0 +1,234 @@
+# ActivitySim
+# See full license in LICENSE.txt.
+from __future__ import annotations
+
+import logging
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+from numba import njit
+
+logger = logging.getLogger(__name__)
+
+SHARED_BUFFER_PREFIX = "maz_to_maz_csr."
+
+
+def array_to_shared_buffer(data):
+    """
+    Copy a numpy array into a newly allocated multiprocessing.RawArray
+
+    Parameters
+    ----------
+    data : numpy.ndarray
+
+    Returns
+    -------
+    multiprocessing.RawArray
+        flat buffer of the ctypes equivalent of data.dtype
+    """
+    buffer = multiprocessing.RawArray(
+        np.ctypeslib.as_ctypes_type(data.dtype), data.size
+    )
+    np.copyto(np.ctypeslib.as_array(buffer), data.ravel())
+    return buffer
+
+
+def array_from_shared_buffer(buffer, shape=None):
+    """
+    Wrap a multiprocessing.RawArray as a (no-copy) numpy array
+
+    Parameters
+    ----------
+    buffer : multiprocessing.RawArray
+    shape : tuple, optional
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    data = np.ctypeslib.as_array(buffer)
+    return data if shape is None else data.reshape(shape)
+
+
+@njit(cache=True)
+def _csr_gather(row_ptr, dest, data, columns, omaz, dmaz, out):
+    """
+    Binary search the dest of each omaz row for dmaz and gather the data columns.
+
+    Rows of out for od pairs not in the table are left as they are (i.e. NaN).
+    """
+    num_rows = len(row_ptr) - 1
+    for i in range(len(omaz)):
+        o = omaz[i]
+        if o < 0 or o >= num_rows:
+            continue
+        d = dmaz[i]
+        lo = row_ptr[o]
+        end = hi = row_ptr[o + 1]
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            if dest[mid] < d:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < end and dest[lo] == d:
+            for j in range(len(columns)):
+                out[i, j] = data[lo, columns[j]]
+
+
+class MazToMazCSR:
+    """
+    Compressed sparse row (CSR) index of the attributes of maz_to_maz od pairs.
+
+    The od pairs with origin maz ``omaz`` are at positions ``row_ptr[omaz]`` up to
+    ``row_ptr[omaz + 1]``, with their destination mazs in ascending order in ``dest``
+    and their attributes in the corresponding rows of ``data``.  Looking up od pairs is
+    a binary search within each origin's destinations, which gathers all requested
+    attributes at once, rather than a reindex of a DataFrame by a synthetic
+    omaz * maz_ceiling + dmaz key for each attribute.
+
+    All state is held in plain numpy arrays, so it can be backed by shared memory.
+    """
+
+    def __init__(self, row_ptr, dest, data, columns):
+        """
+        Parameters
+        ----------
+        row_ptr : numpy.ndarray of int64
+            maz_ceiling + 1 offsets into dest of the destinations of each origin maz
+        dest : numpy.ndarray of int
+            destination maz of each od pair, sorted within each origin maz
+        data : 2-D numpy.ndarray
+            attribute values of each od pair (one column per attribute)
+        columns : list of str
+            attribute names of the columns of data
+        """
+        assert len(dest) == len(data) == row_ptr[-1]
+        self.row_ptr = row_ptr
+        self.dest = dest
+        self.data = data
+        self.columns = list(columns)
+        self.column_index = {c: i for i, c in enumerate(self.columns)}
+
+    @classmethod
+    def from_dataframe(cls, maz_to_maz_df: pd.DataFrame, maz_ceiling: int):
+        """
+        Build from maz_to_maz_df indexed by synthetic omaz * maz_ceiling + dmaz index
+
+        Parameters
+        ----------
+        maz_to_maz_df : pandas.DataFrame
+        maz_ceiling : int
+            max maz_id + 1
+
+        Returns
+        -------
+        MazToMazCSR
+        """
+        keys = maz_to_maz_df.index.to_numpy().astype(np.int64)
+        order = np.argsort(keys, kind="stable")
+        omaz, dmaz = np.divmod(keys[order], np.int64(maz_ceiling))
+
+        row_ptr = np.zeros(maz_ceiling + 1, dtype=np.int64)
+        np.cumsum(np.bincount(omaz, minlength=maz_ceiling), out=row_ptr[1:])
+
+        dest_dtype = np.int32 if maz_ceiling <= np.iinfo(np.int32).max else np.int64
+        dest = dmaz.astype(dest_dtype)
+        data = np.ascontiguousarray(maz_to_maz_df.to_numpy()[order])
+
+        logger.debug(
+            f"MazToMazCSR with {len(dest)} od pairs of {data.shape[1]} attributes "
+            f"{data.dtype} ({data.nbytes + dest.nbytes + row_ptr.nbytes} bytes)"
+        )
+
+        return cls(row_ptr, dest, data, maz_to_maz_df.columns)
+
+    def to_shared_buffers(self):
+        """
+        Copy the CSR arrays into shared multiprocessing.RawArray buffers
+
+        The attribute names are stored alongside, utf-8 encoded and newline delimited,
+        so subprocesses can rebuild the MazToMazCSR from the buffers alone.
+
+        Returns
+        -------
+        dict of multiprocessing.RawArray keyed by SHARED_BUFFER_PREFIX + name
+        """
+        columns = np.frombuffer("\n".join(self.columns).encode("utf-8"), dtype=np.uint8)
+        return {
+            f"{SHARED_BUFFER_PREFIX}row_ptr": array_to_shared_buffer(self.row_ptr),
+            f"{SHARED_BUFFER_PREFIX}dest": array_to_shared_buffer(self.dest),
+            f"{SHARED_BUFFER_PREFIX}data": array_to_shared_buffer(self.data),
+            f"{SHARED_BUFFER_PREFIX}columns": array_to_shared_buffer(columns),
+        }
+
+    @classmethod
+    def from_shared_buffers(cls, data_buffers):
+        """
+        Build from buffers allocated by to_shared_buffers, without copying the data
+
+        Parameters
+        ----------
+        data_buffers : dict
+            shared data buffers, which may include buffers unrelated to maz_to_maz
+
+        Returns
+        -------
+        MazToMazCSR or None
+            None if there are no maz_to_maz buffers in data_buffers
+        """
+        if f"{SHARED_BUFFER_PREFIX}row_ptr" not in data_buffers:
+            return None
+
+        columns = (
+            array_from_shared_buffer(data_buffers[f"{SHARED_BUFFER_PREFIX}columns"])
+            .tobytes()
+            .decode("utf-8")
+            .split("\n")
+        )
+        row_ptr = array_from_shared_buffer(
+            data_buffers[f"{SHARED_BUFFER_PREFIX}row_ptr"]
+        )
+        dest = array_from_shared_buffer(data_buffers[f"{SHARED_BUFFER_PREFIX}dest"])
+        data = array_from_shared_buffer(
+            data_buffers[f"{SHARED_BUFFER_PREFIX}data"], shape=(len(dest), len(columns))
+        )
+
+        return cls(row_ptr, dest, data, columns)
+
+    @property
+    def nbytes(self):
+        return self.row_ptr.nbytes + self.dest.nbytes + self.data.nbytes
+
+    def get(self, omaz, dmaz, attributes):
+        """
+        Look up attribute values of maz od pairs, NaN for od pairs not in the table.
+
+        Parameters
+        ----------
+        omaz : array-like of origin maz zone_ids
+        dmaz : array-like of destination maz zone_ids
+        attributes : str or list of str
+            name(s) of attributes to look up
+
+        Returns
+        -------
+        numpy.ndarray
+            1-D array of attribute values if attributes is a str, otherwise 2-D array
+            with a column for each attribute
+        """
+        single = isinstance(attributes, str)
+        if single:
+            attributes = [attributes]
+        columns = np.array([self.column_index[a] for a in attributes], dtype=np.int64)
+
+        omaz = np.asanyarray(omaz).astype(np.int64, copy=False)
+        dmaz = np.asanyarray(dmaz).astype(np.int64, copy=False)
+        assert omaz.shape == dmaz.shape
+
+        dtype = self.data.dtype if self.data.dtype.kind == "f" else np.float64
+        out = np.full((len(omaz), len(columns)), np.nan, dtype=dtype)
+        _csr_gather(self.row_ptr, self.dest, self.data, columns, omaz, dmaz, out)
+
+        return out[:, 0] if single else out
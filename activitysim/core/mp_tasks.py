@@ -2,11 +2,13 @@
 # See full license in LICENSE.txt.
 from __future__ import annotations
 
+import datetime as dt
 import glob
 import importlib
 import logging
 import multiprocessing
 import os
+import shutil
 import sys
 import time
 import traceback
@@ -15,7 +17,10 @@ from pathlib import Path
 
 import numpy as np
 import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 import yaml
+from numba import njit
 
 from activitysim.core import config, mem, tracing, util, workflow
 from activitysim.core.configuration import FileSystem, Settings
@@ -24,6 +29,7 @@ from activitysim.core.workflow.checkpoint import (
     CHECKPOINT_TABLE_NAME,
     FINAL_CHECKPOINT_NAME,
     NON_TABLE_COLUMNS,
+    TIMESTAMP,
     ParquetStore,
 )
 
@@ -33,6 +39,9 @@ LAST_CHECKPOINT = "_"
 
 MEM_TRACE_TICKS = 5
 
+# number of rows read at a time when streaming parquet tables
+STREAMING_BATCH_SIZE = 1 << 20
+
 """
 mp_tasks - activitysim multiprocessing overview
 
@@ -510,6 +519,502 @@ def build_slice_rules(state: workflow.State, slice_info, pipeline_tables):
     return slice_rules
 
 
+def primary_slicer_weights(
+    state: workflow.State, slice_info, slice_rules, table_column
+):
+    """
+    Predicted work of each row of the primary slicer table, for weighted slicing.
+
+    The weight of a primary row is the sum, over the items of slice_info.weight_by,
+    of the number of rows of that (sliced) table belonging to the primary row, or
+    of the value of that column of the primary table.
+
+    Parameters
+    ----------
+    slice_info : dict
+        'slice' info from run_list for this step
+    slice_rules : dict
+        slice rules from build_slice_rules
+    table_column : function(table_name, column_name) -> array
+        returns values of a column of a pipeline table, or of its index if
+        column_name is None
+
+    Returns
+    -------
+    weights : numpy.ndarray or None
+        None if slice_info has no weight_by items
+    """
+    weight_by = slice_info.get("weight_by", None)
+    if not weight_by:
+        return None
+
+    primary = slice_info["tables"][0]
+    primary_index = pd.Index(table_column(primary, None))
+
+    # position in primary table of the primary row each table row belongs to
+    primary_positions = {primary: np.arange(len(primary_index))}
+
+    def positions_of(table_name):
+        if table_name not in primary_positions:
+            rule = slice_rules[table_name]
+            source = rule["source"]
+            source_positions = positions_of(source)
+            source_index = pd.Index(table_column(source, None))
+            if rule["slice_by"] == "index":
+                keys = table_column(table_name, None)
+            else:
+                keys = table_column(table_name, rule["column"])
+            positions = source_index.get_indexer(keys)
+            primary_positions[table_name] = np.where(
+                positions >= 0, source_positions[positions], -1
+            )
+        return primary_positions[table_name]
+
+    weights = np.zeros(len(primary_index), dtype=np.float64)
+    for item in weight_by:
+        if slice_rules.get(item, {}).get("slice_by") is not None:
+            positions = positions_of(item)
+            weights += np.bincount(
+                positions[positions >= 0], minlength=len(primary_index)
+            )
+        elif item in slice_rules:
+            warning(state, f"weight_by table {item} is not sliced, ignored")
+        else:
+            try:
+                weights += np.asanyarray(table_column(primary, item), dtype=np.float64)
+            except KeyError:
+                warning(
+                    state,
+                    f"weight_by {item} is neither a table in the pipeline nor a "
+                    f"column of {primary}, ignored",
+                )
+    return weights
+
+
+@njit(cache=True)
+def _greedy_sub_procs(order, weights, num_sub_procs):
+    loads = np.zeros(num_sub_procs, dtype=np.float64)
+    sub_procs = np.empty(len(order), dtype=np.int64)
+    for row in order:
+        i = np.argmin(loads)
+        sub_procs[row] = i
+        loads[i] += weights[row]
+    return sub_procs
+
+
+def weighted_sub_procs(weights, num_sub_procs):
+    """
+    Assign weighted rows to sub_procs so each sub_proc gets a similar total weight.
+
+    Rows are assigned in order of decreasing weight, each to the sub_proc with the
+    smallest total weight so far (longest processing time first).
+
+    Parameters
+    ----------
+    weights : array of float
+    num_sub_procs : int
+
+    Returns
+    -------
+    sub_procs : numpy.ndarray of int
+        sub_proc number of each row
+    """
+    weights = np.asanyarray(weights, dtype=np.float64)
+    order = np.argsort(-weights, kind="stable")
+    return _greedy_sub_procs(order, weights, num_sub_procs)
+
+
+def primary_slicer_sub_procs(
+    state: workflow.State, slice_info, slice_rules, table_column, num_sub_procs
+):
+    """
+    Assign rows of the primary slicer table to sub_procs.
+
+    By default rows are assigned in num_sub_procs strides, if slice_info has
+    weight_by items they are assigned by weighted_sub_procs.
+
+    Returns
+    -------
+    sub_procs : numpy.ndarray of int
+        sub_proc number of each row of the primary slicer table
+    """
+    weights = primary_slicer_weights(state, slice_info, slice_rules, table_column)
+    if weights is None:
+        num_rows = len(table_column(slice_info["tables"][0], None))
+        return np.arange(num_rows) % num_sub_procs
+
+    sub_procs = weighted_sub_procs(weights, num_sub_procs)
+    loads = np.bincount(sub_procs, weights=weights, minlength=num_sub_procs)
+    imbalance = loads.max() / loads.mean() if loads.sum() > 0 else 1.0
+    info(
+        state,
+        f"weighted slicing by {slice_info['weight_by']}: predicted work per "
+        f"sub_proc {loads.tolist()} (max/mean {imbalance:.3f})",
+    )
+    return sub_procs
+
+
+def _remove_parquet_pipeline(pipeline_path: Path):
+    """
+    remove existing parquet files and directories from a subprocess pipeline
+    """
+    for pq_file in glob.glob(str(pipeline_path.joinpath("*", "*.parquet"))):
+        try:
+            if os.path.isdir(pq_file):
+                # dataset directory of parquet parts
+                shutil.rmtree(pq_file)
+            else:
+                os.unlink(pq_file)
+        except OSError:
+            pass
+    for pq_dir in glob.glob(str(pipeline_path.joinpath("*", "*"))):
+        try:
+            os.rmdir(pq_dir)
+        except OSError:
+            pass
+    for pq_dir in glob.glob(str(pipeline_path.joinpath("*"))):
+        try:
+            os.rmdir(pq_dir)
+        except OSError:
+            pass
+
+
+def _parquet_schema(path: Path):
+    """
+    arrow schema (with pandas metadata) of a parquet file or dataset directory
+    """
+    if path.is_dir():
+        return ds.dataset(path, format="parquet").schema
+    return pq.read_schema(path)
+
+
+def _parquet_index_columns(schema):
+    """
+    names of the columns holding the pandas index of a parquet table
+
+    Returns None if the index is not stored in columns (e.g. a RangeIndex stored
+    only as metadata), in which case the rows of the table can't be streamed.
+    """
+    pandas_metadata = schema.pandas_metadata
+    if pandas_metadata is None:
+        return None
+    index_columns = pandas_metadata.get("index_columns", [])
+    if not all(isinstance(c, str) for c in index_columns):
+        return None
+    return index_columns
+
+
+def _link_file(source: Path, dest: Path):
+    """
+    hard link source file to dest, or copy it if it can't be linked
+    """
+    try:
+        os.link(source, dest)
+    except OSError:
+        shutil.copyfile(source, dest)
+
+
+def _link_parquet(source: Path, dest: Path):
+    """
+    hard link (or copy) a parquet file or dataset directory, replacing dest
+    """
+    if dest.is_dir():
+        shutil.rmtree(dest)
+    elif dest.exists():
+        dest.unlink()
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if source.is_dir():
+        dest.mkdir()
+        for part in sorted(source.glob("*.parquet")):
+            _link_file(part, dest.joinpath(part.name))
+    else:
+        _link_file(source, dest)
+
+
+def _sub_procs_of_rows(rule, keys, offset, primary_sub_procs, sliced_rows):
+    """
+    sub_proc number of each row of a table being apportioned, -1 for rows not apportioned
+
+    Parameters
+    ----------
+    rule : dict
+        slice rule for table
+    keys : array
+        index values (slice_by index) or slice column values (slice_by column) of rows,
+        unused for the primary table
+    offset : int
+        position in table of first row (primary table)
+    primary_sub_procs : numpy.ndarray
+        sub_proc number of each row of the primary table
+    sliced_rows : dict {<table_name>: (pandas.Index, numpy.ndarray)}
+        index values and sub_proc numbers of rows of previously sliced tables
+    """
+    if rule["slice_by"] == "primary":
+        return primary_sub_procs[offset : offset + len(keys)]
+
+    source_index, source_sub_procs = sliced_rows[rule["source"]]
+    if not source_index.is_unique:
+        raise RuntimeError(
+            f"cannot stream slices of {rule['source']}, its index is not unique"
+        )
+    positions = source_index.get_indexer(keys)
+    return np.where(positions >= 0, source_sub_procs[positions], -1)
+
+
+def _stream_apportion_table(
+    table_name, rule, source_path, primary_sub_procs, sliced_rows, dest_paths
+):
+    """
+    apportion rows of a parquet table to sub_proc tables one batch at a time
+
+    The rows of each batch are sorted (stably) by sub_proc and each sub_proc's rows
+    are written as a row group of its table, so only one batch is ever in memory.
+
+    Returns
+    -------
+    index : pandas.Index
+        index values of apportioned rows
+    sub_procs : numpy.ndarray
+        sub_proc number of apportioned rows
+    """
+    num_sub_procs = len(dest_paths)
+    dataset = ds.dataset(source_path, format="parquet")
+    index_columns = _parquet_index_columns(dataset.schema)
+    index_column = index_columns[0] if len(index_columns) == 1 else None
+    key_column = index_column if rule["slice_by"] == "index" else rule.get("column")
+
+    if rule["slice_by"] == "index":
+        source_index, _ = sliced_rows[rule["source"]]
+        found = np.zeros(len(source_index), dtype=bool)
+
+    index_values = []
+    row_sub_procs = []
+    offset = 0
+    writers = [pq.ParquetWriter(str(p), dataset.schema) for p in dest_paths]
+    try:
+        for batch in dataset.to_batches(batch_size=STREAMING_BATCH_SIZE):
+            if key_column is None:
+                keys = np.empty(batch.num_rows)
+            else:
+                keys = batch.column(key_column).to_numpy(zero_copy_only=False)
+            sub_procs = _sub_procs_of_rows(
+                rule, keys, offset, primary_sub_procs, sliced_rows
+            )
+            offset += batch.num_rows
+
+            if rule["slice_by"] == "index":
+                positions = source_index.get_indexer(keys)
+                found[positions[positions >= 0]] = True
+
+            keep = np.flatnonzero(sub_procs >= 0)
+            order = keep[np.argsort(sub_procs[keep], kind="stable")]
+            bounds = np.searchsorted(sub_procs[order], np.arange(num_sub_procs + 1))
+            batch = batch.take(order)
+            for i, writer in enumerate(writers):
+                if bounds[i + 1] > bounds[i]:
+                    writer.write_batch(
+                        batch.slice(bounds[i], bounds[i + 1] - bounds[i])
+                    )
+
+            if index_column is not None:
+                index_values.append(
+                    batch.column(index_column).to_numpy(zero_copy_only=False)
+                )
+                row_sub_procs.append(sub_procs[order])
+    finally:
+        for writer in writers:
+            writer.close()
+
+    if rule["slice_by"] == "index" and not found.all():
+        raise RuntimeError(
+            f"apportion_pipeline: {(~found).sum()} rows of {rule['source']} "
+            f"not found in index of {table_name}"
+        )
+
+    if index_column is None:
+        return None, None
+    index = pd.Index(np.concatenate(index_values) if index_values else [])
+    return index, np.concatenate(row_sub_procs) if row_sub_procs else np.empty(0, int)
+
+
+def _stream_apportion_pipeline(state: workflow.State, sub_proc_names, step_info):
+    """
+    apportion_pipeline for parquet pipelines, without loading tables into memory
+
+    Rows of sliced tables are streamed from the pipeline in batches and written to the
+    sub_proc pipelines as row groups, and mirrored tables are hard linked (or copied).
+    Tables that can't be streamed are loaded and sliced in memory.
+    """
+    slice_info = step_info["slice"]
+    multiprocess_step_name = step_info.get("name", None)
+    last_checkpoint = step_info["last_checkpoint_in_previous_multiprocess_step"]
+    pipeline_file_name = state.get_injectable("pipeline_file_name")
+
+    store = ParquetStore(state.checkpoint.default_pipeline_file_path(), mode="r")
+    checkpoints = store.get_dataframe(CHECKPOINT_TABLE_NAME)
+    if last_checkpoint == LAST_CHECKPOINT:
+        checkpoint = checkpoints.iloc[-1]
+    else:
+        checkpoint = checkpoints[checkpoints[CHECKPOINT_NAME] == last_checkpoint]
+        if checkpoint.empty:
+            raise RuntimeError(
+                f"Couldn't find checkpoint '{last_checkpoint}' in checkpoints"
+            )
+        checkpoint = checkpoint.iloc[0]
+    table_checkpoints = {
+        table_name: checkpoint_name
+        for table_name, checkpoint_name in checkpoint.items()
+        if table_name not in NON_TABLE_COLUMNS and checkpoint_name
+    }
+
+    # ensure all tables are in the pipeline
+    for table_name in slice_info["tables"]:
+        if table_name not in table_checkpoints:
+            raise RuntimeError(f"slicer table {table_name} not found in pipeline")
+
+    # for the subprocess pipelines, keep only the last row of checkpoints and patch the last checkpoint name
+    table_names = [c for c in checkpoints.columns if c not in NON_TABLE_COLUMNS]
+    checkpoints_df = checkpoints[NON_TABLE_COLUMNS + table_names].tail(1).copy()
+    checkpoint_name = multiprocess_step_name
+    for table_name in table_checkpoints:
+        checkpoints_df[table_name] = checkpoint_name
+
+    # parquet tables are represented by empty frames with their columns and index,
+    # which is all build_slice_rules needs, other tables are loaded
+    tables = {}
+    table_paths = {}
+    num_rows = {}
+    for table_name, table_checkpoint in table_checkpoints.items():
+        path = store.get_table_path(table_name, table_checkpoint)
+        if path is None:
+            tables[table_name] = store.get_dataframe(table_name, table_checkpoint)
+            num_rows[table_name] = len(tables[table_name])
+        else:
+            schema = _parquet_schema(path)
+            tables[table_name] = schema.empty_table().to_pandas()
+            table_paths[table_name] = path
+            num_rows[table_name] = ds.dataset(path, format="parquet").count_rows()
+
+    slice_rules = build_slice_rules(state, slice_info, tables)
+
+    def table_column(table_name, column_name):
+        path = table_paths.get(table_name)
+        if path is None:
+            df = tables[table_name]
+            return df.index.to_numpy() if column_name is None else df[column_name]
+        if column_name is None:
+            (column_name,) = _parquet_index_columns(_parquet_schema(path))
+        elif column_name not in tables[table_name].columns:
+            raise KeyError(column_name)
+        dataset = ds.dataset(path, format="parquet")
+        column = dataset.to_table(columns=[column_name]).column(column_name)
+        return column.to_numpy()
+
+    num_sub_procs = len(sub_proc_names)
+    primary_sub_procs = primary_slicer_sub_procs(
+        state, slice_info, slice_rules, table_column, num_sub_procs
+    )
+
+    sub_proc_stores = []
+    for process_name in sub_proc_names:
+        pipeline_path = state.get_output_file_path(
+            pipeline_file_name, prefix=process_name
+        )
+        sub_proc_store = ParquetStore(pipeline_path)
+        _remove_parquet_pipeline(sub_proc_store.filename)
+        sub_proc_stores.append(sub_proc_store)
+
+    # index values and sub_proc of rows of sliced tables, to cascade slicing to other tables
+    sliced_rows = {}
+
+    for table_name, rule in slice_rules.items():
+        if rule["slice_by"] is not None and num_sub_procs > num_rows[table_name]:
+            # almost certainly a configuration error
+            raise RuntimeError(
+                f"apportion_pipeline: multiprocess step {multiprocess_step_name} "
+                f"slice table {table_name} has fewer rows {num_rows[table_name]} "
+                f"than num_processes ({num_sub_procs})."
+            )
+
+        path = table_paths.get(table_name)
+        if rule["slice_by"] is None:
+            # don't slice mirrored tables
+            for sub_proc_store in sub_proc_stores:
+                if path is None:
+                    sub_proc_store.put(
+                        table_name, tables[table_name], checkpoint_name=checkpoint_name
+                    )
+                else:
+                    _link_parquet(
+                        path,
+                        sub_proc_store._store_table_path(table_name, checkpoint_name),
+                    )
+            continue
+
+        if rule["slice_by"] not in ("primary", "index", "column"):
+            raise RuntimeError(
+                "Unrecognized slice rule '%s' for table %s"
+                % (rule["slice_by"], table_name)
+            )
+
+        if path is not None and _parquet_index_columns(_parquet_schema(path)):
+            debug(state, f"streaming table {table_name} {num_rows[table_name]} rows")
+            dest_paths = []
+            for sub_proc_store in sub_proc_stores:
+                dest_path = sub_proc_store._store_table_path(
+                    table_name, checkpoint_name
+                )
+                dest_path.parent.mkdir(parents=True, exist_ok=True)
+                dest_paths.append(dest_path)
+            index, sub_procs = _stream_apportion_table(
+                table_name, rule, path, primary_sub_procs, sliced_rows, dest_paths
+            )
+            if rule["slice_by"] == "primary":
+                # we are assuming that the primary table index is unique
+                assert index.is_unique
+        else:
+            df = tables[table_name]
+            if path is not None:
+                df = store.get_dataframe(table_name, table_checkpoints[table_name])
+            debug(state, f"loaded table {table_name} {df.shape}")
+            if rule["slice_by"] == "primary":
+                assert not df.index.duplicated().any()
+                keys = df.index
+            elif rule["slice_by"] == "index":
+                keys = df.index
+            else:
+                keys = df[rule["column"]]
+            index = df.index
+            sub_procs = _sub_procs_of_rows(
+                rule, keys, 0, primary_sub_procs, sliced_rows
+            )
+            for i, sub_proc_store in enumerate(sub_proc_stores):
+                if rule["slice_by"] == "index":
+                    # same row order as df.loc[source_df.index]
+                    source_index, source_sub_procs = sliced_rows[rule["source"]]
+                    sliced_df = df.loc[source_index[source_sub_procs == i]]
+                else:
+                    sliced_df = df[sub_procs == i]
+                sub_proc_store.put(
+                    table_name, sliced_df, checkpoint_name=checkpoint_name
+                )
+            keep = sub_procs >= 0
+            index, sub_procs = index[keep], sub_procs[keep]
+
+        if index is not None:
+            sliced_rows[table_name] = (index, sub_procs)
+
+    for sub_proc_store in sub_proc_stores:
+        debug(
+            state,
+            f"writing checkpoints ({checkpoints_df.shape}) "
+            f"to {CHECKPOINT_TABLE_NAME} in {sub_proc_store.filename}",
+        )
+        sub_proc_store.put(
+            table_name=CHECKPOINT_TABLE_NAME, df=checkpoints_df, checkpoint_name=None
+        )
+
+
 def apportion_pipeline(state: workflow.State, sub_proc_names, step_info):
     """
     apportion pipeline for multiprocessing step
@@ -543,6 +1048,12 @@ def apportion_pipeline(state: workflow.State, sub_proc_names, step_info):
     )
     if last_checkpoint_in_previous_multiprocess_step is None:
         raise RuntimeError("missing last_checkpoint_in_previous_multiprocess_step")
+
+    if (
+        state.settings.checkpoint_format == "parquet"
+        and state.settings.stream_multiprocess_pipelines
+    ):
+        return _stream_apportion_pipeline(state, sub_proc_names, step_info)
     state.checkpoint.restore(resume_after=last_checkpoint_in_previous_multiprocess_step)
 
     # ensure all tables are in the pipeline
@@ -575,8 +1086,17 @@ def apportion_pipeline(state: workflow.State, sub_proc_names, step_info):
     # - build slice rules for loaded tables
     slice_rules = build_slice_rules(state, slice_info, tables)
 
-    # - allocate sliced tables for each sub_proc
+    # - assign primary slicer rows to sub_procs
     num_sub_procs = len(sub_proc_names)
+    primary_sub_procs = primary_slicer_sub_procs(
+        state,
+        slice_info,
+        slice_rules,
+        lambda t, c: tables[t].index.to_numpy() if c is None else tables[t][c],
+        num_sub_procs,
+    )
+
+    # - allocate sliced tables for each sub_proc
     for i in range(num_sub_procs):
         # use well-known pipeline file name
         process_name = sub_proc_names[i]
@@ -608,7 +1128,7 @@ def apportion_pipeline(state: workflow.State, sub_proc_names, step_info):
                         )
 
                     if rule["slice_by"] == "primary":
-                        # slice primary apportion table by num_sub_procs strides
+                        # slice primary apportion table by num_sub_procs strides (or weights)
                         # this hopefully yields a more random distribution
                         # (e.g.) households are ordered by size in input store
                         # we are assuming that the primary table index is unique
@@ -616,9 +1136,7 @@ def apportion_pipeline(state: workflow.State, sub_proc_names, step_info):
                         # we could easily work around this, but it seems likely this was an error on the user's part
                         assert not df.index.duplicated().any()
 
-                        primary_df = df[
-                            np.asanyarray(list(range(df.shape[0]))) % num_sub_procs == i
-                        ]
+                        primary_df = df[primary_sub_procs == i]
                         sliced_tables[table_name] = primary_df
                     elif rule["slice_by"] == "index":
                         # slice a table with same index name as a known slicer
@@ -651,21 +1169,7 @@ def apportion_pipeline(state: workflow.State, sub_proc_names, step_info):
                 pipeline_store[CHECKPOINT_TABLE_NAME] = checkpoints_df
         else:
             # remove existing parquet files and directories
-            for pq_file in glob.glob(str(pipeline_path.joinpath("*", "*.parquet"))):
-                try:
-                    os.unlink(pq_file)
-                except OSError:
-                    pass
-            for pq_dir in glob.glob(str(pipeline_path.joinpath("*", "*"))):
-                try:
-                    os.rmdir(pq_dir)
-                except OSError:
-                    pass
-            for pq_dir in glob.glob(str(pipeline_path.joinpath("*"))):
-                try:
-                    os.rmdir(pq_dir)
-                except OSError:
-                    pass
+            _remove_parquet_pipeline(pipeline_path)
 
             # remember sliced_tables so we can cascade slicing to other tables
             sliced_tables = {}
@@ -685,7 +1189,7 @@ def apportion_pipeline(state: workflow.State, sub_proc_names, step_info):
                     )
 
                 if rule["slice_by"] == "primary":
-                    # slice primary apportion table by num_sub_procs strides
+                    # slice primary apportion table by num_sub_procs strides (or weights)
                     # this hopefully yields a more random distribution
                     # (e.g.) households are ordered by size in input store
                     # we are assuming that the primary table index is unique
@@ -693,9 +1197,7 @@ def apportion_pipeline(state: workflow.State, sub_proc_names, step_info):
                     # we could easily work around this, but it seems likely this was an error on the user's part
                     assert not df.index.duplicated().any()
 
-                    primary_df = df[
-                        np.asanyarray(list(range(df.shape[0]))) % num_sub_procs == i
-                    ]
+                    primary_df = df[primary_sub_procs == i]
                     sliced_tables[table_name] = primary_df
                 elif rule["slice_by"] == "index":
                     # slice a table with same index name as a known slicer
@@ -747,6 +1249,132 @@ def apportion_pipeline(state: workflow.State, sub_proc_names, step_info):
             # )
 
 
+def _stream_coalesce_pipelines(state: workflow.State, sub_proc_names, slice_info):
+    """
+    coalesce_pipelines for parquet pipelines, without loading tables into memory
+
+    Each omnibus table is coalesced as a dataset directory of hard links to (or copies
+    of) the parquet files of the sub_proc tables, in sub_proc order, and mirrored
+    tables are hard linked from the first sub_proc pipeline.  Tables that can't be
+    unioned this way (pickled tables, tables with a RangeIndex, or tables with
+    different schemas in different sub_procs) are concatenated in memory.
+    """
+    pipeline_file_name = state.get_injectable("pipeline_file_name")
+
+    debug(state, f"coalesce_pipelines to: {pipeline_file_name}")
+
+    sub_proc_stores = [
+        ParquetStore(
+            state.get_output_file_path(pipeline_file_name, prefix=process_name),
+            mode="r",
+        )
+        for process_name in sub_proc_names
+    ]
+    checkpoint_name, table_keys = parquet_pipeline_table_keys(
+        sub_proc_stores[0].filename
+    )
+
+    # parquet tables are represented by empty frames with their columns and index,
+    # which is all build_slice_rules needs, other tables are loaded
+    tables = {}
+    for table_name in table_keys:
+        path = sub_proc_stores[0].get_table_path(table_name)
+        if path is None:
+            tables[table_name] = sub_proc_stores[0].get_dataframe(table_name)
+        else:
+            tables[table_name] = _parquet_schema(path).empty_table().to_pandas()
+
+    # see coalesce_pipelines for slice_info.coalesce
+    coalesce_tables = slice_info.get("coalesce", [])
+    for table_name in coalesce_tables:
+        if table_name not in tables:
+            logger.warning(
+                "slicer coalesce.table %s not found in pipeline" % table_name
+            )
+
+    slice_rules = build_slice_rules(state, slice_info, tables)
+    mirrored_table_names = [
+        t
+        for t, rule in slice_rules.items()
+        if rule["slice_by"] is None and t not in coalesce_tables
+    ]
+    omnibus_table_names = [t for t in table_keys if t not in mirrored_table_names]
+
+    debug(state, f"mirrored_table_names: {mirrored_table_names}")
+    debug(state, f"omnibus_table_names: {omnibus_table_names}")
+
+    store = ParquetStore(state.checkpoint.default_pipeline_file_path())
+    complib = state.settings.pipeline_complib
+
+    # - add mirrored tables to pipeline
+    for table_name in mirrored_table_names:
+        info(state, f"adding mirrored table {table_name}")
+        path = sub_proc_stores[0].get_table_path(table_name)
+        if path is None:
+            store.put(
+                table_name,
+                tables[table_name],
+                complib=complib,
+                checkpoint_name=checkpoint_name,
+            )
+        else:
+            _link_parquet(path, store._store_table_path(table_name, checkpoint_name))
+
+    # - union omnibus tables and add them to pipeline
+    for table_name in omnibus_table_names:
+        paths = [
+            sub_proc_store.get_table_path(table_name)
+            for sub_proc_store in sub_proc_stores
+        ]
+        schemas = [None if path is None else _parquet_schema(path) for path in paths]
+        if (
+            schemas[0] is None
+            or _parquet_index_columns(schemas[0]) is None
+            or not all(
+                schema is not None and schema.equals(schemas[0], check_metadata=True)
+                for schema in schemas
+            )
+        ):
+            df = pd.concat(
+                [
+                    sub_proc_store.get_dataframe(table_name)
+                    for sub_proc_store in sub_proc_stores
+                ],
+                sort=False,
+            )
+            info(state, f"adding omnibus table {table_name} {df.shape}")
+            df.columns = df.columns.astype(str)
+            store.put(table_name, df, complib=complib, checkpoint_name=checkpoint_name)
+            continue
+
+        info(state, f"adding omnibus table {table_name} as dataset of {len(paths)}")
+        dest = store._store_table_path(table_name, checkpoint_name)
+        if dest.is_dir():
+            shutil.rmtree(dest)
+        elif dest.exists():
+            dest.unlink()
+        dest.mkdir(parents=True)
+        # part names sort in sub_proc order, which is the order rows are read back
+        for i, path in enumerate(paths):
+            parts = sorted(path.glob("*.parquet")) if path.is_dir() else [path]
+            for j, part in enumerate(parts):
+                _link_file(part, dest.joinpath(f"part-{i:05d}-{j:05d}.parquet"))
+
+    # - add checkpoint (preserving existing checkpoints so resume_after will work for prior steps)
+    checkpoints = store.get_dataframe(CHECKPOINT_TABLE_NAME)
+    checkpoint = checkpoints.iloc[-1].to_dict()
+    for table_name in table_keys:
+        checkpoint[table_name] = checkpoint_name
+    checkpoint[CHECKPOINT_NAME] = checkpoint_name
+    checkpoint[TIMESTAMP] = dt.datetime.now()
+    checkpoints = pd.concat(
+        [checkpoints, pd.DataFrame([checkpoint])], ignore_index=True
+    )
+    for c in checkpoints.columns:
+        checkpoints[c] = checkpoints[c].fillna("")
+    store.put(CHECKPOINT_TABLE_NAME, checkpoints, complib=complib)
+
+
 def coalesce_pipelines(state: workflow.State, sub_proc_names, slice_info):
     """
     Coalesce the data in the sub_processes apportioned pipelines back into a single pipeline
@@ -767,6 +1395,12 @@ def coalesce_pipelines(state: workflow.State, sub_proc_names, slice_info):
     creates an omnibus pipeline with coalesced data from individual sub_proc pipelines
     """
 
+    if (
+        state.settings.checkpoint_format == "parquet"
+        and state.settings.stream_multiprocess_pipelines
+    ):
+        return _stream_coalesce_pipelines(state, sub_proc_names, slice_info)
+
     pipeline_file_name = state.get_injectable("pipeline_file_name")
 
     debug(state, f"coalesce_pipelines to: {pipeline_file_name}")
@@ -1053,7 +1687,7 @@ def run_simulation(
     tracing.print_elapsed_time("run (%s models)" % len(models), t0)
 
     # add checkpoint with final tables even if not intermediate checkpointing
-    checkpoint_name = step_info["name"]
+    checkpoint_name = step_info.get("checkpoint_name", step_info["name"])
     state.checkpoint.add(checkpoint_name)
 
     state.checkpoint.close_store()
@@ -1106,6 +1740,69 @@ def mp_run_simulation(
         raise e
 
 
+def mp_run_micro_slices(
+    locutor: bool, queue, task_queue, injectables, step_info, resume_after, **kwargs
+):
+    """
+    mp entry point for a persistent worker that runs micro-slices pulled from task_queue
+
+    The worker is set up (and attaches to the shared data buffers) once, and then runs
+    run_simulation for one micro-slice pipeline after another, until it pulls None
+    from task_queue.  The name of each micro-slice is put on queue once it completes.
+
+    Parameters
+    ----------
+    locutor
+    queue
+    task_queue : multiprocessing.Queue
+        names of micro-slices still to be simulated
+    injectables
+    step_info
+    resume_after : bool
+    kwargs : dict
+        shared_data_buffers passed as kwargs to avoid picking dict
+    """
+
+    state = setup_injectables_and_logging(injectables, locutor=locutor)
+
+    # location choice models cannot synchronize shadow pricing across micro-slices
+    state.add_injectable("micro_sliced", True)
+
+    debug(
+        state,
+        f"mp_run_micro_slices {step_info['name']} locutor={state.get_injectable('locutor', False)} ",
+    )
+
+    try:
+        shared_data_buffer = kwargs
+        while True:
+            slice_name = task_queue.get()
+            if slice_name is None:
+                break
+
+            t0 = time.time()
+            info(state, f"running micro-slice {slice_name}")
+
+            # drop the tables of the previous micro-slice
+            for table_name in list(state.existing_table_names):
+                state.drop_table(table_name)
+
+            logger.debug(f"injecting pipeline_file_prefix '{slice_name}'")
+            state.add_injectable("pipeline_file_prefix", slice_name)
+            run_simulation(state, queue, step_info, resume_after, shared_data_buffer)
+
+            queue.put({"completed": slice_name, "time": time.time() - t0})
+
+        mem.log_global_hwm()  # subprocess
+
+    except Exception as e:
+        exception(
+            state,
+            f"{type(e).__name__} exception caught in mp_run_micro_slices: {str(e)}",
+        )
+        raise e
+
+
 def mp_apportion_pipeline(injectables, sub_proc_names, step_info):
     """
     mp entry point for apportion_pipeline
@@ -1342,6 +2039,7 @@ def run_sub_simulations(
                 if p.name not in completed:
                     info(state, f"process {p.name} completed")
                     completed.add(p.name)
+                    runtimes[p.name] = round(time.time() - start_times[p.name], 1)
                     drop_breadcrumb(state, step_name, "completed", list(completed))
                     state.trace_memory_info(f"{p.name}.completed")
             else:
@@ -1406,6 +2104,8 @@ def run_sub_simulations(
 
     completed = set(previously_completed)
     failed = set([])  # so we can log process failure first time it happens
+    start_times = {}
+    runtimes = {}  # seconds from start to observed completion of each process
     drop_breadcrumb(state, step_name, "completed", list(completed))
 
     for i, process_name in enumerate(process_names):
@@ -1445,6 +2145,7 @@ def run_sub_simulations(
     # - start processes
     for i, p in zip(list(range(num_simulations)), procs):
         info(state, f"start process {p.name}")
+        start_times[p.name] = time.time()
         p.start()
 
         """
@@ -1493,11 +2194,225 @@ def run_sub_simulations(
             info(state, f"Process {p.name} completed with exitcode {p.exitcode}")
             assert p.name in completed
 
+    # record runtime imbalance, so the effect of slice weight_by can be assessed
+    if runtimes:
+        mean_runtime = np.mean(list(runtimes.values()))
+        imbalance = max(runtimes.values()) / mean_runtime if mean_runtime else 1.0
+        drop_breadcrumb(state, step_name, "runtimes", runtimes)
+        drop_breadcrumb(
+            state, step_name, "runtime_imbalance", round(float(imbalance), 3)
+        )
+        info(
+            state,
+            f"run_sub_simulations step {step_name} runtime imbalance (max/mean) {imbalance:.3f}",
+        )
+
     t0 = tracing.print_elapsed_time("run_sub_simulations step %s" % step_name, t0)
 
     return list(completed)
 
 
+def run_micro_slice_simulations(
+    state: workflow.State,
+    injectables,
+    shared_data_buffers,
+    step_info,
+    slice_names,
+    resume_after,
+    previously_completed,
+    fail_fast,
+):
+    """
+    Run the micro-slices of a step on a pool of step_info['num_processes'] workers.
+
+    Work-stealing alternative to run_sub_simulations for steps with micro_slices:
+    rather than launching one process per slice, persistent workers (mp_run_micro_slices)
+    pull the names of micro-slices from a shared queue until none are left, so that
+    workers that finish their micro-slices early pick up the remaining work.
+
+    Resuming and 'completed' breadcrumbs work as for run_sub_simulations, with the
+    micro-slices taking the place of the sub-processes.
+
+    Parameters
+    ----------
+    injectables : dict
+        values to inject in subprocesses
+    shared_data_buffers : dict
+        dict of shared_data for sub-processes (e.g. skim and shadow pricing data)
+    step_info : dict
+        step_info from run_list
+    slice_names : list of str
+        names of the micro-slice pipelines to simulate
+    resume_after : str or None
+        name of simulation to resume after, or LAST_CHECKPOINT to resume where previous run left off
+    previously_completed : list of str
+        names of micro-slices that successfully completed in previous run
+    fail_fast : bool
+        whether to raise error if a worker terminates with nonzero exitcode
+
+    Returns
+    -------
+    completed : list[str]
+        names of micro-slices that completed successfully
+    """
+
+    def log_queued_messages():
+        for process, queue in zip(procs, queues):
+            while not queue.empty():
+                msg = queue.get(block=False)
+                if "completed" in msg:
+                    slice_name = msg["completed"]
+                    info(
+                        state,
+                        f"{process.name} micro-slice {slice_name} completed : "
+                        f"{tracing.format_elapsed_time(msg['time'])}",
+                    )
+                    completed.add(slice_name)
+                    drop_breadcrumb(state, step_name, "completed", list(completed))
+                else:
+                    model_name = msg["model"]
+                    info(
+                        state,
+                        f"{process.name} {model_name} : {tracing.format_elapsed_time(msg['time'])}",
+                    )
+                    state.trace_memory_info(f"{process.name}.{model_name}.completed")
+
+    def check_proc_status(state: workflow.State):
+        for p in procs:
+            if p.exitcode is None:
+                pass  # still running
+            elif p.exitcode == 0:
+                if p.name not in runtimes:
+                    info(state, f"worker {p.name} completed")
+                    runtimes[p.name] = round(time.time() - start_times[p.name], 1)
+                    state.trace_memory_info(f"{p.name}.completed")
+            elif p.name not in failed:
+                warning(state, f"worker {p.name} failed with exitcode {p.exitcode}")
+                failed.add(p.name)
+                state.trace_memory_info(f"{p.name}.failed")
+                if fail_fast:
+                    warning(state, "fail_fast terminating remaining running workers")
+                    for op in procs:
+                        if op.exitcode is None:
+                            try:
+                                info(state, f"terminating worker {op.name}")
+                                op.terminate()
+                            except Exception as e:
+                                info(state, f"error terminating worker {op.name}: {e}")
+                    raise RuntimeError("Process %s failed" % (p.name,))
+
+    step_name = step_info["name"]
+    num_workers = step_info["num_processes"]
+
+    t0 = tracing.print_elapsed_time()
+    info(
+        state,
+        f"run_micro_slice_simulations step {step_name} {len(slice_names)} micro-slices "
+        f"on {num_workers} workers resume_after {resume_after}",
+    )
+
+    if previously_completed:
+        assert resume_after is not None
+        assert set(previously_completed).issubset(set(slice_names))
+
+        if resume_after == LAST_CHECKPOINT:
+            slice_names = [
+                name for name in slice_names if name not in previously_completed
+            ]
+            info(
+                state,
+                f"step {step_name}: skipping {len(previously_completed)} previously completed micro-slices",
+            )
+        else:
+            previously_completed = []
+
+    # if not the first step, resume_after the last checkpoint from the previous step
+    if resume_after is None and step_info["step_num"] > 0:
+        resume_after = LAST_CHECKPOINT
+
+    completed = set(previously_completed)
+    failed = set([])
+    start_times = {}
+    runtimes = {}  # seconds from start to observed completion of each worker
+    drop_breadcrumb(state, step_name, "completed", list(completed))
+
+    num_workers = min(num_workers, len(slice_names))
+
+    task_queue = multiprocessing.Queue()
+    for slice_name in slice_names:
+        task_queue.put(slice_name)
+    for _ in range(num_workers):
+        task_queue.put(None)  # one stop sentinel per worker
+
+    procs = []
+    queues = []
+    for i in range(num_workers):
+        q = multiprocessing.Queue()
+        p = multiprocessing.Process(
+            target=mp_run_micro_slices,
+            name=f"{step_name}_worker_{i}",
+            args=(
+                i == 0,
+                q,
+                task_queue,
+                injectables,
+                step_info,
+                resume_after,
+            ),
+            kwargs=shared_data_buffers,
+        )
+        procs.append(p)
+        queues.append(q)
+
+    for p in procs:
+        info(state, f"start worker {p.name}")
+        start_times[p.name] = time.time()
+        p.start()
+
+        # see run_sub_simulations
+        if sys.platform == "win32":
+            time.sleep(1)
+
+        state.trace_memory_info(f"{p.name}.start")
+
+    while multiprocessing.active_children():
+        log_queued_messages()
+        check_proc_status(state)
+        state.trace_memory_info(
+            "run_micro_slice_simulations.idle",
+            trace_ticks=mem.MEM_PARENT_TRACE_TICK_LEN,
+        )
+        time.sleep(1)
+
+    log_queued_messages()
+    check_proc_status(state)
+
+    for p in procs:
+        assert p.exitcode is not None
+        if p.exitcode:
+            error(state, f"Worker {p.name} failed with exitcode {p.exitcode}")
+        else:
+            info(state, f"Worker {p.name} completed with exitcode {p.exitcode}")
+
+    if runtimes:
+        mean_runtime = np.mean(list(runtimes.values()))
+        imbalance = max(runtimes.values()) / mean_runtime if mean_runtime else 1.0
+        drop_breadcrumb(state, step_name, "runtimes", runtimes)
+        drop_breadcrumb(
+            state, step_name, "runtime_imbalance", round(float(imbalance), 3)
+        )
+        info(
+            state,
+            f"run_micro_slice_simulations step {step_name} runtime imbalance (max/mean) {imbalance:.3f}",
+        )
+
+    t0 = tracing.print_elapsed_time(
+        "run_micro_slice_simulations step %s" % step_name, t0
+    )
+
+    return list(completed)
+
+
 def run_sub_task(state: workflow.State, p):
     """
     Run process p synchroneously,
@@ -1561,6 +2476,75 @@ def drop_breadcrumb(state: workflow.State, step_name, crumb, value=True):
     write_breadcrumbs(state, breadcrumbs)
 
 
+def group_persistent_steps(state: workflow.State, multiprocess_steps):
+    """
+    Merge consecutive multiprocess steps that can be run by the same sub-processes.
+
+    If the persistent_multiprocess_workers setting is True, consecutive steps with
+    the same num_processes (> 1), slice and chunk_size (and no micro_slices) are
+    merged into a single step_info for the first step of the group, with the models
+    of all the steps of the group, so that the sub-processes run them all without
+    an intervening coalesce and apportion.  The names of the steps in the group are
+    in 'group_steps', and the name of the checkpoint to add after the last model in
+    'checkpoint_name'.
+
+    Parameters
+    ----------
+    multiprocess_steps : list[dict]
+        annotated multiprocess_steps from run_list
+
+    Returns
+    -------
+    list[dict]
+        step_info for each step or group of steps
+    """
+
+    if not state.settings.persistent_multiprocess_workers:
+        return multiprocess_steps
+
+    def same_slicing(step, other):
+        return (
+            step["num_processes"] > 1
+            and not step.get("micro_slices")
+            and not other.get("micro_slices")
+            and step["num_processes"] == other["num_processes"]
+            and step.get("slice") == other.get("slice")
+            and step["chunk_size"] == other["chunk_size"]
+        )
+
+    groups = []
+    for step in multiprocess_steps:
+        if groups and same_slicing(groups[-1][-1], step):
+            groups[-1].append(step)
+        else:
+            groups.append([step])
+
+    grouped_steps = []
+    for group in groups:
+        if len(group) == 1:
+            grouped_steps.append(group[0])
+            continue
+
+        for step in group[1:]:
+            if step.get("resume_after", None) not in (None, LAST_CHECKPOINT):
+                raise RuntimeError(
+                    f"can't resume_after {step['resume_after']} in step {step['name']} "
+                    f"run by persistent workers of step {group[0]['name']}"
+                )
+
+        step_info = group[0].copy()
+        step_info["models"] = [model for step in group for model in step["models"]]
+        step_info["group_steps"] = [step["name"] for step in group]
+        step_info["checkpoint_name"] = group[-1]["name"]
+        info(
+            state,
+            f"persistent workers for steps {step_info['group_steps']}",
+        )
+        grouped_steps.append(step_info)
+
+    return grouped_steps
+
+
 def run_multiprocess(state: workflow.State, injectables):
     """
     run the steps in run_list, possibly resuming after checkpoint specified by resume_after
@@ -1673,15 +2657,32 @@ def run_multiprocess(state: workflow.State, injectables):
             state.trace_memory_info("mp_setup_skims.completed")
     state.run.log_runtime("mp_setup_skims", start_time=start_time, force=True)
 
-    # - for each step in run list
-    for step_info in run_list["multiprocess_steps"]:
+    # - for each step (or group of steps run by persistent workers) in run list
+    for step_info in group_persistent_steps(state, run_list["multiprocess_steps"]):
         step_name = step_info["name"]
 
+        # breadcrumbs of a persistent worker group are dropped for its first step
+        group_steps = step_info.get("group_steps", [step_name])
+        for name in group_steps:
+            if name in old_breadcrumbs:
+                previous = old_breadcrumbs[name].get("worker_group", [name])
+                if previous != group_steps:
+                    raise RuntimeError(
+                        f"can't resume step {name} run by worker group {previous} "
+                        f"in worker group {group_steps}"
+                    )
+        if len(group_steps) > 1:
+            drop_breadcrumb(state, step_name, "worker_group", group_steps)
+
         num_processes = step_info["num_processes"]
         slice_info = step_info.get("slice", None)
 
+        micro_slices = step_info.get("micro_slices", 0)
+
         if num_processes == 1:
             sub_proc_names = [step_name]
+        elif micro_slices:
+            sub_proc_names = ["%s_%s" % (step_name, i) for i in range(micro_slices)]
         else:
             sub_proc_names = ["%s_%s" % (step_name, i) for i in range(num_processes)]
 
@@ -1707,7 +2708,12 @@ def run_multiprocess(state: workflow.State, injectables):
 
             previously_completed = find_breadcrumb("completed", default=[])
 
-            completed = run_sub_simulations(
+            if micro_slices:
+                run_simulations = run_micro_slice_simulations
+            else:
+                run_simulations = run_sub_simulations
+
+            completed = run_simulations(
                 state,
                 injectables,
                 shared_data_buffers,
@@ -1718,10 +2724,10 @@ def run_multiprocess(state: workflow.State, injectables):
                 fail_fast,
             )
 
-            if len(completed) != num_processes:
+            if len(completed) != len(sub_proc_names):
                 raise RuntimeError(
                     "%s processes failed in step %s"
-                    % (num_processes - len(completed), step_name)
+                    % (len(sub_proc_names) - len(completed), step_name)
                 )
         drop_breadcrumb(state, step_name, "simulate")
 
@@ -1741,6 +2747,12 @@ def run_multiprocess(state: workflow.State, injectables):
             )
         drop_breadcrumb(state, step_name, "coalesce")
 
+        # the other steps of a persistent worker group completed along with the first
+        for name in group_steps[1:]:
+            drop_breadcrumb(state, name, "worker_group", group_steps)
+            for phase in ("apportion", "simulate", "coalesce"):
+                drop_breadcrumb(state, name, phase)
+
     # add checkpoint with final tables even if not intermediate checkpointing
     if not state.should_save_checkpoint():
         state.checkpoint.restore(resume_after="_")
@@ -1982,6 +2994,28 @@ def get_run_list(state: workflow.State):
 
             multiprocess_steps[istep]["num_processes"] = num_processes
 
+            # - validate micro_slices
+            micro_slices = step.get("micro_slices", None) or 0
+            if not isinstance(micro_slices, int) or micro_slices < 0:
+                raise RuntimeError(
+                    "bad value (%s) for micro_slices for step %s"
+                    " in multiprocess_steps" % (micro_slices, name)
+                )
+            if micro_slices and num_processes == 1:
+                raise RuntimeError(
+                    "micro_slices but num_processes is 1 for step %s"
+                    " in multiprocess_steps" % name
+                )
+            if micro_slices and micro_slices <= num_processes:
+                info(
+                    state,
+                    f"micro_slices ({micro_slices}) not greater than "
+                    f"num_processes ({num_processes}) for step {name}, ignoring",
+                )
+                micro_slices = 0
+
+            multiprocess_steps[istep]["micro_slices"] = micro_slices
+
             # - validate chunk_size and assign default
             chunk_size = step.get("chunk_size", None)
             if chunk_size is None:
@@ -2168,6 +3202,8 @@ def write_breadcrumbs(state: workflow.State, breadcrumbs):
           coalesce: true
           completed: [mp_households_0, mp_households_1]
           name: mp_households
+          runtime_imbalance: 1.012
+          runtimes: {mp_households_0: 412.0, mp_households_1: 405.9}
           simulate: true
 
     Parameters
@@ -8,6 +8,7 @@ from builtins import range
 
 import numpy as np
 import pandas as pd
+from numba import njit
 
 from activitysim.core import (
     assign,
@@ -37,6 +38,58 @@ UNAVAILABLE = -999
 CACHE_TAG = "tap_tap_utilities"
 
 
+@njit(cache=True)
+def _best_paths_kernel(
+    group_offsets, rows, keys, max_paths_per_tap_set, max_paths_across_tap_sets
+):
+    """
+    Select the best paths of each seq group, lower keys are better (NaN worst).
+
+    The best max_paths_per_tap_set rows are chosen for each tap set (column of keys),
+    then the best max_paths_across_tap_sets of those candidates across tap sets. As in
+    the DataFrame implementation this replaces, a chosen row is also kept for the other
+    tap sets it was a candidate in. Candidates are returned ordered by seq group, then
+    key, then tap set and row.
+    """
+    num_sets = keys.shape[1]
+    max_candidates = 0
+    for g in range(len(group_offsets) - 1):
+        group_size = group_offsets[g + 1] - group_offsets[g]
+        max_candidates += min(group_size, max_paths_per_tap_set) * num_sets
+
+    out_rows = np.empty(max_candidates, dtype=np.int64)
+    out_sets = np.empty(max_candidates, dtype=np.int64)
+    chosen = np.zeros(keys.shape[0], dtype=np.bool_)
+    n_out = 0
+
+    for g in range(len(group_offsets) - 1):
+        group_rows = rows[group_offsets[g] : group_offsets[g + 1]]
+        k = min(len(group_rows), max_paths_per_tap_set)
+
+        # candidates in tap set order, then row order within each tap set
+        cand_rows = np.empty(k * num_sets, dtype=np.int64)
+        cand_sets = np.empty(k * num_sets, dtype=np.int64)
+        cand_keys = np.empty(k * num_sets, dtype=keys.dtype)
+        for s in range(num_sets):
+            set_keys = keys[group_rows, s]
+            best = np.sort(np.argsort(set_keys, kind="mergesort")[:k])
+            for j in range(k):
+                cand_rows[s * k + j] = group_rows[best[j]]
+                cand_sets[s * k + j] = s
+                cand_keys[s * k + j] = set_keys[best[j]]
+
+        order = np.argsort(cand_keys, kind="mergesort")
+        for j in order[:max_paths_across_tap_sets]:
+            chosen[cand_rows[j]] = True
+        for j in order:
+            if chosen[cand_rows[j]]:
+                out_rows[n_out] = cand_rows[j]
+                out_sets[n_out] = cand_sets[j]
+                n_out += 1
+
+    return out_rows[:n_out], out_sets[:n_out]
+
+
 def compute_utilities(
     state: workflow.State,
     network_los,
@@ -722,40 +775,37 @@ class TransitVirtualPathBuilder:
                 for c in transit_sets:
                     del path_df[f"total_{c}"]
 
-            for c in transit_sets:
-                path_df[c] = path_df[c] + path_df["access"] + path_df["egress"]
-            path_df.drop(columns=["access", "egress"], inplace=True)
-
-            # choose best paths by tap set
-            best_paths_list = []
-            for c in transit_sets:
-                keep = path_df.index.isin(
-                    path_df[["seq", c]]
-                    .sort_values(by=c, ascending=smaller_is_better)
-                    .groupby(["seq"])
-                    .head(max_paths_per_tap_set)
-                    .index
-                )
-
-                best_paths_for_set = path_df[keep]
-                best_paths_for_set["path_set"] = c  # remember the path set
-                best_paths_for_set[units] = path_df[keep][c]
-                best_paths_for_set.drop(columns=transit_sets, inplace=True)
-                best_paths_list.append(best_paths_for_set)
+            # total utility (access + tap set + egress) of each path for each tap set,
+            # negated if bigger is better so the kernel can always choose the smallest
+            keys = (
+                path_df[transit_sets].to_numpy()
+                + path_df[["access"]].to_numpy()
+                + path_df[["egress"]].to_numpy()
+            )
+            if not smaller_is_better:
+                keys = -keys
+
+            # path_df rows of each seq, in seq order
+            seq = path_df["seq"].to_numpy()
+            rows = np.argsort(seq, kind="stable")
+            group_offsets = np.flatnonzero(
+                np.r_[True, seq[rows][1:] != seq[rows][:-1], True]
+            )
 
-            path_df = pd.concat(best_paths_list).sort_values(
-                by=["seq", units], ascending=[True, smaller_is_better]
+            best_rows, best_sets = _best_paths_kernel(
+                group_offsets,
+                rows,
+                keys,
+                max_paths_per_tap_set,
+                max_paths_across_tap_sets,
             )
 
-            # choose best paths overall by seq
-            path_df = path_df.sort_values(
-                by=["seq", units], ascending=[True, smaller_is_better]
+            best_keys = keys[best_rows, best_sets]
+            path_df = path_df.drop(columns=["access", "egress"] + transit_sets).take(
+                best_rows
             )
-            path_df = path_df[
-                path_df.index.isin(
-                    path_df.groupby(["seq"]).head(max_paths_across_tap_sets).index
-                )
-            ]
+            path_df["path_set"] = np.asarray(transit_sets, dtype=object)[best_sets]
+            path_df[units] = best_keys if smaller_is_better else -best_keys
 
             if trace:
                 self.trace_df(path_df, trace_label, "best_paths")
@@ -2,6 +2,7 @@
 # See full license in LICENSE.txt.
 from __future__ import annotations
 
+import hashlib
 import itertools
 import logging
 import multiprocessing
@@ -81,6 +82,155 @@ class TVPBCache(object):
         self.is_open = False
         self.is_changed = False
         self._data = None
+        self._cache_version = None
+
+    @property
+    def persistent(self):
+        """
+        True if utilities are kept in a persistent cache, one file per attribute combination
+        """
+        return self.network_los.setting("persistent_tvpb_cache")
+
+    @property
+    def cache_version(self):
+        """
+        hash of everything the tap_tap utilities depend on, so that a persistent cache
+        is only reused for the same transit network and TVPB settings
+        """
+        if self._cache_version is None:
+            state = self.network_los.state
+            tvpb_settings = self.network_los.setting("TVPB_SETTINGS.tour_mode_choice")
+            tap_tap_settings = tvpb_settings["tap_tap_settings"]
+
+            digest = hashlib.md5()
+            digest.update(f"{DTYPE_NAME} {self.uid_calculator.set_names}".encode())
+            digest.update(repr(tvpb_settings).encode())
+
+            spec_file_names = [
+                tap_tap_settings.get("SPEC"),
+                (tap_tap_settings.get("PREPROCESSOR") or {}).get("SPEC"),
+            ]
+            for file_name in filter(None, spec_file_names):
+                if not file_name.endswith(".csv"):
+                    file_name = f"{file_name}.csv"
+                file_path = state.filesystem.get_config_file_path(
+                    file_name, mandatory=False
+                )
+                if file_path is not None:
+                    with open(file_path, "rb") as f:
+                        digest.update(f.read())
+
+            # skims are too big to hash, so rely on their size and modification time
+            for file_path in state.filesystem.expand_input_file_list(
+                self.network_los.omx_file_names("tap")
+            ):
+                file_stat = os.stat(file_path)
+                digest.update(
+                    f"{os.path.basename(file_path)} {file_stat.st_size} "
+                    f"{file_stat.st_mtime_ns}".encode()
+                )
+
+            digest.update(
+                pd.util.hash_pandas_object(self.network_los.tap_df).values.tobytes()
+            )
+
+            self._cache_version = digest.hexdigest()[:16]
+
+        return self._cache_version
+
+    @property
+    def persistent_cache_dir(self):
+        return os.path.join(
+            self.network_los.state.filesystem.get_cache_dir(),
+            f"{self.cache_tag}.{self.cache_version}",
+        )
+
+    def chunk_path(self, offset):
+        """
+        path of persistent cache file for the attribute combination at skim offset
+        """
+        return os.path.join(self.persistent_cache_dir, f"{offset}.mmap")
+
+    def missing_offsets(self):
+        """
+        skim offsets of attribute combinations not yet in the persistent cache
+        """
+        num_combinations = self.uid_calculator.skim_shape[0]
+        return [
+            offset
+            for offset in range(num_combinations)
+            if not os.path.isfile(self.chunk_path(offset))
+        ]
+
+    @property
+    def cache_exists(self):
+        """
+        True if a fully populated cache was saved by this or an earlier run
+        """
+        if self.persistent:
+            return not self.missing_offsets()
+        return os.path.isfile(self.cache_path)
+
+    def write_chunk(self, offset, data):
+        """
+        write utilities of the attribute combination at skim offset to the persistent cache
+
+        The file is written under a temporary name and then renamed, so that concurrent
+        readers (e.g. other subprocesses or runs) never see a partially written file.
+
+        Parameters
+        ----------
+        offset: int
+            skim offset of attribute combination
+        data: numpy.ndarray
+            utilities of the attribute combination, with shape (num_od_rows, num_sets)
+        """
+        assert self.persistent
+        os.makedirs(self.persistent_cache_dir, exist_ok=True)
+
+        path = self.chunk_path(offset)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        mm_data = np.memmap(temp_path, shape=data.shape, dtype=DTYPE_NAME, mode="w+")
+        np.copyto(mm_data, data)
+        mm_data.flush()
+        mm_data._mmap.close()
+        del mm_data
+        os.replace(temp_path, path)
+
+        logger.debug(f"#TVPB CACHE write_chunk wrote offset {offset} to {path}")
+
+    def read_chunks(self, data):
+        """
+        copy utilities of all attribute combinations in the persistent cache into data
+
+        Parameters
+        ----------
+        data: numpy.ndarray
+            fully_populated data array, left as is for attribute combinations not in cache
+
+        Returns
+        -------
+        int
+            number of attribute combinations read from the persistent cache
+        """
+        assert self.persistent
+        data = data.reshape(self.uid_calculator.skim_shape)
+
+        num_read = 0
+        for offset in range(data.shape[0]):
+            path = self.chunk_path(offset)
+            if os.path.isfile(path):
+                mm_data = np.memmap(path, dtype=DTYPE_NAME, mode="r")
+                np.copyto(data[offset], mm_data.reshape(data[offset].shape))
+                mm_data._mmap.close()
+                del mm_data
+                num_read += 1
+
+        logger.debug(
+            f"#TVPB CACHE read_chunks read {num_read} of {data.shape[0]} "
+            f"attribute combinations from {self.persistent_cache_dir}"
+        )
+        return num_read
 
     @property
     def cache_path(self):
@@ -102,6 +252,10 @@ class TVPBCache(object):
         """
         Called prior to
         """
+        if self.persistent:
+            # a persistent cache is versioned, so a stale cache is never read
+            return
+
         if os.path.isfile(self.cache_path):
             logger.debug(f"deleting cache {self.cache_path}")
             try:
@@ -164,6 +318,23 @@ class TVPBCache(object):
             logger.info(
                 f"TVPBCache.open {self.cache_tag} STATIC cache using existing data_buffers"
             )
+        elif self.persistent:
+            missing_offsets = self.missing_offsets()
+            if missing_offsets:
+                raise RuntimeError(
+                    f"Pathbuilder cache incomplete. Did you forget to run initialize tvpb?"
+                    f"Missing attribute combinations {missing_offsets} "
+                    f"in cache directory: {self.persistent_cache_dir}"
+                )
+            data = np.empty(
+                util.iprod(self.uid_calculator.fully_populated_shape), dtype=DTYPE_NAME
+            )
+            self.read_chunks(data)
+
+            logger.info(
+                f"TVPBCache.open {self.cache_tag} read fully_populated data array "
+                f"from persistent cache {self.persistent_cache_dir}"
+            )
         elif os.path.isfile(self.cache_path):
             # single process ought have created a precomputed fully_populated STATIC file
             data = np.memmap(self.cache_path, dtype=DTYPE_NAME, mode="r")
@@ -296,7 +467,11 @@ class TVPBCache(object):
             else:
                 np_wrapped_data_buffer = np.ctypeslib.as_array(data_buffer.get_obj())
 
-        if os.path.isfile(self.cache_path):
+        if self.persistent:
+            np.copyto(np_wrapped_data_buffer, np.nan)
+            with memo("TVPBCache.load_data_to_buffer read_chunks"):
+                self.read_chunks(np_wrapped_data_buffer)
+        elif os.path.isfile(self.cache_path):
             with memo("TVPBCache.load_data_to_buffer copy memmap"):
                 data = np.memmap(self.cache_path, dtype=DTYPE_NAME, mode="r")
                 np.copyto(np_wrapped_data_buffer, data)
@@ -9,6 +9,7 @@ from builtins import object, range
 import numpy as np
 import pandas as pd
 
+from activitysim.core.fast_mapping import FastMapping
 from activitysim.core.util import reindex
 
 from .tracing import print_elapsed_time
@@ -19,6 +20,19 @@ logger = logging.getLogger(__name__)
 _MAX_SEED = 1 << 32
 _SEED_MASK = 0xFFFFFFFF
 
+# random stream engines
+#   legacy: reseed and fast-forward a numpy RandomState for every row (original behavior)
+#   philox: counter-based Philox4x32-10 keyed by row_seed, with offset as the counter
+RNG_ENGINES = ("legacy", "philox")
+
+# Philox4x32 multipliers and Weyl key increments (Salmon et al., Random123)
+_PHILOX_M0 = np.uint64(0xD2511F53)
+_PHILOX_M1 = np.uint64(0xCD9E8D57)
+_PHILOX_W0 = np.uint64(0x9E3779B9)
+_PHILOX_W1 = np.uint64(0xBB67AE85)
+_PHILOX_ROUNDS = 10
+_U32 = np.uint64(_SEED_MASK)
+
 
 def hash32(s):
     """
@@ -36,6 +50,57 @@ def hash32(s):
     return int(h, base=16) & _SEED_MASK
 
 
+def philox4x32(counter, key, rounds=_PHILOX_ROUNDS):
+    """
+    Vectorized Philox4x32 counter-based block cipher.
+
+    Every row of counter is encrypted with the corresponding row of key, so an arbitrary
+    number of independent streams can be evaluated at arbitrary positions in one call.
+
+    Parameters
+    ----------
+    counter : array-like of shape (N, 4)
+        unsigned 32 bit counter words
+    key : array-like of shape (N, 2)
+        unsigned 32 bit key words
+    rounds : int
+        number of rounds (10 is the standard, crush-resistant value)
+
+    Returns
+    -------
+    bits : 2-D ndarray of uint32 with shape (N, 4)
+    """
+    counter = np.asanyarray(counter, dtype=np.uint64) & _U32
+    key = np.asanyarray(key, dtype=np.uint64) & _U32
+    c0, c1, c2, c3 = (counter[:, i].copy() for i in range(4))
+    k0, k1 = key[:, 0].copy(), key[:, 1].copy()
+
+    for r in range(rounds):
+        if r:
+            k0 = (k0 + _PHILOX_W0) & _U32
+            k1 = (k1 + _PHILOX_W1) & _U32
+        # 32x32 -> 64 bit products fit exactly in uint64
+        p0 = _PHILOX_M0 * c0
+        p1 = _PHILOX_M1 * c2
+        c0, c1, c2, c3 = (
+            (p1 >> np.uint64(32)) ^ c1 ^ k0,
+            p1 & _U32,
+            (p0 >> np.uint64(32)) ^ c3 ^ k1,
+            p0 & _U32,
+        )
+
+    return np.stack([c0, c1, c2, c3], axis=1).astype(np.uint32)
+
+
+def _bits_to_uniform(hi, lo):
+    """
+    Combine two uint32 words into a 53 bit float in range [0, 1)
+    """
+    hi = hi.astype(np.uint64) >> np.uint64(5)
+    lo = lo.astype(np.uint64) >> np.uint64(6)
+    return (hi * 67108864.0 + lo) / 9007199254740992.0
+
+
 class SimpleChannel(object):
     """
 
@@ -61,12 +126,24 @@ class SimpleChannel(object):
     So we use (global_seed + channel_seed + step_seed + row_index) % (1 << 32)
     to get an int32 seed rather than a tuple.
 
+    With the "philox" engine, row_seed is instead used as the key of a counter-based
+    Philox4x32-10 generator (together with a channel/step key word, so streams of
+    different channels and steps do not collide even when their row_seeds do), and
+    offset is used as the counter. The rands for all rows of a df are then computed
+    in a single vectorized call without any reseeding or fast-forwarding, and each row
+    still gets the same stream regardless of how the df is chunked or multiprocessed.
+
     We do read in the whole households and persons tables at start time, so we could note the
     max index values. But we might then want a way to ensure stability between the test, example,
     and full datasets. I am punting on this for now.
     """
 
-    def __init__(self, channel_name, base_seed, domain_df, step_name):
+    def __init__(self, channel_name, base_seed, domain_df, step_name, engine="legacy"):
+        if engine not in RNG_ENGINES:
+            raise ValueError(
+                f"unknown random engine '{engine}', expected one of {RNG_ENGINES}"
+            )
+        self.engine = engine
         self.base_seed = base_seed
 
         # ensure that every channel is different, even for the same df index values and max_steps
@@ -75,16 +152,35 @@ class SimpleChannel(object):
 
         self.step_name = None
         self.step_seed = None
-        self.row_states = None
 
-        # create dataframe to hold state for every df row
+        # row state for every domain_df row, held in contiguous arrays (with spare capacity
+        # so extending the domain is amortized) and located by position using index_map
+        self._num_rows = 0
+        self._row_ids = np.empty(0, dtype=np.int64)
+        self._row_seed = np.empty(0, dtype=np.int64)
+        self._offset = np.empty(0, dtype=np.int64)
+        self._index_map = None
+
         self.extend_domain(domain_df)
-        assert self.row_states.shape[0] == domain_df.shape[0]
+        assert self._num_rows == domain_df.shape[0]
 
         if step_name:
             self.begin_step(step_name)
 
-    def init_row_states_for_step(self, row_states):
+    @property
+    def row_states(self):
+        """
+        DataFrame with row_seed and offset for every domain row (a copy, for inspection only)
+        """
+        return pd.DataFrame(
+            {
+                "row_seed": self._row_seed[: self._num_rows],
+                "offset": self._offset[: self._num_rows],
+            },
+            index=pd.Index(self._row_ids[: self._num_rows]),
+        )
+
+    def init_row_states_for_step(self, start=0):
         """
         initialize row states (in place) for new step
 
@@ -94,24 +190,23 @@ class SimpleChannel(object):
 
         Parameters
         ----------
-        row_states
+        start : int
+            position of first row to initialize (rows before start are left as-is)
         """
 
         assert self.step_name
 
-        if self.step_name and not row_states.empty:
-            row_states["row_seed"] = (
-                self.base_seed + self.channel_seed + self.step_seed + row_states.index
-            ) % _MAX_SEED
+        rows = slice(start, self._num_rows)
+        self._row_seed[rows] = (
+            self.base_seed + self.channel_seed + self.step_seed + self._row_ids[rows]
+        ) % _MAX_SEED
 
-            # number of rands pulled this step
-            row_states["offset"] = 0
-
-        return row_states
+        # number of rands pulled this step
+        self._offset[rows] = 0
 
     def extend_domain(self, domain_df):
         """
-        Extend or create row_state df by adding seed info for each row in domain_df
+        Extend or create row states by adding seed info for each row in domain_df
 
         If extending, the index values of new tables must be disjoint so
         there will be no ambiguity/collisions between rows
@@ -128,19 +223,30 @@ class SimpleChannel(object):
                 "extend_domain for channel %s for empty domain_df" % self.channel_name
             )
 
-        # dataframe to hold state for every df row
-        row_states = pd.DataFrame(columns=["row_seed", "offset"], index=domain_df.index)
-
-        if self.step_name and not row_states.empty:
-            self.init_row_states_for_step(row_states)
+        new_ids = np.asarray(domain_df.index, dtype=np.int64)
 
-        if self.row_states is None:
-            self.row_states = row_states
+        if self._index_map is None:
+            self._index_map = FastMapping(new_ids)
         else:
-            # row_states already exists, so we are extending
-            # if extending, these should be new rows, no intersection with existing row_states
-            assert len(self.row_states.index.intersection(domain_df.index)) == 0
-            self.row_states = pd.concat([self.row_states, row_states])
+            # if extending, these should be new rows, no intersection with existing rows
+            assert not np.isin(new_ids, self._row_ids[: self._num_rows]).any()
+            self._index_map.extend(new_ids)
+
+        start = self._num_rows
+        num_rows = start + len(new_ids)
+        if num_rows > len(self._row_ids):
+            # grow geometrically so repeated extension (e.g. of tours or trips) is amortized
+            capacity = max(num_rows, 2 * len(self._row_ids))
+            for name in ("_row_ids", "_row_seed", "_offset"):
+                grown = np.zeros(capacity, dtype=np.int64)
+                grown[:start] = getattr(self, name)[:start]
+                setattr(self, name, grown)
+
+        self._row_ids[start:num_rows] = new_ids
+        self._num_rows = num_rows
+
+        if self.step_name:
+            self.init_row_states_for_step(start)
 
     def begin_step(self, step_name):
         """
@@ -157,7 +263,7 @@ class SimpleChannel(object):
         self.step_name = step_name
         self.step_seed = hash32(self.step_name)
 
-        self.init_row_states_for_step(self.row_states)
+        self.init_row_states_for_step()
 
         # standard constant to use for choice_for_df instead of fast-forwarding rand stream
         self.multi_choice_offset = None
@@ -167,10 +273,26 @@ class SimpleChannel(object):
 
         self.step_name = None
         self.step_seed = None
-        self.row_states["offset"] = 0
-        self.row_states["row_seed"] = 0
+        self._offset[:] = 0
+        self._row_seed[:] = 0
+
+    def _positions_for_df(self, df):
+        """
+        Return positions in the row state arrays of the rows in df
+        """
+
+        # assert no dupes
+        assert df.index.is_unique
+
+        return self._index_map.apply_to(np.asarray(df.index, dtype=np.int64))
+
+    def _consume(self, positions, n):
+        """
+        update offset for rows we handled
+        """
+        np.add.at(self._offset, positions, n)
 
-    def _generators_for_df(self, df):
+    def _generators_for_df(self, df, positions=None):
         """
         Python generator function for iterating over numpy prngs (nomenclature collision!)
         seeded and fast-forwarded on-the-fly to the appropriate position in the channel's
@@ -188,21 +310,51 @@ class SimpleChannel(object):
             and well-known index name corresponding to the channel
         """
 
-        # assert no dupes
-        assert len(df.index.unique()) == len(df.index)
-
-        df_row_states = self.row_states.loc[df.index]
+        if positions is None:
+            positions = self._positions_for_df(df)
 
         prng = np.random.RandomState()
-        for row in df_row_states.itertuples():
-            prng.seed(row.row_seed)
+        for row_seed, offset in zip(self._row_seed[positions], self._offset[positions]):
+            prng.seed(row_seed)
 
-            if row.offset:
+            if offset:
                 # consume rands
-                prng.rand(row.offset)
+                prng.rand(offset)
 
             yield prng
 
+    def _philox_bits_for_df(self, positions, n):
+        """
+        Return (N, n, 4) uint32 philox blocks for counters offset .. offset + n for each row
+        """
+
+        num_rows = len(positions)
+
+        key = np.empty((num_rows, 2), dtype=np.uint64)
+        key[:, 0] = self._row_seed[positions].astype(np.uint64)
+        key[:, 1] = (self.channel_seed ^ self.step_seed) & _SEED_MASK
+
+        counter = np.zeros((num_rows, n, 4), dtype=np.uint64)
+        counter[:, :, 0] = self._offset[positions].astype(np.uint64)[
+            :, np.newaxis
+        ] + np.arange(n, dtype=np.uint64)
+
+        bits = philox4x32(
+            counter.reshape(-1, 4), np.repeat(key, n, axis=0) if n != 1 else key
+        )
+        return bits.reshape(num_rows, n, 4)
+
+    def _philox_random_for_df(self, positions, n):
+        bits = self._philox_bits_for_df(positions, n)
+        return _bits_to_uniform(bits[..., 0], bits[..., 1])
+
+    def _philox_normal_for_df(self, positions, n):
+        # Box-Muller on the two uniforms in each block, so one counter per normal deviate
+        bits = self._philox_bits_for_df(positions, n)
+        u1 = 1.0 - _bits_to_uniform(bits[..., 0], bits[..., 1])  # (0, 1]
+        u2 = _bits_to_uniform(bits[..., 2], bits[..., 3])
+        return np.sqrt(-2.0 * np.log(u1)) * np.cos(2.0 * np.pi * u2)
+
     def random_for_df(self, df, step_name, n=1):
         """
         Return n floating point random numbers in range [0, 1) for each row in df
@@ -236,12 +388,17 @@ class SimpleChannel(object):
         assert self.step_name
         assert self.step_name == step_name
 
-        # - reminder: prng must be called when yielded as generated sequence, not serialized
-        generators = self._generators_for_df(df)
+        positions = self._positions_for_df(df)
+
+        if self.engine == "philox":
+            rands = self._philox_random_for_df(positions, n)
+        else:
+            # - reminder: prng must be called when yielded as generated sequence, not serialized
+            generators = self._generators_for_df(df, positions)
+            rands = np.asanyarray([prng.rand(n) for prng in generators])
 
-        rands = np.asanyarray([prng.rand(n) for prng in generators])
         # update offset for rows we handled
-        self.row_states.loc[df.index, "offset"] += n
+        self._consume(positions, n)
         return rands
 
     def normal_for_df(self, df, step_name, mu, sigma, lognormal=False, size=None):
@@ -284,12 +441,27 @@ class SimpleChannel(object):
                 return x.values
             return x
 
-        # - reminder: prng must be called when yielded as generated sequence, not serialized
-        generators = self._generators_for_df(df)
-
         mu = to_series(mu)
         sigma = to_series(sigma)
 
+        positions = self._positions_for_df(df)
+
+        if self.engine == "philox":
+            z = self._philox_normal_for_df(positions, 1 if size is None else int(size))
+            if size is None:
+                z = z[:, 0]
+            else:
+                mu = np.asanyarray(mu)[:, np.newaxis]
+                sigma = np.asanyarray(sigma)[:, np.newaxis]
+            rands = z * sigma + mu
+            if lognormal:
+                rands = np.exp(rands)
+            self._consume(positions, 1 if size is None else int(size))
+            return rands
+
+        # - reminder: prng must be called when yielded as generated sequence, not serialized
+        generators = self._generators_for_df(df, positions)
+
         if lognormal:
             rands = np.asanyarray(
                 [
@@ -310,7 +482,7 @@ class SimpleChannel(object):
             consume_offsets = int(size)
         else:
             consume_offsets = 1
-        self.row_states.loc[df.index, "offset"] += consume_offsets
+        self._consume(positions, consume_offsets)
 
         return rands
 
@@ -332,7 +504,7 @@ class SimpleChannel(object):
             df with index name and values corresponding to a registered channel
 
         step_name : str
-            current step name so we can update row_states seed info
+            current step name so we can update row state seed info
 
         The remaining parameters are passed through as arguments to numpy.random.choice
 
@@ -353,8 +525,13 @@ class SimpleChannel(object):
         assert self.step_name
         assert self.step_name == step_name
 
+        positions = self._positions_for_df(df)
+
+        if self.engine == "philox":
+            return self._philox_choice_for_df(positions, a, size, replace)
+
         # initialize the generator iterator
-        generators = self._generators_for_df(df)
+        generators = self._generators_for_df(df, positions)
 
         sample = np.concatenate(
             tuple(prng.choice(a, size, replace) for prng in generators)
@@ -365,13 +542,48 @@ class SimpleChannel(object):
             if replace:
                 logger.warning("choice_for_df MULTI_CHOICE_FF with replace")
             # update offset for rows we handled
-            self.row_states.loc[df.index, "offset"] += size
+            self._consume(positions, size)
 
         return sample
 
+    def _philox_choice_for_df(self, positions, a, size, replace):
+        """
+        Vectorized equivalent of choice_for_df for the philox engine.
+
+        With replacement, each choice consumes one counter. Without replacement, rows are
+        sampled by taking the size smallest of len(a) uniform sort keys, which consumes
+        len(a) counters per row.
+        """
+
+        pool = np.arange(a) if np.isscalar(a) else np.asanyarray(a)
+        num_alts = len(pool)
+
+        if replace:
+            rands = self._philox_random_for_df(positions, size)
+            alt_ix = (rands * num_alts).astype(np.int64)
+            consumed = size
+        else:
+            if size > num_alts:
+                raise ValueError(
+                    "Cannot take a larger sample than population when 'replace=False'"
+                )
+            rands = self._philox_random_for_df(positions, num_alts)
+            alt_ix = np.argsort(rands, axis=1, kind="stable")[:, :size]
+            consumed = num_alts
+
+        if not self.multi_choice_offset:
+            self._consume(positions, consumed)
+
+        return pool[alt_ix].ravel()
+
 
 class Random(object):
-    def __init__(self):
+    def __init__(self, engine="legacy"):
+        if engine not in RNG_ENGINES:
+            raise ValueError(
+                f"unknown random engine '{engine}', expected one of {RNG_ENGINES}"
+            )
+        self.engine = engine
         self.channels = {}
 
         # dict mapping df index name to channel name
@@ -484,7 +696,11 @@ class Random(object):
             )
 
             channel = SimpleChannel(
-                channel_name, self.base_seed, domain_df, self.step_name
+                channel_name,
+                self.base_seed,
+                domain_df,
+                self.step_name,
+                engine=self.engine,
             )
 
             self.channels[channel_name] = channel
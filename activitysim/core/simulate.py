@@ -25,6 +25,7 @@ from activitysim.core import (
     util,
     workflow,
 )
+from activitysim.core.compiled_spec import compile_spec
 from activitysim.core.configuration.base import ComputeSettings, PydanticBase
 from activitysim.core.configuration.logit import (
     BaseLogitComponentSettings,
@@ -624,6 +625,37 @@ def eval_utilities(
 
     # fixme - restore tracing and _check_for_variability
 
+    if (
+        utilities is None
+        and compute_settings.compiled_spec
+        and not estimator
+        and not log_alt_losers
+        and not (trace_all_rows or have_trace_targets)
+    ):
+        trace_label = tracing.extend_trace_label(trace_label, "eval_utils")
+
+        # avoid altering caller's passed-in locals_d parameter (they may be looping)
+        locals_dict = assign.local_utilities(state)
+
+        if locals_d is not None:
+            locals_dict.update(locals_d)
+
+        locals_dict["df"] = choosers
+
+        compiled = compile_spec(spec)
+        with compute_settings.pandas_option_context():
+            utilities = compiled.eval_utilities(
+                choosers,
+                {},
+                locals_dict,
+                trace_label=trace_label,
+                use_numexpr=compute_settings.use_numexpr is not False,
+            )
+
+        timelogger.mark("compiled flow", True, logger=logger, suffix=trace_label)
+    else:
+        timelogger.mark("compiled flow", False)
+
     if utilities is None or estimator or sharrow_enabled == "test":
         trace_label = tracing.extend_trace_label(trace_label, "eval_utils")
 
@@ -1055,30 +1087,12 @@ def compute_nested_exp_utilities(raw_utilities, nest_spec):
     nested_utilities : pandas.DataFrame
         Will have the index of `raw_utilities` and columns for exponentiated leaf and node utilities
     """
-    nested_utilities = pd.DataFrame(index=raw_utilities.index)
-
-    for nest in logit.each_nest(nest_spec, post_order=True):
-        name = nest.name
-
-        if nest.is_leaf:
-            # leaf_utility = raw_utility / nest.product_of_coefficients
-            nested_utilities[name] = (
-                raw_utilities[name].astype(float) / nest.product_of_coefficients
-            )
-
-        else:
-            # nest node
-            # the alternative nested_utilities will already have been computed due to post_order
-            # this will RuntimeWarning: divide by zero encountered in log
-            # if all nest alternative utilities are zero
-            # but the resulting inf will become 0 when exp is applied below
-            with np.errstate(divide="ignore"):
-                nested_utilities[name] = nest.coefficient * np.log(
-                    nested_utilities[nest.alternatives].sum(axis=1)
-                )
-
-        # exponentiate the utility
-        nested_utilities[name] = np.exp(nested_utilities[name])
+    tree = logit.nest_tree(nest_spec)
+    nested_utilities = pd.DataFrame(
+        tree.exp_utilities(raw_utilities)[:, :-1],
+        columns=tree.names,
+        index=raw_utilities.index,
+    )
 
     return nested_utilities
 
@@ -1105,19 +1119,19 @@ def compute_nested_probabilities(
         Will have the index of `nested_exp_utilities` and columns for leaf and node probabilities
     """
 
-    nested_probabilities = pd.DataFrame(index=nested_exp_utilities.index)
-
-    for nest in logit.each_nest(nest_spec, type="node", post_order=False):
-        probs = logit.utils_to_probs(
-            state,
-            nested_exp_utilities[nest.alternatives],
-            trace_label=trace_label,
-            exponentiated=True,
-            allow_zero_probs=True,
-            overflow_protection=False,
-        )
-
-        nested_probabilities = pd.concat([nested_probabilities, probs], axis=1)
+    tree = logit.nest_tree(nest_spec)
+    exp_utilities = np.zeros(
+        (len(nested_exp_utilities), len(tree.names) + 1), dtype=np.float64
+    )
+    exp_utilities[:, :-1] = nested_exp_utilities[tree.names].to_numpy(dtype=np.float64)
+    probs = tree.nested_probabilities(
+        state, exp_utilities, trace_label=trace_label, index=nested_exp_utilities.index
+    )
+    nested_probabilities = pd.DataFrame(
+        probs[:, tree.nested_probability_positions],
+        columns=tree.nested_probability_names,
+        index=nested_exp_utilities.index,
+    )
 
     return nested_probabilities
 
@@ -1143,18 +1157,18 @@ def compute_base_probabilities(nested_probabilities, nests, spec):
         Will have the index of `nested_probabilities` and columns for leaf base probabilities
     """
 
-    base_probabilities = pd.DataFrame(index=nested_probabilities.index)
-
-    for nest in logit.each_nest(nests, type="leaf", post_order=False):
-        # skip root: it has a prob of 1 but we didn't compute a nested probability column for it
-        ancestors = nest.ancestors[1:]
-
-        base_probabilities[nest.name] = nested_probabilities[ancestors].prod(axis=1)
-
-    # reorder alternative columns to match spec
-    # since these are alternatives chosen by column index, order of columns matters
-    assert set(base_probabilities.columns) == set(spec.columns)
-    base_probabilities = base_probabilities[spec.columns]
+    tree = logit.nest_tree(nests)
+    probs = np.zeros((len(nested_probabilities), len(tree.names)), dtype=np.float64)
+    probs[:, tree.non_root] = nested_probabilities[
+        [tree.names[i] for i in tree.non_root]
+    ].to_numpy(dtype=np.float64)
+
+    # columns in spec order, since these are alternatives chosen by column index
+    base_probabilities = pd.DataFrame(
+        tree.base_probabilities(probs, spec.columns),
+        columns=spec.columns,
+        index=nested_probabilities.index,
+    )
 
     return base_probabilities
 
@@ -1248,6 +1262,21 @@ def eval_mnl(
             column_labels=["alternative", "utility"],
         )
 
+    if (
+        compute_settings is not None
+        and compute_settings.fused_choices
+        and not have_trace_targets
+        and not custom_chooser
+    ):
+        choices, rands, _ = logit.choose_from_utils(
+            state, utilities, trace_label=trace_label, trace_choosers=choosers
+        )
+
+        del utilities
+        chunk_sizer.log_df(trace_label, "utilities", None)
+
+        return choices
+
     probs = logit.utils_to_probs(
         state, utilities, trace_label=trace_label, trace_choosers=choosers
     )
@@ -1371,8 +1400,12 @@ def eval_nl(
             column_labels=["alternative", "utility"],
         )
 
+    # nest tree arrays, compiled once per nest_spec
+    tree = logit.nest_tree(nest_spec)
+    index = raw_utilities.index
+
     # exponentiated utilities of leaves and nests
-    nested_exp_utilities = compute_nested_exp_utilities(raw_utilities, nest_spec)
+    nested_exp_utilities = tree.exp_utilities(raw_utilities)
     chunk_sizer.log_df(trace_label, "nested_exp_utilities", nested_exp_utilities)
 
     del raw_utilities
@@ -1380,20 +1413,20 @@ def eval_nl(
 
     if have_trace_targets:
         state.tracing.trace_df(
-            nested_exp_utilities,
+            pd.DataFrame(nested_exp_utilities[:, :-1], columns=tree.names, index=index),
             "%s.nested_exp_utilities" % trace_label,
             column_labels=["alternative", "utility"],
         )
 
     # probabilities of alternatives relative to siblings sharing the same nest
-    nested_probabilities = compute_nested_probabilities(
-        state, nested_exp_utilities, nest_spec, trace_label=trace_label
+    nested_probabilities = tree.nested_probabilities(
+        state, nested_exp_utilities, trace_label=trace_label, index=index
     )
     chunk_sizer.log_df(trace_label, "nested_probabilities", nested_probabilities)
 
     if want_logsums:
         # logsum of nest root
-        logsums = pd.Series(np.log(nested_exp_utilities.root), index=choosers.index)
+        logsums = pd.Series(tree.logsums(nested_exp_utilities), index=choosers.index)
         chunk_sizer.log_df(trace_label, "logsums", logsums)
 
     del nested_exp_utilities
@@ -1401,14 +1434,20 @@ def eval_nl(
 
     if have_trace_targets:
         state.tracing.trace_df(
-            nested_probabilities,
+            pd.DataFrame(
+                nested_probabilities[:, tree.nested_probability_positions],
+                columns=tree.nested_probability_names,
+                index=index,
+            ),
             "%s.nested_probabilities" % trace_label,
             column_labels=["alternative", "probability"],
         )
 
     # global (flattened) leaf probabilities based on relative nest coefficients (in spec order)
-    base_probabilities = compute_base_probabilities(
-        nested_probabilities, nest_spec, spec
+    base_probabilities = pd.DataFrame(
+        tree.base_probabilities(nested_probabilities, spec.columns),
+        columns=spec.columns,
+        index=index,
     )
     chunk_sizer.log_df(trace_label, "base_probabilities", base_probabilities)
 
@@ -1618,6 +1657,20 @@ def tvpb_skims(skims):
     ]
 
 
+def _estimated_row_size(state: workflow.State, spec, nest_spec):
+    """
+    bytes per chooser of a simple simulate model, if estimate_chunk_row_size setting
+    """
+    if not state.settings.estimate_chunk_row_size:
+        return 0
+    num_nest_nodes = len(logit.nest_tree(nest_spec).names) if nest_spec else 0
+    return chunk.estimate_row_size(
+        num_alternatives=spec.shape[1],
+        num_expressions=spec.shape[0],
+        num_nest_nodes=num_nest_nodes,
+    )
+
+
 def simple_simulate(
     state: workflow.State,
     choosers,
@@ -1651,7 +1704,12 @@ def simple_simulate(
         chooser_chunk,
         chunk_trace_label,
         chunk_sizer,
-    ) in chunk.adaptive_chunked_choosers(state, choosers, trace_label):
+    ) in chunk.adaptive_chunked_choosers(
+        state,
+        choosers,
+        trace_label,
+        estimated_row_size=_estimated_row_size(state, spec, nest_spec),
+    ):
         choices = _simple_simulate(
             state,
             chooser_chunk,
@@ -1707,7 +1765,12 @@ def simple_simulate_by_chunk_id(
         chooser_chunk,
         chunk_trace_label,
         chunk_sizer,
-    ) in chunk.adaptive_chunked_choosers_by_chunk_id(state, choosers, trace_label):
+    ) in chunk.adaptive_chunked_choosers_by_chunk_id(
+        state,
+        choosers,
+        trace_label,
+        estimated_row_size=_estimated_row_size(state, spec, nest_spec),
+    ):
         choices = _simple_simulate(
             state,
             chooser_chunk,
@@ -1930,19 +1993,24 @@ def eval_nl_logsums(
         )
 
     # - exponentiated utilities of leaves and nests
-    nested_exp_utilities = compute_nested_exp_utilities(raw_utilities, nest_spec)
+    tree = logit.nest_tree(nest_spec)
+    index = raw_utilities.index
+    nested_exp_utilities = tree.exp_utilities(raw_utilities)
     chunk_sizer.log_df(trace_label, "nested_exp_utilities", nested_exp_utilities)
 
     del raw_utilities  # done with raw_utilities
     chunk_sizer.log_df(trace_label, "raw_utilities", None)
 
     # - logsums
-    logsums = np.log(nested_exp_utilities.root)
+    logsums = tree.logsums(nested_exp_utilities)
     logsums = pd.Series(logsums, index=choosers.index)
     chunk_sizer.log_df(trace_label, "logsums", logsums)
 
     if have_trace_targets:
         # add logsum to nested_exp_utilities for tracing
+        nested_exp_utilities = pd.DataFrame(
+            nested_exp_utilities[:, :-1], columns=tree.names, index=index
+        )
         nested_exp_utilities["logsum"] = logsums
         state.tracing.trace_df(
             nested_exp_utilities,
@@ -2066,6 +2134,7 @@ def simple_simulate_logsums(
         chunk_tag,
         chunk_size=chunk_size,
         explicit_chunk_size=explicit_chunk_size,
+        estimated_row_size=_estimated_row_size(state, spec, nest_spec),
     ):
         logsums = _simple_simulate_logsums(
             state,
@@ -529,6 +529,212 @@ def _apply_digital_encoding(dataset, digital_encodings):
     return dataset
 
 
+def _omx_variable_sources(omx_file_paths, time_period_sep="__", ignore=None):
+    """
+    Find the omx file(s) from which each skim dataset variable is read.
+
+    Parameters
+    ----------
+    omx_file_paths : Collection[Path-like]
+    time_period_sep : str, default "__"
+        Separator of base variable name and time period in omx matrix names.
+    ignore : Collection[str], optional
+        Regular expressions of omx matrix names to ignore.
+
+    Returns
+    -------
+    dict[str, set[str]]
+        Base names of files keyed by dataset variable name.
+    """
+    import re
+
+    variable_sources = {}
+    for omx_file_path in omx_file_paths:
+        with openmatrix.open_file(omx_file_path, mode="r") as omx_file:
+            matrix_names = omx_file.listMatrices()
+        for k in matrix_names:
+            if ignore and any(re.match(i, k) for i in ignore):
+                continue
+            variable_sources.setdefault(k.split(time_period_sep, 1)[0], set()).add(
+                os.path.basename(omx_file_path)
+            )
+    return variable_sources
+
+
+def _stale_skim_variables(
+    variable_sources, source_mtimes, cached_source_mtimes, cached_variables
+):
+    """
+    Find the skim variables of a zarr skim cache that need to be (re)built.
+
+    Parameters
+    ----------
+    variable_sources : dict[str, set[str]]
+        Source omx files keyed by variable name, as from `_omx_variable_sources`.
+    source_mtimes : dict[str, float]
+        Current modification time of each source omx file.
+    cached_source_mtimes : dict[str, float] or None
+        Modification time of each source omx file when the cache was written,
+        or None if there is no (usable) cache.
+    cached_variables : Collection[str]
+        Variables in the cache.
+
+    Returns
+    -------
+    set[str]
+        Variables that are not in the cache, or any of whose source files
+        have changed since the cache was written.
+    """
+    if cached_source_mtimes is None:
+        return set(variable_sources)
+    changed = {
+        f for f, mtime in source_mtimes.items() if cached_source_mtimes.get(f) != mtime
+    }
+    return {
+        k
+        for k, sources in variable_sources.items()
+        if k not in cached_variables or sources & changed
+    }
+
+
+def convert_omx_to_zarr(
+    state, skim_tag="taz", num_processes=None, rebuild=False, network_los=None
+):
+    """
+    Convert omx skims to the zarr skim cache, updating only what has changed.
+
+    The omx matrices are read, converted to the configured float precision and
+    digital encodings, and written to zarr by a pool of `num_processes`
+    processes, with a task for each skim core and time period.
+
+    If the zarr skim cache already exists, only the variables read from omx
+    files modified since the cache was written (or not yet in the cache) are
+    rebuilt.  The whole cache is rebuilt if omx variables have been removed, if
+    the zone or time period coordinates or the zarr digital encodings have
+    changed, or if any variable with a `joint_dict` encoding is stale.
+
+    Parameters
+    ----------
+    state : State
+    skim_tag : str, default "taz"
+    num_processes : int, optional
+        Number of processes to use, defaults to the number of CPUs.
+    rebuild : bool, default False
+        Rebuild the whole zarr skim cache even if parts of it are up to date.
+    network_los : Network_LOS, optional
+        Defaults to the `network_los_preload` injectable.
+
+    Returns
+    -------
+    Path
+        Location of the zarr skim cache
+    """
+    import copy
+    import re
+
+    import dask
+
+    if network_los is None:
+        network_los = state.get_injectable("network_los_preload")
+
+    zarr_file = network_los.zarr_file_name(skim_tag)
+    if zarr_file is None:
+        raise ValueError(f"no zarr file given for {skim_tag} skims in network_los")
+    zarr_file = Path(state.filesystem.get_cache_dir()).joinpath(zarr_file)
+
+    omx_file_paths = state.filesystem.expand_input_file_list(
+        network_los.omx_file_names(skim_tag),
+    )
+    index_names = (
+        ("otap", "dtap", "time_period")
+        if skim_tag == "tap"
+        else ("otaz", "dtaz", "time_period")
+    )
+    time_periods = _dedupe_time_periods(network_los)
+    zarr_digital_encoding = network_los.zarr_pre_encoding(skim_tag) or []
+    ignore = state.settings.omx_ignore_patterns
+
+    variable_sources = _omx_variable_sources(omx_file_paths, ignore=ignore)
+    source_mtimes = {os.path.basename(f): os.path.getmtime(f) for f in omx_file_paths}
+
+    d = sh.dataset.from_omx_3d(
+        [str(f) for f in omx_file_paths],
+        index_names=index_names,
+        time_periods=time_periods,
+        max_float_precision=network_los.skim_max_float_precision(skim_tag),
+        ignore=ignore,
+    )
+
+    # - find out what (if anything) can be kept from an existing cache
+    cached_source_mtimes = None
+    cached_variables = ()
+    if zarr_file.exists() and not rebuild:
+        cached = sh.dataset.from_zarr_with_attr(zarr_file)
+        cached_source_mtimes = cached.attrs.get("OMX_SOURCE_MTIMES")
+        cached_variables = set(cached.variables)
+        if set(cached.attrs.get("OMX_VARIABLES", ())) - set(variable_sources):
+            logger.info(f"omx variables removed, rebuilding {zarr_file}")
+            cached_source_mtimes = None
+        elif cached.attrs.get("ZARR_DIGITAL_ENCODING") != repr(zarr_digital_encoding):
+            logger.info(f"zarr digital encoding changed, rebuilding {zarr_file}")
+            cached_source_mtimes = None
+        elif any(
+            k in cached.coords and not cached[k].equals(d[k])
+            for k in index_names
+            if k in d.coords
+        ):
+            logger.info(f"skim coordinates changed, rebuilding {zarr_file}")
+            cached_source_mtimes = None
+
+    stale = _stale_skim_variables(
+        variable_sources, source_mtimes, cached_source_mtimes, cached_variables
+    )
+    joint_dict_variables = set()
+    for encoding in zarr_digital_encoding:
+        if encoding.get("joint_dict"):
+            joint_dict_variables |= {
+                k for k in variable_sources if re.match(encoding["regex"], k)
+            }
+    if cached_source_mtimes is not None and stale & joint_dict_variables:
+        logger.info(f"joint_dict encoded variables changed, rebuilding {zarr_file}")
+        cached_source_mtimes = None
+        stale = set(variable_sources)
+
+    if not stale:
+        logger.info(f"zarr skims at {zarr_file} are up to date")
+        return zarr_file
+
+    logger.info(
+        f"writing {len(stale)} of {len(variable_sources)} {skim_tag} skim variables "
+        f"to zarr skims at {zarr_file}"
+    )
+
+    d = d[sorted(stale)]
+    # _apply_digital_encoding consumes the encoding dicts, so give it a copy
+    d = _apply_digital_encoding(d, copy.deepcopy(zarr_digital_encoding))
+    d.attrs["OMX_SOURCE_MTIMES"] = source_mtimes
+    d.attrs["OMX_VARIABLES"] = sorted(variable_sources)
+    d.attrs["ZARR_DIGITAL_ENCODING"] = repr(zarr_digital_encoding)
+    d.attrs["ZARR_WRITE_TIME"] = time.time()
+
+    if cached_source_mtimes is None:
+        mode = "w"
+    else:
+        import zarr
+
+        # stale variables are dropped and written anew, as their encoding may differ
+        group = zarr.open_group(str(zarr_file), mode="a")
+        for k in stale & cached_variables:
+            del group[k]
+        mode = "a"
+
+    # each omx matrix (skim core and time period) is a separate dask task
+    with dask.config.set(scheduler="processes", num_workers=num_processes):
+        d.to_zarr_with_attr(zarr_file, mode=mode)
+
+    return zarr_file
+
+
 def _scan_for_unused_names(state, tokens):
     """
     Scan all spec files to find unused skim variable names.
@@ -728,7 +934,6 @@ def load_skim_dataset_to_shared_memory(state, skim_tag="taz") -> xr.Dataset:
     max_float_precision = network_los_preload.skim_max_float_precision(skim_tag)
 
     skim_digital_encoding = network_los_preload.skim_digital_encoding(skim_tag)
-    zarr_digital_encoding = network_los_preload.zarr_pre_encoding(skim_tag)
 
     # The backing can be plain shared_memory, or a memmap
     backing = network_los_preload.skim_backing_store(skim_tag)
@@ -751,27 +956,25 @@ def load_skim_dataset_to_shared_memory(state, skim_tag="taz") -> xr.Dataset:
         d = _use_existing_backing_if_valid(backing, omx_file_paths, skim_tag)
     else:
         d = None  # skims are not stored in shared memory, so we need to load them
-    do_not_save_zarr = False
 
     if d is None:
         time_periods = _dedupe_time_periods(network_los_preload)
         if zarr_file:
-            logger.info(f"looking for zarr skims at {zarr_file}")
-        if zarr_file and os.path.exists(zarr_file):
-            from .util import latest_file_modification_time
-
-            logger.info("found zarr skims, loading them")
-            d = sh.dataset.from_zarr_with_attr(zarr_file)
-            zarr_write_time = d.attrs.get("ZARR_WRITE_TIME", 0)
-            if zarr_write_time < latest_file_modification_time(omx_file_paths):
-                logger.warning("zarr skims older than omx, not using them")
-                do_not_save_zarr = True
-                d = None
+            try:
+                import zarr  # noqa
+
+                # ensure zarr is available before we do all this work
+            except ModuleNotFoundError:
+                logger.warning(
+                    "the 'zarr' package is not installed, cannot cache skims to zarr"
+                )
             else:
+                # (re)build only stale parts of zarr skims, if any
+                convert_omx_to_zarr(state, skim_tag, network_los=network_los_preload)
+                logger.info(f"loading zarr skims from {zarr_file}")
+                d = sh.dataset.from_zarr_with_attr(zarr_file)
                 d = d.max_float_precision(max_float_precision)
         if d is None:
-            if zarr_file and not do_not_save_zarr:
-                logger.info("did not find zarr skims, loading omx")
             omx_file_handles = [
                 openmatrix.open_file(f, mode="r") for f in omx_file_paths
             ]
@@ -787,24 +990,6 @@ def load_skim_dataset_to_shared_memory(state, skim_tag="taz") -> xr.Dataset:
                 ignore=state.settings.omx_ignore_patterns,
             )
 
-            if zarr_file:
-                try:
-                    import zarr  # noqa
-
-                    # ensure zarr is available before we do all this work
-                except ModuleNotFoundError:
-                    logger.warning(
-                        "the 'zarr' package is not installed, "
-                        "cannot cache skims to zarr"
-                    )
-                else:
-                    if zarr_digital_encoding:
-                        d = _apply_digital_encoding(d, zarr_digital_encoding)
-                    logger.info(f"writing zarr skims to {zarr_file}")
-                    d.attrs["ZARR_WRITE_TIME"] = time.time()
-                    if not do_not_save_zarr:
-                        d.to_zarr_with_attr(zarr_file)
-
         if skim_tag in ("taz", "maz"):
             # load sparse MAZ skims, if any
             # these are processed after the ZARR stuff as the GCXS sparse array
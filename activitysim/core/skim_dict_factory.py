@@ -3,11 +3,13 @@
 # from builtins import int
 from __future__ import annotations
 
+import hashlib
 import logging
 import multiprocessing
 import os
 import warnings
 from abc import ABC
+from collections import OrderedDict
 
 import numpy as np
 import openmatrix as omx
@@ -69,6 +71,8 @@ class SkimInfo(object):
                                             ('DRV_COM_WLK_BOARDS', 'AM'): DRV_COM_WLK_BOARDS__AM, ...}
         base_keys:          list of str     e.g. 'BIKEDIST' or 'SOVTOLL_VTOLL' (base key of 3d skim)
         block_offsets:      dict            dict mapping skim key tuple to offset
+        lazy_omx_keys:      dict            like omx_keys, for skims not in skim_manifest (if any), which
+                                            are not preloaded but read from omx file on first lookup
 
         Parameters
         ----------
@@ -88,6 +92,7 @@ class SkimInfo(object):
         self.omx_keys = None
         self.base_keys = None
         self.block_offsets = None
+        self.lazy_omx_keys = {}
 
         if skim_tag:
             self.load_skim_info(state, skim_tag)
@@ -163,6 +168,25 @@ class SkimInfo(object):
 
             self.omx_keys[skim_key] = skim_name
 
+        # - only preload skims in skim_manifest (if any), the rest are read on demand
+        skim_manifest = self.network_los.skim_manifest
+        if skim_manifest is not None and skim_tag in skim_manifest:
+            preload = set(skim_manifest[skim_tag] or [])
+            unknown = preload - set(self.omx_keys.values())
+            if unknown:
+                logger.warning(
+                    f"load_skim_info {skim_tag} ignoring {len(unknown)} skim_manifest skims "
+                    f"not in omx files: {sorted(unknown)[:5]}"
+                )
+            self.lazy_omx_keys = {
+                k: v for k, v in self.omx_keys.items() if v not in preload
+            }
+            self.omx_keys = {k: v for k, v in self.omx_keys.items() if v in preload}
+            logger.info(
+                f"load_skim_info {skim_tag} preloading {len(self.omx_keys)} of "
+                f"{len(self.omx_keys) + len(self.lazy_omx_keys)} skims in skim_manifest"
+            )
+
         self.num_skims = len(self.omx_keys)
 
         # - key1_subkeys dict maps key1 to dict of subkeys with that key1
@@ -210,7 +234,13 @@ class SkimInfo(object):
             self.skim_data_shape = self.omx_shape + (self.num_skims,)
 
         # list of base keys (keys
-        self.base_keys = tuple(k for k in key1_block_offsets.keys())
+        # (including those of skims not preloaded, as they can still be looked up)
+        lazy_base_keys = [
+            k[0] if isinstance(k, tuple) else k for k in self.lazy_omx_keys
+        ]
+        self.base_keys = tuple(
+            OrderedDict.fromkeys(list(key1_block_offsets.keys()) + lazy_base_keys)
+        )
 
     def print(self):
         print(f"SkimInfo for {self.skim_tag}")
@@ -263,9 +293,16 @@ class AbstractSkimFactory(ABC):
     def _skim_data_from_buffer(self, skim_info, skim_buffer):
         assert False, "Not supported"
 
-    def _memmap_skim_data_path(self, skim_tag):
+    def _memmap_skim_data_path(self, skim_info):
+        file_name = f"cached_{skim_info.skim_tag}"
+        if skim_info.lazy_omx_keys:
+            # cache of skims preloaded according to skim_manifest is specific to that manifest
+            digest = hashlib.md5(
+                "\n".join(sorted(skim_info.omx_keys.values())).encode("utf-8")
+            ).hexdigest()
+            file_name = f"{file_name}_{digest[:8]}"
         return os.path.join(
-            self.network_los.state.filesystem.get_cache_dir(), f"cached_{skim_tag}.mmap"
+            self.network_los.state.filesystem.get_cache_dir(), f"{file_name}.mmap"
         )
 
     def load_skim_info(self, state, skim_tag):
@@ -321,7 +358,7 @@ class AbstractSkimFactory(ABC):
 
         dtype = np.dtype(skim_info.dtype_name)
 
-        skim_cache_path = self._memmap_skim_data_path(skim_info.skim_tag)
+        skim_cache_path = self._memmap_skim_data_path(skim_info)
 
         if not os.path.isfile(skim_cache_path):
             logger.warning(f"read_skim_cache file not found: {skim_cache_path}")
@@ -353,7 +390,7 @@ class AbstractSkimFactory(ABC):
 
         dtype = np.dtype(skim_info.dtype_name)
 
-        skim_cache_path = self._memmap_skim_data_path(skim_info.skim_tag)
+        skim_cache_path = self._memmap_skim_data_path(skim_info)
 
         logger.info(
             f"writing skim cache {skim_info.skim_tag} {skim_info.skim_data_shape} to {skim_cache_path}"
@@ -601,7 +638,7 @@ class MemMapSkimFactory(AbstractSkimFactory):
             skim_tag
         )
 
-        skim_cache_path = self._memmap_skim_data_path(skim_tag)
+        skim_cache_path = self._memmap_skim_data_path(skim_info)
         if not os.path.isfile(skim_cache_path):
             self.copy_omx_to_mmap_file(skim_info)
 
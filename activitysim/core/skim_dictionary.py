@@ -7,6 +7,7 @@ import logging
 from builtins import object, range
 
 import numpy as np
+import openmatrix as omx
 import pandas as pd
 
 from activitysim.core import workflow
@@ -166,6 +167,13 @@ class SkimDict:
         self.skim_tag = skim_tag
         self.skim_info = skim_info
         self.usage = set()  # track keys of skims looked up
+        self.dim3_usage = {}  # track dim3 keys of 3d skims looked up, keyed by key1
+
+        # dim3 keys of 3d lookups are only needed to write the skim_manifest
+        try:
+            self.track_dim3_usage = "track_skim_usage" in (state.settings.models or [])
+        except StateAccessError:
+            self.track_dim3_usage = False
 
         try:
             self.time_label_dtype = pd.api.types.CategoricalDtype(
@@ -203,6 +211,12 @@ class SkimDict:
             f"SkimDict.build_3d_skim_block_offset_table registered {len(self.skim_dim3)} 3d keys"
         )
 
+        # - skims in the omx files that were not preloaded (because they are not in the skim_manifest)
+        # are faulted in to lazy_skim_data on first lookup, and addressed by negative block offsets
+        self.lazy_omx_keys = getattr(skim_info, "lazy_omx_keys", None) or {}
+        self.lazy_skim_data = []
+        self.lazy_block_offsets = {}
+
     def _offset_mapper(self, state):
         """
         Return an OffsetMapper to set self.offset_mapper for use with skims
@@ -247,6 +261,96 @@ class SkimDict:
         """
         return self.usage
 
+    def get_skim_manifest(self):
+        """
+        return sorted list of omx keys of skims looked up, e.g. ['DIST', 'SOV_TIME__AM']
+
+        Unlike get_skim_usage, 3d skims are only listed for the dim3 keys (time periods)
+        actually looked up, so the result can be used as a skim_manifest to preload only
+        these skims in subsequent runs.  The dim3 keys are only tracked if
+        track_dim3_usage is set (by default, if the track_skim_usage step is in models).
+
+        Returns
+        -------
+        list of str
+        """
+        omx_keys = {**self.skim_info.omx_keys, **self.lazy_omx_keys}
+        used = set()
+        for skim_key, omx_key in omx_keys.items():
+            if skim_key in self.usage:
+                used.add(omx_key)
+            elif isinstance(skim_key, tuple):
+                key1, key2 = skim_key
+                if key2 in self.dim3_usage.get(key1, ()):
+                    used.add(omx_key)
+        return sorted(used)
+
+    def _fault_in(self, skim_key):
+        """
+        Read a skim that was not preloaded from its omx file, and return its block offset
+
+        Parameters
+        ----------
+        skim_key : str or tuple of str
+
+        Returns
+        -------
+        int
+            negative block offset of skim in lazy_skim_data
+        """
+        omx_key = self.lazy_omx_keys[skim_key]
+        omx_file_path = self.skim_info.omx_manifest[omx_key]
+
+        logger.warning(
+            f"SkimDict {self.skim_tag} loading skim '{omx_key}' not in skim_manifest "
+            f"from {omx_file_path}"
+        )
+
+        with omx.open_file(omx_file_path, mode="r") as omx_file:
+            data = np.asarray(omx_file[omx_key][:], dtype=self.dtype)
+
+        self.lazy_skim_data.append(data)
+        block_offset = self.lazy_block_offsets[skim_key] = -len(self.lazy_skim_data)
+
+        if isinstance(skim_key, tuple):
+            key1, key2 = skim_key
+            self.skim_dim3.setdefault(key1, {})[key2] = block_offset
+
+        return block_offset
+
+    def _block_offset(self, key):
+        """
+        Return block offset of skim key, faulting it in if it was not preloaded, or None if not in skims
+        """
+        block_offset = self.skim_info.block_offsets.get(key)
+        if block_offset is None:
+            block_offset = self.lazy_block_offsets.get(key)
+        if block_offset is None and key in self.lazy_omx_keys:
+            block_offset = self._fault_in(key)
+        return block_offset
+
+    def _lookup_blocks(self, mapped_orig, mapped_dest, block_offsets):
+        """
+        Gather skim values from skim_data or (for negative block_offsets) lazy_skim_data
+        """
+        block_offsets = np.broadcast_to(block_offsets, mapped_orig.shape)
+        result = np.empty(mapped_orig.shape, dtype=self.dtype)
+        for block_offset in np.unique(block_offsets):
+            rows = block_offsets == block_offset
+            if block_offset < 0:
+                result[rows] = self.lazy_skim_data[-block_offset - 1][
+                    mapped_orig[rows], mapped_dest[rows]
+                ]
+            elif ROW_MAJOR_LAYOUT:
+                result[rows] = self.skim_data[
+                    block_offset, mapped_orig[rows], mapped_dest[rows]
+                ]
+            else:
+                result[rows] = self.skim_data[
+                    mapped_orig[rows], mapped_dest[rows], block_offset
+                ]
+        return result
+
     def _lookup(self, orig, dest, block_offsets):
         """
         Return list of skim values of skims(s) at orig/dest for the skim(s) at block_offset in skim_data
@@ -274,7 +378,9 @@ class SkimDict:
 
         mapped_orig = self.offset_mapper.map(orig)
         mapped_dest = self.offset_mapper.map(dest)
-        if ROW_MAJOR_LAYOUT:
+        if self.lazy_skim_data and np.min(block_offsets) < 0:
+            result = self._lookup_blocks(mapped_orig, mapped_dest, block_offsets)
+        elif ROW_MAJOR_LAYOUT:
             result = self.skim_data[block_offsets, mapped_orig, mapped_dest]
         else:
             result = self.skim_data[mapped_orig, mapped_dest, block_offsets]
@@ -323,7 +429,7 @@ class SkimDict:
 
         self.usage.add(key)
 
-        block_offset = self.skim_info.block_offsets.get(key)
+        block_offset = self._block_offset(key)
         assert block_offset is not None, f"SkimDict lookup key '{key}' not in skims"
 
         try:
@@ -361,7 +467,20 @@ class SkimDict:
         Numpy.ndarray: list of skim values
         """
 
-        self.usage.add(key)  # should we keep usage stats by (key, dim3)?
+        self.usage.add(key)
+
+        if self.track_dim3_usage or self.lazy_omx_keys:
+            dim3_keys = pd.unique(np.asanyarray(dim3).ravel())
+        if self.track_dim3_usage:
+            self.dim3_usage.setdefault(key, set()).update(dim3_keys)
+
+        # fault in any skims for these dim3 keys that were not preloaded
+        if self.lazy_omx_keys:
+            for key2 in dim3_keys:
+                if (key, key2) in self.lazy_omx_keys and key2 not in self.skim_dim3.get(
+                    key, {}
+                ):
+                    self._fault_in((key, key2))
 
         assert key in self.skim_dim3, f"3d skim key {key} not in skims."
 
@@ -625,7 +744,7 @@ class MazSkimDict(SkimDict):
     MazSkimDict provides a facade that allows skim-like lookup by maz orig,dest zone_id
     when there are often too many maz zones to create maz skims.
 
-    Dependencies: network_los.load_data must have already loaded: taz skim_dict, maz_to_maz_df, and maz_taz_df
+    Dependencies: network_los.load_data must have already loaded: taz skim_dict, maz_to_maz_csr, and maz_taz_df
 
     It performs lookups from a sparse list of maz-maz od pairs on selected attributes (e.g. WALKDIST)
     where accuracy for nearby od pairs is critical. And is backed by a fallback taz skim dict
@@ -634,7 +753,7 @@ class MazSkimDict(SkimDict):
 
     def __init__(self, state: workflow.State, skim_tag, network_los, taz_skim_dict):
         """
-        we need network_los because we have dependencies on network_los.load_data (e.g. maz_to_maz_df, maz_taz_df,
+        we need network_los because we have dependencies on network_los.load_data (e.g. maz_to_maz_csr, maz_taz_df,
         and the fallback taz skim_dict)
 
         We require taz_skim_dict as an explicit parameter to emphasize that we are piggybacking on taz_skim_dict's
@@ -671,6 +790,7 @@ class MazSkimDict(SkimDict):
             skim_info.omx_keys = taz_skim_dict.skim_info.omx_keys
             skim_info.base_keys = taz_skim_dict.skim_info.base_keys
             skim_info.block_offsets = taz_skim_dict.skim_info.block_offsets
+            skim_info.lazy_omx_keys = taz_skim_dict.skim_info.lazy_omx_keys
 
             skim_info.offset_map = recode_based_on_table(
                 state, taz_skim_dict.skim_info.offset_map, "land_use_taz"
@@ -685,9 +805,9 @@ class MazSkimDict(SkimDict):
 
         self.dtype = np.dtype(self.skim_info.dtype_name)
         self.base_keys = taz_skim_dict.skim_info.base_keys
-        if network_los.maz_to_maz_df is not None:
+        if network_los.maz_to_maz_csr is not None:
             self.sparse_keys = list(
-                set(network_los.maz_to_maz_df.columns) - {"OMAZ", "DMAZ"}
+                set(network_los.maz_to_maz_csr.columns) - {"OMAZ", "DMAZ"}
             )
         else:
             self.sparse_keys = []
@@ -767,7 +887,13 @@ class MazSkimDict(SkimDict):
         assert not (np.isnan(orig) | np.isnan(dest)).any()
 
         # we want values from mazpairs, where we have them
-        values = self.network_los.get_mazpairs(orig, dest, key)
+        # (along with distance skim if a different key was specified by blend_distance_skim_name)
+        if max_blend_distance > 0 and blend_distance_skim_name != key:
+            values, distance = self.network_los.get_mazpairs(
+                orig, dest, [key, blend_distance_skim_name]
+            ).T
+        else:
+            values = distance = self.network_los.get_mazpairs(orig, dest, key)
 
         is_nan = np.isnan(values)
 
@@ -778,14 +904,6 @@ class MazSkimDict(SkimDict):
 
             backstop_values = super().lookup(orig, dest, key)
 
-            # get distance skim if a different key was specified by blend_distance_skim_name
-            if blend_distance_skim_name != key:
-                distance = self.network_los.get_mazpairs(
-                    orig, dest, blend_distance_skim_name
-                )
-            else:
-                distance = values
-
             # for distances less than max_blend_distance, we blend maz-maz and skim backstop values
             # shorter distances have less fractional backstop, and more maz-maz
             # beyond max_blend_distance, just use the skim values
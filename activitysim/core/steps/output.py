@@ -10,6 +10,7 @@ import pandas as pd
 import pyarrow as pa
 import pyarrow.csv as csv
 import pyarrow.parquet as parquet
+import yaml
 
 from activitysim.core import configuration, workflow
 from activitysim.core.workflow.checkpoint import CHECKPOINT_NAME
@@ -22,10 +23,14 @@ def track_skim_usage(state: workflow.State) -> None:
     """
     write statistics on skim usage (diagnostic to detect loading of un-needed skims)
 
-    FIXME - have not yet implemented a facility to avoid loading of unused skims
+    Also writes skim_manifest.yaml listing the omx keys of the skims used, which can be
+    specified as the network_los skim_manifest setting of subsequent runs to preload only
+    these skims (not available when sharrow is enabled).
 
     FIXME - if resume_after, this will only reflect skims used after resume
 
+    FIXME - if multiprocessing, this will only reflect skims used by the process running this step
+
     Parameters
     ----------
     output_dir: str
@@ -58,6 +63,21 @@ def track_skim_usage(state: workflow.State) -> None:
         for key in unused:
             print(key, file=output_file)
 
+    skim_manifest = {}
+    for d in state.get_injectable("network_los").skim_dicts.values():
+        if hasattr(d, "get_skim_manifest"):
+            skim_manifest.setdefault(d.skim_info.skim_tag, set()).update(
+                d.get_skim_manifest()
+            )
+    if skim_manifest:
+        with open(
+            state.filesystem.get_output_file_path("skim_manifest.yaml"), "w"
+        ) as output_file:
+            yaml.safe_dump(
+                {skim_tag: sorted(keys) for skim_tag, keys in skim_manifest.items()},
+                output_file,
+            )
+
 
 def previous_write_data_dictionary(state: workflow.State, output_dir):
     """
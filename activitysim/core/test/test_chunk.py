@@ -0,0 +1,55 @@
+# ActivitySim
+# See full license in LICENSE.txt.
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from activitysim.core import chunk, workflow
+
+
+def test_estimate_row_size():
+    # expression values, utilities and probs, plus rands, positions and choices
+    assert chunk.estimate_row_size(3, num_expressions=10) == 2 * (16 + 3) * 8
+
+    # plus nested exp utilities, nested probabilities, logsums and base probabilities
+    assert chunk.estimate_row_size(3, num_expressions=10, num_nest_nodes=5) == (
+        2 * (16 + 3 + 14) * 8
+    )
+
+    # interaction rows of alternative and chooser columns and index, with
+    # expression values, utilities and probs
+    row_size = chunk.estimate_row_size(
+        4,
+        num_expressions=10,
+        sample_size=4,
+        interaction_dtypes=[np.dtype(np.int32), np.dtype(np.float64)],
+        chooser_dtypes=[np.dtype(np.int64), pd.CategoricalDtype(["a", "b"])],
+    )
+    assert row_size == 2 * (4 * (4 + 8 + 8 + 1 + 8 + 3 * 8) + 3 * 8)
+
+
+@pytest.mark.parametrize("estimate", [False, True])
+def test_initial_rows_from_estimate(tmp_path, estimate):
+    for d in ("configs", "data", "output"):
+        tmp_path.joinpath(d).mkdir()
+    state = workflow.State().initialize_filesystem(working_dir=tmp_path)
+    state.default_settings()
+    state.settings.chunk_training_mode = "adaptive"
+    state.settings.chunk_size = 1 << 50
+    state.settings.estimate_chunk_row_size = estimate
+
+    choosers = pd.DataFrame({"x": np.arange(1000)})
+    chunk_lengths = [
+        len(chooser_chunk)
+        for _i, chooser_chunk, _trace_label, _chunk_sizer in chunk.adaptive_chunked_choosers(
+            state, choosers, "test", estimated_row_size=1000
+        )
+    ]
+
+    if estimate:
+        # the estimated row size fits all choosers in the first chunk
+        assert chunk_lengths == [1000]
+    else:
+        assert chunk_lengths[0] == state.settings.default_initial_rows_per_chunk
@@ -140,6 +140,56 @@ def test_make_choices_real_probs(utilities):
     )
 
 
+def test_choose_from_utils(utilities):
+    state = workflow.State().default_settings()
+    choices, rands, choice_probs, logsums = logit.choose_from_utils(
+        state, utilities, return_logsums=True
+    )
+
+    pdt.assert_series_equal(
+        choices,
+        pd.Series([1, 2], index=[0, 1]),
+        check_dtype=False,
+    )
+
+    probs, expected_logsums = logit.utils_to_probs(
+        state, utilities, trace_label=None, return_logsums=True
+    )
+    np.testing.assert_allclose(
+        choice_probs, probs.values[np.arange(len(probs)), choices.values]
+    )
+    pdt.assert_series_equal(logsums, expected_logsums)
+
+
+def test_choose_from_utils_matches_make_choices():
+    state = workflow.State().default_settings()
+    utils = pd.DataFrame(np.random.RandomState(42).normal(size=(1000, 12)) * 3)
+    utils.iloc[::7, 3] = -999  # unavailable alternatives
+
+    choices, rands, choice_probs = logit.choose_from_utils(state, utils.copy())
+
+    probs = logit.utils_to_probs(state, utils.copy(), trace_label=None)
+    expected_choices, expected_rands = logit.make_choices(state, probs)
+
+    pdt.assert_series_equal(choices, expected_choices, check_dtype=False)
+    pdt.assert_series_equal(rands, expected_rands)
+
+
+def test_choose_from_utils_raises():
+    state = workflow.State().default_settings()
+    idx = pd.Index(name="household_id", data=[1, 2])
+    utils = pd.DataFrame([[1, 2, 3, 4], [1, np.nan, 3, 4]], index=idx, dtype=float)
+
+    with pytest.raises(RuntimeError) as excinfo:
+        logit.choose_from_utils(state, utils, trace_label=None)
+    assert "probabilities do not add up to 1" in str(excinfo.value)
+
+    choices, rands, choice_probs = logit.choose_from_utils(
+        state, utils, trace_label=None, allow_bad_probs=True
+    )
+    assert choice_probs[2] == 0.0
+
+
 @pytest.fixture(scope="module")
 def interaction_choosers():
     return pd.DataFrame({"attr": ["a", "b", "c", "b"]}, index=["w", "x", "y", "z"])
@@ -188,3 +238,192 @@ def test_interaction_dataset_sampled(interaction_choosers, interaction_alts):
 
     interacted, expected = interacted.align(expected, axis=1)
     pdt.assert_frame_equal(interacted, expected)
+
+
+def test_interaction_dataset_lazy(interaction_choosers, interaction_alts):
+
+    choosers = interaction_choosers.reset_index(drop=True)
+    choosers["prop"] = [1, 2, 3, 4]  # duplicate column name gets a _chooser suffix
+    choosers.index.name = "chooser_id"
+
+    kwargs = dict(sample_size=2, alt_index_id="alt_id", chooser_index_id="_chooser_id")
+
+    state = workflow.State().default_settings()
+    state.get_rn_generator().set_base_seed(0)
+    state.get_rn_generator().begin_step("test_step")
+    state.get_rn_generator().add_channel("choosers", choosers)
+    expected = logit.interaction_dataset(state, choosers, interaction_alts, **kwargs)
+    state.get_rn_generator().end_step("test_step")
+
+    # same step, so same sample
+    state.get_rn_generator().begin_step("test_step")
+    lazy = logit.interaction_dataset(
+        state, choosers, interaction_alts, lazy=True, **kwargs
+    )
+    state.get_rn_generator().end_step("test_step")
+
+    assert len(lazy) == len(expected)
+    assert set(lazy.columns) == set(expected.columns)
+    assert "prop_chooser" in lazy
+    pdt.assert_index_equal(lazy.index, expected.index)
+
+    pdt.assert_frame_equal(lazy.to_frame()[expected.columns], expected)
+    pdt.assert_series_equal(lazy["prop_chooser"], expected["prop_chooser"])
+    pdt.assert_series_equal(lazy.attr, expected.attr)
+
+    rows = np.array([True, False] * 4)
+    pdt.assert_frame_equal(lazy[rows][expected.columns], expected[rows])
+
+    for expr in ["prop * prop_chooser", "(attr == 'b') & (prop > 10)"]:
+        pdt.assert_series_equal(lazy.eval(expr), expected.eval(expr), check_names=False)
+
+    # locals are resolved from additional resolvers
+    pdt.assert_series_equal(
+        lazy.eval("prop * k", resolvers=[{"k": 2}]),
+        expected.eval("prop * k", resolvers=[{"k": 2}]),
+        check_names=False,
+    )
+
+
+@pytest.fixture(scope="module")
+def nest_spec():
+    return {
+        "name": "root",
+        "coefficient": 1.0,
+        "alternatives": [
+            {
+                "name": "motorized",
+                "coefficient": 0.72,
+                "alternatives": [
+                    "car",
+                    {
+                        "name": "transit",
+                        "coefficient": 0.5,
+                        "alternatives": [f"transit_{i}" for i in range(9)],
+                    },
+                ],
+            },
+            {
+                "name": "nonmotorized",
+                "coefficient": 0.72,
+                "alternatives": ["walk", "bike"],
+            },
+        ],
+    }
+
+
+def test_nest_tree(nest_spec):
+    state = workflow.State().default_settings()
+    tree = logit.nest_tree(nest_spec)
+    assert logit.nest_tree(dict(nest_spec)) is tree
+    assert tree.names[tree.root] == "root"
+
+    leaves = [nest.name for nest in logit.each_nest(nest_spec, type="leaf")]
+    rng = np.random.RandomState(0)
+    raw_utilities = pd.DataFrame(rng.normal(size=(500, len(leaves))), columns=leaves)
+    raw_utilities.iloc[::5, 2:] = -999  # transit unavailable
+    raw_utilities.iloc[::7, -2:] = -999  # nonmotorized unavailable
+
+    # reference per-nest computation
+    expected_exp_utilities = pd.DataFrame(index=raw_utilities.index)
+    for nest in logit.each_nest(nest_spec, post_order=True):
+        if nest.is_leaf:
+            u = raw_utilities[nest.name] / nest.product_of_coefficients
+        else:
+            with np.errstate(divide="ignore"):
+                u = nest.coefficient * np.log(
+                    expected_exp_utilities[nest.alternatives].sum(axis=1)
+                )
+        expected_exp_utilities[nest.name] = np.exp(u)
+
+    expected_nested_probs = pd.concat(
+        [
+            logit.utils_to_probs(
+                state,
+                expected_exp_utilities[nest.alternatives].copy(),
+                exponentiated=True,
+                allow_zero_probs=True,
+                overflow_protection=False,
+            )
+            for nest in logit.each_nest(nest_spec, type="node")
+        ],
+        axis=1,
+    )
+
+    expected_base_probs = pd.DataFrame(
+        {
+            nest.name: expected_nested_probs[nest.ancestors[1:]].prod(axis=1)
+            for nest in logit.each_nest(nest_spec, type="leaf")
+        }
+    )
+
+    exp_utilities = tree.exp_utilities(raw_utilities)
+    np.testing.assert_array_equal(
+        exp_utilities[:, :-1], expected_exp_utilities[tree.names].values
+    )
+    np.testing.assert_array_equal(
+        tree.logsums(exp_utilities), np.log(expected_exp_utilities.root.values)
+    )
+
+    nested_probs = tree.nested_probabilities(state, exp_utilities)
+    np.testing.assert_array_equal(
+        nested_probs[:, tree.nested_probability_positions],
+        expected_nested_probs.values,
+    )
+    assert tree.nested_probability_names == list(expected_nested_probs.columns)
+
+    alternatives = list(reversed(leaves))
+    np.testing.assert_array_equal(
+        tree.base_probabilities(nested_probs, alternatives),
+        expected_base_probs[alternatives].values,
+    )
+
+
+@pytest.mark.parametrize("sample_size", [None, 3])
+def test_interaction_simulate_lazy(sample_size):
+
+    from activitysim.core import interaction_simulate
+    from activitysim.core.configuration.base import ComputeSettings
+
+    rng = np.random.default_rng(3)
+    choosers = pd.DataFrame(
+        {"income": rng.integers(1, 100, 20), "size": rng.integers(1, 5, 20)},
+        index=pd.Index(np.arange(20) + 100, name="person_id"),
+    )
+    alternatives = pd.DataFrame(
+        {"size": [1, 2, 3, 4, 5], "cost": [5.0, 1.0, 3.0, 2.0, 4.0]},
+        index=pd.Index([11, 12, 13, 14, 15], name="zone_id"),
+    )
+    spec = pd.DataFrame(
+        {"coefficient": [0.1, -0.5, 0.2, 0.05, 1.0]},
+        index=pd.Index(
+            [
+                "income * cost / 100",
+                "size == size_chooser",
+                # index names resolve as for DataFrame.eval on the eager dataset
+                "zone_id % 2",
+                "(zone_id > 12) * income / 10",
+                "@df.cost * (df.income > 50)",
+            ],
+            name="Expression",
+        ),
+    )
+
+    results = {}
+    for lazy in (False, True):
+        state = workflow.State().default_settings()
+        state.get_rn_generator().set_base_seed(0)
+        state.get_rn_generator().add_channel("persons", choosers)
+        state.get_rn_generator().begin_step("test_step")
+        results[lazy] = interaction_simulate.interaction_simulate(
+            state,
+            choosers,
+            alternatives,
+            spec,
+            sample_size=sample_size,
+            trace_label="test",
+            compute_settings=ComputeSettings(lazy_interaction_dataset=lazy),
+        )
+        state.get_rn_generator().end_step("test_step")
+
+    pdt.assert_series_equal(results[True], results[False])
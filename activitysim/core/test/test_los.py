@@ -11,7 +11,7 @@ import pandas.testing as pdt
 import pytest
 
 import activitysim.abm.tables  # noqa  -- load table defs
-from activitysim.core import exceptions, los, workflow
+from activitysim.core import exceptions, los, util, workflow
 
 
 def add_canonical_dirs(configs_dir_name):
@@ -87,6 +87,73 @@ def test_one_zone():
     )
 
 
+def test_skim_manifest(tmp_path):
+
+    state = add_canonical_dirs("configs_1z").load_settings()
+    network_los = los.Network_LOS(state)
+    network_los.load_data()
+
+    od_df = pd.DataFrame(
+        {"orig": [5, 23, 23, 23], "dest": [7, 20, 21, 22], "period": list("AAPA")}
+    )
+    od_df["period"] = od_df.period.map({"A": "AM", "P": "PM"})
+
+    def lookup_skims(skim_dict):
+        skims = skim_dict.wrap("orig", "dest")
+        skims.set_df(od_df)
+        skims3d = skim_dict.wrap_3d("orig", "dest", "period")
+        skims3d.set_df(od_df)
+        return skims["DIST"], skims["DISTWALK"], skims3d["DRV_COM_WLK_BOARDS"]
+
+    skim_dict = network_los.get_default_skim_dict()
+
+    # dim3 keys of 3d lookups are not tracked unless track_skim_usage is run
+    assert not skim_dict.track_dim3_usage
+    lookup_skims(skim_dict)
+    assert skim_dict.dim3_usage == {}
+
+    skim_dict.track_dim3_usage = True
+    expected = lookup_skims(skim_dict)
+    assert skim_dict.get_skim_manifest() == [
+        "DIST",
+        "DISTWALK",
+        "DRV_COM_WLK_BOARDS__AM",
+        "DRV_COM_WLK_BOARDS__PM",
+    ]
+
+    # preload only some of the skims used, the others are loaded on first lookup
+    configs_dir = os.path.join(os.path.dirname(__file__), "los/configs_1z")
+    with open(os.path.join(configs_dir, "network_los.yaml")) as f:
+        network_los_yaml = f.read()
+    (tmp_path / "network_los.yaml").write_text(
+        network_los_yaml + "\nskim_manifest: skim_manifest.yaml\n"
+    )
+    (tmp_path / "skim_manifest.yaml").write_text(
+        "taz: [DIST, DRV_COM_WLK_BOARDS__AM]\n"
+    )
+    state = workflow.State()
+    state.initialize_filesystem(
+        working_dir=os.path.dirname(__file__),
+        configs_dir=(tmp_path, configs_dir),
+        output_dir=os.path.join(os.path.dirname(__file__), "output"),
+        data_dir=(os.path.join(os.path.dirname(__file__), "los/data"),),
+    )
+    network_los = los.Network_LOS(state.load_settings())
+    network_los.load_data()
+
+    skim_dict = network_los.get_default_skim_dict()
+    assert skim_dict.skim_info.num_skims == 2
+    assert "DISTWALK" in skim_dict.skim_info.base_keys
+
+    for result, expected_result in zip(lookup_skims(skim_dict), expected):
+        pdt.assert_series_equal(result, expected_result)
+    assert len(skim_dict.lazy_skim_data) == 2  # DISTWALK and DRV_COM_WLK_BOARDS__PM
+
+    # already loaded skims are not loaded again
+    lookup_skims(skim_dict)
+    assert len(skim_dict.lazy_skim_data) == 2
+
+
 def test_two_zone():
 
     state = add_canonical_dirs("configs_2z").load_settings()
@@ -137,6 +204,86 @@ def test_two_zone():
         pdt.assert_series_equal(skims["DIST"], dist)
 
 
+def test_maz_to_maz_csr():
+
+    state = add_canonical_dirs("configs_2z").load_settings()
+
+    network_los = los.Network_LOS(state)
+    network_los.load_data()
+    assert network_los.maz_to_maz_csr is not None
+    # the maz_to_maz DataFrame is dropped once indexed
+    assert not hasattr(network_los, "maz_to_maz_df")
+    maz_to_maz_df = network_los.read_maz_to_maz_df()
+
+    # all od pairs in maz_to_maz table, some pairs not in it and some out of range mazs
+    rng = np.random.default_rng(0)
+    keys = maz_to_maz_df.index.to_numpy()
+    omaz, dmaz = np.divmod(keys, network_los.maz_ceiling)
+    omaz = np.concatenate([omaz, rng.integers(0, network_los.maz_ceiling, 500), [-1]])
+    dmaz = np.concatenate([dmaz, rng.integers(0, network_los.maz_ceiling, 500), [1]])
+
+    i = omaz * network_los.maz_ceiling + dmaz
+    for attribute in ["DIST", "DISTBIKE"]:
+        expected = util.quick_loc_df(i, maz_to_maz_df, attribute)
+        npt.assert_array_equal(
+            network_los.get_mazpairs(omaz, dmaz, attribute), expected.to_numpy()
+        )
+
+    both = network_los.get_mazpairs(omaz, dmaz, ["DISTBIKE", "DIST"])
+    assert both.shape == (len(omaz), 2)
+    npt.assert_array_equal(both[:, 1], network_los.get_mazpairs(omaz, dmaz, "DIST"))
+    assert np.isnan(both[-1]).all()
+
+
+def test_shared_maz_buffers():
+
+    state = add_canonical_dirs("configs_3z").load_settings()
+
+    network_los = los.Network_LOS(state)
+    network_los.load_data()
+
+    # buffers allocated by the parent process and wrapped by subprocess load_data
+    preload = los.Network_LOS(state)
+    data_buffers = preload.allocate_shared_maz_buffers()
+    for skim_tag, skim_info in preload.skims_info.items():
+        buffer = preload.skim_dict_factory.allocate_skim_buffer(skim_info)
+        preload.skim_dict_factory.load_skims_to_buffer(skim_info, buffer)
+        data_buffers[skim_tag] = buffer
+    assert "maz_to_maz_csr.data" in data_buffers
+    assert "maz_to_tap.walk.MAZ" in data_buffers
+
+    shared_state = add_canonical_dirs("configs_3z").load_settings()
+    shared_state.add_injectable("data_buffers", data_buffers)
+    shared_los = los.Network_LOS(shared_state)
+    shared_los.load_data()
+
+    assert shared_los.maz_to_maz_csr.columns == network_los.maz_to_maz_csr.columns
+    assert np.shares_memory(
+        shared_los.maz_to_maz_csr.data,
+        np.ctypeslib.as_array(data_buffers["maz_to_maz_csr.data"]),
+    )
+
+    omaz, dmaz = np.divmod(
+        network_los.read_maz_to_maz_df().index.to_numpy(), network_los.maz_ceiling
+    )
+    npt.assert_array_equal(
+        shared_los.get_mazpairs(omaz, dmaz, ["DIST", "DISTBIKE"]),
+        network_los.get_mazpairs(omaz, dmaz, ["DIST", "DISTBIKE"]),
+    )
+
+    # blended MazSkimDict distances
+    od_df = pd.DataFrame({"orig": omaz, "dest": dmaz})
+    skims = network_los.get_default_skim_dict().wrap("orig", "dest")
+    skims.set_df(od_df)
+    shared_skims = shared_los.get_default_skim_dict().wrap("orig", "dest")
+    shared_skims.set_df(od_df)
+    pdt.assert_series_equal(shared_skims["DIST"], skims["DIST"])
+
+    assert shared_los.maz_to_tap_dfs.keys() == network_los.maz_to_tap_dfs.keys()
+    for mode, df in network_los.maz_to_tap_dfs.items():
+        pdt.assert_frame_equal(shared_los.maz_to_tap_dfs[mode], df)
+
+
 def test_three_zone():
 
     state = add_canonical_dirs("configs_3z").load_settings()
@@ -235,3 +382,60 @@ def test_skim_time_periods_future_warning():
         network_los = los.Network_LOS(
             state, los_settings_file_name="settings_legacy_hours_key.yaml"
         )
+
+
+def test_persistent_tvpb_cache(tmp_path):
+
+    state = add_canonical_dirs("configs_3z").load_settings()
+    state.filesystem.cache_dir = tmp_path
+
+    network_los = los.Network_LOS(state)
+    network_los.los_settings.persistent_tvpb_cache = True
+    network_los.load_data()
+
+    tap_cache = network_los.tvpb.tap_cache
+    uid_calculator = network_los.tvpb.uid_calculator
+    num_combinations = uid_calculator.skim_shape[0]
+    assert tap_cache.persistent
+    assert tap_cache.missing_offsets() == list(range(num_combinations))
+    assert not tap_cache.cache_exists
+
+    data = np.random.default_rng(0).random(uid_calculator.skim_shape)
+    data = data.astype(np.float32)
+    for offset in range(num_combinations - 1):
+        tap_cache.write_chunk(offset, data[offset])
+    assert tap_cache.missing_offsets() == [num_combinations - 1]
+    with pytest.raises(RuntimeError, match="incomplete"):
+        tap_cache.open()
+    tap_cache.is_open = False
+
+    # partially populated cache leaves missing attribute combinations as they are
+    loaded = np.full(uid_calculator.skim_shape, np.nan, dtype=np.float32)
+    assert tap_cache.read_chunks(loaded) == num_combinations - 1
+    npt.assert_array_equal(loaded[:-1], data[:-1])
+    assert np.isnan(loaded[-1]).all()
+
+    tap_cache.write_chunk(num_combinations - 1, data[-1])
+    assert tap_cache.cache_exists
+    tap_cache.open()
+    npt.assert_array_equal(
+        tap_cache.data, data.reshape(uid_calculator.fully_populated_shape)
+    )
+    tap_cache.close()
+
+    # cache is versioned by the tap skims and settings
+    cache_version = tap_cache.cache_version
+    state.filesystem.cache_dir = tmp_path
+    other_los = los.Network_LOS(state)
+    other_los.los_settings.persistent_tvpb_cache = True
+    other_los.load_data()
+    assert other_los.tvpb.tap_cache.cache_version == cache_version
+    assert other_los.tvpb.tap_cache.cache_exists
+
+    tap_tap_settings = other_los.setting(
+        "TVPB_SETTINGS.tour_mode_choice.tap_tap_settings"
+    )
+    tap_tap_settings["attributes_as_columns"].append("access_mode")
+    other_los.tvpb.tap_cache._cache_version = None
+    assert other_los.tvpb.tap_cache.cache_version != cache_version
+    assert not other_los.tvpb.tap_cache.cache_exists
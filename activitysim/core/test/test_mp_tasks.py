@@ -0,0 +1,298 @@
+# ActivitySim
+# See full license in LICENSE.txt.
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from activitysim.core import mp_tasks, workflow
+from activitysim.core.workflow.checkpoint import ParquetStore
+
+NUM_SUB_PROCS = 3
+
+
+def _make_state(working_dir, stream):
+    for d in ("configs", "data", "output"):
+        working_dir.joinpath(d).mkdir(parents=True, exist_ok=True)
+    state = workflow.State().initialize_filesystem(working_dir=working_dir)
+    state.default_settings()
+    state.settings.checkpoint_format = "parquet"
+    state.settings.stream_multiprocess_pipelines = stream
+    state.add_injectable("pipeline_file_name", "pipeline")
+    return state
+
+
+def _make_tables():
+    rng = np.random.default_rng(42)
+    households = pd.DataFrame(
+        {"income": rng.integers(0, 100000, 20)},
+        index=pd.Index(rng.permutation(np.arange(100, 120)), name="household_id"),
+    )
+    persons = pd.DataFrame(
+        {
+            "household_id": np.repeat(households.index, 2),
+            "age": rng.integers(0, 90, 40),
+        },
+        index=pd.Index(np.arange(1000, 1040), name="person_id"),
+    )
+    person_windows = pd.DataFrame(
+        {"4": rng.integers(0, 2, 40), "5": rng.integers(0, 2, 40)},
+        index=persons.index,
+    )
+    land_use = pd.DataFrame(
+        {"area_type": rng.integers(0, 5, 25)},
+        index=pd.Index(np.arange(1, 26), name="zone_id"),
+    )
+    return {
+        "households": households,
+        "persons": persons,
+        "person_windows": person_windows,
+        "land_use": land_use,
+    }
+
+
+def _run_multiprocess_step(working_dir, stream):
+    state = _make_state(working_dir, stream)
+    state.checkpoint.restore()
+    for table_name, df in _make_tables().items():
+        state.add_table(table_name, df)
+    state.checkpoint.add("initialize")
+    state.checkpoint.close_store()
+
+    sub_proc_names = [f"mp_step_{i}" for i in range(NUM_SUB_PROCS)]
+    step_info = {
+        "name": "mp_step",
+        "slice": {"tables": ["households", "persons"]},
+        "last_checkpoint_in_previous_multiprocess_step": "initialize",
+    }
+    mp_tasks.apportion_pipeline(state, sub_proc_names, step_info)
+
+    apportioned = {}
+    for process_name in sub_proc_names:
+        store = ParquetStore(
+            state.get_output_file_path("pipeline", prefix=process_name), mode="r"
+        )
+        apportioned[process_name] = {
+            table_name: store.get_dataframe(table_name)
+            for table_name in ("households", "persons", "person_windows", "land_use")
+        }
+
+        # simulate a model step in the subprocess that creates a new omnibus table
+        sub_state = _make_state(working_dir, stream)
+        sub_state.set("pipeline_file_prefix", process_name)
+        sub_state.checkpoint.restore(resume_after="_")
+        persons = sub_state.get_dataframe("persons")
+        tours = pd.DataFrame(
+            {"person_id": persons.index, "tour_type": "work"},
+            index=pd.Index(persons.index * 10, name="tour_id"),
+        )
+        sub_state.add_table("tours", tours)
+        sub_state.checkpoint.add("tour_step")
+        sub_state.checkpoint.close_store()
+
+    state = _make_state(working_dir, stream)
+    mp_tasks.coalesce_pipelines(state, sub_proc_names, step_info["slice"])
+
+    state = _make_state(working_dir, stream)
+    state.checkpoint.restore(resume_after="_")
+    coalesced = {
+        table_name: state.get_dataframe(table_name)
+        for table_name in ("households", "persons", "person_windows", "tours")
+    }
+    inventory = state.checkpoint.get_inventory()
+    state.checkpoint.close_store()
+    return apportioned, coalesced, inventory
+
+
+def test_apportion_coalesce(tmp_path):
+    apportioned, coalesced, inventory = _run_multiprocess_step(
+        tmp_path.joinpath("expected"), stream=False
+    )
+
+    tables = _make_tables()
+    households = apportioned["mp_step_1"]["households"]
+    pdt.assert_frame_equal(households, tables["households"].iloc[1::NUM_SUB_PROCS])
+    assert set(apportioned["mp_step_1"]["persons"].household_id) == set(
+        households.index
+    )
+    pdt.assert_frame_equal(apportioned["mp_step_2"]["land_use"], tables["land_use"])
+
+    assert len(coalesced["tours"]) == len(tables["persons"])
+    assert list(inventory.checkpoint_name) == ["init", "initialize", "tour_step"]
+
+
+def test_stream_apportion_coalesce(tmp_path, monkeypatch):
+    apportioned, coalesced, inventory = _run_multiprocess_step(
+        tmp_path.joinpath("expected"), stream=False
+    )
+
+    # stream several batches per table
+    monkeypatch.setattr(mp_tasks, "STREAMING_BATCH_SIZE", 7)
+    stream_apportioned, stream_coalesced, stream_inventory = _run_multiprocess_step(
+        tmp_path.joinpath("stream"), stream=True
+    )
+
+    for process_name, tables in apportioned.items():
+        for table_name, df in tables.items():
+            pdt.assert_frame_equal(stream_apportioned[process_name][table_name], df)
+    for table_name, df in coalesced.items():
+        pdt.assert_frame_equal(stream_coalesced[table_name], df)
+    assert list(stream_inventory.checkpoint_name) == list(inventory.checkpoint_name)
+
+    # omnibus tables are coalesced as a dataset of the subprocess files
+    store = ParquetStore(tmp_path.joinpath("stream", "output", "pipeline"), mode="r")
+    tours_path = store.get_table_path("tours")
+    assert tours_path.is_dir()
+    assert len(list(tours_path.glob("*.parquet"))) == NUM_SUB_PROCS
+
+
+def test_weighted_sub_procs():
+    weights = np.array([1, 9, 2, 8, 3, 7, 4, 6, 5, 5])
+    sub_procs = mp_tasks.weighted_sub_procs(weights, 2)
+    # by decreasing weight: 9, 6, 5, 4, 1 to 0 and 8, 7, 5, 3, 2 to 1
+    assert sub_procs.tolist() == [0, 0, 1, 1, 1, 1, 0, 0, 0, 1]
+    loads = np.bincount(sub_procs, weights=weights)
+    assert loads.tolist() == [25, 25]
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_apportion_weight_by(tmp_path, stream):
+    state = _make_state(tmp_path, stream)
+    state.checkpoint.restore()
+    tables = _make_tables()
+    households = tables["households"]
+    # a few very large households, which would all go to the first sub_proc by stride
+    hhsize = np.where(np.isin(np.arange(len(households)), [0, 3, 6]), 12, 1)
+    persons = pd.DataFrame(
+        {"household_id": np.repeat(households.index, hhsize)},
+        index=pd.Index(np.arange(hhsize.sum()), name="person_id"),
+    )
+    state.add_table("households", households.assign(hhsize=hhsize))
+    state.add_table("persons", persons)
+    state.checkpoint.add("initialize")
+    state.checkpoint.close_store()
+
+    sub_proc_names = [f"mp_step_{i}" for i in range(NUM_SUB_PROCS)]
+    step_info = {
+        "name": "mp_step",
+        "slice": {
+            "tables": ["households", "persons"],
+            "weight_by": ["persons", "trips"],
+        },
+        "last_checkpoint_in_previous_multiprocess_step": "initialize",
+    }
+    mp_tasks.apportion_pipeline(state, sub_proc_names, step_info)
+
+    num_persons = []
+    num_households = 0
+    for process_name in sub_proc_names:
+        store = ParquetStore(
+            state.get_output_file_path("pipeline", prefix=process_name), mode="r"
+        )
+        sliced_households = store.get_dataframe("households")
+        sliced_persons = store.get_dataframe("persons")
+        assert set(sliced_persons.household_id) == set(sliced_households.index)
+        assert sliced_households.hhsize.sum() == len(sliced_persons)
+        num_households += len(sliced_households)
+        num_persons.append(len(sliced_persons))
+
+    assert num_households == len(households)
+    # three households of 12 persons and 17 of 1 are balanced
+    assert max(num_persons) - min(num_persons) <= 1
+
+
+def _run_list_with_micro_slices(tmp_path, num_processes, micro_slices):
+    state = _make_state(tmp_path, stream=False)
+    state.settings.multiprocess = True
+    state.settings.models = ["initialize_households", "school_location", "tour_mode"]
+    state.settings.multiprocess_steps = [
+        {"name": "mp_initialize", "begin": "initialize_households"},
+        {
+            "name": "mp_households",
+            "begin": "school_location",
+            "num_processes": num_processes,
+            "micro_slices": micro_slices,
+            "slice": {"tables": ["households", "persons"]},
+        },
+    ]
+    return mp_tasks.get_run_list(state)
+
+
+def test_get_run_list_micro_slices(tmp_path):
+    run_list = _run_list_with_micro_slices(tmp_path, 2, 16)
+    initialize, households = run_list["multiprocess_steps"]
+    assert initialize["micro_slices"] == 0
+    assert households["micro_slices"] == 16
+    assert households["num_processes"] == 2
+
+    # no more micro-slices than processes is the same as not micro-slicing
+    run_list = _run_list_with_micro_slices(tmp_path, 2, 2)
+    assert run_list["multiprocess_steps"][1]["micro_slices"] == 0
+
+    with pytest.raises(RuntimeError, match="micro_slices"):
+        _run_list_with_micro_slices(tmp_path, 1, 16)
+
+
+@pytest.mark.parametrize("persistent", [False, True])
+def test_group_persistent_steps(tmp_path, persistent):
+    state = _make_state(tmp_path, stream=False)
+    state.settings.multiprocess = True
+    state.settings.persistent_multiprocess_workers = persistent
+    state.settings.models = [
+        "initialize_households",
+        "school_location",
+        "tour_frequency",
+        "tour_mode",
+        "trip_mode",
+        "write_tables",
+    ]
+    households_slice = {"tables": ["households", "persons"]}
+    state.settings.multiprocess_steps = [
+        {"name": "mp_initialize", "begin": "initialize_households"},
+        {
+            "name": "mp_households",
+            "begin": "school_location",
+            "num_processes": 2,
+            "slice": households_slice,
+        },
+        {
+            "name": "mp_tours",
+            "begin": "tour_frequency",
+            "num_processes": 2,
+            "slice": households_slice,
+        },
+        {
+            "name": "mp_trips",
+            "begin": "tour_mode",
+            "num_processes": 2,
+            "slice": households_slice,
+        },
+        {"name": "mp_summarize", "begin": "write_tables"},
+    ]
+    run_list = mp_tasks.get_run_list(state)
+    steps = mp_tasks.group_persistent_steps(state, run_list["multiprocess_steps"])
+
+    if not persistent:
+        assert steps == run_list["multiprocess_steps"]
+        return
+
+    assert [step["name"] for step in steps] == [
+        "mp_initialize",
+        "mp_households",
+        "mp_summarize",
+    ]
+    households = steps[1]
+    assert households["group_steps"] == ["mp_households", "mp_tours", "mp_trips"]
+    assert households["models"] == [
+        "school_location",
+        "tour_frequency",
+        "tour_mode",
+        "trip_mode",
+    ]
+    assert households["checkpoint_name"] == "mp_trips"
+    assert households["last_checkpoint_in_previous_multiprocess_step"] == (
+        "mp_initialize"
+    )
+    assert steps[2]["last_checkpoint_in_previous_multiprocess_step"] == "mp_trips"
@@ -0,0 +1,75 @@
+# ActivitySim
+# See full license in LICENSE.txt.
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from activitysim.core.pathbuilder import _best_paths_kernel
+
+
+def _best_paths_df(path_df, transit_sets, units, smaller_is_better, per_set, across):
+    # sort/groupby/isin selection used by best_paths before _best_paths_kernel
+    best_paths_list = []
+    for c in transit_sets:
+        keep = path_df.index.isin(
+            path_df[["seq", c]]
+            .sort_values(by=c, ascending=smaller_is_better)
+            .groupby(["seq"])
+            .head(per_set)
+            .index
+        )
+        best_paths_for_set = path_df[keep].copy()
+        best_paths_for_set["path_set"] = c
+        best_paths_for_set[units] = path_df[keep][c]
+        best_paths_for_set.drop(columns=transit_sets, inplace=True)
+        best_paths_list.append(best_paths_for_set)
+
+    path_df = pd.concat(best_paths_list).sort_values(
+        by=["seq", units], ascending=[True, smaller_is_better]
+    )
+    return path_df[path_df.index.isin(path_df.groupby(["seq"]).head(across).index)]
+
+
+@pytest.mark.parametrize("smaller_is_better", [True, False])
+@pytest.mark.parametrize("per_set,across", [(1, 1), (2, 3), (3, 2), (20, 20)])
+def test_best_paths_kernel(smaller_is_better, per_set, across):
+
+    rng = np.random.default_rng(42)
+    num_rows = 500
+    transit_sets = ["fastest", "cheap", "shortwalk"]
+
+    # correlated tap sets, so the same path is often best in several of them
+    base = rng.normal(size=num_rows)
+    path_df = pd.DataFrame(
+        {
+            "seq": rng.choice(np.arange(40) * 3, size=num_rows),
+            "atap": rng.integers(0, 100, size=num_rows),
+            "btap": rng.integers(0, 100, size=num_rows),
+        }
+    )
+    for c in transit_sets:
+        path_df[c] = base + rng.normal(scale=0.5, size=num_rows)
+
+    expected = _best_paths_df(
+        path_df, transit_sets, "utility", smaller_is_better, per_set, across
+    )
+
+    keys = path_df[transit_sets].to_numpy()
+    if not smaller_is_better:
+        keys = -keys
+    seq = path_df["seq"].to_numpy()
+    rows = np.argsort(seq, kind="stable")
+    group_offsets = np.flatnonzero(np.r_[True, seq[rows][1:] != seq[rows][:-1], True])
+    best_rows, best_sets = _best_paths_kernel(
+        group_offsets, rows, keys, per_set, across
+    )
+
+    result = path_df.drop(columns=transit_sets).take(best_rows)
+    result["path_set"] = np.asarray(transit_sets, dtype=object)[best_sets]
+    best_keys = keys[best_rows, best_sets]
+    result["utility"] = best_keys if smaller_is_better else -best_keys
+
+    pdt.assert_frame_equal(result, expected)
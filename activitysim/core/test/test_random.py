@@ -127,3 +127,162 @@ def test_channel():
     npt.assert_almost_equal(np.asanyarray(rands).flatten(), test1_expected_rands2)
 
     rng.end_step("test_step")
+
+
+def test_philox_known_answers():
+
+    # Random123 known answer tests for philox4x32-10
+    bits = random.philox4x32(
+        [
+            [0, 0, 0, 0],
+            [0xFFFFFFFF] * 4,
+            [0x243F6A88, 0x85A308D3, 0x13198A2E, 0x03707344],
+        ],
+        [[0, 0], [0xFFFFFFFF] * 2, [0xA4093822, 0x299F31D0]],
+    )
+    expected = [
+        [0x6627E8D5, 0xE169C58D, 0xBC57AC4C, 0x9B00DBD8],
+        [0x408F276D, 0x41C83B0E, 0xA20BC7C6, 0x6D5451FD],
+        [0xD16CFE09, 0x94FDCCEB, 0x5001E420, 0x24126EA1],
+    ]
+    npt.assert_array_equal(bits, np.asarray(expected, dtype=np.uint32))
+
+
+def _philox_persons(n=1000):
+    persons = pd.DataFrame({"household_id": np.arange(n) // 2}, index=np.arange(n))
+    persons.index.name = "person_id"
+    return persons
+
+
+def test_philox_chunk_invariance():
+
+    persons = _philox_persons()
+
+    rng = random.Random(engine="philox")
+    rng.begin_step("test_step")
+    rng.add_channel("persons", persons)
+    whole = rng.random_for_df(persons, n=3)
+    normal = rng.normal_for_df(persons)
+    choices = rng.choice_for_df(persons, 10, 2, replace=False)
+    rng.end_step("test_step")
+
+    assert whole.shape == (len(persons), 3)
+    assert normal.shape == (len(persons),)
+    assert choices.shape == (len(persons) * 2,)
+
+    # same step, chunked and shuffled, should produce the same rands for each row
+    rng.begin_step("test_step")
+    shuffled = persons.sample(frac=1.0, random_state=0)
+    chunks = np.array_split(np.arange(len(shuffled)), 3)
+    chunked = np.concatenate([rng.random_for_df(shuffled.iloc[c], n=3) for c in chunks])
+    rng.end_step("test_step")
+
+    positions = persons.index.get_indexer(shuffled.index)
+    npt.assert_array_equal(chunked, whole[positions])
+
+    # without replacement, the choices for each row should be distinct
+    choices = choices.reshape(-1, 2)
+    assert (choices[:, 0] != choices[:, 1]).all()
+
+
+@pytest.mark.parametrize("replace,consumed", [(True, 2), (False, 10)])
+def test_philox_choice_consumes_chooser_rows(replace, consumed):
+
+    persons = _philox_persons(20)
+    choosers = persons.iloc[15:18]
+
+    rng = random.Random(engine="philox")
+    rng.begin_step("test_step")
+    rng.add_channel("persons", persons)
+    channel = rng.get_channel_for_df(persons)
+
+    first = rng.choice_for_df(choosers, 10, 2, replace=replace)
+
+    # offsets advance for the rows that drew, and only for them
+    offsets = np.zeros(len(persons), dtype=np.int64)
+    offsets[15:18] = consumed
+    npt.assert_array_equal(channel._offset[: len(persons)], offsets)
+
+    # so repeated draws for the same choosers continue their streams
+    second = rng.choice_for_df(choosers, 10, 2, replace=replace)
+    rng.end_step("test_step")
+    assert not np.array_equal(first, second)
+
+
+def test_philox_independence():
+
+    persons = _philox_persons(20000)
+
+    rng = random.Random(engine="philox")
+    rng.begin_step("test_step")
+    rng.add_channel("persons", persons)
+    first = rng.random_for_df(persons, n=1)[:, 0]
+    second = rng.random_for_df(persons, n=1)[:, 0]
+    rng.end_step("test_step")
+
+    rng.begin_step("test_step2")
+    other_step = rng.random_for_df(persons, n=1)[:, 0]
+    rng.end_step("test_step2")
+
+    # uniform on [0, 1)
+    assert 0.0 <= first.min() and first.max() < 1.0
+    assert abs(first.mean() - 0.5) < 0.01
+
+    # successive draws, adjacent rows, and different steps are uncorrelated
+    for a, b in [
+        (first, second),
+        (first[:-1], first[1:]),
+        (first, other_step),
+    ]:
+        assert abs(np.corrcoef(a, b)[0, 1]) < 0.03
+
+    # normals should be standard normal
+    rng.begin_step("test_step3")
+    z = rng.normal_for_df(persons)
+    rng.end_step("test_step3")
+    assert abs(z.mean()) < 0.03
+    assert abs(z.std() - 1.0) < 0.03
+
+
+def test_legacy_engine_is_default():
+
+    persons = _philox_persons(5)
+
+    legacy = random.Random()
+    assert legacy.engine == "legacy"
+    philox = random.Random(engine="philox")
+    for rng in (legacy, philox):
+        rng.begin_step("test_step")
+        rng.add_channel("persons", persons)
+
+    assert not np.allclose(legacy.random_for_df(persons), philox.random_for_df(persons))
+
+    with pytest.raises(ValueError):
+        random.Random(engine="mersenne")
+
+
+def test_extend_domain():
+
+    tours = pd.DataFrame(index=pd.Index([10, 11, 12], name="tour_id"))
+    more_tours = pd.DataFrame(index=pd.Index([20, 21], name="tour_id"))
+
+    rng = random.Random()
+    rng.begin_step("test_step")
+    rng.add_channel("tours", tours)
+    rands = rng.random_for_df(tours)
+
+    # extending mid-step initializes new rows without disturbing existing offsets
+    rng.add_channel("tours", more_tours)
+    channel = rng.get_channel_for_df(tours)
+    row_states = channel.row_states
+    assert list(row_states.index) == [10, 11, 12, 20, 21]
+    assert list(row_states.offset) == [1, 1, 1, 0, 0]
+
+    rng.end_step("test_step")
+
+    # results for the original rows are the same as if the channel had been created whole
+    rng2 = random.Random()
+    rng2.begin_step("test_step")
+    rng2.add_channel("tours", pd.concat([tours, more_tours]))
+    npt.assert_almost_equal(rng2.random_for_df(tours), rands)
+    rng2.end_step("test_step")
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import os.path
+from types import SimpleNamespace
 
 import numpy as np
 import numpy.testing as npt
@@ -92,3 +93,168 @@ def test_simple_simulate_chunked(state, data, spec):
     )
     expected = pd.Series([1, 1, 1], index=data.index)
     pdt.assert_series_equal(choices, expected, check_dtype=False)
+
+
+def test_eval_utilities_compiled(state, data, spec):
+
+    from activitysim.core import chunk
+    from activitysim.core.configuration.base import ComputeSettings
+
+    utilities = {}
+    for compiled_spec in (False, True):
+        for (
+            _i,
+            chooser_chunk,
+            chunk_trace_label,
+            chunk_sizer,
+        ) in chunk.adaptive_chunked_choosers(state, data, "test"):
+            utilities[compiled_spec] = simulate.eval_utilities(
+                state,
+                spec,
+                chooser_chunk,
+                trace_label=chunk_trace_label,
+                chunk_sizer=chunk_sizer,
+                compute_settings=ComputeSettings(compiled_spec=compiled_spec),
+            )
+
+    pdt.assert_frame_equal(utilities[True], utilities[False])
+
+
+def test_compiled_spec():
+
+    from activitysim.core.compiled_spec import compile_spec
+
+    choosers = pd.DataFrame(
+        {
+            "age": np.array([10, 30, 70], dtype=np.int8),
+            "income": [10.0, 55.5, 23.0],
+            "ptype": pd.Categorical(["a", "b", "a"]),
+        }
+    )
+    spec = pd.DataFrame(
+        {
+            "alt0": [1.5, 0.0, 2.0, 0.5, -1.0],
+            "alt1": [0.0, 3.0, 0.0, 0.25, 10.0],
+        },
+        index=pd.Index(
+            [
+                "age > 20",
+                "(age >= 16) & (income < 50)",
+                "log(income) * age",
+                "ptype == 'a'",
+                "@df.income.clip(upper=30)",
+            ],
+            name="Expression",
+        ),
+    )
+
+    expression_values = np.stack(
+        [
+            (choosers.age > 20).values,
+            ((choosers.age >= 16) & (choosers.income < 50)).values,
+            np.log(choosers.income.values) * choosers.age.values,
+            (choosers.ptype == "a").values,
+            choosers.income.clip(upper=30).values,
+        ]
+    ).astype(np.float64)
+    expected = np.dot(expression_values.T, spec.values)
+
+    compiled = compile_spec(spec)
+    assert compile_spec(spec.copy()) is compiled
+
+    # string comparisons and python expressions are not folded into numexpr programs
+    assert sorted(compiled.pure_names) == [0, 1, 2]
+    assert sorted(compiled.code) == [4]
+
+    for use_numexpr in (True, False):
+        utilities = compiled.eval_utilities(
+            choosers, {}, {"df": choosers}, use_numexpr=use_numexpr
+        )
+        npt.assert_allclose(utilities, expected)
+
+
+def test_compiled_spec_bitwise_precedence(state, monkeypatch):
+
+    from activitysim.core import chunk
+    from activitysim.core.compiled_spec import compile_spec
+    from activitysim.core.configuration.base import ComputeSettings
+
+    choosers = pd.DataFrame(
+        {
+            "ptype": np.array([1, 1, 2, 3, 1], dtype=np.int8),
+            "work_from_home": [True, False, True, False, True],
+        }
+    )
+    spec = pd.DataFrame(
+        {
+            "alt0": [1.0, 2.0, 0.5, 0.0],
+            "alt1": [0.0, -1.0, 0.25, 3.0],
+        },
+        index=pd.Index(
+            [
+                # from production_semcog cdap_fixed_relative_proportions.csv
+                "ptype == 1 & work_from_home",
+                "(ptype == 2) | work_from_home",
+                "~work_from_home",
+                "age_16_p",
+            ],
+            name="Expression",
+        ),
+    )
+    choosers["age_16_p"] = 1.0
+
+    # DataFrame.eval binds & and | below comparisons
+    assert (
+        choosers.eval("ptype == 1 & work_from_home")
+        == ((choosers.ptype == 1) & choosers.work_from_home)
+    ).all()
+
+    compiled = compile_spec(spec)
+    assert sorted(compiled.pure_names) == [1, 2, 3]
+
+    utilities = {}
+    for compiled_spec in (False, True):
+        for (
+            _i,
+            chooser_chunk,
+            chunk_trace_label,
+            chunk_sizer,
+        ) in chunk.adaptive_chunked_choosers(state, choosers, "test"):
+            utilities[compiled_spec] = simulate.eval_utilities(
+                state,
+                spec,
+                chooser_chunk,
+                trace_label=chunk_trace_label,
+                chunk_sizer=chunk_sizer,
+                compute_settings=ComputeSettings(compiled_spec=compiled_spec),
+            )
+
+    pdt.assert_frame_equal(utilities[True], utilities[False])
+
+    # programs numexpr fails to evaluate fall back to evaluating their terms one by one
+    from activitysim.core import compiled_spec
+
+    def unsupported(*args, **kwargs):
+        raise NotImplementedError("couldn't find matching opcode for 'and_bll'")
+
+    monkeypatch.setattr(compiled_spec, "ne", SimpleNamespace(evaluate=unsupported))
+    npt.assert_allclose(
+        compiled.eval_utilities(choosers, {}, {}), utilities[False].to_numpy()
+    )
+
+
+def test_simple_simulate_fused_choices(state, data, spec):
+
+    from activitysim.core.configuration.base import ComputeSettings
+
+    state.settings.check_for_variability = False
+
+    choices = simulate.simple_simulate(
+        state,
+        choosers=data,
+        spec=spec,
+        nest_spec=None,
+        compute_settings=ComputeSettings(fused_choices=True),
+    )
+    expected = pd.Series([1, 1, 1], index=data.index)
+    pdt.assert_series_equal(choices, expected, check_dtype=False)
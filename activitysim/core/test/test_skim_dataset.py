@@ -0,0 +1,61 @@
+# ActivitySim
+# See full license in LICENSE.txt.
+from __future__ import annotations
+
+import os
+
+from activitysim.core import skim_dataset
+
+
+def test_omx_variable_sources():
+
+    data_dir = os.path.join(os.path.dirname(__file__), "los/data")
+    omx_file_paths = [
+        os.path.join(data_dir, "z3_taz_skims.omx"),
+        os.path.join(data_dir, "z3_tap_skims.omx"),
+    ]
+
+    variable_sources = skim_dataset._omx_variable_sources(omx_file_paths)
+    assert variable_sources["DIST"] == {"z3_taz_skims.omx"}
+    # 3d skims are keyed by base name
+    assert "SOV_TIME" in variable_sources
+    assert not any("__" in k for k in variable_sources)
+
+    ignored = skim_dataset._omx_variable_sources(omx_file_paths, ignore=["DIST"])
+    assert not any(k.startswith("DIST") for k in ignored)
+    assert "SOV_TIME" in ignored
+
+
+def test_stale_skim_variables():
+
+    variable_sources = {
+        "DIST": {"a.omx"},
+        "SOV_TIME": {"a.omx", "b.omx"},
+        "BUS_IVT": {"b.omx"},
+        "WALK": {"c.omx"},
+    }
+    source_mtimes = {"a.omx": 1.0, "b.omx": 2.0, "c.omx": 3.0}
+    cached = {"DIST", "SOV_TIME", "BUS_IVT", "WALK"}
+
+    # no cache
+    assert skim_dataset._stale_skim_variables(
+        variable_sources, source_mtimes, None, ()
+    ) == set(variable_sources)
+
+    # up to date
+    assert not skim_dataset._stale_skim_variables(
+        variable_sources, source_mtimes, dict(source_mtimes), cached
+    )
+
+    # only variables read from the modified file are stale
+    assert skim_dataset._stale_skim_variables(
+        variable_sources, source_mtimes, {**source_mtimes, "b.omx": 1.5}, cached
+    ) == {"SOV_TIME", "BUS_IVT"}
+
+    # as are variables (or files) not yet in the cache
+    assert skim_dataset._stale_skim_variables(
+        variable_sources,
+        source_mtimes,
+        {"a.omx": 1.0, "b.omx": 2.0},
+        cached - {"DIST"},
+    ) == {"DIST", "WALK"}
@@ -220,3 +220,209 @@ def test_basic(persons, tdd_alts):
         pdt.assert_series_equal(
             periods_available, pd.Series([6, 3, 4, 3]), check_dtype=False
         )
+
+
+def test_available_tour_tdds(persons, tdd_alts):
+
+    person_windows = tt.create_timetable_windows(persons, tdd_alts)
+    timetable = tt.TimeTable(person_windows, tdd_alts, "person_windows")
+    timetable.assign(pd.Series([0, 1, 2, 3, 4, 5]), pd.Series([0, 1, 2, 15, 16, 17]))
+
+    # a subset of alts, in no particular order, and tours sharing a window
+    tdds = np.array([17, 0, 6, 1, 13, 3, 20])
+    window_row_ids = pd.Series(
+        [5, 0, 1, 2, 2, 4, 3], index=[10, 11, 12, 13, 14, 15, 16]
+    )
+
+    tour_ix, tdd_ix = timetable.available_tour_tdds(window_row_ids, tdds)
+
+    # same pairs, in the same order, as slicing the full cross product by tour_available
+    available = timetable.tour_available(
+        np.repeat(window_row_ids.to_numpy(), len(tdds)),
+        np.tile(tdds, len(window_row_ids)),
+    )
+    expected_tour_ix, expected_tdd_ix = np.divmod(np.flatnonzero(available), len(tdds))
+
+    assert 0 < len(tour_ix) < len(available)
+    assert_array_equal(tour_ix, expected_tour_ix)
+    assert_array_equal(tdd_ix, expected_tdd_ix)
+
+
+def test_packed_collision():
+
+    states = [tt.I_EMPTY, tt.I_START, tt.I_MIDDLE, tt.I_END, tt.I_START_END]
+    collisions = {tuple(c) for c in tt.COLLISIONS}
+
+    # every pair of footprint and window states, in a period spanning two words
+    for footprint_state in states:
+        for window_state in states:
+            footprint = np.zeros((1, 70), dtype=np.int8)
+            window = np.zeros((1, 70), dtype=np.int8)
+            footprint[0, 66] = footprint_state
+            window[0, 66] = window_state
+            assert tt._packed_collision(
+                tt.pack_windows(footprint)[0], tt.pack_windows(window)[0]
+            ) == ((footprint_state, window_state) in collisions)
+
+    # planes hold the bits of each period's state
+    windows = np.array([[0, 2, 7, 4, 0, 6]], dtype=np.int8)
+    planes = tt.pack_windows(windows)
+    assert planes.shape == (1, tt.NUM_BIT_PLANES, 1)
+    assert_array_equal(planes[0, :, 0], [0b000100, 0b100110, 0b101100])
+
+
+@pytest.mark.parametrize("num_periods", [6, 40, 70])
+def test_packed_windows(num_periods):
+
+    rng = np.random.default_rng(0)
+    alts = pd.DataFrame(
+        [[s, e] for s in range(1, num_periods - 1) for e in range(s, num_periods - 1)],
+        columns=["start", "end"],
+    )
+    alts["duration"] = alts.end - alts.start
+    persons = pd.DataFrame(index=pd.Index(np.arange(50) * 7 + 3, name="person_id"))
+
+    windows_df = tt.create_timetable_windows(persons, alts)
+    timetable = tt.TimeTable(windows_df, alts, "person_windows")
+    assert timetable.packed_windows.dtype == tt.window_word_dtype(num_periods)
+    assert timetable.packed_windows.nbytes < windows_df.to_numpy().nbytes
+
+    # schedule a few rounds of tours, each wherever it fits
+    for _ in range(3):
+        person_ids = pd.Series(persons.index)
+        tdds = pd.Series(rng.integers(0, len(alts), len(persons)))
+        available = timetable.tour_available(person_ids, tdds)
+        timetable.assign(person_ids[available], tdds[available])
+
+    # the dense windows, with the dense (sharrow) queries on them as reference
+    windows = timetable.windows
+    assert windows.dtype == np.int8
+    pdt.assert_frame_equal(
+        timetable.get_windows_df(),
+        pd.DataFrame(windows, index=windows_df.index, columns=windows_df.columns),
+    )
+    assert_array_equal(tt.pack_windows(windows), timetable.packed_windows)
+    numba_tt = timetable.export_for_numba()
+    row_mapper = numba_tt["tt_row_mapper"]
+    col_mapper = numba_tt["tt_col_mapper"]
+    assert_array_equal(numba_tt["tt_windows"], windows)
+
+    person_ids = pd.Series(rng.choice(persons.index, 200))
+    periods = pd.Series(rng.integers(0, num_periods, 200))
+    ends = periods + rng.integers(0, 3, 200)
+
+    def dense(func, *args):
+        return [func(windows, row_mapper, *a) for a in zip(*args)]
+
+    assert_array_equal(
+        timetable.adjacent_window_before(person_ids, periods),
+        dense(
+            lambda *a: tt.sharrow_tt_adjacent_window_before(*a[:2], col_mapper, *a[2:]),
+            person_ids,
+            periods,
+        ),
+    )
+    assert_array_equal(
+        timetable.adjacent_window_after(person_ids, periods),
+        dense(
+            lambda *a: tt.sharrow_tt_adjacent_window_after(*a[:2], col_mapper, *a[2:]),
+            person_ids,
+            periods,
+        ),
+    )
+    assert_array_equal(
+        timetable.previous_tour_ends(person_ids, periods),
+        dense(
+            lambda *a: tt.sharrow_tt_previous_tour_ends(*a[:2], col_mapper, *a[2:]),
+            person_ids,
+            periods,
+        ),
+    )
+    assert_array_equal(
+        timetable.previous_tour_begins(person_ids, periods),
+        dense(
+            lambda *a: tt.sharrow_tt_previous_tour_begins(*a[:2], col_mapper, *a[2:]),
+            person_ids,
+            periods,
+        ),
+    )
+    assert_array_equal(
+        timetable.remaining_periods_available(person_ids, periods, ends),
+        dense(tt.sharrow_tt_remaining_periods_available, person_ids, periods, ends),
+    )
+    assert_array_equal(
+        timetable.max_time_block_available(person_ids),
+        dense(tt.sharrow_tt_max_time_block_available, person_ids),
+    )
+
+    # subtour mask is I_MIDDLE outside the footprint, including the padding
+    tdds = pd.Series(rng.integers(0, len(alts), len(persons)))
+    timetable.assign_subtour_mask(pd.Series(persons.index), tdds)
+    assert_array_equal(
+        timetable.windows, (timetable.tdd_footprints[tdds] == 0) * tt.I_MIDDLE
+    )
+    assert timetable.max_time_block_available(pd.Series(persons.index)).gt(0).all()
+
+
+def test_replace_table_and_rollback(persons, tdd_alts):
+
+    state = workflow.State().default_settings()
+
+    person_windows = tt.create_timetable_windows(persons, tdd_alts)
+    timetable = tt.TimeTable(person_windows, tdd_alts, "person_windows")
+    timetable.assign(pd.Series([0, 1, 2]), pd.Series([0, 1, 2]))
+    timetable.replace_table(state)
+
+    windows_df = state.get_dataframe("person_windows", as_copy=False)
+    pdt.assert_frame_equal(windows_df, timetable.get_windows_df())
+
+    # later assignments only unpack the assigned rows into the same table
+    timetable.assign(pd.Series([1, 4]), pd.Series([6, 15]))
+    assert timetable.stale_rows.sum() == 2
+    timetable.replace_table(state)
+    assert state.get_dataframe("person_windows", as_copy=False) is windows_df
+    pdt.assert_frame_equal(windows_df, timetable.get_windows_df())
+    assert not timetable.stale_rows.any()
+
+    # rollback restores the windows at the start of the transaction
+    class Logger:
+        def log(self, *args, **kwargs):
+            pass
+
+    windows = timetable.windows
+    timetable.begin_transaction(Logger())
+    timetable.assign(pd.Series([3, 5]), pd.Series([20, 3]))
+    assert not (timetable.windows == windows).all()
+    timetable.rollback()
+    assert_array_equal(timetable.windows, windows)
+    timetable.replace_table(state)
+    pdt.assert_frame_equal(windows_df, timetable.get_windows_df())
+
+
+def test_export_for_numba(persons, tdd_alts):
+
+    person_windows = tt.create_timetable_windows(persons, tdd_alts)
+    timetable = tt.TimeTable(person_windows, tdd_alts, "person_windows")
+    timetable.assign(pd.Series([0, 1, 2]), pd.Series([0, 1, 2]))
+
+    exported = timetable.export_for_numba()["tt_windows"]
+    assert_array_equal(exported, timetable.windows)
+
+    # later exports update the same array with the rows assigned since
+    timetable.assign(pd.Series([1, 4]), pd.Series([6, 15]))
+    assert timetable.stale_exported_rows.sum() == 2
+    assert timetable.export_for_numba()["tt_windows"] is exported
+    assert_array_equal(exported, timetable.windows)
+    assert not timetable.stale_exported_rows.any()
+
+    # including rows restored by a rollback after an export in the transaction
+    class Logger:
+        def log(self, *args, **kwargs):
+            pass
+
+    windows = timetable.windows
+    timetable.begin_transaction(Logger())
+    timetable.assign(pd.Series([3, 5]), pd.Series([20, 3]))
+    timetable.export_for_numba()
+    timetable.rollback()
+    assert_array_equal(timetable.export_for_numba()["tt_windows"], windows)
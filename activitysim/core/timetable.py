@@ -49,23 +49,174 @@ C_MIDDLE = str(I_MIDDLE)
 C_START_END = str(I_START_END)
 
 
+# time window states packed into bit planes: bit b of the state of each period is
+# held in plane b, one bit per period, in words of the smallest unsigned int dtype
+# that holds all the periods of a window (or in uint64 words if none does)
+NUM_BIT_PLANES = I_BIT_SHIFT
+WORD_DTYPES = (np.uint8, np.uint16, np.uint32, np.uint64)
+
+
+def window_word_dtype(num_periods):
+    """
+    Smallest unsigned int dtype with a bit for each of num_periods periods (or uint64)
+    """
+    for dtype in WORD_DTYPES:
+        if num_periods <= np.dtype(dtype).itemsize * 8:
+            return dtype
+    return np.uint64
+
+
+@nb.njit
+def _pack_window(window, planes):
+    """
+    Pack the states of one window row into bit planes
+
+    Bit b of the state of period i is bit (i % word_bits) of word
+    planes[b, i // word_bits], so the collision test for all periods is just a
+    few bitwise ops on each word.
+
+    Parameters
+    ----------
+    window : array of int, shape (t)
+    planes : array of unsigned int, shape (NUM_BIT_PLANES, ceil(t / word_bits))
+        overwritten with the packed window
+    """
+    planes[:] = 0
+    word_bits = planes.itemsize * 8
+    for i in range(window.size):
+        state = window[i]
+        if state:
+            word = i // word_bits
+            bit = np.uint64(1) << np.uint64(i % word_bits)
+            for b in range(NUM_BIT_PLANES):
+                if state & (1 << b):
+                    planes[b, word] |= bit
+
+
+@nb.njit
+def _pack_windows(windows, planes):
+    for k in range(windows.shape[0]):
+        _pack_window(windows[k], planes[k])
+
+
+def pack_windows(windows, dtype=None):
+    """
+    Pack time windows (or tdd footprints) into bit planes
+
+    Parameters
+    ----------
+    windows : array of int, shape (n, t)
+    dtype : unsigned int dtype, optional
+        word dtype, by default the window_word_dtype for t periods
+
+    Returns
+    -------
+    array of dtype, shape (n, NUM_BIT_PLANES, ceil(t / word_bits))
+    """
+    windows = np.asarray(windows)
+    if dtype is None:
+        dtype = window_word_dtype(windows.shape[1])
+    word_bits = np.dtype(dtype).itemsize * 8
+    num_words = (windows.shape[1] + word_bits - 1) // word_bits
+    planes = np.zeros((windows.shape[0], NUM_BIT_PLANES, num_words), dtype=dtype)
+    _pack_windows(windows, planes)
+    return planes
+
+
+@nb.njit
+def _period_bit(planes, b, i):
+    """
+    Bit b of the state of period i of a packed window
+    """
+    word_bits = planes.itemsize * 8
+    word = np.uint64(planes[b, i // word_bits])
+    return (word >> np.uint64(i % word_bits)) & np.uint64(1)
+
+
+@nb.njit
+def _period_state(planes, i):
+    """
+    State of period i of a packed window
+    """
+    state = 0
+    for b in range(NUM_BIT_PLANES):
+        if _period_bit(planes, b, i):
+            state |= 1 << b
+    return state
+
+
+@nb.njit
+def _period_available(planes, i):
+    """
+    Whether period i of a packed window is available (not I_MIDDLE)
+
+    Bit 0 is only set for I_MIDDLE.
+    """
+    return _period_bit(planes, 0, i) == 0
+
+
+@nb.njit
+def _unpack_windows(packed_windows, row_ixs, num_periods):
+    """
+    Window states of the packed window rows row_ixs
+
+    Returns
+    -------
+    array of int8, shape (len(row_ixs), num_periods)
+    """
+    windows = np.zeros((row_ixs.shape[0], num_periods), dtype=np.int8)
+    for k in range(row_ixs.shape[0]):
+        planes = packed_windows[row_ixs[k]]
+        for i in range(num_periods):
+            windows[k, i] = _period_state(planes, i)
+    return windows
+
+
+@nb.njit
+def _packed_collision(footprint, window):
+    """
+    Whether a packed tour footprint collides with a packed window (see COLLISIONS)
+
+    Bit 0 is only set for I_MIDDLE, and every other non-empty state has bit 1 or 2
+    set, so a period collides if either side is I_MIDDLE and the other is not
+    empty, or both are I_START (bit 1 without bit 2) or both are I_END (bit 2
+    without bit 1).
+    """
+    for word in range(footprint.shape[1]):
+        f0 = footprint[0, word]
+        f1 = footprint[1, word]
+        f2 = footprint[2, word]
+        w0 = window[0, word]
+        w1 = window[1, word]
+        w2 = window[2, word]
+        if (
+            (f0 & (w1 | w2))
+            | (w0 & (f1 | f2))
+            | (f1 & ~f2 & w1 & ~w2)
+            | (f2 & ~f1 & w2 & ~w1)
+        ):
+            return True
+    return False
+
+
 @nb.njit
 def _fast_tour_available(
     tdds,
-    tdd_footprints,
+    tdd_footprint_planes,
     window_row_ids,
     window_row_ix__mapper,
-    self_windows,
+    packed_windows,
 ):
     """
 
     Parameters
     ----------
     tdds : array-like, shape (k)
-    tdd_footprints : array-like, shape (c, t)
+    tdd_footprint_planes : array-like, shape (c, NUM_BIT_PLANES, w)
+        tdd footprints packed by pack_windows
     window_row_ids : array-like, shape (k)
     window_row_ix__mapper : FastMapping._mapper
-    self_windows : array-like
+    packed_windows : array-like, shape (n, NUM_BIT_PLANES, w)
 
     Returns
     -------
@@ -73,22 +224,55 @@ def _fast_tour_available(
     """
     out = np.ones_like(tdds, dtype=np.bool_)
     for k in range(tdds.shape[0]):
-        tour_footprints = tdd_footprints[tdds[k]]  # -> shape (t)
         row_ix = window_row_ix__mapper[window_row_ids[k]]
-        windows = self_windows[row_ix]
-        x = tour_footprints + (windows << I_BIT_SHIFT)
-        stop = False
-        for j in range(COLLISION_ARRAY.size):
-            for i in range(x.size):
-                if x[i] == COLLISION_ARRAY[j]:
-                    out[k] = False
-                    stop = True
-                    break
-            if stop:
-                break
+        if _packed_collision(tdd_footprint_planes[tdds[k]], packed_windows[row_ix]):
+            out[k] = False
     return out
 
 
+@nb.njit
+def _fast_available_tour_tdds(
+    tdds,
+    tdd_footprint_planes,
+    window_row_ids,
+    window_row_ix__mapper,
+    packed_windows,
+):
+    """
+    Positions of the (tour, tdd) pairs whose tdd footprint fits in the tour's window.
+
+    Same collision test as _fast_tour_available, but for every tdd in tdds for every
+    window row, and only the available pairs are returned, so the full cross product
+    of tours and tdds is never materialized.
+
+    Parameters
+    ----------
+    tdds : array-like, shape (a)
+    tdd_footprint_planes : array-like, shape (c, NUM_BIT_PLANES, w)
+        tdd footprints packed by pack_windows
+    window_row_ids : array-like, shape (k)
+    window_row_ix__mapper : FastMapping._mapper
+    packed_windows : array-like, shape (n, NUM_BIT_PLANES, w)
+
+    Returns
+    -------
+    tour_ix : array of int64, shape (n)
+        positions in window_row_ids of available pairs
+    tdd_ix : array of int64, shape (n)
+        positions in tdds of available pairs
+    """
+    num_tdds = tdds.shape[0]
+    available = np.ones((window_row_ids.shape[0], num_tdds), dtype=np.bool_)
+    for k in range(window_row_ids.shape[0]):
+        planes = packed_windows[window_row_ix__mapper[window_row_ids[k]]]
+        for a in range(num_tdds):
+            if _packed_collision(tdd_footprint_planes[tdds[a]], planes):
+                available[k, a] = False
+
+    tour_ix, tdd_ix = np.nonzero(available)
+    return tour_ix.astype(np.int64), tdd_ix.astype(np.int64)
+
+
 @nb.njit
 def _available_run_length(
     available,
@@ -120,6 +304,45 @@ def _available_run_length(
     return available_run_length
 
 
+@nb.njit
+def _window_run_length(window_row, time_col_ix, before):
+    """
+    Number of periods adjacent to time_col_ix (before or after) not in I_MIDDLE
+
+    The first and last (padding) periods of the window never count as available.
+    """
+    num_cols = window_row.size
+    if before:
+        # index of first unavailable window before time
+        j = time_col_ix - 1
+        while j > 0 and window_row[j] != I_MIDDLE:
+            j -= 1
+        return time_col_ix - max(j, 0) - 1
+    else:
+        # index of first unavailable window after time
+        j = time_col_ix + 1
+        while j < num_cols - 1 and window_row[j] != I_MIDDLE:
+            j += 1
+        return j - time_col_ix - 1
+
+
+@nb.njit
+def _packed_window_run_length(planes, num_periods, time_col_ix, before):
+    """
+    Same as _window_run_length, for a packed window row
+    """
+    if before:
+        j = time_col_ix - 1
+        while j > 0 and _period_available(planes, j):
+            j -= 1
+        return time_col_ix - max(j, 0) - 1
+    else:
+        j = time_col_ix + 1
+        while j < num_periods - 1 and _period_available(planes, j):
+            j += 1
+        return j - time_col_ix - 1
+
+
 @nb.njit
 def _available_run_length_1(
     windows,
@@ -129,39 +352,15 @@ def _available_run_length_1(
     window_row_id,
     period,
 ):
-    num_cols = windows.shape[1]
-    _time_col_ix_map = np.arange(num_cols)
-    available = np.ones(num_cols, dtype=np.int8)
-    available[0] = 0
-    available[-1] = 0
-
-    window_row = windows[window_row_mapper[window_row_id], :]
-    for j in range(1, num_cols - 1):
-        if window_row[j] != I_MIDDLE:
-            available[j] = 1
-        else:
-            available[j] = 0
-
-    _time_col_ix = time_ix_mapper[period]  # scalar
-    if before:
-        mask = (_time_col_ix_map < _time_col_ix) * 1
-        # index of first unavailable window after time
-        first_unavailable = np.where((1 - available) * mask, _time_col_ix_map, 0).max()
-        available_run_length = _time_col_ix - first_unavailable - 1
-    else:
-        # ones after specified time, zeroes before
-        mask = (_time_col_ix_map > _time_col_ix) * 1
-        # index of first unavailable window after time
-        first_unavailable = np.where(
-            (1 - available) * mask, _time_col_ix_map, num_cols
-        ).min()
-        available_run_length = first_unavailable - _time_col_ix - 1
-    return available_run_length
+    return _window_run_length(
+        windows[window_row_mapper[window_row_id], :], time_ix_mapper[period], before
+    )
 
 
 @nb.njit
 def _available_run_length_2(
-    windows,
+    packed_windows,
+    num_periods,
     window_row_mapper,
     time_ix_mapper,
     before,
@@ -169,38 +368,14 @@ def _available_run_length_2(
     periods,
 ):
     num_rows = window_row_id_values.shape[0]
-    num_cols = windows.shape[1]
-    _time_col_ix_map = np.arange(num_cols)
     available_run_length = np.zeros(num_rows, dtype=np.int32)
-    available = np.ones(num_cols, dtype=np.int8)
-    available[0] = 0
-    available[-1] = 0
     for row in range(num_rows):
-
-        row_ix = window_row_mapper[window_row_id_values[row]]
-        window_row = windows[row_ix]
-        for j in range(1, num_cols - 1):
-            if window_row[j] != I_MIDDLE:
-                available[j] = 1
-            else:
-                available[j] = 0
-
-        _time_col_ix = time_ix_mapper[periods[row]]  # scalar
-        if before:
-            mask = (_time_col_ix_map < _time_col_ix) * 1
-            # index of first unavailable window after time
-            first_unavailable = np.where(
-                (1 - available) * mask, _time_col_ix_map, 0
-            ).max()
-            available_run_length[row] = _time_col_ix - first_unavailable - 1
-        else:
-            # ones after specified time, zeroes before
-            mask = (_time_col_ix_map > _time_col_ix) * 1
-            # index of first unavailable window after time
-            first_unavailable = np.where(
-                (1 - available) * mask, _time_col_ix_map, num_cols
-            ).min()
-            available_run_length[row] = first_unavailable - _time_col_ix - 1
+        available_run_length[row] = _packed_window_run_length(
+            packed_windows[window_row_mapper[window_row_id_values[row]]],
+            num_periods,
+            time_ix_mapper[periods[row]],
+            before,
+        )
     return available_run_length
 
 
@@ -334,6 +509,9 @@ class TimeTable(object):
       5      6    ==>  0   2   4   0   0 ...
       5      7    ==>  0   2   7   4   0 ...
 
+    The window states are held packed into bit planes (see pack_windows), and
+    only unpacked to the int8 windows_df layout by get_windows_df (to checkpoint
+    the table) and export_for_numba (for sharrow).
     """
 
     def __init__(self, windows_df, tdd_alts_df, table_name=None):
@@ -348,9 +526,23 @@ class TimeTable(object):
 
         self.windows_table_name = table_name
 
-        self.windows_df = windows_df
-        self.windows = self.windows_df.values
-        self.checkpoint_df = None
+        self.window_row_index = windows_df.index
+        self.window_columns = windows_df.columns
+        self.packed_windows = pack_windows(windows_df.to_numpy())
+        # bits of the periods in each word (the last word may have spare bits)
+        self.packed_period_mask = pack_windows(
+            np.ones((1, len(windows_df.columns)), dtype=np.int8),
+            self.packed_windows.dtype,
+        )[0, 0]
+        self.checkpoint_packed_windows = None
+
+        # rows assigned since the windows_df last added to the pipeline by replace_table
+        self.replaced_windows_df = None
+        self.stale_rows = np.zeros(len(windows_df.index), dtype=bool)
+
+        # unpacked windows exported for sharrow, and rows assigned since last export
+        self.exported_windows = None
+        self.stale_exported_rows = np.zeros(len(windows_df.index), dtype=bool)
 
         # series to map window row index value to window row's ordinal index
         from activitysim.core.fast_mapping import FastMapping
@@ -379,6 +571,9 @@ class TimeTable(object):
         # we want range index so we can use raw numpy
         assert (tdd_alts_df.index == list(range(tdd_alts_df.shape[0]))).all()
         self.tdd_footprints = np.asanyarray([list(r) for r in w_strings]).astype(int)
+        self.tdd_footprint_planes = pack_windows(
+            self.tdd_footprints, self.packed_windows.dtype
+        )
 
         # by default, do not attach state to this object.
         self.state = None
@@ -395,24 +590,53 @@ class TimeTable(object):
             transaction_logger.log(
                 "timetable.begin_transaction %s" % self.windows_table_name
             )
-        self.checkpoint_df = self.windows_df.copy()
+        self.checkpoint_packed_windows = self.packed_windows.copy()
         self.transaction_loggers = transaction_loggers
         pass
 
     def rollback(self):
-        assert self.checkpoint_df is not None
+        assert self.checkpoint_packed_windows is not None
         for logger in self.transaction_loggers:
             logger.log("timetable.rollback %s" % self.windows_table_name)
-        self.windows_df = self.checkpoint_df
-        self.windows = self.windows_df.values
-        self.checkpoint_df = None
+        # the rows assigned in the transaction are stale again once rolled back
+        self._mark_stale(
+            (self.packed_windows != self.checkpoint_packed_windows).any(axis=(1, 2))
+        )
+        self.packed_windows = self.checkpoint_packed_windows
+        self.checkpoint_packed_windows = None
         self.transaction_loggers = None
 
+    @property
+    def num_periods(self):
+        return len(self.window_columns)
+
+    @property
+    def windows(self):
+        """
+        int8 array of window states, unpacked from packed_windows
+
+        This is a copy, so assignments into it do not 'take' in the timetable.
+        """
+        return self._unpack_rows(np.arange(len(self.window_row_index)))
+
+    def _unpack_rows(self, row_ixs):
+        return _unpack_windows(
+            self.packed_windows, np.asarray(row_ixs, dtype=np.int64), self.num_periods
+        )
+
     def export_for_numba(self):
+        # unpack the windows once, and after that only the rows assigned since
+        if self.exported_windows is None:
+            self.exported_windows = self.windows
+        else:
+            stale_row_ixs = np.flatnonzero(self.stale_exported_rows)
+            self.exported_windows[stale_row_ixs] = self._unpack_rows(stale_row_ixs)
+        self.stale_exported_rows[:] = False
+
         return dict(
             tt_row_mapper=self.window_row_ix._mapper,
             tt_col_mapper=self.time_ix._mapper,
-            tt_windows=self.windows,
+            tt_windows=self.exported_windows,
         )
 
     def attach_state(self, state: workflow.State):
@@ -425,7 +649,7 @@ class TimeTable(object):
         (in window_row_ids order)
         """
         row_ixs = self.window_row_ix.apply_to(window_row_ids.values)
-        windows = self.windows[row_ixs]
+        windows = self._unpack_rows(row_ixs)
 
         return windows
 
@@ -437,18 +661,23 @@ class TimeTable(object):
         # col ixs of periods in windows
         time_col_ixs = self.time_ix.apply_to(periods)
 
-        windows = self.windows[row_ixs, time_col_ixs]
+        windows = _packed_periods_states(
+            self.packed_windows,
+            np.asarray(row_ixs, dtype=np.int64),
+            np.asarray(time_col_ixs, dtype=np.int64),
+        )
 
         return windows
 
     def get_windows_df(self):
 
-        # It appears that assignments into windows write through to underlying pandas table.
-        # because we set windows = windows_df.values, and since all the columns are the same type
-        # so no need to refresh pandas dataframe, but if we had to it would go here
+        return pd.DataFrame(
+            self.windows, index=self.window_row_index, columns=self.window_columns
+        )
 
-        # assert (self.windows_df.values == self.windows).all()
-        return self.windows_df
+    def _mark_stale(self, row_ixs):
+        self.stale_rows[row_ixs] = True
+        self.stale_exported_rows[row_ixs] = True
 
     def replace_table(self, state: workflow.State):
         """
@@ -461,7 +690,7 @@ class TimeTable(object):
         """
 
         assert self.windows_table_name is not None
-        if self.checkpoint_df is not None:
+        if self.checkpoint_packed_windows is not None:
             for logger in self.transaction_loggers.values():
                 logger.log(
                     "Attempt to replace_table while in transaction: %s"
@@ -470,9 +699,20 @@ class TimeTable(object):
                 )
             raise RuntimeError("Attempt to replace_table while in transaction")
 
-        # get windows_df from bottleneck function in case updates to self.person_window
-        # do not write through to pandas dataframe
-        state.add_table(self.windows_table_name, self.get_windows_df())
+        # if the table is still the windows_df we last replaced, only unpack the
+        # rows assigned since then into it, rather than unpacking every row again
+        windows_df = None
+        if state.is_table(self.windows_table_name):
+            windows_df = state.get_dataframe(self.windows_table_name, as_copy=False)
+        if windows_df is not None and windows_df is self.replaced_windows_df:
+            stale_row_ixs = np.flatnonzero(self.stale_rows)
+            windows_df.iloc[stale_row_ixs] = self._unpack_rows(stale_row_ixs)
+        else:
+            windows_df = self.get_windows_df()
+
+        state.add_table(self.windows_table_name, windows_df)
+        self.replaced_windows_df = windows_df
+        self.stale_rows[:] = False
 
     def tour_available(self, window_row_ids, tdds):
         """
@@ -502,10 +742,10 @@ class TimeTable(object):
         try:
             available = _fast_tour_available(
                 tdds,
-                self.tdd_footprints,
+                self.tdd_footprint_planes,
                 window_row_ids,
                 self.window_row_ix._mapper,
-                self.windows,
+                self.packed_windows,
             )
         except KeyError:
             # key error messages here may not have enough detail to be useful,
@@ -517,11 +757,50 @@ class TimeTable(object):
 
         return available
 
+    def available_tour_tdds(self, window_row_ids, tdds):
+        """
+        find the tdd alts that each window allows
+
+        Equivalent to tour_available on every window_row_id repeated for every tdd,
+        but returns only the available pairs, without building the cross product.
+
+        Parameters
+        ----------
+        window_row_ids : pandas Series or numpy array
+            window_row_id of each tour
+        tdds : array-like
+            tdd_alt ids to test for each tour
+
+        Returns
+        -------
+        tour_ix : numpy array of int64
+            positions in window_row_ids of the available (tour, tdd) pairs
+        tdd_ix : numpy array of int64
+            positions in tdds of the available (tour, tdd) pairs, ordered by tdd_ix
+            within tour_ix
+        """
+        tdds = np.asanyarray(tdds).astype(np.int32)
+        window_row_ids = np.asanyarray(window_row_ids).astype(np.int64)
+
+        try:
+            return _fast_available_tour_tdds(
+                tdds,
+                self.tdd_footprint_planes,
+                window_row_ids,
+                self.window_row_ix._mapper,
+                self.packed_windows,
+            )
+        except KeyError:
+            logger.error("KeyError in _fast_available_tour_tdds")
+            logger.error(f"{window_row_ids=}")
+            logger.error(f"{self.window_row_ix._mapper=}")
+            raise
+
     def assign(self, window_row_ids, tdds):
         """
         Assign tours (represented by tdd alt ids) to persons
 
-        Updates self.windows numpy array. Assignments will not 'take' outside this object
+        Updates self.packed_windows. Assignments will not 'take' outside this object
         until/unless replace_table called or updated timetable retrieved by get_windows_df
 
         Parameters
@@ -537,13 +816,14 @@ class TimeTable(object):
         # vectorization doesn't work duplicates
         assert len(window_row_ids.index) == len(np.unique(window_row_ids.values))
 
-        # numpy array with one time window row for each person tdd
-        tour_footprints = self.tdd_footprints[tdds.values.astype(int)]
+        # packed footprint planes with one time window row for each person tdd
+        tour_footprints = self.tdd_footprint_planes[tdds.values.astype(int)]
 
         # row idxs of windows to assign to
         row_ixs = self.window_row_ix.apply_to(window_row_ids)
 
-        self.windows[row_ixs] = np.bitwise_or(self.windows[row_ixs], tour_footprints)
+        self.packed_windows[row_ixs] |= tour_footprints
+        self._mark_stale(row_ixs)
 
     def assign_subtour_mask(self, window_row_ids, tdds):
         """
@@ -571,16 +851,18 @@ class TimeTable(object):
 
         assert len(window_row_ids) == len(tdds)
 
-        self.windows.fill(0)
-        self.assign(window_row_ids, tdds)
-
-        # numpy array with one time window row for each person tdd
-        tour_footprints = self.tdd_footprints[tdds.values.astype(int)]
+        # packed footprint planes with one time window row for each person tdd
+        tour_footprints = self.tdd_footprint_planes[tdds.values.astype(int)]
 
         # row idxs of windows to assign to
         row_ixs = self.window_row_ix.apply_to(window_row_ids)
 
-        self.windows[row_ixs] = (tour_footprints == 0) * I_MIDDLE
+        # I_MIDDLE sets every bit plane of the periods outside the tour footprint
+        outside = ~np.bitwise_or.reduce(tour_footprints, axis=1)
+        self.packed_windows[row_ixs] = (
+            outside[:, np.newaxis, :] & self.packed_period_mask
+        )
+        self._mark_stale(row_ixs)
 
     def assign_footprints(self, window_row_ids, footprints):
         """
@@ -600,7 +882,7 @@ class TimeTable(object):
         assert len(window_row_ids) == footprints.shape[0]
 
         # require same number of periods in footprints
-        assert self.windows.shape[1] == footprints.shape[1]
+        assert self.num_periods == footprints.shape[1]
 
         # vectorization doesn't work with duplicate row_ids
         assert len(window_row_ids.values) == len(np.unique(window_row_ids.values))
@@ -608,7 +890,10 @@ class TimeTable(object):
         # row idxs of windows to assign to
         row_ixs = self.window_row_ix.apply_to(window_row_ids)
 
-        self.windows[row_ixs] = np.bitwise_or(self.windows[row_ixs], footprints)
+        self.packed_windows[row_ixs] |= pack_windows(
+            footprints, self.packed_windows.dtype
+        )
+        self._mark_stale(row_ixs)
 
     def pairwise_available(self, window1_row_ids, window2_row_ids):
 
@@ -642,7 +927,8 @@ class TimeTable(object):
         trace_label = "tt.adjacent_window_run_length"
         with chunk.chunk_log(self.state, trace_label) as chunk_sizer:
             available_run_length = _available_run_length_2(
-                self.windows,
+                self.packed_windows,
+                self.num_periods,
                 self.window_row_ix._mapper,
                 self.time_ix._mapper,
                 before,
@@ -814,7 +1100,10 @@ class TimeTable(object):
         """
         result = pd.Series(
             _max_time_blocks_available_1(
-                self.window_row_ix._mapper, self.windows, np.asarray(window_row_ids)
+                self.window_row_ix._mapper,
+                self.packed_windows,
+                self.num_periods,
+                np.asarray(window_row_ids),
             ),
             index=window_row_ids.index,
         )
@@ -850,13 +1139,32 @@ def _max_time_block_available_1(windows_row):
 
 
 @nb.njit
-def _max_time_blocks_available_1(tt_window_row_ix, tt_windows, window_row_ids):
+def _packed_max_time_block_available_1(planes, num_periods):
+    """
+    Same as _max_time_block_available_1, for a packed window row
+    """
+    max_block_avail = 0
+    current_block = 0
+    for i in range(1, num_periods - 1):
+        if _period_available(planes, i):
+            current_block += 1
+        else:
+            current_block = 0
+        if current_block > max_block_avail:
+            max_block_avail = current_block
+    return max_block_avail
+
+
+@nb.njit
+def _max_time_blocks_available_1(
+    tt_window_row_ix, packed_windows, num_periods, window_row_ids
+):
     max_blocks = np.zeros(window_row_ids.size, dtype=np.uint8)
     # FIXME consider dedupe/redupe window_row_ids for performance
     # as this may be called for alts with lots of duplicates (e.g. trip scheduling time pressure calculations)
     for j in range(window_row_ids.size):
-        max_blocks[j] = _max_time_block_available_1(
-            tt_windows[tt_window_row_ix[window_row_ids[j]]]
+        max_blocks[j] = _packed_max_time_block_available_1(
+            packed_windows[tt_window_row_ix[window_row_ids[j]]], num_periods
         )
     return max_blocks
 
@@ -944,7 +1252,8 @@ def sharrow_tt_remaining_periods_available(
 
 @nb.njit
 def _remaining_periods_available(
-    windows,  # ndarray
+    packed_windows,  # ndarray
+    num_periods,  # int
     windows_row_mapper,
     window_row_ids,  # ndarray[int]
     starts,  # ndarray[int]
@@ -965,9 +1274,11 @@ def _remaining_periods_available(
 
     Parameters
     ----------
+    packed_windows : array[unsigned int], 3 dimensions
+        Windows packed by pack_windows
+    num_periods : int
     windows_row_mapper : numba.typed.Dict[int,int]
-        Maps value in the `window_row_ids` to row positions in `windows`.
-    windows : array[int8], 2 dimensions
+        Maps value in the `window_row_ids` to row positions in `packed_windows`.
     window_row_ids : array[int], 1-dimension
     starts : array[int]
         A 1-dimension array the same shape as `window_row_ids` which
@@ -984,13 +1295,17 @@ def _remaining_periods_available(
     """
     result = np.empty(window_row_ids.shape, dtype=np.int64)
     for i in range(window_row_ids.shape[0]):
-        result[i] = sharrow_tt_remaining_periods_available(
-            windows,
-            windows_row_mapper,
-            window_row_ids[i],
-            starts[i],
-            ends[i],
-        )
+        planes = packed_windows[windows_row_mapper[window_row_ids[i]]]
+        available = 0
+        for j in range(num_periods):
+            if _period_available(planes, j):
+                available += 1
+        # don't count time window padding at both ends of day
+        available -= 2
+        this_block = ends[i] - starts[i] - 1
+        if this_block > 0:
+            available -= this_block
+        result[i] = available
     return result
 
 
@@ -1025,7 +1340,8 @@ def tt_remaining_periods_available(tt, window_row_ids, starts, ends):
     """
 
     result = _remaining_periods_available(
-        tt.windows,
+        tt.packed_windows,
+        tt.num_periods,
         tt.window_row_ix._mapper,
         window_row_ids.values,
         starts.values,
@@ -1076,9 +1392,20 @@ def _window_period_in_states(
     return False
 
 
+@nb.njit
+def _packed_periods_states(packed_windows, row_ixs, time_col_ixs):
+    """
+    States of the periods time_col_ixs of the packed window rows row_ixs
+    """
+    result = np.empty(row_ixs.shape, dtype=np.int8)
+    for i in range(row_ixs.shape[0]):
+        result[i] = _period_state(packed_windows[row_ixs[i]], time_col_ixs[i])
+    return result
+
+
 @nb.njit
 def _windows_periods_in_states(
-    windows,
+    packed_windows,
     windows_row_mapper,
     windows_col_mapper,
     window_row_ids,
@@ -1088,21 +1415,17 @@ def _windows_periods_in_states(
 ):
     result = np.empty(window_row_ids.shape, dtype=np.int8)
     for i in range(window_row_ids.shape[0]):
-        result[i] = _window_period_in_states(
-            windows,
-            windows_row_mapper,
-            windows_col_mapper,
-            window_row_ids[i],
-            periods[i],
-            state1,
-            state2,
+        w = _period_state(
+            packed_windows[windows_row_mapper[window_row_ids[i]]],
+            windows_col_mapper[periods[i]],
         )
+        result[i] = w == state1 or w == state2
     return result
 
 
 def tt_previous_tour_ends(tt, window_row_ids, periods):
     return _windows_periods_in_states(
-        tt.windows,
+        tt.packed_windows,
         tt.window_row_ix._mapper,
         tt.time_ix._mapper,
         window_row_ids.values,
@@ -1129,7 +1452,7 @@ def sharrow_tt_previous_tour_ends(
 
 def tt_previous_tour_begins(tt, window_row_ids, periods):
     return _windows_periods_in_states(
-        tt.windows,
+        tt.packed_windows,
         tt.window_row_ix._mapper,
         tt.time_ix._mapper,
         window_row_ids.values,
@@ -1156,7 +1479,8 @@ def sharrow_tt_previous_tour_begins(
 
 def tt_adjacent_window_before(tt, window_row_ids, periods):
     return _available_run_length_2(
-        tt.windows,
+        tt.packed_windows,
+        tt.num_periods,
         tt.window_row_ix._mapper,
         tt.time_ix._mapper,
         True,
@@ -1181,7 +1505,8 @@ def sharrow_tt_adjacent_window_before(
 
 def tt_adjacent_window_after(tt, window_row_ids, periods):
     return _available_run_length_2(
-        tt.windows,
+        tt.packed_windows,
+        tt.num_periods,
         tt.window_row_ix._mapper,
         tt.time_ix._mapper,
         False,
@@ -4,6 +4,7 @@ import abc
 import datetime as dt
 import logging
 import os
+import shutil
 import warnings
 from pathlib import Path
 from typing import Optional, TypeVar
@@ -320,6 +321,12 @@ class ParquetStore(GenericCheckpointStore):
             raise ValueError("store is read-only")
         filepath = self._store_table_path(table_name, checkpoint_name)
         filepath.parent.mkdir(parents=True, exist_ok=True)
+        # never overwrite in place, the existing file may be hard linked from
+        # another pipeline by streaming apportion or coalesce
+        if filepath.is_dir():
+            shutil.rmtree(filepath)
+        elif filepath.exists():
+            filepath.unlink()
         if complib == "NOTSET":
             self._to_parquet(pd.DataFrame(df), filepath)
         else:
@@ -350,6 +357,19 @@ class ParquetStore(GenericCheckpointStore):
                         zip_internal_filename.with_suffix(".pickle.gz").as_posix()
                     ) as zipo:
                         return pd.read_pickle(zipo, compression="gzip")
+                # a dataset directory of parquet parts (see coalesce_pipelines)
+                parts = sorted(
+                    name
+                    for name in namelist
+                    if name.startswith(zip_internal_filename.as_posix() + "/")
+                    and name.endswith(".parquet")
+                )
+                if parts:
+                    dfs = []
+                    for part in parts:
+                        with zipf.open(part) as zipo:
+                            dfs.append(pd.read_parquet(zipo))
+                    return pd.concat(dfs)
                 checkpoint_name_ = self._get_store_checkpoint_from_named_checkpoint(
                     table_name, checkpoint_name
                 )
@@ -371,6 +391,41 @@ class ParquetStore(GenericCheckpointStore):
                     return self.get_dataframe(table_name, checkpoint_name_)
             raise FileNotFoundError(target_path)
 
+    def get_table_path(self, table_name: str, checkpoint_name: str = None) -> Path:
+        """
+        Get the location of the parquet data for a table.
+
+        Parameters
+        ----------
+        table_name : str
+        checkpoint_name : str, optional
+            The name of the checkpoint, if not given the last stored checkpoint
+            is used.  Back-tracks to the checkpoint where the table was written.
+
+        Returns
+        -------
+        Path or None
+            A parquet file, or a directory of parquet files that together make up
+            the table, or None if the table was stored as a pickle.
+        """
+        if checkpoint_name is None:
+            checkpoint_name = LAST_CHECKPOINT
+        if checkpoint_name == LAST_CHECKPOINT:
+            checkpoint_name = self._get_store_checkpoint_from_named_checkpoint(
+                table_name, checkpoint_name
+            )
+        target_path = self._store_table_path(table_name, checkpoint_name)
+        if target_path.exists():
+            return target_path
+        elif target_path.with_suffix(".pickle.gz").exists():
+            return None
+        checkpoint_name_ = self._get_store_checkpoint_from_named_checkpoint(
+            table_name, checkpoint_name
+        )
+        if checkpoint_name_ != checkpoint_name:
+            return self.get_table_path(table_name, checkpoint_name_)
+        raise FileNotFoundError(target_path)
+
     @property
     def is_readonly(self) -> bool:
         return self._mode == "r"
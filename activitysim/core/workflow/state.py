@@ -180,14 +180,17 @@ class State:
     def _initialize_prng(self, base_seed=None):
         from activitysim.core.random import Random
 
-        self._context["prng"] = Random()
-        if base_seed is None:
-            try:
-                self.settings
-            except StateAccessError:
+        try:
+            self.settings
+        except StateAccessError:
+            engine = "legacy"
+            if base_seed is None:
                 base_seed = 0
-            else:
+        else:
+            engine = self.settings.rng_engine
+            if base_seed is None:
                 base_seed = self.settings.rng_base_seed
+        self._context["prng"] = Random(engine=engine)
         self._context["prng"].set_base_seed(base_seed)
 
     def import_extensions(self, ext: str | Iterable[str] = None, append=True) -> None: